@@ -0,0 +1,122 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+
+#
+# Baselines of benchmark results.
+#
+# A baseline file (JSON) maps the key of a benchmark run (e.g. the tool
+# versions and the host) to the results of its first run, a dict of
+# {metric : value}.  The results of later runs with the same key are compared
+# to it metric by metric.  Whether a metric regressed is decided by the rule
+# for that metric that the benchmark gives (see the isBenchmark*Regressed()
+# functions), e.g. for a time it is more than (1 + tolerance) times the
+# baseline and for a bandwidth it is less than the baseline divided by
+# (1 + tolerance).
+#
+
+from FindGeneralScriptSupport import *
+
+import json
+
+
+#
+# The rules for whether a metric regressed compared to its baseline value
+#
+
+# Lower is better (e.g. a time or a latency)
+def isBenchmarkIncreaseRegressed(value, baseValue, tolerance):
+  return value > baseValue * (1.0 + tolerance)
+
+
+# Higher is better (e.g. a bandwidth or a rate)
+def isBenchmarkDecreaseRegressed(value, baseValue, tolerance):
+  return value < baseValue / (1.0 + tolerance)
+
+
+# Any increase is a regression (e.g. a count that does not depend on the
+# speed of the machine)
+def isBenchmarkCountRegressed(value, baseValue, tolerance):
+  return value > baseValue
+
+
+#
+# Get the regressions of the results compared to the baseline (as a list of
+# messages, empty if there are none).  getMetricRule(metric) returns the rule
+# (one of the isBenchmark*Regressed() functions) for a metric.
+#
+def getBenchmarkRegressions(results, baseline, tolerance, getMetricRule):
+  regressions = []
+  for metric in sorted(results.keys()):
+    if not metric in baseline:
+      continue
+    (value, baseValue) = (results[metric], baseline[metric])
+    if getMetricRule(metric)(value, baseValue, tolerance):
+      regressions.append("%s: %.3f (baseline %.3f)" %
+        (metric, value, baseValue))
+  return regressions
+
+
+#
+# Get the results compared to the baseline as a table
+#
+def getBenchmarkReportStr(results, baseline):
+  reportStr = "  %-34s %12s %12s\n" % ("metric", "result", "baseline")
+  for metric in sorted(results.keys()):
+    if metric in baseline:
+      baseValueStr = "%12.3f" % baseline[metric]
+    else:
+      baseValueStr = "%12s" % "-"
+    reportStr += "  %-34s %12.3f %s\n" % (metric, results[metric],
+      baseValueStr)
+  return reportStr
+
+
+def readBenchmarkBaselines(baselineFile):
+  if not os.path.exists(baselineFile):
+    return {}
+  return json.loads(readStrFromFile(baselineFile))
+
+
+def writeBenchmarkBaselines(baselineFile, baselines):
+  baselineDir = os.path.dirname(baselineFile)
+  if baselineDir and not os.path.exists(baselineDir):
+    os.makedirs(baselineDir)
+  writeStrToFile(baselineFile, json.dumps(baselines, sort_keys=True,
+    indent=2)+"\n")
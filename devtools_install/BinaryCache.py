@@ -0,0 +1,163 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Cache of the built tool installs (gcc, MPI, TPLs, ...).
+#
+# After a tool is built and installed, its install directory
+# <toolset>/<tool>-<ver> is packed into a .tar.gz and stored in the cache
+# under a key that is a hash of the tool name and version, its configure
+# flags, the hashes of the compilers used to build it and the host arch.
+# A later install with the same key is restored from the cache instead of
+# being built again.
+#
+# The storage and the LRU size cap are the same as the SourceCache (the
+# cached file for a tool is named '<key>.tar.gz').
+#
+
+from FindGeneralScriptSupport import *
+from SourceCache import *
+
+import hashlib
+import json
+import platform
+
+
+binaryCacheDir_default = os.path.join(os.path.expanduser("~"), ".cache",
+  "mpact-dev-env", "binaries")
+
+binaryCacheMaxSizeGb_default = "50"
+
+
+#
+# Find an executable in the PATH (or return '' if it is not found)
+#
+def findExecutable(exeName):
+  if os.path.isabs(exeName):
+    if os.path.exists(exeName):
+      return exeName
+    return ""
+  for pathDir in os.environ.get("PATH", "").split(os.pathsep):
+    exePath = os.path.join(pathDir, exeName)
+    if os.path.isfile(exePath) and os.access(exePath, os.X_OK):
+      return exePath
+  return ""
+
+
+#
+# Get the sha256 of a compiler executable (following any symlinks), or ''
+# if it can't be found
+#
+def getCompilerHash(compiler):
+  exePath = findExecutable(compiler)
+  if not exePath:
+    return ""
+  return getFileSha256(os.path.realpath(exePath))
+
+
+#
+# Get the host arch and the C library version that the binaries depend on
+#
+def getHostArch():
+  (libcName, libcVersion) = platform.libc_ver()
+  return platform.system()+"-"+platform.machine()+"-"+libcName+libcVersion
+
+
+#
+# Get the binary cache key for a tool install
+#
+# If the install is relocatable (i.e. it works when moved to another
+# directory), then installDir is left out of the configure flags so the
+# same cache entry can be used for any install dir.
+#
+def getBinaryCacheKey(toolName, toolVersion, configureFlags, compilers,
+  installDir="", relocatable=False \
+  ):
+  if relocatable and installDir:
+    configureFlags = configureFlags.replace(installDir, "<install-dir>")
+  keyInputs = {
+    "tool" : toolName,
+    "version" : toolVersion,
+    "configureFlags" : configureFlags,
+    "compilers" : [getCompilerHash(compiler) for compiler in compilers],
+    "arch" : getHostArch(),
+    }
+  return hashlib.sha256(
+    json.dumps(keyInputs, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+#
+# Persistent cache of the tool installs
+#
+class BinaryCache(SourceCache):
+
+  cacheDesc = "binary cache"
+
+  def getFileName(self, key):
+    return key+".tar.gz"
+
+  def contains(self, toolName, toolVersion, key, touch=True):
+    return self.lookup(toolName, toolVersion, self.getFileName(key),
+      touch=touch) != None
+
+  # Restore the install dir from the cache.  The commands are run with
+  # task.runCmnd() so they go to the log of the task.  Returns True if it
+  # was in the cache.
+  def restore(self, task, toolName, toolVersion, key, installDir):
+    tmpTarball = os.path.join(task.scratchDir, self.getFileName(key))
+    if not self.fetch(toolName, toolVersion, self.getFileName(key),
+      tmpTarball \
+      ):
+      return False
+    (parentDir, installDirName) = os.path.split(installDir)
+    extractCmnd = getExtractTarballCmnd(tmpTarball, parentDir) or \
+      "tar -xzf "+tmpTarball+" -C "+parentDir
+    task.runCmnd("rm -rf "+installDir+" && mkdir -p "+parentDir+" && " \
+      +extractCmnd+" && rm -f "+tmpTarball)
+    return True
+
+  # Pack the install dir and add it to the cache
+  def storeInstall(self, task, toolName, toolVersion, key, installDir):
+    tmpTarball = os.path.join(task.scratchDir, self.getFileName(key))
+    (parentDir, installDirName) = os.path.split(installDir)
+    task.runCmnd("tar -czf "+tmpTarball+" -C "+parentDir+" "+installDirName)
+    try:
+      self.store(toolName, toolVersion, self.getFileName(key), tmpTarball)
+    finally:
+      os.remove(tmpTarball)
@@ -0,0 +1,160 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Automatic build parallelism (--parallel=auto).
+#
+# The number of make jobs for a tool is the number of cores that can be used,
+# capped so that each job has the memory it needs.  The memory per job is a
+# rough peak resident size of one compile of that tool (e.g. GCC's C++ and
+# Fortran front ends need a lot more than the C files of MPICH).  The cores and
+# the memory available take the cgroup limits into account so that this works
+# in a container too.
+#
+
+from FindGeneralScriptSupport import *
+
+import multiprocessing
+
+
+autoParallelLevel = "auto"
+
+# Peak memory in MB needed per make job of each tool
+toolMemPerJobMb = {
+  "gitdist" : 0,
+  "autoconf" : 256,
+  "cmake" : 768,
+  "gcc" : 2048,
+  "mpich" : 512,
+  "mvapich" : 512,
+  "openmpi" : 512,
+  "git" : 256,
+  "vera_tpls" : 1536,
+  }
+
+toolMemPerJobMb_default = 1024
+
+
+#
+# Read the first line of a file (or '' if it can't be read)
+#
+def readFirstLine(fileName):
+  try:
+    fileHandle = open(fileName, "r")
+    try:
+      return fileHandle.readline().strip()
+    finally:
+      fileHandle.close()
+  except (IOError, OSError):
+    return ""
+
+
+#
+# Get the number of cores this process can use
+#
+def getNumCores():
+  if hasattr(os, "sched_getaffinity"):
+    numCores = len(os.sched_getaffinity(0))
+  else:
+    numCores = multiprocessing.cpu_count()
+  # cgroup v2 (e.g. 'docker run --cpus=4') then v1 CPU quota
+  cpuMax = readFirstLine("/sys/fs/cgroup/cpu.max").split()
+  if len(cpuMax) == 2 and cpuMax[0] != "max":
+    quota = float(cpuMax[0])
+    period = float(cpuMax[1])
+  else:
+    quota = float(readFirstLine("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") or -1)
+    period = float(readFirstLine("/sys/fs/cgroup/cpu/cpu.cfs_period_us") or 0)
+  if quota > 0 and period > 0:
+    numCores = min(numCores, int(math.ceil(quota/period)))
+  return max(1, numCores)
+
+
+#
+# Get the memory available for the build in MB
+#
+def getAvailableMemoryMb():
+  memInfo = {}
+  if os.path.exists("/proc/meminfo"):
+    for line in readStrFromFile("/proc/meminfo").splitlines():
+      lineParts = line.split()
+      if len(lineParts) >= 2:
+        memInfo[lineParts[0].rstrip(":")] = int(lineParts[1])
+  availableMb = memInfo.get("MemAvailable", memInfo.get("MemFree", 0)) / 1024
+  # cgroup v2 then v1 memory limit
+  for (limitFile, usageFile) in [
+    ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory.current"),
+    ("/sys/fs/cgroup/memory/memory.limit_in_bytes",
+     "/sys/fs/cgroup/memory/memory.usage_in_bytes"),
+    ]:
+    limit = readFirstLine(limitFile)
+    if limit and limit != "max":
+      usage = readFirstLine(usageFile) or "0"
+      cgroupAvailableMb = (int(limit) - int(usage)) / (1024*1024)
+      if cgroupAvailableMb > 0 and (not availableMb or \
+        cgroupAvailableMb < availableMb):
+        availableMb = cgroupAvailableMb
+      break
+  return int(availableMb)
+
+
+def getToolMemPerJobMb(toolName):
+  return toolMemPerJobMb.get(toolName, toolMemPerJobMb_default)
+
+
+#
+# Get the number of make jobs for a tool from the cores and the memory
+#
+# If memAvailableMb is 0 (i.e. unknown), only the cores are used.
+#
+def getAutoNumJobs(toolName, numCores, memAvailableMb):
+  numJobs = numCores
+  memPerJobMb = getToolMemPerJobMb(toolName)
+  if memAvailableMb and memPerJobMb:
+    numJobs = min(numJobs, memAvailableMb // memPerJobMb)
+  return max(1, numJobs)
+
+
+#
+# Get the number of jobs for --parallel=<num>|auto for a tool
+#
+def getParallelJobs(parallelLevel, toolName):
+  if str(parallelLevel) == autoParallelLevel:
+    return getAutoNumJobs(toolName, getNumCores(), getAvailableMemoryMb())
+  return int(parallelLevel)
@@ -0,0 +1,285 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Machine-readable execution plan of an install (--plan=<file>).
+#
+# The plan is made by running the install in --no-op mode with a BuildPlan
+# attached to the downloads and the install tasks.  Each download records
+# where it would come from (up to date, mirror, source cache or network),
+# each task records its dependencies and each of its stages records if its
+# stamp is up to date or if it would run.  The binary cache entry of each
+# tool is recorded as 'unknown' since its key depends on compilers that may
+# not be installed yet (see setBinaryCacheStatus()).
+#
+# The duration of each download and stage is estimated from the previous
+# runs recorded in the timeline file (see BuildTimeline.py) as the average
+# wall time of its last few completed runs.  If a tool has no history for
+# that version, the history of the other versions of the tool is used.
+# The plan is written as JSON like:
+#
+#   {
+#     "downloads" : [{"name" : ..., "url" : ..., "source" : ...,
+#       "estimate" : ...}, ...],
+#     "tools" : [{"name" : ..., "deps" : [...], "maxProcs" : ...,
+#       "binaryCache" : "hit|miss|unknown|",
+#       "status" : "pending|up-to-date|failed|skipped", "estimate" : ...,
+#       "stages" : [{"name" : ..., "action" : "run|up-to-date",
+#         "estimate" : ...}, ...]}, ...],
+#     "estimates" : {"download" : ..., "install" : ..., "total" : ...,
+#       "criticalPath" : [...], "unestimated" : [...]}
+#   }
+#
+# The estimates are in seconds and are null if there is no history for them.
+# The install estimate is the critical path through the install graph so it
+# assumes that there are enough processes to run the other tools alongside.
+# The TPL benchmarks run one at a time after all of the installs so they are
+# added to the end of it (see setToolsRunAfter()).
+#
+
+from FindGeneralScriptSupport import *
+from BuildTimeline import readAllTimelineEvents, getCriticalPath
+
+import json
+import threading
+
+
+# Number of the last completed runs of a stage that its estimate is
+# averaged over
+numEstimateRuns_default = 3
+
+reToolVersionSuffix = re.compile(r"^(.*)-[0-9][^-]*$")
+
+
+#
+# Get the name of a tool without its version (e.g. 'gcc' for 'gcc-4.8.3')
+#
+def getToolBaseName(toolName):
+  # NOTE: The tasks of a --matrix toolset have the suffix @<variant>
+  toolName = toolName.split("@")[0]
+  match = reToolVersionSuffix.match(toolName)
+  if match:
+    return match.group(1)
+  return toolName
+
+
+#
+# Get the estimated wall time of each (tool, stage) and (tool base name,
+# stage) from the 'stage' events of the previous runs
+#
+def getStageDurationEstimates(events, numRuns=numEstimateRuns_default):
+  stageWalls = {}
+  for event in sorted(events, key=lambda e: e.get("start", 0.0)):
+    if event["event"] != "stage" or event["status"] != "done":
+      continue
+    for toolName in [event["tool"], getToolBaseName(event["tool"])]:
+      stageWalls.setdefault((toolName, event["stage"]), []).append(
+        event["wall"])
+  estimates = {}
+  for (key, walls) in stageWalls.items():
+    lastWalls = walls[-numRuns:]
+    estimates[key] = sum(lastWalls) / len(lastWalls)
+  return estimates
+
+
+#
+# Read the stage duration estimates out of a timeline file (empty if there
+# is no timeline file yet)
+#
+def readStageDurationEstimates(timelineFile):
+  if not os.path.exists(timelineFile):
+    return {}
+  return getStageDurationEstimates(readAllTimelineEvents(timelineFile))
+
+
+class BuildPlan:
+
+  def __init__(self, estimates):
+    self.estimates = estimates
+    self.downloads = []
+    self.tools = []
+    self.toolsDict = {}
+    self.lock = threading.Lock()
+
+  def getEstimate(self, toolName, stageName):
+    estimate = self.estimates.get((toolName, stageName), None)
+    if estimate is None:
+      estimate = self.estimates.get((getToolBaseName(toolName), stageName),
+        None)
+    return estimate
+
+  def addDownload(self, name, url, source):
+    self.lock.acquire()
+    try:
+      if source == "up-to-date":
+        estimate = 0.0
+      else:
+        estimate = self.getEstimate(name, "download")
+      self.downloads.append({"name" : name, "url" : url, "source" : source,
+        "estimate" : estimate})
+    finally:
+      self.lock.release()
+
+  def addTool(self, toolName, deps, maxProcs):
+    self.lock.acquire()
+    try:
+      self._getTool(toolName).update({"deps" : list(deps),
+        "maxProcs" : maxProcs})
+    finally:
+      self.lock.release()
+
+  # Record the status of a tool after the --no-op run.  A task that
+  # completed only traced its stages so it is 'pending' if any of its stages
+  # would run (or it has none recorded) and 'up-to-date' if none would.
+  def setToolStatus(self, toolName, status):
+    self.lock.acquire()
+    try:
+      tool = self._getTool(toolName)
+      if status == "done":
+        if tool["stages"] and \
+          not [stage for stage in tool["stages"] if stage["action"] == "run"] \
+          :
+          status = "up-to-date"
+        else:
+          status = "pending"
+      tool["status"] = status
+    finally:
+      self.lock.release()
+
+  # Record the binary cache lookup of a tool (hit is None if its key is
+  # unknown)
+  def setBinaryCacheStatus(self, toolName, hit):
+    self.lock.acquire()
+    try:
+      if hit is None:
+        self._getTool(toolName)["binaryCache"] = "unknown"
+      elif hit:
+        self._getTool(toolName)["binaryCache"] = "hit"
+      else:
+        self._getTool(toolName)["binaryCache"] = "miss"
+    finally:
+      self.lock.release()
+
+  # Record that the tools toolNames run one at a time in that order after
+  # all of the tools afterToolNames are done (e.g. the benchmarks after the
+  # installs) so that they are part of the critical path
+  def setToolsRunAfter(self, toolNames, afterToolNames):
+    self.lock.acquire()
+    try:
+      deps = list(afterToolNames)
+      for toolName in toolNames:
+        tool = self._getTool(toolName)
+        tool["deps"] = deps + [dep for dep in tool["deps"] if not dep in deps]
+        deps = [toolName]
+    finally:
+      self.lock.release()
+
+  # Record a stage of a tool.  willRun is False if its stamp is up to date.
+  def addStage(self, toolName, stageName, willRun):
+    self.lock.acquire()
+    try:
+      if willRun:
+        (action, estimate) = ("run", self.getEstimate(toolName, stageName))
+      else:
+        (action, estimate) = ("up-to-date", 0.0)
+      self._getTool(toolName)["stages"].append({"name" : stageName,
+        "action" : action, "estimate" : estimate})
+    finally:
+      self.lock.release()
+
+  # Get the plan as JSON-able data
+  def getPlan(self, numDownloadJobs=1):
+    unestimated = []
+    downloadEstimates = []
+    for download in self.downloads:
+      if download["estimate"] is None:
+        unestimated.append(download["name"]+"/download")
+      else:
+        downloadEstimates.append(download["estimate"])
+    # The downloads run concurrently so they take at least as long as the
+    # longest one
+    downloadEstimate = 0.0
+    if downloadEstimates:
+      downloadEstimate = max(max(downloadEstimates),
+        sum(downloadEstimates) / max(1, numDownloadJobs))
+    taskEvents = []
+    for tool in self.tools:
+      tool["estimate"] = 0.0
+      for stage in tool["stages"]:
+        if stage["estimate"] is None:
+          unestimated.append(tool["name"]+"/"+stage["name"])
+        else:
+          tool["estimate"] += stage["estimate"]
+      taskEvents.append({"event" : "task", "tool" : tool["name"],
+        "deps" : tool["deps"], "wall" : tool["estimate"]})
+    (criticalPath, installEstimate) = getCriticalPath(taskEvents)
+    return {
+      "downloads" : self.downloads,
+      "tools" : self.tools,
+      "estimates" : {
+        "download" : downloadEstimate,
+        "install" : installEstimate,
+        "total" : downloadEstimate + installEstimate,
+        "criticalPath" : [event["tool"] for event in criticalPath],
+        "unestimated" : unestimated,
+        },
+      }
+
+  def _getTool(self, toolName):
+    if not toolName in self.toolsDict:
+      tool = {"name" : toolName, "deps" : [], "maxProcs" : 1,
+        "binaryCache" : "", "status" : "", "stages" : []}
+      self.tools.append(tool)
+      self.toolsDict[toolName] = tool
+    return self.toolsDict[toolName]
+
+
+#
+# Write the plan as JSON to planFile (or to stdout if planFile is '-')
+#
+# NOTE: The plan is written to the real stdout in case sys.stdout was pointed
+# to stderr to keep the rest of the output out of it.
+#
+def writeBuildPlan(plan, planFile):
+  planStr = json.dumps(plan, indent=2, sort_keys=True)+"\n"
+  if planFile == "-":
+    sys.__stdout__.write(planStr)
+    sys.__stdout__.flush()
+  else:
+    writeStrToFile(planFile, planStr)
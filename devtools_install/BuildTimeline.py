@@ -0,0 +1,230 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Structured timeline of the downloads and the install stages of each tool.
+#
+# Each event is written as one JSON object per line (JSON lines) to the
+# timeline file.  The events are:
+#
+#   {"event" : "run-start", "runId" : ..., "time" : ..., "script" : ...}
+#
+#   {"event" : "stage", "runId" : ..., "script" : ..., "tool" : ...,
+#    "stage" : ..., "start" : ..., "end" : ..., "wall" : ..., "cpu" : ...,
+#    "exitCode" : ..., "status" : "done|skipped|failed", "log" : ...}
+#
+#   {"event" : "task", "runId" : ..., "tool" : ..., "deps" : [...],
+#    "start" : ..., "end" : ..., "wall" : ..., "status" : ...}
+#
+# The times are in seconds.  The CPU time of a stage is the user + system
+# time of the commands run in it.  The 'task' events are for the nodes of
+# the install dependency graph and are used to find the critical path.
+#
+
+from FindGeneralScriptSupport import *
+
+import json
+import threading
+
+
+buildTimelineFileName_default = "timeline.jsonl"
+
+
+#
+# Append-only JSON lines timeline of a run
+#
+class BuildTimeline:
+
+  # If runId is empty, this is a new run.  Otherwise the events are added to
+  # the run with that ID (e.g. for an install-<tool>.py script run by
+  # install_devtools.py).
+  def __init__(self, timelineFile, scriptName, runId=""):
+    self.timelineFile = timelineFile
+    self.scriptName = scriptName
+    self.lock = threading.Lock()
+    timelineDir = os.path.dirname(timelineFile)
+    if timelineDir and not os.path.exists(timelineDir):
+      os.makedirs(timelineDir)
+    if runId:
+      self.runId = runId
+    else:
+      self.runId = "%s-%d" % (time.strftime("%Y%m%d-%H%M%S"), os.getpid())
+      self.addEvent({"event" : "run-start", "time" : time.time()})
+
+  def addEvent(self, event):
+    event["runId"] = self.runId
+    event["script"] = self.scriptName
+    eventLine = json.dumps(event, sort_keys=True)+"\n"
+    self.lock.acquire()
+    try:
+      # NOTE: The whole line is written at once so that lines from other
+      # threads or processes appending to the same file don't get mixed up
+      timelineFileHandle = open(self.timelineFile, "a")
+      try:
+        timelineFileHandle.write(eventLine)
+      finally:
+        timelineFileHandle.close()
+    finally:
+      self.lock.release()
+
+  def addStageEvent(self, toolName, stageName, startTime, endTime, cpuTime,
+    exitCode, status, logFile="" \
+    ):
+    self.addEvent({"event" : "stage", "tool" : toolName, "stage" : stageName,
+      "start" : startTime, "end" : endTime, "wall" : endTime-startTime,
+      "cpu" : cpuTime, "exitCode" : exitCode, "status" : status,
+      "log" : logFile})
+
+  def addTaskEvent(self, toolName, deps, startTime, endTime, status):
+    self.addEvent({"event" : "task", "tool" : toolName, "deps" : deps,
+      "start" : startTime, "end" : endTime, "wall" : endTime-startTime,
+      "status" : status})
+
+
+#
+# Read the events of all of the runs out of a timeline file
+#
+def readAllTimelineEvents(timelineFile):
+  events = []
+  for line in readStrFromFile(timelineFile).splitlines():
+    if not line.strip():
+      continue
+    try:
+      events.append(json.loads(line))
+    except ValueError:
+      # A line cut off by a killed run
+      continue
+  return events
+
+
+#
+# Read the events of a run out of a timeline file (the last run if runId is
+# empty)
+#
+def readTimelineEvents(timelineFile, runId=""):
+  events = readAllTimelineEvents(timelineFile)
+  if not runId:
+    runStarts = [e for e in events if e["event"] == "run-start"]
+    if not runStarts:
+      return []
+    runId = runStarts[-1]["runId"]
+  return [e for e in events if e["runId"] == runId]
+
+
+#
+# Get the critical path through the install tasks
+#
+# Returns (path, length) where path is the list of task events along the
+# chain of dependencies that took the longest and length is the sum of
+# their wall times.
+#
+def getCriticalPath(events):
+  taskEvents = {}
+  for event in events:
+    if event["event"] == "task":
+      taskEvents[event["tool"]] = event
+  finish = {}
+  prev = {}
+  def getFinish(name):
+    if not name in finish:
+      finish[name] = 0.0
+      prev[name] = None
+      best = 0.0
+      for dep in taskEvents[name]["deps"]:
+        if dep in taskEvents and (prev[name] is None or getFinish(dep) > best):
+          best = getFinish(dep)
+          prev[name] = dep
+      finish[name] = best + taskEvents[name]["wall"]
+    return finish[name]
+  if not taskEvents:
+    return ([], 0.0)
+  last = max(taskEvents.keys(), key=getFinish)
+  path = []
+  name = last
+  while name:
+    path.insert(0, taskEvents[name])
+    name = prev[name]
+  return (path, finish[last])
+
+
+#
+# Get the timeline report as a string
+#
+def getTimelineReportStr(events):
+
+  stageEvents = [e for e in events if e["event"] == "stage"]
+  taskEvents = [e for e in events if e["event"] == "task"]
+  runStarts = [e for e in events if e["event"] == "run-start"]
+
+  reportStr = ""
+
+  # Wall and CPU time per tool and stage (in the order they started)
+  toolNames = []
+  for event in sorted(stageEvents, key=lambda e: e["start"]):
+    if not event["tool"] in toolNames:
+      toolNames.append(event["tool"])
+  reportStr += "\nWall-clock and CPU time per tool and stage:\n\n"
+  reportStr += "  %-36s %10s %10s  %s\n" % ("tool / stage", "wall (s)",
+    "cpu (s)", "status")
+  for toolName in toolNames:
+    toolStages = [e for e in stageEvents if e["tool"] == toolName]
+    reportStr += "  %-36s %10.1f %10.1f\n" % (toolName,
+      sum([e["wall"] for e in toolStages]), sum([e["cpu"] for e in toolStages]))
+    for event in toolStages:
+      stageName = event["stage"]
+      if event["script"] != toolStages[0]["script"]:
+        stageName += " ("+event["script"]+")"
+      reportStr += "    %-34s %10.1f %10.1f  %s\n" % (stageName, event["wall"],
+        event["cpu"], event["status"])
+
+  # Critical path through the install dependency graph
+  (criticalPath, criticalPathLength) = getCriticalPath(events)
+  if criticalPath:
+    installWall = max([e["end"] for e in taskEvents]) - \
+      min([e["start"] for e in taskEvents])
+    reportStr += "\nCritical path of the install graph (%.1f s of %.1f s" \
+      " install wall time):\n\n" % (criticalPathLength, installWall)
+    for event in criticalPath:
+      reportStr += "  %-36s %10.1f\n" % (event["tool"], event["wall"])
+
+  if runStarts and stageEvents:
+    totalWall = max([e["end"] for e in stageEvents]) - runStarts[0]["time"]
+    reportStr += "\nTotal wall time: %.1f s\n" % totalWall
+
+  return reportStr
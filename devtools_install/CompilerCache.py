@@ -0,0 +1,174 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Compiler cache (ccache) for the tool builds.
+#
+# The C, C++ and Fortran compilers are run through 'ccache <compiler>' with
+# CCACHE_DIR set to the --compiler-cache=<dir> directory so that re-building
+# the same sources (e.g. a similar toolset or a build after a failed one) gets
+# the object files out of the cache.  There are three ways to wrap the
+# compilers, depending on what the build records about them:
+#
+#   getEnv(): CC, CXX and FC env vars for the configure and build (for builds
+#   that do not record the compilers in what they install, e.g. GCC).
+#
+#   getMakeVarsStr(): CC=..., CXX=... and FC=... arguments to 'make' (for
+#   autotools builds that record the compilers at configure time, e.g. the
+#   MPI compiler wrappers, which must not call ccache).
+#
+#   getCMakeLauncherOptions(): CMAKE_<LANG>_COMPILER_LAUNCHER options (for
+#   CMake builds).
+#
+# The hit rate of the run is the difference of the 'ccache -s' stats at the
+# start and the end.
+#
+
+from FindGeneralScriptSupport import *
+from BinaryCache import findExecutable
+
+
+compilerCacheEnvVarDefaults = [
+  ("CC", "gcc"),
+  ("CXX", "g++"),
+  ("FC", "gfortran"),
+  ]
+
+compilerCacheCMakeLangs = ["C", "CXX", "Fortran"]
+
+
+#
+# Get the (hits, misses) out of the output of 'ccache -s'
+#
+# This handles both the old format (e.g. 'cache hit (direct)   12') and the
+# ccache 4.x format (e.g. 'Hits:   12 / 20 (60.00 %)').
+#
+def parseCcacheStats(statsStr):
+  hits = 0
+  misses = 0
+  for line in statsStr.splitlines():
+    line = line.strip()
+    oldHitMatch = re.match(r"cache hit \((direct|preprocessed)\)\s+(\d+)", line)
+    oldMissMatch = re.match(r"cache miss\s+(\d+)", line)
+    newHitMatch = re.match(r"Hits:\s+(\d+)", line)
+    newMissMatch = re.match(r"Misses:\s+(\d+)", line)
+    if oldHitMatch:
+      hits += int(oldHitMatch.group(2))
+    elif oldMissMatch:
+      misses += int(oldMissMatch.group(1))
+    elif newHitMatch:
+      hits += int(newHitMatch.group(1))
+    elif newMissMatch:
+      misses += int(newMissMatch.group(1))
+  return (hits, misses)
+
+
+#
+# The ccache compiler cache in a directory
+#
+class CompilerCache:
+
+  # baseDir is passed in as CCACHE_BASEDIR so that the absolute paths under it
+  # (e.g. the scratch dirs) do not change the hashes.
+  def __init__(self, cacheDir, baseDir="", skipOp=False):
+    self.cacheDir = os.path.abspath(os.path.expanduser(cacheDir))
+    self.baseDir = baseDir
+    self.skipOp = skipOp
+    self.ccache = findExecutable("ccache")
+    if not self.ccache:
+      if not skipOp:
+        raise Exception("Error, --compiler-cache='"+cacheDir+"' was given" \
+          " but 'ccache' is not in the PATH!")
+      self.ccache = "ccache"
+    if not skipOp and not os.path.exists(self.cacheDir):
+      os.makedirs(self.cacheDir)
+
+  # Env vars that tell ccache where the cache is
+  def getCcacheEnv(self):
+    ccacheEnv = {"CCACHE_DIR" : self.cacheDir}
+    if self.baseDir:
+      ccacheEnv["CCACHE_BASEDIR"] = self.baseDir
+    return ccacheEnv
+
+  # Get the compilers to wrap from compilerEnv, the env or the defaults
+  def getCompilers(self, compilerEnv=None):
+    compilers = []
+    for (envVarName, defaultCompiler) in compilerCacheEnvVarDefaults:
+      if compilerEnv and envVarName in compilerEnv:
+        compiler = compilerEnv[envVarName]
+      else:
+        compiler = os.environ.get(envVarName, defaultCompiler)
+      compilers.append((envVarName, compiler))
+    return compilers
+
+  # Get compilerEnv (or an empty env) with CC, CXX and FC run through ccache
+  def getEnv(self, compilerEnv=None):
+    env = {}
+    if compilerEnv:
+      env.update(compilerEnv)
+    env.update(self.getCcacheEnv())
+    for (envVarName, compiler) in self.getCompilers(compilerEnv):
+      env[envVarName] = self.ccache+" "+compiler
+    return env
+
+  def getMakeVarsStr(self, compilerEnv=None):
+    return "".join([" "+envVarName+"='"+self.ccache+" "+compiler+"'"
+      for (envVarName, compiler) in self.getCompilers(compilerEnv)])
+
+  def getCMakeLauncherOptions(self):
+    return "".join([" -D CMAKE_"+lang+"_COMPILER_LAUNCHER="+self.ccache
+      for lang in compilerCacheCMakeLangs])
+
+  # Get the (hits, misses) in the cache so far
+  def getStats(self):
+    if self.skipOp:
+      return (0, 0)
+    statsStr = s(getCmndOutput("env CCACHE_DIR='"+self.cacheDir+"' " \
+      +self.ccache+" -s", throwOnError=False))
+    return parseCcacheStats(statsStr)
+
+  # Get a string with the hit rate since the stats startStats
+  def getHitRateStr(self, startStats):
+    (hits, misses) = self.getStats()
+    hits -= startStats[0]
+    misses -= startStats[1]
+    if hits + misses == 0:
+      return "no cacheable compiles"
+    return "%d hits, %d misses (%.1f%% hit rate)" % (hits, misses,
+      100.0*hits/(hits+misses))
@@ -0,0 +1,140 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Flattened, precomputed snapshot of the environment of an installed dev env.
+#
+# The environment is given as an ordered list of operations like in a module
+# file:
+#
+#   ("setenv", <var>, <value>)
+#   ("prepend-path", <var>, <path>)
+#
+# and is written out as plain sh and csh files where all of the paths
+# prepended to a var are merged into one assignment.  Paths that do not exist
+# when the snapshot is written are left out so sourcing the snapshot does not
+# run anything or look anything up.  The snapshot is guarded by the env var
+# TRIBITS_DEV_ENV_SNAPSHOT so sourcing it again in the same shell (or in a
+# child shell) does not prepend the paths again.
+#
+
+from FindGeneralScriptSupport import *
+
+
+envSnapshotGuardVarName = "TRIBITS_DEV_ENV_SNAPSHOT"
+
+
+#
+# Flatten the env operations into (setVars, prependPaths) where setVars is a
+# list of (var, value) and prependPaths is a list of (var, [path, ...]) with
+# the paths in the order they end up in the var (last prepended first).  Both
+# are in the order the vars were first used.
+#
+def flattenEnvOps(envOps, pathExists=os.path.exists):
+  setVars = []
+  setVarsDict = {}
+  prependPaths = []
+  prependPathsDict = {}
+  for (op, varName, value) in envOps:
+    if op == "setenv":
+      if not varName in setVarsDict:
+        setVars.append(varName)
+      setVarsDict[varName] = value
+    elif op == "prepend-path":
+      if not varName in prependPathsDict:
+        prependPaths.append(varName)
+        prependPathsDict[varName] = []
+      paths = prependPathsDict[varName]
+      if value in paths:
+        paths.remove(value)
+      if pathExists(value):
+        paths.insert(0, value)
+    else:
+      raise Exception("Error, '"+op+"' is not a valid env operation!")
+  return ([(varName, setVarsDict[varName]) for varName in setVars],
+    [(varName, prependPathsDict[varName]) for varName in prependPaths
+      if prependPathsDict[varName]])
+
+
+def getEnvSnapshotShStr(setVars, prependPaths, snapshotId, desc):
+  snapshotStr = "#\n# "+desc+"\n#\n" \
+    "# Generated by install_devtools.py.  Do not edit!\n#\n\n"
+  snapshotStr += 'if [ "${'+envSnapshotGuardVarName+'}" != "'+snapshotId \
+    +'" ]; then\n\n'
+  for (varName, value) in setVars:
+    snapshotStr += 'export '+varName+'="'+value+'"\n'
+  snapshotStr += "\n"
+  for (varName, paths) in prependPaths:
+    snapshotStr += 'export '+varName+'="'+":".join(paths) \
+      +'${'+varName+':+:$'+varName+'}"\n'
+  snapshotStr += "\nexport "+envSnapshotGuardVarName+'="'+snapshotId+'"\n\nfi\n'
+  return snapshotStr
+
+
+def getEnvSnapshotCshStr(setVars, prependPaths, snapshotId, desc):
+  snapshotStr = "#\n# "+desc+"\n#\n" \
+    "# Generated by install_devtools.py.  Do not edit!\n#\n\n"
+  snapshotStr += "if ( ! $?"+envSnapshotGuardVarName+" ) setenv " \
+    +envSnapshotGuardVarName+' ""\n'
+  snapshotStr += 'if ( "$'+envSnapshotGuardVarName+'" != "'+snapshotId \
+    +'" ) then\n\n'
+  for (varName, value) in setVars:
+    snapshotStr += 'setenv '+varName+' "'+value+'"\n'
+  snapshotStr += "\n"
+  for (varName, paths) in prependPaths:
+    pathsStr = ":".join(paths)
+    snapshotStr += "if ( $?"+varName+" ) then\n" \
+      '  setenv '+varName+' "'+pathsStr+':${'+varName+'}"\n' \
+      "else\n" \
+      '  setenv '+varName+' "'+pathsStr+'"\n' \
+      "endif\n"
+  snapshotStr += "\nsetenv "+envSnapshotGuardVarName+' "'+snapshotId+'"\n\n' \
+    "endif\n\nrehash\n"
+  return snapshotStr
+
+
+#
+# Write the snapshot files <fileBasePath>.sh and <fileBasePath>.csh
+#
+def writeEnvSnapshotFiles(envOps, fileBasePath, desc):
+  (setVars, prependPaths) = flattenEnvOps(envOps)
+  writeStrToFile(fileBasePath+".sh",
+    getEnvSnapshotShStr(setVars, prependPaths, fileBasePath, desc))
+  writeStrToFile(fileBasePath+".csh",
+    getEnvSnapshotCshStr(setVars, prependPaths, fileBasePath, desc))
@@ -0,0 +1,203 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Support for the GCC prerequisite sources (GMP, MPFR, MPC, ISL, ...).
+#
+# GCC's contrib/download_prerequisites script downloads these with wget
+# every time it is run.  The functions here read the list of archives (and
+# the checksums that newer GCC versions ship for them) out of the GCC sources
+# so they can be fetched ahead of time (e.g. into the source cache or a
+# prefetch bundle) and then unpacked and linked into the GCC source tree the
+# same way the script does it, without any network access.
+#
+
+from FindGeneralScriptSupport import *
+
+import tarfile
+
+
+gccInfrastructureUrl_default = "https://gcc.gnu.org/pub/gcc/infrastructure/"
+
+# Patch applied to the GCC sources for the 'struct ucontext' vs 'ucontext_t'
+# build error with newer glibc versions
+gccUcontextPatchUrl = "https://gcc.gnu.org/git/?p=gcc.git;a=patch;" \
+  "h=14c2f22a1877f6b60a2f7c2f83ffb032759456a6"
+gccUcontextPatchFileName = "compiler.patch"
+
+reScriptVarAssign = re.compile(r"""^\s*([A-Za-z_]+)=['"]?([^'"\s]+)['"]?\s*$""")
+reScriptWgetVar = re.compile(r"""\$\{?([A-Za-z_]+)\}?(\.tar\.[a-z0-9]+)""")
+reArchiveName = re.compile(r"^([a-z]+)-[0-9][^/]*\.tar\.[a-z0-9]+$")
+
+# The checksum files that GCC ships for the prerequisites, strongest first
+gccPrerequisiteChecksumAlgos = ["sha512", "md5"]
+
+
+#
+# Get the prerequisite archive names out of the contents of a
+# contrib/download_prerequisites script.
+#
+# This handles both the older scripts that do:
+#
+#   GMP=gmp-4.3.2
+#   wget ftp://gcc.gnu.org/pub/gcc/infrastructure/$GMP.tar.bz2
+#
+# and the newer scripts (GCC 7 and later) that do:
+#
+#   gmp='gmp-6.1.0.tar.bz2'
+#
+def getGccPrerequisitesFromScript(scriptStr):
+  scriptVars = {}
+  for line in scriptStr.splitlines():
+    match = reScriptVarAssign.match(line)
+    if match:
+      scriptVars[match.group(1)] = match.group(2)
+  archives = []
+  def addArchive(archive):
+    if reArchiveName.match(archive) and not archive in archives:
+      archives.append(archive)
+  for (varName, value) in scriptVars.items():
+    if varName.islower():
+      addArchive(value)
+  for line in scriptStr.splitlines():
+    if line.strip().startswith("#"):
+      continue
+    for (varName, ext) in reScriptWgetVar.findall(line):
+      if varName in scriptVars:
+        addArchive(scriptVars[varName]+ext)
+  return sorted(archives)
+
+
+#
+# Get the checksums of the prerequisite archives out of the contents of a
+# contrib/prerequisites.<algo> file (GCC 7 and later) which has lines like:
+#
+#   <checksum>  gmp-6.1.0.tar.bz2
+#
+def getGccPrerequisiteChecksumsFromStr(checksumsStr):
+  checksums = {}
+  for line in checksumsStr.splitlines():
+    lineSplit = line.split()
+    if len(lineSplit) == 2 and reArchiveName.match(lineSplit[1]):
+      checksums[lineSplit[1]] = lineSplit[0]
+  return checksums
+
+
+#
+# Read a file under contrib/ out of the GCC sources.  This looks in the
+# unpacked source dir first and then in the tarball (without unpacking it).
+# Returns None if the file is in neither.
+#
+def readGccContribFile(gccSrcDir, gccTarball, gccVersion, fileName):
+  filePath = os.path.join(gccSrcDir, "contrib", fileName)
+  if os.path.exists(filePath):
+    return readStrFromFile(filePath)
+  if not os.path.exists(gccTarball):
+    return None
+  tarballFile = tarfile.open(gccTarball, "r:*")
+  try:
+    try:
+      member = tarballFile.extractfile(
+        "gcc-"+gccVersion+"/contrib/"+fileName)
+    except KeyError:
+      return None
+    return s(member.read())
+  finally:
+    tarballFile.close()
+
+
+#
+# Read the prerequisite archive names and their checksums out of the GCC
+# sources.  Returns (archives, checksums) where checksums maps an archive
+# name to (algo, checksum) for the archives that GCC lists a checksum for.
+#
+def readGccPrerequisites(gccSrcDir, gccTarball, gccVersion):
+  scriptStr = readGccContribFile(gccSrcDir, gccTarball, gccVersion,
+    "download_prerequisites")
+  if scriptStr is None:
+    raise Exception("Error, could not find contrib/download_prerequisites" \
+      " in '"+gccSrcDir+"' or '"+gccTarball+"'!")
+  archives = getGccPrerequisitesFromScript(scriptStr)
+  checksums = {}
+  for algo in gccPrerequisiteChecksumAlgos:
+    checksumsStr = readGccContribFile(gccSrcDir, gccTarball, gccVersion,
+      "prerequisites."+algo)
+    if checksumsStr is None:
+      continue
+    for (archive, checksum) in getGccPrerequisiteChecksumsFromStr(
+      checksumsStr).items():
+      if archive in archives and not archive in checksums:
+        checksums[archive] = (algo, checksum)
+  return (archives, checksums)
+
+
+#
+# Name of the directory link that GCC expects for a prerequisite archive
+# (e.g. 'gmp' for 'gmp-4.3.2.tar.bz2')
+#
+def getGccPrerequisiteLinkName(archive):
+  return reArchiveName.match(archive).group(1)
+
+
+def getGccPrerequisiteDirName(archive):
+  return archive.split(".tar.")[0]
+
+
+#
+# Return True if all of the prerequisite archives are in archiveDir
+#
+def haveGccPrerequisites(archiveDir, archives):
+  for archive in archives:
+    if not os.path.exists(os.path.join(archiveDir, archive)):
+      return False
+  return True
+
+
+#
+# Unpack the prerequisite archives in archiveDir into the GCC source tree
+# and link them in with the names GCC expects.  This is what
+# contrib/download_prerequisites does after downloading them.
+#
+def installGccPrerequisites(task, gccSrcDir, archiveDir, archives):
+  for archive in archives:
+    archivePath = os.path.join(archiveDir, archive)
+    task.runCmnd(getExtractTarballCmnd(archivePath) or "tar -xf "+archivePath,
+      workingDir=gccSrcDir)
+    task.runCmnd("ln -sfn "+getGccPrerequisiteDirName(archive)+" " \
+      +getGccPrerequisiteLinkName(archive), workingDir=gccSrcDir)
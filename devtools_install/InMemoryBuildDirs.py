@@ -0,0 +1,188 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Build directories in memory (--build-in-memory).
+#
+# The build tree of a tool (e.g. gcc-build/) is made a symlink to a directory
+# under a tmpfs (/dev/shm by default) if the tmpfs has room for it and there
+# is enough free RAM left for it next to the compile jobs.  Otherwise, it is
+# a plain directory on disk as before.  Since only the build tree is moved,
+# the stamps and the logs stay in the persistent scratch dir.
+#
+# A build tree in memory is kept if the build fails so that a re-run can
+# resume in it.  It is removed after a successful install to give the memory
+# back.  If the tmpfs was wiped (e.g. a reboot), the dangling symlink is
+# replaced and the stamps of the build stages see that their outputs are
+# gone.
+#
+
+from FindGeneralScriptSupport import *
+from BuildParallelism import getAvailableMemoryMb
+
+import hashlib
+import shutil
+import threading
+
+
+inMemoryBuildBaseDir_default = "/dev/shm"
+
+# Rough peak size in MB of the build tree of each tool
+toolBuildTreeSizeMb = {
+  "autoconf" : 64,
+  "cmake" : 1024,
+  "gcc" : 8192,
+  "git" : 512,
+  "mpich" : 1024,
+  "mvapich" : 1024,
+  "openmpi" : 1024,
+  "vera_tpls" : 6144,
+  }
+
+toolBuildTreeSizeMb_default = 2048
+
+# Memory reserved by the build trees set up in memory by this process (the
+# tools are built in threads at the same time)
+inMemoryBuildDirsLock = threading.Lock()
+inMemoryBuildDirsReservedMb = {}
+
+
+def getFreeSpaceMb(dirName):
+  stat = os.statvfs(dirName)
+  return stat.f_bavail * stat.f_frsize // (1024*1024)
+
+
+#
+# Get the directory in memory for the build dir buildDir
+#
+# The name is from a hash of the path of buildDir so that a re-run finds it.
+#
+def getInMemoryBuildDir(buildDir, memBaseDir):
+  buildDir = os.path.abspath(buildDir)
+  pathHash = hashlib.sha1(buildDir.encode("utf-8")).hexdigest()[0:12]
+  return os.path.join(memBaseDir, "mpact-dev-env-"+str(os.getuid()),
+    pathHash+"-"+os.path.basename(buildDir))
+
+
+#
+# Set up the build dir buildDir of the tool toolName in memory (under
+# memBaseDir) if there is room, or on disk otherwise
+#
+# jobsMemMb is the memory that the compile jobs of the build need.  Returns
+# True if the build dir is in memory.
+#
+def setUpBuildDir(buildDir, toolName, memBaseDir, jobsMemMb=0):
+  if os.path.islink(buildDir):
+    if os.path.exists(buildDir):
+      print("\nUsing the build dir in memory '"+os.path.realpath(buildDir) \
+        +"' from before for "+toolName)
+      reserveMemory(buildDir, toolName)
+      return True
+    # The tmpfs was wiped
+    os.remove(buildDir)
+  elif os.path.exists(buildDir):
+    print("\nUsing the build dir on disk '"+buildDir+"' from before for " \
+      +toolName)
+    return False
+  buildTreeSizeMb = toolBuildTreeSizeMb.get(toolName,
+    toolBuildTreeSizeMb_default)
+  freeSpaceMb = 0
+  if os.path.isdir(memBaseDir):
+    freeSpaceMb = getFreeSpaceMb(memBaseDir)
+  inMemoryBuildDirsLock.acquire()
+  try:
+    freeMemMb = getAvailableMemoryMb() - jobsMemMb \
+      - sum(inMemoryBuildDirsReservedMb.values())
+    if buildTreeSizeMb > min(freeSpaceMb, freeMemMb):
+      print("\nBuilding "+toolName+" on disk in '"+buildDir+"' since it" \
+        " needs "+str(buildTreeSizeMb)+" MB and there is only " \
+        +str(max(0, min(freeSpaceMb, freeMemMb)))+" MB free in" \
+        " '"+memBaseDir+"'")
+      if not os.path.exists(buildDir):
+        os.makedirs(buildDir)
+      return False
+    inMemoryBuildDirsReservedMb[buildDir] = buildTreeSizeMb
+  finally:
+    inMemoryBuildDirsLock.release()
+  memBuildDir = getInMemoryBuildDir(buildDir, memBaseDir)
+  print("\nBuilding "+toolName+" in memory in '"+memBuildDir+"'" \
+    " (linked from '"+buildDir+"')")
+  if not os.path.exists(memBuildDir):
+    os.makedirs(memBuildDir)
+  parentDir = os.path.dirname(os.path.abspath(buildDir))
+  if not os.path.exists(parentDir):
+    os.makedirs(parentDir)
+  os.symlink(memBuildDir, buildDir)
+  return True
+
+
+def reserveMemory(buildDir, toolName):
+  inMemoryBuildDirsLock.acquire()
+  try:
+    inMemoryBuildDirsReservedMb[buildDir] = toolBuildTreeSizeMb.get(toolName,
+      toolBuildTreeSizeMb_default)
+  finally:
+    inMemoryBuildDirsLock.release()
+
+
+#
+# Remove the build dir in memory linked from buildDir (if it is in memory)
+#
+def removeInMemoryBuildDir(buildDir):
+  if not os.path.islink(buildDir):
+    return
+  memBuildDir = os.path.realpath(buildDir)
+  print("\nRemoving the build dir in memory '"+memBuildDir+"' ...")
+  shutil.rmtree(memBuildDir, ignore_errors=True)
+  os.remove(buildDir)
+  inMemoryBuildDirsLock.acquire()
+  try:
+    inMemoryBuildDirsReservedMb.pop(buildDir, None)
+  finally:
+    inMemoryBuildDirsLock.release()
+
+
+#
+# Run buildFunc() with the build dir buildDir set up in memory if there is
+# room, and remove it again if buildFunc() succeeds
+#
+def runInMemoryBuild(buildDir, toolName, memBaseDir, jobsMemMb, buildFunc):
+  setUpBuildDir(buildDir, toolName, memBaseDir, jobsMemMb)
+  buildFunc()
+  removeInMemoryBuildDir(buildDir)
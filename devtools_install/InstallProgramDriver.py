@@ -39,8 +39,17 @@
 
 from FindGeneralScriptSupport import *
 from gitdist import addOptionParserChoiceOption
+from SourceMirror import getMirrorCatCmnd, getBundleSourceRelPath
+from StageStamps import *
+from BuildTimeline import BuildTimeline
+from CompilerCache import CompilerCache
+from BuildParallelism import getParallelJobs, autoParallelLevel, \
+  getToolMemPerJobMb
+from InMemoryBuildDirs import *
 
 from optparse import OptionParser
+import resource
+import threading
 
 
 #
@@ -62,21 +71,71 @@ class InstallProgramDriver:
 
     # Get the production version out of command-line
 
-    productBaseName = self.installObj.getProductBaseName()
-
-    versionCmndArgName = "--"+productBaseName+"-version"    
+    versionCmndArgName = self._getVersionCmndArgName()
     for arg in sys.argv[1:]:
       #print("arg = '"+arg+"'")
       arg_and_value = arg.split("=")
       if len(arg_and_value) and arg_and_value[0] == versionCmndArgName:
         self.productVersion = arg_and_value[1].strip()
-    # Get basic info after knowing the version
 
+    clp = self._getCmndLineParser()
+    (options, args) = clp.parse_args()
+    return self._runWithOptions(options)
+
+
+  # Run the install with the options given as a dict of their dests (e.g.
+  # {"version" : "4.8.3", "installDir" : "/opt/gcc-4.8.3", "doAll" : True})
+  # and the defaults for the rest.  Unlike runDriver(), this does not read
+  # sys.argv so it can be called by another script (see
+  # installToolFromSource() in install_devtools.py).  Returns 0 if the
+  # install succeeded.
+  def run(self, optionsDict):
+    self.productVersion = optionsDict.get("version",
+      self.installObj.getProductDefaultVersion())
+    clp = self._getCmndLineParser()
+    options = clp.get_default_values()
+    for (name, value) in optionsDict.items():
+      if not hasattr(options, name):
+        raise Exception("Error, '"+name+"' is not an option of " \
+          +self.installObj.getScriptName()+"!")
+      setattr(options, name, value)
+    if not options.version in self._getSupportedVersions():
+      raise Exception("Error, the version '"+options.version+"' of " \
+        +self.installObj.getProductBaseName()+" is not one of " \
+        +str(self._getSupportedVersions())+"!")
+    return self._runWithOptions(options)
+
+
+  def _getVersionCmndArgName(self):
+    return "--"+self.installObj.getProductBaseName()+"-version"
+
+
+  # The supported versions plus the requested version if the install object
+  # allows versions that are not listed (allowUnlistedVersions())
+  def _getSupportedVersions(self):
+    supportedVersions = list(self.installObj.getProductSupportedVersions())
+    if hasattr(self.installObj, "allowUnlistedVersions") \
+      and self.installObj.allowUnlistedVersions() \
+      and not self.productVersion in supportedVersions \
+      :
+      supportedVersions.append(self.productVersion)
+    return supportedVersions
+
+
+  # Get basic info after knowing the version
+  def _getProductInfo(self):
+    productBaseName = self.installObj.getProductBaseName()
     productName = self.installObj.getProductName(self.productVersion)
     baseDirName = self.installObj.getBaseDirName(self.productVersion)
+    scriptName = self.installObj.getScriptName()
+    return (productBaseName, productName, baseDirName, scriptName)
+
 
-    scriptName = self.installObj.getScriptName();
+  def _getCmndLineParser(self):
 
+    versionCmndArgName = self._getVersionCmndArgName()
+    (productBaseName, productName, baseDirName, scriptName) = \
+      self._getProductInfo()
 
     #
     # 1) Set up the help text
@@ -123,6 +182,25 @@ that needs root privileges, do:
 
 This appears to work on most systems.
 
+Each of the download, untar, configure, build and install steps writes a
+stamp file in the directory """+baseDirName+r"""-stamps/ with a hash of its
+inputs (the options, compiler and build env vars).  Re-running skips the
+steps that are up to date and resumes from the first one that failed or whose
+inputs changed (pass in --ignore-stamps to redo them all).
+
+If --compiler-cache=<dir> is given, the compilers are run through ccache with
+its cache in <dir> in the build and install steps.  They are passed to 'make'
+as CC, CXX and FC (from the env, or gcc, g++ and gfortran) so that the
+compilers recorded by the configure step are the real ones.
+
+If --build-in-memory is given, the build dir is linked to a directory in the
+tmpfs --build-in-memory-dir=<dir> (default /dev/shm) if there is room for it
+(and is on disk otherwise).  It is removed after the install step.
+
+If --timeline-file=<file> is given, each of these steps is recorded in it as
+a JSON line with its wall and CPU time and exit code (install_devtools.py
+passes in its own timeline file and --timeline-run-id=<id>).
+
 After you have done a successful install, you might want to do:
 
   $ rm -r """+baseDirName+r"""
@@ -136,7 +214,7 @@ in order to remove the intermediate source and build files.
 
     clp = OptionParser(usage=usageHelp)
 
-    supportedVersions = self.installObj.getProductSupportedVersions()
+    supportedVersions = self._getSupportedVersions()
     defaultVersion = self.installObj.getProductDefaultVersion()
     defaultVersionIdx = findInSequence(supportedVersions, defaultVersion)
 
@@ -154,9 +232,12 @@ in order to remove the intermediate source and build files.
     insertInstallPermissionsOptions(clp)
 
     clp.add_option(
-      "--parallel", dest="parallel", type="int", \
-      default=0, \
-      help="Uses parallelism in build if set to > 0." )
+      "--parallel", dest="parallel", type="string", \
+      default=autoParallelLevel, \
+      help="Uses parallelism in build if set to > 0.  If '" \
+        +autoParallelLevel+"', uses as many jobs as there are cores and" \
+        " memory for "+productBaseName+".  (Default = '" \
+        +autoParallelLevel+"')" )
     
     clp.add_option(
       "--make-options", dest="makeOptions", type="string",
@@ -165,6 +246,37 @@ in order to remove the intermediate source and build files.
 
     self.installObj.injectExtraCmndLineOptions(clp, self.productVersion)
     
+    clp.add_option(
+      "--ignore-stamps", dest="ignoreStamps", action="store_true",
+      default=False,
+      help="Redo the requested actions even if their stamp files show that" \
+        " they are up to date." )
+
+    clp.add_option(
+      "--compiler-cache", dest="compilerCache", type="string", default="",
+      help="Directory of the ccache cache to run the compilers through in" \
+        " the build.  If empty '', ccache is not used.  (Default = '')" )
+
+    clp.add_option(
+      "--build-in-memory", dest="buildInMemory", action="store_true",
+      default=False,
+      help="Put the build dir in --build-in-memory-dir if there is room." )
+
+    clp.add_option(
+      "--build-in-memory-dir", dest="buildInMemoryDir", type="string",
+      default=inMemoryBuildBaseDir_default,
+      help="The tmpfs dir to put the build dir in with --build-in-memory." \
+        "  (Default = '"+inMemoryBuildBaseDir_default+"')" )
+
+    clp.add_option(
+      "--timeline-file", dest="timelineFile", type="string", default="",
+      help="JSON lines file to record the steps in.  (Default = '')" )
+
+    clp.add_option(
+      "--timeline-run-id", dest="timelineRunId", type="string", default="",
+      help="ID of the run in --timeline-file to add the steps to.  If empty," \
+        " a new run is started.  (Default = '')" )
+
     clp.add_option(
       "--show-defaults", dest="showDefaults", action="store_true", default=False,
       help="[ACTION] Show the defaults and exit." )
@@ -198,9 +310,20 @@ in order to remove the intermediate source and build files.
       "--do-all", dest="doAll", action="store_true", default=False,
       help="[AGGR ACTION] Same as --download --untar --configure --build --install" \
       +" --show-final-instructions")
-    
-    (options, args) = clp.parse_args()
-     
+
+    return clp
+
+
+  def _runWithOptions(self, options):
+
+    versionCmndArgName = self._getVersionCmndArgName()
+    (productBaseName, productName, baseDirName, scriptName) = \
+      self._getProductInfo()
+
+    # The default --download-cmnd depends on --mirror
+    if getattr(options, "downloadCmnd", None) == "":
+      options.downloadCmnd = getStdDownloadCmnd(self.installObj,
+        self.productVersion, options.mirror)
 
     #
     # 3) Echo the command-line options
@@ -214,6 +337,17 @@ in order to remove the intermediate source and build files.
     cmndLine += "  --parallel='" + str(options.parallel) + "' \\\n"
     cmndLine += "  --make-options='" + options.makeOptions + "'\\\n"
     cmndLine += self.installObj.echoExtraCmndLineOptions(options)
+    if options.ignoreStamps:
+      cmndLine += "  --ignore-stamps \\\n"
+    if options.buildInMemory:
+      cmndLine += "  --build-in-memory \\\n"
+      cmndLine += "  --build-in-memory-dir='" + options.buildInMemoryDir + "' \\\n"
+    if options.compilerCache:
+      cmndLine += "  --compiler-cache='" + options.compilerCache + "' \\\n"
+    if options.timelineFile:
+      cmndLine += "  --timeline-file='" + options.timelineFile + "' \\\n"
+    if options.timelineRunId:
+      cmndLine += "  --timeline-run-id='" + options.timelineRunId + "' \\\n"
     if options.download:
       cmndLine += "  --download \\\n"
     if options.untar:
@@ -240,6 +374,9 @@ in order to remove the intermediate source and build files.
       raise Exception("Error, --install-dir=<install-dir> can't be empty!")
     options.installDir = os.path.abspath(os.path.expanduser(options.installDir))
 
+    options.parallel = getParallelJobs(options.parallel, productBaseName)
+    print("Using "+str(options.parallel)+" parallel job(s)")
+
     #
     # 4) Execute the commands
     #
@@ -258,17 +395,43 @@ in order to remove the intermediate source and build files.
 
     self.installObj.setup(options)
 
+    stamps = StageStamps(baseDir+"/"+baseDirName+"-stamps",
+      getDriverStageInputs(productName, options), options.ignoreStamps)
+
+    timeline = None
+    if options.timelineFile:
+      timeline = BuildTimeline(os.path.abspath(options.timelineFile),
+        scriptName, options.timelineRunId)
+
+    # NOTE: This is done after the stage inputs are read from the options
+    # since ccache does not change what is built.  The ccache env is passed
+    # to the make commands in options.makeEnv instead of being set in
+    # os.environ so that the driver does not change the env of its caller.
+    options.makeEnv = {}
+    compilerCache = None
+    if options.compilerCache:
+      compilerCache = CompilerCache(options.compilerCache, baseDir)
+      compilerCacheStartStats = compilerCache.getStats()
+      options.makeOptions += compilerCache.getMakeVarsStr()
+      options.makeEnv.update(compilerCache.getCcacheEnv())
+
+    def runStage(stageName, stageFunc, outputPath=""):
+      return runTimedStage(stamps, timeline, productName, stageName,
+        stageFunc, outputPath)
+
     print("")
     print("A) Download the source for "+productName+" ...")
     print("")
     
     if options.download:
       try:
-        self.installObj.doDownload()
-      except:
-        print("Invalid version of " + productName + " specified")
-        exit(1)
+        runStage("download", self.installObj.doDownload,
+          outputPath=productBaseDir)
+      except Exception as e:
+        print("Error, the download of " + productName + " failed: " + str(e))
+        return 1
     else:
+      stamps.passStage("download", {})
       print("Skipping on request ...")
     
     print("")
@@ -276,19 +439,32 @@ in order to remove the intermediate source and build files.
     print("")
     
     if options.untar:
-      self.installObj.doUntar()
+      runStage("untar", self.installObj.doUntar)
     else:
+      stamps.passStage("untar", {})
       print("Skipping on request ...")
     
     
+    # NOTE: The build dir is set up after the download and untar since the
+    # download removes the base dir
+    buildInMemory = options.buildInMemory \
+      and hasattr(self.installObj, "getBuildDir")
+    if buildInMemory and (options.configure or options.build \
+      or options.install) \
+      :
+      setUpBuildDir(self.installObj.getBuildDir(), productBaseName,
+        options.buildInMemoryDir,
+        options.parallel*getToolMemPerJobMb(productBaseName))
+
     print("")
     print("C) Configure "+productName+" ...")
     print("")
     
     
     if options.configure:
-      self.installObj.doConfigure()
+      runStage("configure", self.installObj.doConfigure)
     else:
+      stamps.passStage("configure", {})
       print("Skipping on request ...")
     
     
@@ -297,8 +473,9 @@ in order to remove the intermediate source and build files.
     print("")
     
     if options.build:
-      self.installObj.doBuild()
+      runStage("build", self.installObj.doBuild)
     else:
+      stamps.passStage("build", {})
       print("Skipping on request ...")
     
     
@@ -307,12 +484,20 @@ in order to remove the intermediate source and build files.
     print("")
     
     if options.install:
-      self.installObj.doInstall()
-      fixupInstallPermissions(options, options.installDir)
+      def doInstall():
+        self.installObj.doInstall()
+        fixupInstallPermissions(options, options.installDir)
+      runStage("install", doInstall, outputPath=options.installDir)
+      if buildInMemory:
+        removeInMemoryBuildDir(self.installObj.getBuildDir())
     else:
       print("Skipping on request ...")
     
     
+    if compilerCache:
+      print("\nCompiler cache '"+compilerCache.cacheDir+"': " \
+        +compilerCache.getHitRateStr(compilerCacheStartStats))
+
     print("")
     print("D) Final instructions for using "+productName+" ...")
     print("")
@@ -324,23 +509,232 @@ in order to remove the intermediate source and build files.
     
     print("\n[End]")
 
+    return 0
+
+
+#
+# Get the install object of the script install-<toolName>.py (returned by
+# its getInstallObj()) to run with InstallProgramDriver.run()
+#
+# The scripts only run their driver when they are run as a script so this
+# just defines their install classes.  Each script is loaded once.
+#
+
+# NOTE: This is read when the module is imported since __file__ can be
+# relative to the working dir (e.g. on Python 2) and the driver changes it
+installScriptsDir = os.path.dirname(os.path.abspath(__file__))
+
+installScriptModules = {}
+
+installScriptModulesLock = threading.Lock()
+
+def getInstallObj(toolName):
+  installScriptModulesLock.acquire()
+  try:
+    if not toolName in installScriptModules:
+      installScriptModules[toolName] = loadInstallScript(toolName)
+    module = installScriptModules[toolName]
+  finally:
+    installScriptModulesLock.release()
+  return module.getInstallObj()
+
+
+def loadInstallScript(toolName):
+  scriptPath = os.path.join(installScriptsDir, "install-"+toolName+".py")
+  moduleName = "install_"+toolName
+  try:
+    import importlib.util
+  except ImportError:
+    import imp
+    return imp.load_source(moduleName, scriptPath)
+  spec = importlib.util.spec_from_file_location(moduleName, scriptPath)
+  module = importlib.util.module_from_spec(spec)
+  spec.loader.exec_module(module)
+  return module
+
+
+#
+# Pool of worker processes that run InstallProgramDriver.run() for the
+# install-<toolName>.py scripts
+#
+# Each worker is an interpreter that is started once, when the pool is
+# created, and then runs one install at a time.  It keeps this module and the
+# install scripts it has loaded (see getInstallObj()) for all of the installs
+# it runs.  The workers are started with the 'forkserver' (or 'spawn') start
+# method so that they are not forked from the threads of the caller.  An
+# install is run in a worker since the install scripts change the working dir
+# and run their commands in the env of the process.
+#
+class InstallDriverPool:
+
+  def __init__(self, numWorkers):
+    self.numWorkers = numWorkers
+    print("\nStarting "+str(numWorkers)+" install driver worker process(es)" \
+      " ...")
+    self.pool = getInstallDriverPoolContext().Pool(numWorkers)
+
+  # Run InstallProgramDriver.run(optionsDict) for install-<toolName>.py in a
+  # worker in workingDir with extraEnv added to the env and the output
+  # appended to logFile.  Returns (rtnCode, cpuTime, errorMsg).
+  def runDriver(self, toolName, optionsDict, workingDir, extraEnv, logFile):
+    return self.pool.apply(runDriverInWorker,
+      (toolName, optionsDict, workingDir, extraEnv, logFile))
+
+  def close(self):
+    self.pool.close()
+    self.pool.join()
+
+
+def getInstallDriverPoolContext():
+  import multiprocessing
+  if not hasattr(multiprocessing, "get_context"):
+    # NOTE: Python 2 can only fork the workers.  They are all forked when the
+    # pool is created so that is done before any other threads are started.
+    return multiprocessing
+  if "forkserver" in multiprocessing.get_all_start_methods():
+    return multiprocessing.get_context("forkserver")
+  return multiprocessing.get_context("spawn")
+
+
+def runDriverInWorker(toolName, optionsDict, workingDir, extraEnv, logFile):
+  startSelfUsage = resource.getrusage(resource.RUSAGE_SELF)
+  startChildrenUsage = resource.getrusage(resource.RUSAGE_CHILDREN)
+  savedEnv = dict(os.environ)
+  sys.stdout.flush()
+  sys.stderr.flush()
+  savedStdoutFd = os.dup(1)
+  savedStderrFd = os.dup(2)
+  logFd = os.open(logFile, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+  errorMsg = ""
+  try:
+    os.dup2(logFd, 1)
+    os.dup2(logFd, 2)
+    os.chdir(workingDir)
+    if extraEnv:
+      os.environ.update(extraEnv)
+    try:
+      rtnCode = InstallProgramDriver(getInstallObj(toolName)).run(optionsDict)
+    except Exception as e:
+      printStackTrace()
+      rtnCode = 1
+      errorMsg = str(e)
+  finally:
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.dup2(savedStdoutFd, 1)
+    os.dup2(savedStderrFd, 2)
+    for fd in [savedStdoutFd, savedStderrFd, logFd]:
+      os.close(fd)
+    os.environ.clear()
+    os.environ.update(savedEnv)
+  cpuTime = 0.0
+  for (startUsage, who) in [(startSelfUsage, resource.RUSAGE_SELF),
+    (startChildrenUsage, resource.RUSAGE_CHILDREN)] \
+    :
+    usage = resource.getrusage(who)
+    cpuTime += (usage.ru_utime - startUsage.ru_utime) \
+      + (usage.ru_stime - startUsage.ru_stime)
+  return (rtnCode, cpuTime, errorMsg)
+
+
+#
+# Get the inputs of the install stages from the options that change what is
+# installed (i.e. not the actions or the level of parallelism) and the
+# compiler and build env
+#
+
+driverNonStageOptions = ["download", "untar", "configure", "build", "install",
+  "showFinalInstructions", "doAll", "showDefaults", "parallel", "ignoreStamps",
+  "compilerCache", "buildInMemory", "buildInMemoryDir", "timelineFile",
+  "timelineRunId"]
+
+def getDriverStageInputs(productName, options):
+  optionInputs = {}
+  for (name, value) in vars(options).items():
+    if not name in driverNonStageOptions:
+      optionInputs[name] = value
+  return {
+    "product" : productName,
+    "options" : optionInputs,
+    "env" : getStdStageEnvInputs(),
+    }
+
+
+#
+# Run a step of the install through its stamp and record it in the timeline
+# (if there is one)
+#
+# NOTE: The CPU time of the step is that of the child processes that finished
+# while it ran (the steps are run one at a time).
+#
+
+def runTimedStage(stamps, timeline, productName, stageName, stageFunc,
+  outputPath="" \
+  ):
+  if not timeline:
+    return stamps.runStage(stageName, {}, stageFunc, outputPath)
+  startTime = time.time()
+  startUsage = resource.getrusage(resource.RUSAGE_CHILDREN)
+  def getCpuTime():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return (usage.ru_utime - startUsage.ru_utime) \
+      + (usage.ru_stime - startUsage.ru_stime)
+  try:
+    ranStage = stamps.runStage(stageName, {}, stageFunc, outputPath)
+  except:
+    timeline.addStageEvent(productName, stageName, startTime, time.time(),
+      getCpuTime(), 1, "failed")
+    raise
+  if ranStage:
+    status = "done"
+  else:
+    status = "skipped"
+  timeline.addStageEvent(productName, stageName, startTime, time.time(),
+    getCpuTime(), 0, status)
+  return ranStage
+
 
 #
 # Insert the standard --download-cmnd option
 #
+# If --mirror=<dir|file://path|bundle> is given, the default download
+# command gets the <product>-base repo out of that prefetch bundle (or the
+# directory it was extracted into) instead of cloning it from GitHub.  The
+# default is left empty and filled in by the driver once --mirror is known.
+#
 
 def setStdDownloadCmndOption(installObj, clp, version):
   productName = installObj.getProductBaseName()+"-"+version
   productBaseDirName = productName+"-base"
-  defaultDownloadCmnd = \
-    "git clone https://github.com/tribitsdevtools/"+productBaseDirName
   clp.add_option(
-    "--download-cmnd", dest="downloadCmnd", type="string",
-    default=defaultDownloadCmnd,
+    "--mirror", dest="mirror", type="string", default="",
+    help="Prefetch bundle file (or directory it was extracted into) created" \
+      +" with 'install_devtools.py --prefetch-bundle' to get the source for" \
+      +" "+productName+" from instead of the internet.  This changes the" \
+      +" default for --download-cmnd.")
+  clp.add_option(
+    "--download-cmnd", dest="downloadCmnd", type="string", default="",
     help="Command used to download source for "+productName+"." \
-      +"  (Default ='"+defaultDownloadCmnd+"')  WARNING: This will delete" \
+      +"  (Default ='"+getStdDownloadCmnd(installObj, version, "")+"' or" \
+      +" out of --mirror if it is given)  WARNING: This will delete" \
       +" an existing directory '"+productBaseDirName+"' if it already exists!")
 
+
+#
+# Get the default --download-cmnd for the --mirror (if not empty)
+#
+
+def getStdDownloadCmnd(installObj, version, mirror):
+  productName = installObj.getProductBaseName()+"-"+version
+  productBaseDirName = productName+"-base"
+  if mirror:
+    return "rm -rf "+productBaseDirName+" && " \
+      +getMirrorCatCmnd(mirror, getBundleSourceRelPath(productName,
+        productBaseDirName+".tar.gz")) \
+      +" | tar -xzf -"
+  return "git clone https://github.com/tribitsdevtools/"+productBaseDirName
+
+
 #
 # Get the parallel option
 #
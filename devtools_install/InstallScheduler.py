@@ -0,0 +1,438 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Dependency-graph scheduler for the tool installs driven by
+# install_devtools.py.
+#
+# Each tool install is an InstallTask node that lists the names of the tasks
+# it depends on.  InstallScheduler runs every task whose dependencies have
+# completed, concurrently, as long as there are processes left in the global
+# CPU budget.  Each task gets its own scratch directory and its own log file.
+#
+# If a stamp directory is given, each task runs its stages through
+# task.runStage() so that a re-run skips the stages that are up to date (see
+# StageStamps.py).  The stamps of a task also depend on the stamps of the
+# tasks it depends on so a rebuilt dependency causes a rebuild downstream.
+#
+# If a memory budget is given, a task is also given no more processes than
+# there is memory for (each of its processes needs task.memPerProcMb) so that
+# e.g. GCC is not built with more jobs than fit in memory next to the others.
+#
+# The tasks that run the driver of an install-<tool>.py script (created with
+# usesInstallDriver=True) run it with task.runInstallDriver() in a worker of
+# the InstallDriverPool that the scheduler starts for them (see
+# InstallProgramDriver.py).
+#
+# If a BuildTimeline is given, each stage and each task is recorded in it
+# with its wall and CPU times (see BuildTimeline.py).  If a BuildPlan is
+# given (with skipOp), each task and each of its stages that would run or is
+# up to date is recorded in it (see BuildPlan.py).
+#
+
+from FindGeneralScriptSupport import *
+from StageStamps import *
+from BuildTimeline import *
+from InstallProgramDriver import InstallDriverPool
+
+import threading
+
+
+#
+# A single node in the install dependency graph
+#
+class InstallTask:
+
+  def __init__(self, name, func, deps=None, maxProcs=1, memPerProcMb=0,
+    usesInstallDriver=False \
+    ):
+    self.name = name
+    self.func = func
+    if deps:
+      self.deps = list(deps)
+    else:
+      self.deps = []
+    self.maxProcs = max(1, maxProcs)
+    self.memPerProcMb = memPerProcMb
+    self.usesInstallDriver = usesInstallDriver
+    # Set by the scheduler
+    self.scratchDir = None
+    self.logFile = None
+    self.driverPool = None
+    self.skipOp = False
+    self.numProcs = 0
+    self.status = "pending"
+    self.errorMsg = ""
+    self.stamps = None
+    self.timeline = None
+    self.plan = None
+    # CPU time and return code of the commands of the current stage
+    self.stageCpuTime = 0.0
+    self.lastRtnCode = 0
+
+  def getParallelOpt(self, optName):
+    return " "+optName+str(self.numProcs)
+
+  # Run a command for this task in its scratch dir and append the output to
+  # its log file.
+  def runCmnd(self, cmnd, workingDir="", extraEnv=None, throwExcept=True):
+    if not workingDir:
+      workingDir = self.scratchDir
+    if self.skipOp:
+      print("\nRunning: " + cmnd)
+      print("\n  Running in working directory: " + workingDir)
+      if extraEnv:
+        print("\n  Appending environment: " + sorted_dict_str(extraEnv))
+      print("\n  Writing console output to file " + self.logFile)
+      return 0
+    cmndStats = {}
+    try:
+      return echoRunSysCmnd(cmnd, throwExcept=throwExcept,
+        outFile=self.logFile, timeCmnd=True, workingDir=workingDir,
+        extraEnv=extraEnv, appendOutFile=True, cmndStats=cmndStats)
+    finally:
+      self.stageCpuTime += cmndStats.get("userTime", 0.0) \
+        + cmndStats.get("sysTime", 0.0)
+      self.lastRtnCode = cmndStats.get("rtnCode", self.lastRtnCode)
+
+  # Run InstallProgramDriver.run(optionsDict) for install-<toolName>.py in a
+  # worker of the driver pool in the scratch dir of this task and append the
+  # output to its log file (like runCmnd()).
+  def runInstallDriver(self, toolName, optionsDict, extraEnv=None):
+    if self.skipOp:
+      print("\nRunning the install-" + toolName + ".py driver with: " \
+        + sorted_dict_str(optionsDict))
+      print("\n  Running in working directory: " + self.scratchDir)
+      if extraEnv:
+        print("\n  Appending environment: " + sorted_dict_str(extraEnv))
+      print("\n  Writing console output to file " + self.logFile)
+      return 0
+    if not self.driverPool:
+      raise Exception("Error, the install task '"+self.name+"' was not" \
+        " created with usesInstallDriver=True!")
+    (rtnCode, cpuTime, errorMsg) = self.driverPool.runDriver(toolName,
+      optionsDict, self.scratchDir, extraEnv, self.logFile)
+    self.stageCpuTime += cpuTime
+    self.lastRtnCode = rtnCode
+    if rtnCode != 0:
+      raise Exception("Error, the install-"+toolName+".py driver failed" \
+        " with error code "+str(rtnCode)+": "+errorMsg)
+    return rtnCode
+
+  # Extract a tarball (relative to the scratch dir) into the scratch dir with
+  # a parallel decompressor if there is one (see extractTarball())
+  def extractTarball(self, tarball):
+    cmnd = getExtractTarballCmnd(tarball)
+    if cmnd:
+      return self.runCmnd(cmnd)
+    print("\nExtracting " + tarball + " with Python tarfile ...")
+    if self.skipOp:
+      return 0
+    return extractTarball(tarball, workingDir=self.scratchDir, verbose=False)
+
+  # Run stageFunc() as the stage stageName of this task unless its stamp is
+  # up to date.  Returns True if the stage was run.  The stage is recorded in
+  # the timeline and the plan (if there are).  See StageStamps.runStage() for
+  # chained.
+  def runStage(self, stageName, inputs, stageFunc, outputPath="",
+    chained=True \
+    ):
+    self.stageCpuTime = 0.0
+    self.lastRtnCode = 0
+    startTime = time.time()
+    try:
+      if self.stamps:
+        ranStage = self.stamps.runStage(stageName, inputs, stageFunc,
+          outputPath, chained)
+      else:
+        stageFunc()
+        ranStage = True
+    except Exception:
+      self._addStageEvent(stageName, startTime, "failed")
+      raise
+    if ranStage:
+      self._addStageEvent(stageName, startTime, "done")
+    else:
+      self._addStageEvent(stageName, startTime, "skipped")
+    if self.plan:
+      self.plan.addStage(self.name, stageName, ranStage)
+    return ranStage
+
+  def _addStageEvent(self, stageName, startTime, status):
+    if not self.timeline or self.skipOp:
+      return
+    exitCode = self.lastRtnCode
+    if status == "failed" and not exitCode:
+      exitCode = 1
+    self.timeline.addStageEvent(self.name, stageName, startTime, time.time(),
+      self.stageCpuTime, exitCode, status, self.logFile)
+
+  def __str__(self):
+    return self.name
+
+
+#
+# Run a graph of InstallTask objects
+#
+class InstallScheduler:
+
+  def __init__(self, cpuBudget, scratchBaseDir, logDir, skipOp=False,
+    stampBaseDir=None, ignoreStamps=False, timeline=None, memBudgetMb=0,
+    plan=None \
+    ):
+    self.cpuBudget = max(1, cpuBudget)
+    self.memBudgetMb = memBudgetMb
+    self.scratchBaseDir = scratchBaseDir
+    self.logDir = logDir
+    self.skipOp = skipOp
+    self.stampBaseDir = stampBaseDir
+    self.ignoreStamps = ignoreStamps
+    self.timeline = timeline
+    self.plan = plan
+    self.tasks = []
+    self.tasksDict = {}
+
+  def addTask(self, task):
+    if task.name in self.tasksDict:
+      raise Exception("Error, the install task '"+task.name+"' was already" \
+        " added!")
+    task.scratchDir = os.path.join(self.scratchBaseDir, task.name)
+    task.logFile = os.path.join(self.logDir, task.name+".log")
+    task.skipOp = self.skipOp
+    task.timeline = self.timeline
+    task.plan = self.plan
+    self.tasks.append(task)
+    self.tasksDict[task.name] = task
+    return task
+
+  # Mark a task as failed before the graph is run (e.g. because its source
+  # could not be downloaded) so that it and its dependents are not run.
+  def failTask(self, name, errorMsg):
+    task = self.tasksDict[name]
+    task.status = "failed"
+    task.errorMsg = errorMsg
+
+  def getTask(self, name):
+    return self.tasksDict.get(name, None)
+
+  def getTaskNames(self):
+    return [task.name for task in self.tasks]
+
+  # Return the tasks sorted so that every task comes after its dependencies
+  # (ties are broken by the order the tasks were added).
+  def getTopologicalOrder(self):
+    for task in self.tasks:
+      for dep in task.deps:
+        if not dep in self.tasksDict:
+          raise Exception("Error, the install task '"+task.name+"' depends" \
+            " on '"+dep+"' which is not an install task!")
+    orderedTasks = []
+    doneSet = set()
+    remainingTasks = self.tasks[:]
+    while remainingTasks:
+      readyTasks = [task for task in remainingTasks
+        if set(task.deps).issubset(doneSet)]
+      if not readyTasks:
+        raise Exception("Error, the install tasks " \
+          +str([task.name for task in remainingTasks])+" have cyclic" \
+          " dependencies!")
+      for task in readyTasks:
+        orderedTasks.append(task)
+        doneSet.add(task.name)
+        remainingTasks.remove(task)
+    return orderedTasks
+
+  # Number of tasks downstream of each task along its longest chain.  Tasks
+  # on the longest chain are started first.
+  def getDownstreamDepths(self):
+    depths = {}
+    for task in reversed(self.getTopologicalOrder()):
+      dependents = [t for t in self.tasks if task.name in t.deps]
+      depths[task.name] = 1 + max([0] + [depths[t.name] for t in dependents])
+    return depths
+
+  def run(self):
+    orderedTasks = self.getTopologicalOrder()
+    budgetStr = "CPU budget = "+str(self.cpuBudget)
+    if self.memBudgetMb:
+      budgetStr += ", memory budget = "+str(self.memBudgetMb)+" MB"
+    print("\nInstall task graph ("+budgetStr+"):\n")
+    for task in orderedTasks:
+      print("  "+task.name+" <- "+str(task.deps))
+      if self.plan:
+        self.plan.addTool(task.name, task.deps, task.maxProcs)
+    if not self.skipOp:
+      for dirName in [self.scratchBaseDir, self.logDir]:
+        if not os.path.exists(dirName):
+          os.makedirs(dirName)
+    if self.skipOp:
+      # Just trace the tasks one at a time so the output is readable
+      for task in orderedTasks:
+        if task.status != "pending":
+          continue
+        if self._skipIfDepsNotDone(task):
+          continue
+        task.numProcs = min(task.maxProcs, self.cpuBudget,
+          self._getMemProcs(task, self.memBudgetMb))
+        self._runTask(task)
+    else:
+      # NOTE: The driver pool is started before the tasks so that no task
+      # threads are running yet
+      driverTasks = [task for task in self.tasks if task.usesInstallDriver
+        and task.status == "pending"]
+      driverPool = None
+      if driverTasks:
+        driverPool = InstallDriverPool(min(len(driverTasks), self.cpuBudget))
+      try:
+        for task in driverTasks:
+          task.driverPool = driverPool
+        self._runConcurrently()
+      finally:
+        if driverPool:
+          driverPool.close()
+    failedTasks = [task for task in self.tasks if task.status == "failed"]
+    skippedTasks = [task for task in self.tasks if task.status == "skipped"]
+    print("\nInstall task summary:\n")
+    for task in orderedTasks:
+      print("  "+task.name+": "+task.status)
+      if self.plan:
+        self.plan.setToolStatus(task.name, task.status)
+    if failedTasks:
+      for task in failedTasks:
+        print("\nError, install task '"+task.name+"' failed: "+task.errorMsg)
+        print("  See log file '"+task.logFile+"'")
+      raise Exception("Error, the install tasks " \
+        +str([task.name for task in failedTasks])+" failed and the tasks " \
+        +str([task.name for task in skippedTasks])+" were skipped!")
+
+  def _skipIfDepsNotDone(self, task):
+    for dep in task.deps:
+      if self.tasksDict[dep].status in ("failed", "skipped"):
+        task.status = "skipped"
+        print("\nSkipping install task '"+task.name+"' because" \
+          " '"+dep+"' did not complete!")
+        return True
+    return False
+
+  def _runTask(self, task):
+    task.status = "running"
+    print("\nStarting install task '"+task.name+"' using " \
+      +str(task.numProcs)+" process(es) ...")
+    startTime = time.time()
+    try:
+      if not self.skipOp and not os.path.exists(task.scratchDir):
+        os.makedirs(task.scratchDir)
+      if self.stampBaseDir:
+        depHashes = [self.tasksDict[dep].stamps.getLastHash()
+          for dep in task.deps]
+        task.stamps = StageStamps(os.path.join(self.stampBaseDir, task.name),
+          {"task" : task.name, "deps" : depHashes}, self.ignoreStamps,
+          self.skipOp)
+      task.func(task)
+      task.status = "done"
+      print("\nFinished install task '"+task.name+"'")
+    except Exception as e:
+      task.status = "failed"
+      task.errorMsg = str(e)
+      print("\nFailed install task '"+task.name+"': "+task.errorMsg)
+    if self.timeline and not self.skipOp:
+      self.timeline.addTaskEvent(task.name, task.deps, startTime, time.time(),
+        task.status)
+
+  # Number of processes of a task that fit in the memory freeMemMb (or the
+  # CPU budget if there is no memory budget)
+  def _getMemProcs(self, task, freeMemMb):
+    if not self.memBudgetMb or not task.memPerProcMb:
+      return self.cpuBudget
+    return freeMemMb // task.memPerProcMb
+
+  def _runConcurrently(self):
+    depths = self.getDownstreamDepths()
+    cond = threading.Condition()
+    state = { "freeProcs" : self.cpuBudget, "freeMemMb" : self.memBudgetMb }
+
+    def runTaskThread(task):
+      try:
+        self._runTask(task)
+      finally:
+        cond.acquire()
+        state["freeProcs"] += task.numProcs
+        state["freeMemMb"] += task.numProcs * task.memPerProcMb
+        cond.notify()
+        cond.release()
+
+    threads = []
+    cond.acquire()
+    try:
+      while True:
+        # Skip the tasks downstream of a failed task
+        for task in self.tasks:
+          if task.status == "pending":
+            self._skipIfDepsNotDone(task)
+        pendingTasks = [t for t in self.tasks if t.status == "pending"]
+        runningTasks = [t for t in self.tasks if t.status == "running"]
+        if not pendingTasks and not runningTasks:
+          break
+        readyTasks = [t for t in pendingTasks
+          if all(self.tasksDict[dep].status == "done" for dep in t.deps)]
+        # Start the tasks on the longest chain first
+        readyTasks.sort(key=lambda t: -depths[t.name])
+        while readyTasks and state["freeProcs"] > 0:
+          task = readyTasks[0]
+          memProcs = self._getMemProcs(task, state["freeMemMb"])
+          if memProcs < 1 and runningTasks:
+            # Wait for memory to be freed by the running tasks
+            break
+          readyTasks.pop(0)
+          # Leave at least one process for each of the other ready tasks
+          task.numProcs = max(1, min(task.maxProcs, memProcs,
+            state["freeProcs"] - len(readyTasks)))
+          state["freeProcs"] -= task.numProcs
+          state["freeMemMb"] -= task.numProcs * task.memPerProcMb
+          runningTasks.append(task)
+          task.status = "running"
+          thread = threading.Thread(target=runTaskThread, args=(task,))
+          thread.daemon = True
+          threads.append(thread)
+          thread.start()
+        cond.wait()
+    finally:
+      cond.release()
+    for thread in threads:
+      thread.join()
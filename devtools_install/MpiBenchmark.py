@@ -0,0 +1,146 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Post-install benchmark gate of an MPI.
+#
+# After an MPI is installed, mpi_benchmark.c is built with its mpicc and run
+# on the local host with mpiexec -n <num-ranks>.  It measures the ping-pong
+# latency and bandwidth between two ranks and the all-reduce latency over all
+# of the ranks for a few message sizes (see mpi_benchmark.c).  The results
+# are compared to the baseline for the same MPI, GCC, number of ranks and
+# host in the baseline file (JSON).  The first run for these records the
+# baseline.  A latency more than (1 + tolerance) times the baseline, or a
+# bandwidth less than the baseline divided by (1 + tolerance), is a
+# regression, e.g. for an MPI built with the wrong device or debug flags.
+# To record a new baseline, remove its entry from the baseline file.
+#
+
+from FindGeneralScriptSupport import *
+from BenchmarkBaselines import *
+
+import json
+import socket
+import threading
+
+
+mpiBenchmarkModes = ["off", "warn", "fail"]
+
+mpiBenchmarkMode_default = "off"
+
+mpiBenchmarkRanks_default = "4"
+
+mpiBenchmarkTolerance_default = "1.0"
+
+mpiBenchmarkBaselineFile_default = os.path.join(os.path.expanduser("~"),
+  ".cache", "mpact-dev-env", "mpi_benchmark_baseline.json")
+
+mpiBenchmarkSourceFileName = "mpi_benchmark.c"
+
+# NOTE: The MPIs of the --matrix toolsets are benchmarked at the same time
+# and share the baseline file
+mpiBenchmarkBaselineLock = threading.Lock()
+
+
+#
+# Get the key of the baseline of an MPI in the baseline file
+#
+def getMpiBenchmarkKey(mpiName, mpiVersion, gccVersion, numRanks,
+  hostName=None \
+  ):
+  if hostName is None:
+    hostName = socket.gethostname()
+  return mpiName+"-"+mpiVersion+" gcc-"+gccVersion+" np="+str(numRanks) \
+    +" host="+hostName
+
+
+#
+# Parse the output of mpi_benchmark into a dict of the results, e.g.
+# {"pingpong_latency_us:8" : 0.3, "pingpong_bandwidth_mbps:1048576" : 9000.0,
+# "allreduce_latency_us:8" : 0.6, ...}
+#
+def parseMpiBenchmarkOutput(outputStr):
+  results = {}
+  for line in outputStr.splitlines():
+    fields = line.split()
+    if len(fields) == 4 and fields[0] == "pingpong":
+      results["pingpong_latency_us:"+fields[1]] = float(fields[2])
+      results["pingpong_bandwidth_mbps:"+fields[1]] = float(fields[3])
+    elif len(fields) == 3 and fields[0] == "allreduce":
+      results["allreduce_latency_us:"+fields[1]] = float(fields[2])
+  if not results:
+    raise Exception("Error, no results in the MPI benchmark output:\n" \
+      +outputStr)
+  return results
+
+
+#
+# Get the rule for whether a metric regressed (see BenchmarkBaselines.py)
+#
+def getMpiBenchmarkMetricRule(metric):
+  if "bandwidth" in metric:
+    return isBenchmarkDecreaseRegressed
+  return isBenchmarkIncreaseRegressed
+
+
+#
+# Compare the results of a benchmark run to its baseline and record them as
+# the baseline if there is none yet.  Returns (baseline, regressions).
+#
+def checkMpiBenchmarkResults(baselineFile, key, results, tolerance):
+  mpiBenchmarkBaselineLock.acquire()
+  try:
+    baselines = readBenchmarkBaselines(baselineFile)
+    if key in baselines:
+      baseline = baselines[key]
+      return (baseline, getBenchmarkRegressions(results, baseline,
+        tolerance, getMpiBenchmarkMetricRule))
+    baselines[key] = results
+    writeBenchmarkBaselines(baselineFile, baselines)
+    return ({}, [])
+  finally:
+    mpiBenchmarkBaselineLock.release()
+
+
+def writeMpiBenchmarkResultsFile(resultsFile, key, results, baseline,
+  regressions \
+  ):
+  writeStrToFile(resultsFile, json.dumps({"key" : key, "results" : results,
+    "baseline" : baseline, "regressions" : regressions}, sort_keys=True,
+    indent=2)+"\n")
@@ -0,0 +1,136 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Runtime container image of an already installed dev env.
+#
+# Instead of building the tools again inside the image (see Dockerfile.in),
+# the trees that install_devtools.py installed on the host
+# (<install-dir>/common_tools, gcc-<ver>/toolset, gcc-<ver>/tpls and env) are
+# copied into a minimal image at the same absolute paths (the installs are
+# not relocatable) and the env of the dev env is set with ENV.  The install
+# dir is the build context and the Dockerfile-specific ignore file
+# Dockerfile.dockerignore next to the Dockerfile keeps everything else (the
+# images dir, ...) out of it:
+#
+#   DOCKER_BUILDKIT=1 docker build -f <install-dir>/images/runtime/Dockerfile \
+#     -t <image> <install-dir>
+#
+# The Dockerfile and the ignore file are made by pure functions of their
+# arguments so they can be checked as text.
+#
+
+from FindGeneralScriptSupport import *
+from EnvSnapshot import envSnapshotGuardVarName
+
+
+runtimeImageBaseImage_default = "centos:7"
+
+# The system packages needed to use the installed compilers and tools
+runtimeImagePackages = ["binutils", "glibc-devel", "make", "which",
+  "environment-modules", "git", "python"]
+
+
+#
+# Get the trees under the install dir (relative paths) that go into the
+# runtime image (envDir is the env files dir, e.g. env/gcc-<ver> for a
+# --matrix toolset)
+#
+def getRuntimeImageTrees(installDir, gccVersion, envDir="env",
+  pathExists=os.path.exists \
+  ):
+  trees = ["common_tools", "gcc-"+gccVersion+"/toolset",
+    "gcc-"+gccVersion+"/tpls", envDir]
+  return [tree for tree in trees if pathExists(os.path.join(installDir, tree))]
+
+
+#
+# Get the Dockerfile of the runtime image
+#
+# setVars and prependPaths are the flattened env of the dev env (see
+# EnvSnapshot.flattenEnvOps()).  If snapshotId is given, the env snapshot
+# guard var is set to it so sourcing the env snapshot in the image does not
+# prepend the paths again.
+#
+def getRuntimeImageDockerfileStr(installDir, trees, setVars, prependPaths,
+  snapshotId="", baseImage=runtimeImageBaseImage_default,
+  packages=runtimeImagePackages \
+  ):
+  dockerfileStr = "# syntax=docker/dockerfile:1.4\n" \
+    "#\n# Runtime image of the MPACT dev env installed in "+installDir+"\n#\n" \
+    "# Generated by install_devtools.py.  Do not edit!  Build with the" \
+    " install dir as\n# the context:\n#\n" \
+    "#   DOCKER_BUILDKIT=1 docker build -f "+installDir \
+    +"/images/runtime/Dockerfile \\\n#     -t <image> "+installDir+"\n#\n\n"
+  dockerfileStr += "FROM "+baseImage+"\n"
+  dockerfileStr += "RUN --mount=type=cache,target=/var/cache/yum \\\n" \
+    "sed -i 's/keepcache=0/keepcache=1/' /etc/yum.conf && \\\n" \
+    "yum install -y "+" ".join(packages)+"\n"
+  for tree in trees:
+    dockerfileStr += "COPY "+tree+" "+installDir+"/"+tree+"\n"
+  envLines = []
+  for (varName, value) in setVars:
+    envLines.append(varName+'="'+value+'"')
+  for (varName, paths) in prependPaths:
+    envLines.append(varName+'="'+":".join(paths) \
+      +'${'+varName+':+:${'+varName+'}}"')
+  if snapshotId:
+    envLines.append(envSnapshotGuardVarName+'="'+snapshotId+'"')
+  if envLines:
+    dockerfileStr += "ENV "+" \\\n  ".join(envLines)+"\n"
+  dockerfileStr += "WORKDIR /scratch\n"
+  return dockerfileStr
+
+
+#
+# Get the Dockerfile.dockerignore that only lets the trees into the context
+#
+def getRuntimeImageDockerignoreStr(trees):
+  return "*\n"+"".join(["!"+tree+"\n" for tree in trees])
+
+
+#
+# Write <imageDir>/Dockerfile and <imageDir>/Dockerfile.dockerignore
+#
+def writeRuntimeImageFiles(imageDir, dockerfileStr, dockerignoreStr):
+  if not os.path.exists(imageDir):
+    os.makedirs(imageDir)
+  writeStrToFile(os.path.join(imageDir, "Dockerfile"), dockerfileStr)
+  writeStrToFile(os.path.join(imageDir, "Dockerfile.dockerignore"),
+    dockerignoreStr)
@@ -0,0 +1,210 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Persistent, content-addressed cache of the tool sources.
+#
+# The cache directory looks like:
+#
+#   <cache-dir>/
+#     index.json
+#     blobs/<sha256[0:2]>/<sha256>
+#
+# index.json maps '<tool>/<version>/<file-name>' to the sha256, size and the
+# last time the entry was used.  The blobs are stored by their sha256 so the
+# same file is only stored once.  When the total size of the blobs goes over
+# the size cap, the least recently used entries are evicted.
+#
+
+from FindGeneralScriptSupport import *
+
+import hashlib
+import json
+import shutil
+import threading
+
+
+sourceCacheDir_default = os.path.join(os.path.expanduser("~"), ".cache",
+  "mpact-dev-env", "sources")
+
+sourceCacheMaxSizeGb_default = "20"
+
+
+#
+# Compute the checksum of a file using the hashlib algorithm algo (e.g.
+# 'sha512' or 'md5')
+#
+def getFileChecksum(filePath, algo):
+  fileHash = hashlib.new(algo)
+  fileHandle = open(filePath, 'rb')
+  try:
+    while True:
+      data = fileHandle.read(1024*1024)
+      if not data:
+        break
+      fileHash.update(data)
+  finally:
+    fileHandle.close()
+  return fileHash.hexdigest()
+
+
+#
+# Compute the sha256 of a file
+#
+def getFileSha256(filePath):
+  return getFileChecksum(filePath, "sha256")
+
+
+class SourceCache:
+
+  # Used in the messages
+  cacheDesc = "source cache"
+
+  def __init__(self, cacheDir, maxSizeBytes):
+    self.cacheDir = os.path.abspath(os.path.expanduser(cacheDir))
+    self.maxSizeBytes = maxSizeBytes
+    self.indexFile = os.path.join(self.cacheDir, "index.json")
+    self.lock = threading.Lock()
+
+  def getKey(self, toolName, toolVersion, fileName):
+    return toolName+"/"+toolVersion+"/"+fileName
+
+  def getBlobPath(self, sha256):
+    return os.path.join(self.cacheDir, "blobs", sha256[0:2], sha256)
+
+  # Return the path to the cached file or None if it is not in the cache.
+  # If expectedSha256 is given, then the cached file must match it.  If touch
+  # is False, the entry is not marked as used (e.g. for --no-op).
+  def lookup(self, toolName, toolVersion, fileName, expectedSha256="",
+    touch=True \
+    ):
+    self.lock.acquire()
+    try:
+      index = self._readIndex()
+      entry = index.get(self.getKey(toolName, toolVersion, fileName), None)
+      if not entry:
+        return None
+      if expectedSha256 and entry["sha256"] != expectedSha256:
+        return None
+      blobPath = self.getBlobPath(entry["sha256"])
+      if not os.path.exists(blobPath):
+        return None
+      if touch:
+        entry["lastUsed"] = time.time()
+        self._writeIndex(index)
+      return blobPath
+    finally:
+      self.lock.release()
+
+  # Copy the cached file to destPath.  Returns True if it was in the cache.
+  def fetch(self, toolName, toolVersion, fileName, destPath,
+    expectedSha256="" \
+    ):
+    blobPath = self.lookup(toolName, toolVersion, fileName, expectedSha256)
+    if not blobPath:
+      return False
+    tmpDestPath = destPath+".part"
+    shutil.copyfile(blobPath, tmpDestPath)
+    os.rename(tmpDestPath, destPath)
+    return True
+
+  # Add a file to the cache and return its sha256
+  def store(self, toolName, toolVersion, fileName, srcPath):
+    sha256 = getFileSha256(srcPath)
+    blobPath = self.getBlobPath(sha256)
+    if not os.path.exists(blobPath):
+      blobDir = os.path.dirname(blobPath)
+      if not os.path.exists(blobDir):
+        os.makedirs(blobDir)
+      tmpBlobPath = blobPath+"."+str(os.getpid())+"."+ \
+        str(threading.current_thread().ident)+".part"
+      shutil.copyfile(srcPath, tmpBlobPath)
+      os.rename(tmpBlobPath, blobPath)
+    self.lock.acquire()
+    try:
+      index = self._readIndex()
+      index[self.getKey(toolName, toolVersion, fileName)] = {
+        "sha256" : sha256,
+        "size" : os.path.getsize(blobPath),
+        "lastUsed" : time.time(),
+        }
+      self._evict(index)
+      self._writeIndex(index)
+    finally:
+      self.lock.release()
+    return sha256
+
+  def getTotalSize(self, index=None):
+    if index is None:
+      index = self._readIndex()
+    blobSizes = {}
+    for entry in index.values():
+      blobSizes[entry["sha256"]] = entry["size"]
+    return sum(blobSizes.values())
+
+  # Remove the least recently used entries until the cache fits.  The
+  # entry that was just added is never removed, even if it is bigger than
+  # the size cap.
+  def _evict(self, index):
+    entries = sorted(index.items(), key=lambda item: item[1]["lastUsed"])
+    while len(entries) > 1 and self.getTotalSize(index) > self.maxSizeBytes:
+      (key, entry) = entries.pop(0)
+      del index[key]
+      if not entry["sha256"] in [e["sha256"] for e in index.values()]:
+        blobPath = self.getBlobPath(entry["sha256"])
+        print("\nEvicting '"+key+"' from the "+self.cacheDesc+" ...")
+        if os.path.exists(blobPath):
+          os.remove(blobPath)
+
+  def _readIndex(self):
+    if not os.path.exists(self.indexFile):
+      return {}
+    try:
+      return json.loads(readStrFromFile(self.indexFile))
+    except ValueError:
+      print("\nWARNING: Ignoring the corrupted "+self.cacheDesc+" index '" \
+        +self.indexFile+"'!")
+      return {}
+
+  def _writeIndex(self, index):
+    if not os.path.exists(self.cacheDir):
+      os.makedirs(self.cacheDir)
+    tmpIndexFile = self.indexFile+"."+str(os.getpid())+".part"
+    writeStrToFile(tmpIndexFile, json.dumps(index, indent=2, sort_keys=True))
+    os.rename(tmpIndexFile, self.indexFile)
@@ -0,0 +1,415 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Concurrent download of the tool sources for install_devtools.py.
+#
+# Each SourceDownload is either a tarball fetched with wget or a git repo
+# fetched with git clone.  downloadSources() runs them on a bounded pool of
+# worker threads, prints the aggregate progress as each one finishes and
+# returns the success or failure of each download instead of aborting on the
+# first error.
+#
+# If a SourceCache is given, the downloads are looked up in the cache first
+# and only fetched from the network (and then added to the cache) if they
+# are missing.  Git repos are cached as a tarball of the clone.
+#
+# If a SourceMirror is given instead, all of the downloads are restored from
+# the mirror and nothing is fetched from the network.
+#
+# If a stamp directory is given, a download is skipped if it is already there
+# from an earlier run with the same URL (see StageStamps.py).
+#
+
+from FindGeneralScriptSupport import *
+from SourceMirror import getBundleSourceRelPath
+from SourceCache import getFileChecksum
+from StageStamps import StageStamps
+
+import threading
+
+try:
+  import Queue as queue
+except ImportError:
+  import queue
+
+
+#
+# The source for a single tool
+#
+class SourceDownload:
+
+  # If extractDir is given, a tarball is extracted into it while it is
+  # downloading (see wasExtractedWhileDownloading()).  If checksum is given
+  # as (algo, checksum), the downloaded file must match it.
+  def __init__(self, name, url, destDir, isGitRepo=False, fileName="",
+    downloadCmnd="", toolName="", toolVersion="", extractDir="",
+    checksum=None \
+    ):
+    self.name = name
+    self.url = url
+    self.destDir = destDir
+    self.isGitRepo = isGitRepo
+    self.downloadCmnd = downloadCmnd
+    self.toolName = toolName
+    self.toolVersion = toolVersion
+    self.extractDir = extractDir
+    self.checksum = checksum
+    if fileName:
+      self.fileName = fileName
+    else:
+      self.fileName = url.split("/")[-1]
+
+  def getDestPath(self):
+    return os.path.join(self.destDir, self.fileName)
+
+  # Only the downloads of a specific tool version can be cached
+  def isCacheable(self):
+    return (self.toolName and self.toolVersion and not self.downloadCmnd)
+
+  def getBundleRelPath(self):
+    return getBundleSourceRelPath(self.name, self.getCacheFileName())
+
+  def getCacheFileName(self):
+    if self.isGitRepo:
+      return self.fileName+".tar.gz"
+    return self.fileName
+
+  # NOTE: The download command is run in destDir
+  def getDownloadCmnd(self):
+    if self.downloadCmnd:
+      return self.downloadCmnd
+    destPath = self.getDestPath()
+    if self.isGitRepo:
+      return "rm -rf "+destPath+" && git clone "+self.url+" "+destPath
+    if self.extractDir:
+      extractedStampFile = getExtractedStampFile(destPath)
+      downloadExtractCmnd = getDownloadExtractTarballCmnd(self.url, destPath,
+        self.extractDir)
+      if downloadExtractCmnd:
+        return "rm -f "+extractedStampFile+" && mkdir -p "+self.extractDir \
+          +" && "+downloadExtractCmnd+" && touch "+extractedStampFile
+    return "wget -nv -O "+destPath+".part '"+self.url+"'" \
+      +" && mv "+destPath+".part "+destPath
+
+  # Return True if there is no checksum for the download or if the
+  # downloaded file matches it
+  def checksumMatches(self):
+    if not self.checksum or self.isGitRepo:
+      return True
+    (algo, checksum) = self.checksum
+    return getFileChecksum(self.getDestPath(), algo) == checksum
+
+  def __str__(self):
+    return self.name+": "+self.url
+
+
+#
+# Stamp file written after a tarball was extracted while it was downloading
+#
+def getExtractedStampFile(tarball):
+  return tarball+".extracted"
+
+
+#
+# Return True if the tarball was extracted into the extract dir of its
+# download while it was downloading (and was not replaced since)
+#
+def wasExtractedWhileDownloading(tarball):
+  extractedStampFile = getExtractedStampFile(tarball)
+  return os.path.exists(tarball) and os.path.exists(extractedStampFile) \
+    and os.path.getmtime(extractedStampFile) >= os.path.getmtime(tarball)
+
+
+#
+# Download the sources concurrently
+#
+# Returns a dict mapping the name of each download to (success, errorMsg).
+# If a BuildTimeline is given, each download is recorded in it as a
+# 'download' stage.  If a BuildPlan is given (with skipOp), where each
+# download would come from is recorded in it.
+#
+def downloadSources(sourceDownloads, numWorkers, logDir, skipOp=False,
+  sourceCache=None, sourceMirror=None, stampDir=None, ignoreStamps=False,
+  timeline=None, plan=None \
+  ):
+
+  results = {}
+  numDownloads = len(sourceDownloads)
+
+  if skipOp:
+    for sourceDownload in sourceDownloads:
+      source = traceDownloadSource(sourceDownload, sourceCache, sourceMirror,
+        stampDir, ignoreStamps)
+      if plan:
+        plan.addDownload(sourceDownload.name, sourceDownload.url, source)
+      results[sourceDownload.name] = (True, "")
+    return results
+
+  for dirName in [logDir] + [sd.destDir for sd in sourceDownloads]:
+    if not os.path.exists(dirName):
+      os.makedirs(dirName)
+
+  numWorkers = max(1, min(numWorkers, numDownloads))
+  print("\nDownloading "+str(numDownloads)+" sources using " \
+    +str(numWorkers)+" workers ...\n")
+
+  workQueue = queue.Queue()
+  for sourceDownload in sourceDownloads:
+    workQueue.put(sourceDownload)
+  printLock = threading.Lock()
+  tStart = time.time()
+
+  def downloadWorker():
+    while True:
+      try:
+        sourceDownload = workQueue.get_nowait()
+      except queue.Empty:
+        return
+      logFile = os.path.join(logDir, sourceDownload.name+"-download.log")
+      t1 = time.time()
+      state = { "fromCache" : False }
+      def doDownload():
+        state["fromCache"] = downloadSource(sourceDownload, sourceCache,
+          sourceMirror, logFile)
+      try:
+        # NOTE: A custom download command (e.g. a git submodule update) is
+        # always run
+        if stampDir and not sourceDownload.downloadCmnd:
+          stamps = getDownloadStamps(sourceDownload, stampDir, ignoreStamps)
+          upToDate = not stamps.runStage("download", {}, doDownload,
+            outputPath=sourceDownload.getDestPath())
+        else:
+          doDownload()
+          upToDate = False
+        result = (True, "")
+      except Exception as e:
+        result = (False, str(e))
+        upToDate = False
+      if timeline:
+        if not result[0]:
+          (status, exitCode) = ("failed", 1)
+        elif upToDate:
+          (status, exitCode) = ("skipped", 0)
+        else:
+          (status, exitCode) = ("done", 0)
+        timeline.addStageEvent(sourceDownload.name, "download", t1,
+          time.time(), 0.0, exitCode, status, logFile)
+      printLock.acquire()
+      try:
+        results[sourceDownload.name] = result
+        if result[0] and upToDate:
+          statusStr = "OK (up to date)"
+        elif result[0] and sourceMirror:
+          statusStr = "OK (mirror)"
+        elif result[0] and state["fromCache"]:
+          statusStr = "OK (cached)"
+        elif result[0]:
+          statusStr = "OK"
+        else:
+          statusStr = "FAILED"
+        print("  [%d/%d] %s: %s (%.1f s, %.1f s total)" % (len(results),
+          numDownloads, sourceDownload.name, statusStr, time.time()-t1,
+          time.time()-tStart))
+        sys.stdout.flush()
+      finally:
+        printLock.release()
+
+  threads = []
+  for i in range(numWorkers):
+    thread = threading.Thread(target=downloadWorker)
+    thread.daemon = True
+    threads.append(thread)
+    thread.start()
+  for thread in threads:
+    thread.join()
+
+  return results
+
+
+#
+# Get the stamps of a download (a custom download command, e.g. a git
+# submodule update, has none since it is always run)
+#
+def getDownloadStamps(sourceDownload, stampDir, ignoreStamps, skipOp=False):
+  return StageStamps(os.path.join(stampDir, sourceDownload.name),
+    {"url" : sourceDownload.url, "fileName" : sourceDownload.fileName},
+    ignoreStamps, skipOp, verbose=False)
+
+
+#
+# Trace the download of a single source for --no-op without touching the
+# source cache.  Returns where it would come from: 'up-to-date', 'mirror',
+# 'source-cache' or 'network'.
+#
+def traceDownloadSource(sourceDownload, sourceCache, sourceMirror, stampDir,
+  ignoreStamps \
+  ):
+  sd = sourceDownload
+  if stampDir and not sd.downloadCmnd:
+    if not getDownloadStamps(sd, stampDir, ignoreStamps, True).runStage(
+      "download", {}, lambda: None, outputPath=sd.getDestPath() \
+      ):
+      print("\nSkipping the download of '"+sd.name+"' (up to date)")
+      return "up-to-date"
+  if sourceMirror:
+    print("\nRestoring '"+sd.getBundleRelPath()+"' from the mirror '" \
+      +sourceMirror.mirrorPath+"' ...")
+    return "mirror"
+  if sourceCache and sd.isCacheable():
+    print("\nLooking up '"+sd.getCacheFileName()+"' in the source cache '" \
+      +sourceCache.cacheDir+"' ...")
+    if sourceCache.lookup(sd.toolName, sd.toolVersion, sd.getCacheFileName(),
+      touch=False \
+      ):
+      print("\n  Found '"+sd.getCacheFileName()+"' in the source cache")
+      return "source-cache"
+  print("\nRunning: " + sd.getDownloadCmnd())
+  return "network"
+
+
+#
+# Download a single source from the mirror, the cache or the network.
+# Returns True if it came from the mirror or the cache.
+#
+def downloadSource(sourceDownload, sourceCache, sourceMirror, logFile):
+  if sourceMirror:
+    if not restoreFromSourceMirror(sourceDownload, sourceMirror, logFile):
+      raise Exception("Error, '"+sourceDownload.getBundleRelPath()+"'" \
+        " is not in the mirror '"+sourceMirror.mirrorPath+"'!")
+    return True
+  # NOTE: A cached file that does not match the checksum is downloaded again
+  # (and replaces the cache entry)
+  if sourceCache and sourceDownload.isCacheable():
+    if restoreFromSourceCache(sourceDownload, sourceCache, logFile) \
+      and sourceDownload.checksumMatches():
+      return True
+  rtnCode = runSysCmnd(sourceDownload.getDownloadCmnd(), throwExcept=False,
+    outFile=logFile, workingDir=sourceDownload.destDir)
+  if rtnCode != 0:
+    raise Exception("Error, downloading '"+sourceDownload.url+"' failed" \
+      " with error code "+str(rtnCode)+" (see '"+logFile+"')")
+  if not sourceDownload.checksumMatches():
+    raise Exception("Error, the "+sourceDownload.checksum[0]+" of '" \
+      +sourceDownload.getDestPath()+"' downloaded from '"+sourceDownload.url \
+      +"' does not match '"+sourceDownload.checksum[1]+"'!")
+  if sourceCache and sourceDownload.isCacheable():
+    addToSourceCache(sourceDownload, sourceCache, logFile)
+  return False
+
+
+#
+# Restore a download from the source cache.  Returns True if it was found.
+#
+def restoreFromSourceCache(sourceDownload, sourceCache, logFile):
+  sd = sourceDownload
+  return restoreDownload(sd,
+    lambda destPath: sourceCache.fetch(sd.toolName, sd.toolVersion,
+      sd.getCacheFileName(), destPath),
+    logFile)
+
+
+#
+# Restore a download from a source mirror.  Returns True if it was found.
+#
+def restoreFromSourceMirror(sourceDownload, sourceMirror, logFile):
+  return restoreDownload(sourceDownload,
+    lambda destPath: sourceMirror.fetch(sourceDownload.getBundleRelPath(),
+      destPath),
+    logFile)
+
+
+#
+# Restore a download using fetchFunc(destPath) to get the file (or the
+# tarball of a git repo).  Returns the return value of fetchFunc.
+#
+def restoreDownload(sourceDownload, fetchFunc, logFile):
+  sd = sourceDownload
+  if not sd.isGitRepo:
+    return fetchFunc(sd.getDestPath())
+  cachedTarball = os.path.join(sd.destDir, sd.getCacheFileName())
+  if not fetchFunc(cachedTarball):
+    return False
+  # A repo with a custom download command (e.g. a git submodule) is not ours
+  # to remove so it is just extracted over
+  extractCmnd = getExtractTarballCmnd(cachedTarball) or \
+    "tar -xzf "+cachedTarball
+  if sd.downloadCmnd:
+    cmnd = extractCmnd
+  else:
+    cmnd = "rm -rf "+sd.getDestPath()+" && "+extractCmnd
+  runSysCmnd(cmnd+" && rm -f "+cachedTarball, outFile=logFile,
+    workingDir=sd.destDir, appendOutFile=True)
+  return True
+
+
+#
+# Add a completed download to the source cache
+#
+def addToSourceCache(sourceDownload, sourceCache, logFile):
+  sd = sourceDownload
+  if not sd.isGitRepo:
+    sourceCache.store(sd.toolName, sd.toolVersion, sd.fileName,
+      sd.getDestPath())
+    return
+  cachedTarball = os.path.join(sd.destDir, sd.getCacheFileName())
+  runSysCmnd("tar -czf "+cachedTarball+" "+sd.fileName, outFile=logFile,
+    workingDir=sd.destDir, appendOutFile=True)
+  try:
+    sourceCache.store(sd.toolName, sd.toolVersion, sd.getCacheFileName(),
+      cachedTarball)
+  finally:
+    os.remove(cachedTarball)
+
+
+#
+# Print a summary of the download results and return the names of the
+# failed downloads
+#
+def printDownloadSummary(results):
+  failedNames = []
+  print("\nDownload summary:\n")
+  for name in sorted(results.keys()):
+    (success, errorMsg) = results[name]
+    if success:
+      print("  "+name+": OK")
+    else:
+      print("  "+name+": FAILED: "+errorMsg)
+      failedNames.append(name)
+  return failedNames
@@ -0,0 +1,231 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Offline source mirror (prefetch bundle) support.
+#
+# A prefetch bundle is a single tar file that holds every source needed to
+# install a selected toolset so that it can be carried to a machine without
+# internet access.  It looks like:
+#
+#   manifest.json
+#   sources/<name>/<file-name>
+#
+# where <name> is the name of the SourceDownload and <file-name> is the
+# tarball (or, for a git repo, a .tar.gz of the clone).  manifest.json
+# records the tool versions, the sha256 of each file and the GCC
+# prerequisite archives for each GCC version.
+#
+# A mirror is either a bundle file or a directory that a bundle was
+# extracted into (optionally given as a file:// URL).
+#
+
+from FindGeneralScriptSupport import *
+from SourceCache import getFileSha256
+
+import json
+import shutil
+import tarfile
+
+
+bundleManifestFileName = "manifest.json"
+
+bundleSourcesDirName = "sources"
+
+
+#
+# Get the local path from a --mirror=<dir|file://path> spec
+#
+def getMirrorPath(mirrorSpec):
+  if mirrorSpec.startswith("file://"):
+    mirrorSpec = mirrorSpec[len("file://"):]
+  return os.path.abspath(os.path.expanduser(mirrorSpec))
+
+
+#
+# Get the relative path of a source in a bundle
+#
+def getBundleSourceRelPath(name, fileName):
+  return bundleSourcesDirName+"/"+name+"/"+fileName
+
+
+#
+# Get a shell command that writes a file in the mirror to stdout.  This is
+# used by the install-<tool>.py scripts that don't go through
+# install_devtools.py.
+#
+def getMirrorCatCmnd(mirrorSpec, relPath):
+  mirrorPath = getMirrorPath(mirrorSpec)
+  if os.path.isdir(mirrorPath):
+    return "cat "+os.path.join(mirrorPath, relPath)
+  return "tar -xOf "+mirrorPath+" "+relPath
+
+
+#
+# A source mirror that downloads are resolved from
+#
+class SourceMirror:
+
+  def __init__(self, mirrorSpec, extractDir, skipOp=False):
+    self.mirrorPath = getMirrorPath(mirrorSpec)
+    if not os.path.exists(self.mirrorPath):
+      raise Exception("Error, the mirror '"+mirrorSpec+"' does not exist!")
+    if os.path.isdir(self.mirrorPath):
+      self.mirrorDir = self.mirrorPath
+    else:
+      self.mirrorDir = extractDir
+      print("\nExtracting the prefetch bundle '"+self.mirrorPath+"' into '" \
+        +extractDir+"' ...")
+      if not skipOp:
+        if os.path.exists(extractDir):
+          shutil.rmtree(extractDir)
+        os.makedirs(extractDir)
+        bundleFile = tarfile.open(self.mirrorPath, "r:*")
+        try:
+          bundleFile.extractall(extractDir)
+        finally:
+          bundleFile.close()
+    self.manifest = self._readManifest()
+
+  def getManifest(self):
+    return self.manifest
+
+  def getGccPrerequisites(self, gccVersion):
+    return self.manifest.get("gccPrerequisites", {}).get(gccVersion, [])
+
+  # Copy a file out of the mirror.  Returns False if it is not in the mirror.
+  def fetch(self, relPath, destPath):
+    srcPath = os.path.join(self.mirrorDir, relPath)
+    if not os.path.exists(srcPath):
+      return False
+    expectedSha256 = self.manifest.get("files", {}).get(relPath, {}) \
+      .get("sha256", "")
+    if expectedSha256 and getFileSha256(srcPath) != expectedSha256:
+      raise Exception("Error, the file '"+srcPath+"' in the mirror does not" \
+        " match the sha256 in the bundle manifest!")
+    shutil.copyfile(srcPath, destPath+".part")
+    os.rename(destPath+".part", destPath)
+    return True
+
+  def _readManifest(self):
+    if os.path.isdir(self.mirrorPath):
+      manifestPath = os.path.join(self.mirrorDir, bundleManifestFileName)
+      if not os.path.exists(manifestPath):
+        return {}
+      return json.loads(readStrFromFile(manifestPath))
+    bundleFile = tarfile.open(self.mirrorPath, "r:*")
+    try:
+      try:
+        manifestMember = bundleFile.extractfile(bundleManifestFileName)
+      except KeyError:
+        return {}
+      return json.loads(s(manifestMember.read()))
+    finally:
+      bundleFile.close()
+
+
+#
+# Write a prefetch bundle with the given downloads
+#
+# The downloads must have already been done.  Git repos are packed into a
+# .tar.gz in stagingDir first.  Returns the manifest that was written.
+#
+def writeSourceBundle(bundleFile, sourceDownloads, versionList,
+  gccPrerequisites, stagingDir \
+  ):
+
+  if os.path.exists(stagingDir):
+    shutil.rmtree(stagingDir)
+  os.makedirs(stagingDir)
+
+  manifest = {
+    "versions" : versionList,
+    "gccPrerequisites" : gccPrerequisites,
+    "sources" : [],
+    "files" : {},
+    }
+
+  bundleMembers = []
+  for sd in sourceDownloads:
+    relPath = getBundleSourceRelPath(sd.name, sd.getCacheFileName())
+    if sd.isGitRepo:
+      filePath = os.path.join(stagingDir, sd.getCacheFileName())
+      print("\nPacking '"+sd.getDestPath()+"' into '"+filePath+"' ...")
+      repoTarball = tarfile.open(filePath, "w:gz")
+      try:
+        # A submodule's .git is a file that points into the parent repo
+        repoTarball.add(sd.getDestPath(), arcname=sd.fileName,
+          filter=lambda tarInfo: _excludeGitLink(tarInfo, sd))
+      finally:
+        repoTarball.close()
+    else:
+      filePath = sd.getDestPath()
+    manifest["sources"].append({"name" : sd.name, "url" : sd.url,
+      "path" : relPath})
+    manifest["files"][relPath] = {"sha256" : getFileSha256(filePath),
+      "size" : os.path.getsize(filePath)}
+    bundleMembers.append((filePath, relPath))
+
+  manifestPath = os.path.join(stagingDir, bundleManifestFileName)
+  writeStrToFile(manifestPath, json.dumps(manifest, indent=2, sort_keys=True))
+
+  # The sources are already compressed so only compress the bundle itself
+  # if asked for with the file extension
+  if bundleFile.endswith(".gz") or bundleFile.endswith(".tgz"):
+    bundleMode = "w:gz"
+  else:
+    bundleMode = "w"
+  bundle = tarfile.open(bundleFile+".part", bundleMode)
+  try:
+    bundle.add(manifestPath, arcname=bundleManifestFileName)
+    for (filePath, relPath) in bundleMembers:
+      bundle.add(filePath, arcname=relPath)
+  finally:
+    bundle.close()
+  os.rename(bundleFile+".part", bundleFile)
+
+  return manifest
+
+
+def _excludeGitLink(tarInfo, sourceDownload):
+  if sourceDownload.downloadCmnd and \
+    tarInfo.name == sourceDownload.fileName+"/.git" \
+    :
+    return None
+  return tarInfo
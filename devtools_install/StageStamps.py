@@ -0,0 +1,176 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Stamp files for resumable, incremental installs.
+#
+# An install is broken into an ordered list of stages (e.g. untar,
+# configure, build, install).  When a stage completes, a stamp file
+# <stamp-dir>/<stage>.stamp is written with a hash of the inputs of that
+# stage (tool version, configure flags, compiler, environment, ...).  The
+# hash of each stage is chained with the hash of the stage before it, so
+# changing the inputs of one stage makes all of the stages after it stale.
+#
+# On a re-run, a stage is skipped if its stamp has the same hash.  The first
+# stage that is stale (or that failed, and so has no stamp) is run and so
+# are all of the stages after it.
+#
+
+from FindGeneralScriptSupport import *
+
+import hashlib
+import json
+
+
+# Env vars that change what the compilers produce
+stdStageEnvVarNames = ["CC", "CXX", "FC", "F77", "CFLAGS", "CXXFLAGS",
+  "FFLAGS", "LDFLAGS", "CPPFLAGS", "LIBS"]
+
+
+#
+# Get the hash of the inputs of a stage (any JSON-able data)
+#
+def getStageInputsHash(inputs):
+  return hashlib.sha256(
+    json.dumps(inputs, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+compilerVersionCache = {}
+
+#
+# Get the first line of '<compiler> --version' (or '' if it can't be run)
+#
+def getCompilerVersion(compiler):
+  if not compiler in compilerVersionCache:
+    (output, rtnCode) = getCmndOutput(compiler+" --version",
+      throwOnError=False, rtnCode=True)
+    output = s(output).strip()
+    if rtnCode == 0 and output:
+      compilerVersionCache[compiler] = output.splitlines()[0]
+    else:
+      compilerVersionCache[compiler] = ""
+  return compilerVersionCache[compiler]
+
+
+#
+# Get the standard stage inputs for the compiler and build environment.
+# The values in extraEnv override the current env.
+#
+def getStdStageEnvInputs(extraEnv=None):
+  env = {}
+  for envVarName in stdStageEnvVarNames:
+    if extraEnv and envVarName in extraEnv:
+      env[envVarName] = extraEnv[envVarName]
+    elif envVarName in os.environ:
+      env[envVarName] = os.environ[envVarName]
+  return {
+    "env" : env,
+    "compiler" : getCompilerVersion(env.get("CC", "cc")),
+    }
+
+
+#
+# The stamps for the stages of one install
+#
+class StageStamps:
+
+  def __init__(self, stampDir, baseInputs=None, ignoreStamps=False,
+    skipOp=False, verbose=True \
+    ):
+    self.stampDir = stampDir
+    self.ignoreStamps = ignoreStamps
+    self.skipOp = skipOp
+    self.verbose = verbose
+    self.lastHash = getStageInputsHash(baseInputs)
+    # Set once a stage is run so that all of the later stages are run too
+    self.mustRun = ignoreStamps
+
+  def getStampFile(self, stageName):
+    return os.path.join(self.stampDir, stageName+".stamp")
+
+  # The chained hash of the last stage (used as an input of the installs
+  # that depend on this one)
+  def getLastHash(self):
+    return self.lastHash
+
+  # Run stageFunc() unless the stage is up to date.  If outputPath is given,
+  # the stage is also stale if that path does not exist.  Returns True if
+  # the stage was run.  A stage that is not chained (e.g. an optional
+  # benchmark) depends on the stages before it but the stages after it (and
+  # the installs that depend on this one) do not depend on it.
+  def runStage(self, stageName, inputs, stageFunc, outputPath="",
+    chained=True \
+    ):
+    stageHash = getStageInputsHash([self.lastHash, stageName, inputs])
+    if chained:
+      self.lastHash = stageHash
+    stampFile = self.getStampFile(stageName)
+    if not self.mustRun and self._readStampHash(stampFile) == stageHash \
+      and (not outputPath or os.path.exists(outputPath)) \
+      :
+      if self.verbose:
+        print("\nSkipping stage '"+stageName+"' (up to date with stamp '" \
+          +stampFile+"')")
+      return False
+    if chained:
+      self.mustRun = True
+    if not self.skipOp and os.path.exists(stampFile):
+      os.remove(stampFile)
+    stageFunc()
+    if not self.skipOp:
+      if not os.path.exists(self.stampDir):
+        os.makedirs(self.stampDir)
+      writeStrToFile(stampFile+".tmp", json.dumps(
+        {"hash" : stageHash, "inputs" : inputs, "time" : time.time()},
+        indent=2, sort_keys=True))
+      os.rename(stampFile+".tmp", stampFile)
+    return True
+
+  # Account for a stage that is not run this time (e.g. because it was not
+  # requested) so that the hashes of the stages after it stay the same
+  def passStage(self, stageName, inputs):
+    self.lastHash = getStageInputsHash([self.lastHash, stageName, inputs])
+
+  def _readStampHash(self, stampFile):
+    if not os.path.exists(stampFile):
+      return ""
+    try:
+      return json.loads(readStrFromFile(stampFile)).get("hash", "")
+    except ValueError:
+      return ""
@@ -0,0 +1,209 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Benchmarks of the installed VERA TPLs.
+#
+# Each benchmark is a small C program in devtools_install/ that is built with
+# the mpicc of the compiler toolset against the installed TPLs and run once
+# all of the TPLs are installed (one benchmark at a time so that the builds
+# do not disturb the timings).  It prints one result per line as:
+#
+#   <metric> <value>
+#
+# The results are written with the TPL versions, the host and any warnings
+# about the configuration of the TPLs (e.g. a debug PETSc) to
+# <dev_env_base>/gcc-<ver>/tpls/benchmarks/<benchmark>.json next to the TPL
+# installs so that the dev env variants can be compared.
+#
+
+from FindGeneralScriptSupport import *
+
+import json
+import re
+import socket
+
+
+# The benchmarks: (name, TPLs it needs, source file, number of MPI ranks to
+# run it with (0 to run it without mpiexec))
+tplBenchmarksArray = [
+  ("blas_lapack", ["blas", "lapack"], "blas_lapack_benchmark.c", 0),
+  ("hdf5", ["hdf5"], "hdf5_benchmark.c", 4),
+  ("petsc_slepc", ["petsc", "slepc"], "petsc_slepc_benchmark.c", 4),
+  ]
+
+tplBenchmarkNames = [name for (name, tpls, sourceFile, numRanks)
+  in tplBenchmarksArray]
+
+
+#
+# Get the benchmarks that can be run for the installed TPLs
+#
+def getTplBenchmarks(tplBenchmarksSelectedSet, installedTpls):
+  return [(name, tpls, sourceFile, numRanks)
+    for (name, tpls, sourceFile, numRanks) in tplBenchmarksArray
+    if name in tplBenchmarksSelectedSet and set(tpls).issubset(installedTpls)]
+
+
+#
+# Get the compile and link flags of a benchmark given the install dir of
+# each TPL
+#
+def getTplBenchmarkBuildFlags(benchmarkName, tplDirs):
+  if benchmarkName == "blas_lapack":
+    return getTplLibDirFlags(tplDirs, ["lapack", "blas"]) \
+      +" -llapack -lblas -lgfortran -lm"
+  if benchmarkName == "hdf5":
+    # NOTE: -lz and -ldl are for a static libhdf5
+    return "-I"+tplDirs["hdf5"]+"/include " \
+      +getTplLibDirFlags(tplDirs, ["hdf5"])+" -lhdf5 -lz -ldl -lm"
+  if benchmarkName == "petsc_slepc":
+    # NOTE: PETSc knows the libs of its external packages (hypre, LAPACK,
+    # ...) that it was linked against
+    petscDir = tplDirs["petsc"]
+    petscVars = readPetscVariables(petscDir)
+    return "-I"+tplDirs["slepc"]+"/include " \
+      +petscVars.get("PETSC_CC_INCLUDES", "-I"+petscDir+"/include")+" " \
+      +getTplLibDirFlags(tplDirs, ["slepc"])+" -lslepc " \
+      +petscVars.get("PETSC_WITH_EXTERNAL_LIB",
+        getTplLibDirFlags(tplDirs, ["petsc"])+" -lpetsc")
+  raise Exception("Error, unknown TPL benchmark '"+benchmarkName+"'!")
+
+
+#
+# Get the -L and -rpath flags for the lib dirs of the TPLs (BLAS and LAPACK
+# are installed in the same dir)
+#
+def getTplLibDirFlags(tplDirs, tplNames):
+  libDirs = []
+  for tplName in tplNames:
+    libDir = tplDirs[tplName]+"/lib"
+    if not libDir in libDirs:
+      libDirs.append(libDir)
+  return " ".join(["-L"+libDir+" -Wl,-rpath,"+libDir for libDir in libDirs])
+
+
+#
+# Read the make variables of an installed PETSc (empty if it is not installed
+# yet, e.g. for a no-op run)
+#
+def readPetscVariables(petscDir):
+  petscVars = {}
+  # NOTE: PETSc 3.6 moved conf/ to lib/petsc/conf/
+  for confDir in ["lib/petsc/conf", "conf"]:
+    petscVariablesFile = os.path.join(petscDir, confDir, "petscvariables")
+    if os.path.exists(petscVariablesFile):
+      for line in readStrFromFile(petscVariablesFile).splitlines():
+        (name, sep, value) = line.partition("=")
+        if sep:
+          petscVars[name.strip()] = value.strip()
+      break
+  return petscVars
+
+
+#
+# Get the warnings about the configuration of the TPLs of a benchmark given
+# its results
+#
+def getTplBenchmarkWarnings(benchmarkName, tplDirs, results):
+  warnings = []
+  if benchmarkName == "petsc_slepc":
+    if results.get("petsc_debug"):
+      warnings.append("PETSc in '"+tplDirs["petsc"]+"' was configured with" \
+        " debugging (PETSC_USE_DEBUG) which makes it several times slower!")
+    pccFlags = readPetscVariables(tplDirs["petsc"]).get("PCC_FLAGS")
+    if pccFlags is not None:
+      optLevels = re.findall(r"(?:^|\s)-O(\S*)", pccFlags)
+      if not [optLevel for optLevel in optLevels if optLevel != "0"]:
+        warnings.append("PETSc in '"+tplDirs["petsc"]+"' was compiled" \
+          " without optimization (PCC_FLAGS = '"+pccFlags+"')!")
+  return warnings
+
+
+#
+# Parse the output of a benchmark into a dict of the results
+#
+def parseTplBenchmarkOutput(outputStr):
+  results = {}
+  for line in outputStr.splitlines():
+    fields = line.split()
+    if len(fields) == 2:
+      try:
+        results[fields[0]] = float(fields[1])
+      except ValueError:
+        pass
+  if not results:
+    raise Exception("Error, no results in the TPL benchmark output:\n" \
+      +outputStr)
+  return results
+
+
+#
+# Sort key of a metric so that e.g. dgemm_gflops:64 comes before
+# dgemm_gflops:128
+#
+def getTplBenchmarkMetricSortKey(metric):
+  (name, sep, size) = metric.partition(":")
+  try:
+    return (name, float(size))
+  except ValueError:
+    return (name, 0.0)
+
+
+def getTplBenchmarkReportStr(results):
+  reportStr = "  %-34s %12s\n" % ("metric", "result")
+  for metric in sorted(results.keys(), key=getTplBenchmarkMetricSortKey):
+    reportStr += "  %-34s %12.3f\n" % (metric, results[metric])
+  return reportStr
+
+
+#
+# Write the results of a benchmark along with what they were measured for
+#
+def writeTplBenchmarkResultsFile(resultsFile, benchmarkName, toolset,
+  tplVersions, results, warnings \
+  ):
+  resultsDir = os.path.dirname(resultsFile)
+  if not os.path.exists(resultsDir):
+    os.makedirs(resultsDir)
+  writeStrToFile(resultsFile, json.dumps({"benchmark" : benchmarkName,
+    "toolset" : toolset, "tpls" : tplVersions, "host" : socket.gethostname(),
+    "time" : time.strftime("%Y-%m-%d %H:%M:%S"), "results" : results,
+    "warnings" : warnings},
+    sort_keys=True, indent=2)+"\n")
@@ -0,0 +1,543 @@
+#!/usr/bin/env python
+
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Benchmark of the overhead of the Python orchestration of the installs.
+#
+# Runs install_devtools.py and the install-<tool>.py scripts end to end with
+# all of the build commands stubbed out (see SysCmndInterceptor in
+# GeneralScriptSupport.py) so that all that is left is the cost of the
+# scripts themselves: option parsing, building the command lines, the task
+# graph, the stamps, the timeline and spawning the commands.  For each
+# scenario it reports:
+#
+#   wall_s: wall-clock time of the run
+#   cpu_s: user + system time of all of the processes of the run
+#   peak_rss_mb: peak RSS of the largest process of the run
+#   commands: number of system commands the scripts ran
+#   processes: number of processes spawned (the commands that are not
+#     stubbed out, the install driver workers and the script itself)
+#
+# The results are compared to the baseline for the same scenario, Python and
+# host in the baseline file (JSON) and the first run records the baseline.  A
+# time or RSS more than (1 + tolerance) times the baseline, or more commands
+# or processes than the baseline, is a regression.
+#
+# The scripts are run out of a copy of the repo in the scratch dir so that
+# the vera_tpls source is not touched.  The sources come from a fixture
+# mirror (see SourceMirror.py) with tiny tarballs that only have the
+# directories the scripts change into.  Only the commands that extract them
+# are really run.  The fixture is for the default tool versions.
+#
+
+#
+# Imports
+#
+
+from FindGeneralScriptSupport import *
+from BenchmarkBaselines import *
+from SourceMirror import bundleManifestFileName, getBundleSourceRelPath
+from SourceCache import getFileSha256
+
+import io
+import json
+import shutil
+import socket
+import tarfile
+
+
+#
+# Defaults
+#
+
+orchestrationBenchmarkReps_default = "3"
+
+orchestrationBenchmarkTolerance_default = "0.5"
+
+orchestrationBenchmarkBaselineFile_default = os.path.join(
+  os.path.expanduser("~"), ".cache", "mpact-dev-env",
+  "orchestration_benchmark_baseline.json")
+
+devtools_install_dir = os.path.dirname(os.path.abspath(__file__))
+
+repo_base_dir = os.path.dirname(devtools_install_dir)
+
+# The dirs of the repo that are copied into the scratch dir to run from
+orchestrationBenchmarkRepoDirs = ["common_tools", "devtools_install",
+  "python_utils"]
+
+# Options of install_devtools.py to not use the caches or run the
+# post-install benchmarks (which would only measure the stubs)
+installDevtoolsBenchmarkOptions = ["--do-all", "--parallel=2",
+  "--source-cache-dir=", "--binary-cache-dir=", "--mpi-benchmark=off",
+  "--tpl-benchmarks="]
+
+# The scenarios: (name, script, options, install subdirs).  All of them are
+# run with --install-dir=<scratch>/install and --mirror=<fixture mirror>.
+# The install subdirs are created up front since the stubbed out 'make
+# install' commands don't create them and install_devtools.py checks that
+# GCC is installed before it builds MPICH with it.
+orchestrationBenchmarkScenarios = [
+  ("install_devtools", "install_devtools.py", installDevtoolsBenchmarkOptions,
+    ["common_tools/autoconf-2.69", "common_tools/cmake-3.3.2",
+     "gcc-4.8.3/toolset/gcc-4.8.3", "gcc-4.8.3/toolset/mpich-3.1.3"]),
+  ("install-autoconf", "install-autoconf.py", ["--do-all"], []),
+  ("install-cmake", "install-cmake.py", ["--do-all"], []),
+  ("install-gcc", "install-gcc.py", ["--do-all"], []),
+  ("install-git", "install-git.py", ["--do-all"], []),
+  ("install-mpich", "install-mpich.py", ["--do-all"], []),
+  ("install-mvapich", "install-mvapich.py", ["--do-all"], []),
+  ]
+
+orchestrationBenchmarkScenarioNames = [name for (name, scriptName, options,
+  installSubDirs) in orchestrationBenchmarkScenarios]
+
+# The fixture sources in the mirror (relative to its sources/ dir).  A
+# tarball is given as the list of its members where a member is a dir
+# (ending in '/') or (name, members) for a nested tarball.  None is an empty
+# file.
+orchestrationFixtureSources = {
+  # The downloads of install_devtools.py (see getSourceDownloads())
+  "cmake-3.3.2/cmake-3.3.2.tar.gz" : ["cmake-3.3.2/"],
+  "autoconf-2.69/autoconf-2.69-base.tar.gz" : ["autoconf-2.69-base/",
+    ("autoconf-2.69-base/autoconf-2.69.tar.gz", ["autoconf-2.69/"])],
+  "gcc-4.8.3/gcc-4.8.3.tar.gz" : ["gcc-4.8.3/"],
+  "gcc-4.8.3-ucontext-patch/compiler.patch" : None,
+  "mpich-3.1.3/mpich-3.1.3-base.tar.gz" : ["mpich-3.1.3-base/",
+    ("mpich-3.1.3-base/mpich-3.1.3.tar.gz", ["mpich-3.1.3/"])],
+  "mvapich-2.3/mvapich2-2.3.tar.gz" : ["mvapich2-2.3/"],
+  "vera_tpls/vera_tpls.tar.gz" : ["vera_tpls/"],
+  # The <tool>-<version>-base repos of the install-<tool>.py scripts
+  "cmake-3.3.2/cmake-3.3.2-base.tar.gz" : ["cmake-3.3.2-base/",
+    ("cmake-3.3.2-base/cmake-3.3.2.tar.gz",
+      ["cmake-3.3.2/", "cmake-3.3.2/Source/"])],
+  "gcc-4.8.3/gcc-4.8.3-base.tar.gz" : ["gcc-4.8.3-base/",
+    "gcc-4.8.3-base/gcc-4.8.3/"],
+  "git-2.6.4/git-2.6.4-base.tar.gz" : ["git-2.6.4-base/",
+    ("git-2.6.4-base/git-2.6.4.tar.gz",
+      ["git-2.6.4/", "git-2.6.4/contrib/", "git-2.6.4/contrib/subtree/"])],
+  "mvapich2-2.3/mvapich2-2.3-base.tar.gz" : ["mvapich2-2.3-base/",
+    ("mvapich2-2.3-base/mvapich-2.3.tar.gz", ["mvapich-2.3/"])],
+  }
+
+# The commands that are really run: the extraction of the fixture sources.
+# All of the other commands are stubbed out to return 0 with no output.
+orchestrationFallThroughCmndRegexes = [
+  r".*\| *tar -x.*",
+  ]
+
+# The line install_devtools.py prints when it starts the worker processes
+# that run the install-<tool>.py drivers (see InstallDriverPool)
+installDriverPoolStartRegex = \
+  r"Starting ([0-9]+) install driver worker process\(es\)"
+
+dumpSysCmndPrefix = "DUMP SYS CMND: "
+
+
+#
+# Help message
+#
+
+usageHelp = r"""benchmark_orchestration.py [OPTIONS]
+
+Benchmark the overhead of the Python orchestration of install_devtools.py
+and the install-<tool>.py scripts with all of the build commands stubbed out.
+
+To run all of the scenarios and compare them to the stored baseline:
+
+  benchmark_orchestration.py
+
+Each scenario runs a script end to end (--do-all) out of a copy of the repo
+in --scratch-dir=<dir> with its sources coming from a fixture mirror of tiny
+tarballs.  All of the commands except for extracting the fixture sources are
+intercepted with the system command interceptor of GeneralScriptSupport.py and return 0.  So
+the run measures just the scripts: option parsing, building the command
+lines, the install task graph, the stamps and the timeline, and spawning the
+commands.
+
+Each scenario is run --reps=<num> times and the best of each metric is
+reported: the wall-clock time (wall_s), the user + system time of all of the
+processes (cpu_s), the peak RSS of the largest process (peak_rss_mb), the
+number of system commands run by the scripts (commands, i.e. the processes a
+real install would spawn) and the number of processes really spawned
+(processes).
+
+The results are compared to the baseline for the same scenario, Python
+version and host in --baseline-file=<file>.  The first run records the
+baseline (and --update-baseline records a new one).  A time or RSS more than
+(1 + --tolerance=<tol>) times the baseline or more commands or processes
+than the baseline is a regression and makes this script return 1.
+"""
+
+
+# Get and process command-line arguments
+def getCmndLineOptions(cmndLineArgs):
+
+  from optparse import OptionParser
+
+  clp = OptionParser(usage=usageHelp)
+
+  clp.add_option(
+    "--scenarios", dest="scenarios", type="string", default="all",
+    help="Scenarios to run.  Can be 'all' or any combination of" \
+      " '"+(",".join(orchestrationBenchmarkScenarioNames))+"' (separated by" \
+      " commas, no spaces).  (Default = 'all')")
+
+  clp.add_option(
+    "--reps", dest="reps", type="string",
+    default=orchestrationBenchmarkReps_default,
+    help="Number of times each scenario is run (the best of each metric is" \
+      " reported).  (Default = '"+orchestrationBenchmarkReps_default+"')")
+
+  clp.add_option(
+    "--tolerance", dest="tolerance", type="string",
+    default=orchestrationBenchmarkTolerance_default,
+    help="A time or RSS more than (1 + <tolerance>) times the baseline is a" \
+      " regression.  (Default = '"+orchestrationBenchmarkTolerance_default+"')")
+
+  clp.add_option(
+    "--baseline-file", dest="baselineFile", type="string",
+    default=orchestrationBenchmarkBaselineFile_default,
+    help="JSON file of the baselines.  (Default = '" \
+      +orchestrationBenchmarkBaselineFile_default+"')")
+
+  clp.add_option(
+    "--update-baseline", dest="updateBaseline", action="store_true",
+    default=False,
+    help="Record the results as the new baseline of the scenarios.")
+
+  clp.add_option(
+    "--results-file", dest="resultsFile", type="string", default="",
+    help="JSON file to write the results, baselines and regressions to." \
+      "  (Default = '')")
+
+  clp.add_option(
+    "--scratch-dir", dest="scratchDir", type="string",
+    default="orchestration_benchmark",
+    help="Directory the scenarios are run in (removed first).  (Default =" \
+      " 'orchestration_benchmark')")
+
+  clp.add_option(
+    "--python", dest="python", type="string", default=sys.executable,
+    help="Python to run the scripts with.  (Default = '"+sys.executable+"')")
+
+  (options, args) = clp.parse_args(args=cmndLineArgs)
+
+  if options.scenarios == "all":
+    options.scenarios = ",".join(orchestrationBenchmarkScenarioNames)
+
+  options.scratchDir = os.path.abspath(os.path.expanduser(options.scratchDir))
+
+  cmndLine = "**************************************************************************\n"
+  cmndLine +=  "Script: benchmark_orchestration.py \\\n"
+  cmndLine +=  "  --scenarios='"+options.scenarios+"' \\\n"
+  cmndLine +=  "  --reps='"+options.reps+"' \\\n"
+  cmndLine +=  "  --tolerance='"+options.tolerance+"' \\\n"
+  cmndLine +=  "  --baseline-file='"+options.baselineFile+"' \\\n"
+  if options.updateBaseline:
+    cmndLine +=  "  --update-baseline \\\n"
+  cmndLine +=  "  --results-file='"+options.resultsFile+"' \\\n"
+  cmndLine +=  "  --scratch-dir='"+options.scratchDir+"' \\\n"
+  cmndLine +=  "  --python='"+options.python+"' \\\n"
+  print(cmndLine)
+
+  return options
+
+
+#
+# Get the selected scenarios
+#
+def getOrchestrationBenchmarkScenarios(scenariosStr):
+  scenarioNames = scenariosStr.split(",")
+  for scenarioName in scenarioNames:
+    if not scenarioName in orchestrationBenchmarkScenarioNames:
+      raise Exception("Error, '"+scenarioName+"' is not one of" \
+        " '"+(",".join(orchestrationBenchmarkScenarioNames))+"'")
+  return [scenario for scenario in orchestrationBenchmarkScenarios
+    if scenario[0] in scenarioNames]
+
+
+#
+# Get the system command intercepts (see SysCmndInterceptor) of the runs
+#
+def getOrchestrationBenchmarkInterceptsStr():
+  interceptsStr = ""
+  for cmndRegex in orchestrationFallThroughCmndRegexes:
+    interceptsStr += "FT: "+cmndRegex+"\n"
+  interceptsStr += "DT: .*; 0; ''\n"
+  return interceptsStr
+
+
+#
+# Write a fixture tarball (see orchestrationFixtureSources) to fileObj
+#
+def writeFixtureTarball(fileObj, members):
+  tarball = tarfile.open(fileobj=fileObj, mode="w:gz")
+  try:
+    for member in members:
+      if isinstance(member, tuple):
+        (memberName, nestedMembers) = member
+        nestedTarball = io.BytesIO()
+        writeFixtureTarball(nestedTarball, nestedMembers)
+        tarInfo = tarfile.TarInfo(memberName)
+        tarInfo.size = len(nestedTarball.getvalue())
+        nestedTarball.seek(0)
+        tarball.addfile(tarInfo, nestedTarball)
+      else:
+        tarInfo = tarfile.TarInfo(member.rstrip("/"))
+        tarInfo.type = tarfile.DIRTYPE
+        tarInfo.mode = 0o755
+        tarball.addfile(tarInfo)
+  finally:
+    tarball.close()
+
+
+#
+# Write the fixture mirror (a directory a prefetch bundle was extracted into)
+#
+def writeFixtureMirror(mirrorDir):
+  manifest = {"sources" : [], "files" : {}, "gccPrerequisites" : {}}
+  for sourcePath in sorted(orchestrationFixtureSources.keys()):
+    (name, fileName) = sourcePath.split("/")
+    relPath = getBundleSourceRelPath(name, fileName)
+    filePath = os.path.join(mirrorDir, relPath)
+    if not os.path.exists(os.path.dirname(filePath)):
+      os.makedirs(os.path.dirname(filePath))
+    fileHandle = open(filePath, "wb")
+    try:
+      if orchestrationFixtureSources[sourcePath] is not None:
+        writeFixtureTarball(fileHandle, orchestrationFixtureSources[sourcePath])
+    finally:
+      fileHandle.close()
+    manifest["sources"].append({"name" : name, "path" : relPath})
+    manifest["files"][relPath] = {"sha256" : getFileSha256(filePath),
+      "size" : os.path.getsize(filePath)}
+  writeStrToFile(os.path.join(mirrorDir, bundleManifestFileName),
+    json.dumps(manifest, indent=2, sort_keys=True))
+
+
+#
+# Set up the scratch dir with the copy of the repo, the fixture mirror and
+# the intercepts file
+#
+def setUpOrchestrationBenchmarkDir(scratchDir):
+  if os.path.exists(scratchDir):
+    shutil.rmtree(scratchDir)
+  for repoDir in orchestrationBenchmarkRepoDirs:
+    shutil.copytree(os.path.join(repo_base_dir, repoDir),
+      os.path.join(scratchDir, "repo", repoDir),
+      ignore=shutil.ignore_patterns("*.pyc", "__pycache__"))
+  writeFixtureMirror(os.path.join(scratchDir, "mirror"))
+  writeStrToFile(os.path.join(scratchDir, "intercepts.txt"),
+    getOrchestrationBenchmarkInterceptsStr())
+
+
+#
+# Get the system commands that the scripts of a run ran out of the dumped
+# commands in its output and logs
+#
+def getDumpedSysCmnds(outputFile, logDir):
+  outputFiles = [outputFile]
+  if os.path.exists(logDir):
+    outputFiles.extend([os.path.join(logDir, fileName)
+      for fileName in sorted(os.listdir(logDir))
+      if fileName.endswith(".log")])
+  cmnds = []
+  for fileName in outputFiles:
+    for line in readStrFromFile(fileName).splitlines():
+      if line.startswith(dumpSysCmndPrefix):
+        cmnds.append(line[len(dumpSysCmndPrefix):])
+  return cmnds
+
+
+def isFallThroughCmnd(cmnd):
+  for cmndRegex in orchestrationFallThroughCmndRegexes:
+    if re.match(cmndRegex, cmnd):
+      return True
+  return False
+
+
+def getNumInstallDriverWorkers(outputFile):
+  return sum([int(match.group(1)) for match in
+    re.finditer(installDriverPoolStartRegex, readStrFromFile(outputFile))])
+
+
+#
+# Run a scenario once and return its results
+#
+def runOrchestrationBenchmarkScenario(scenario, scratchDir, rep, python):
+  (name, scriptName, options, installSubDirs) = scenario
+  runDir = os.path.join(scratchDir, "runs", name+"-"+str(rep))
+  installDir = os.path.join(runDir, "install")
+  for installSubDir in installSubDirs:
+    os.makedirs(os.path.join(installDir, installSubDir))
+  if not os.path.exists(runDir):
+    os.makedirs(runDir)
+  outputFile = os.path.join(runDir, "output.txt")
+  cmnd = python+" "+os.path.join(scratchDir, "repo", "devtools_install",
+    scriptName)+" "+" ".join(options) \
+    +" --install-dir="+installDir \
+    +" --mirror="+os.path.join(scratchDir, "mirror")
+  extraEnv = {
+    "GENERAL_SCRIPT_SUPPORT_CMND_INTERCEPTS_FILE" :
+      os.path.join(scratchDir, "intercepts.txt"),
+    "GENERAL_SCRIPT_SUPPORT_DUMD_COMMANDS" : "1",
+    # Anything written to ~/ (e.g. caches) goes in the run dir
+    "HOME" : runDir,
+    }
+  cmndStats = {}
+  startTime = time.time()
+  rtnCode = runSysCmnd(cmnd, throwExcept=False, outFile=outputFile,
+    workingDir=runDir, extraEnv=extraEnv, cmndStats=cmndStats)
+  wallTime = time.time() - startTime
+  if rtnCode != 0:
+    raise Exception("Error, the scenario '"+name+"' failed with error code " \
+      +str(rtnCode)+" (see '"+outputFile+"')!")
+  cmnds = getDumpedSysCmnds(outputFile, os.path.join(runDir, "logs"))
+  return {
+    "wall_s" : wallTime,
+    "cpu_s" : cmndStats["userTime"] + cmndStats["sysTime"],
+    # NOTE: ru_maxrss is in KB on Linux
+    "peak_rss_mb" : cmndStats["maxRssKb"] / 1024.0,
+    "commands" : len(cmnds),
+    "processes" : 1 + len([cmnd for cmnd in cmnds if isFallThroughCmnd(cmnd)])
+      + getNumInstallDriverWorkers(outputFile),
+    }
+
+
+#
+# Run a scenario --reps times and return the best of each metric
+#
+def runOrchestrationBenchmarkReps(scenario, scratchDir, numReps, python):
+  results = {}
+  for rep in range(numReps):
+    repResults = runOrchestrationBenchmarkScenario(scenario, scratchDir, rep,
+      python)
+    for metric in repResults.keys():
+      if not metric in results or repResults[metric] < results[metric]:
+        results[metric] = repResults[metric]
+  return results
+
+
+#
+# Get the key of the baseline of a scenario in the baseline file
+#
+def getOrchestrationBenchmarkKey(scenarioName, hostName=None):
+  if hostName is None:
+    hostName = socket.gethostname()
+  return scenarioName+" python-"+".".join([str(v) for v in sys.version_info[0:3]]) \
+    +" host="+hostName
+
+
+#
+# Get the rule for whether a metric regressed (see BenchmarkBaselines.py)
+#
+def getOrchestrationBenchmarkMetricRule(metric):
+  if metric in ["commands", "processes"]:
+    return isBenchmarkCountRegressed
+  return isBenchmarkIncreaseRegressed
+
+
+#
+# Main
+#
+
+def main(cmndLineArgs):
+
+  inOptions = getCmndLineOptions(cmndLineArgs)
+  scenarios = getOrchestrationBenchmarkScenarios(inOptions.scenarios)
+  tolerance = float(inOptions.tolerance)
+
+  print("\nSetting up '"+inOptions.scratchDir+"' ...")
+  setUpOrchestrationBenchmarkDir(inOptions.scratchDir)
+
+  baselines = readBenchmarkBaselines(inOptions.baselineFile)
+  allResults = {}
+  allRegressions = {}
+  for scenario in scenarios:
+    scenarioName = scenario[0]
+    print("\nRunning the scenario '"+scenarioName+"' "+inOptions.reps+ \
+      " times ...")
+    results = runOrchestrationBenchmarkReps(scenario, inOptions.scratchDir,
+      int(inOptions.reps), inOptions.python)
+    key = getOrchestrationBenchmarkKey(scenarioName)
+    baseline = baselines.get(key, {})
+    regressions = []
+    if baseline and not inOptions.updateBaseline:
+      regressions = getBenchmarkRegressions(results, baseline, tolerance,
+        getOrchestrationBenchmarkMetricRule)
+    else:
+      print("\nRecording the results as the baseline '"+key+"'")
+      baselines[key] = results
+    print("\n"+scenarioName+":\n\n"+ \
+      getBenchmarkReportStr(results, baseline))
+    for regression in regressions:
+      print("REGRESSION: "+scenarioName+": "+regression)
+    allResults[scenarioName] = {"key" : key, "results" : results,
+      "baseline" : baseline, "regressions" : regressions}
+    if regressions:
+      allRegressions[scenarioName] = regressions
+
+  writeBenchmarkBaselines(inOptions.baselineFile, baselines)
+  if inOptions.resultsFile:
+    writeStrToFile(inOptions.resultsFile, json.dumps(allResults,
+      sort_keys=True, indent=2)+"\n")
+
+  if allRegressions:
+    print("\nError, the scenarios "+str(sorted(allRegressions.keys()))+ \
+      " regressed compared to the baseline in '"+inOptions.baselineFile+"'!")
+    return 1
+  print("\nNo regressions compared to the baseline in '" \
+    +inOptions.baselineFile+"'")
+  return 0
+
+
+#
+# Script driver
+#
+if __name__ == '__main__':
+  try:
+    sys.exit(main(sys.argv[1:]))
+  except Exception as e:
+    print(e)
+    print()
+    printStackTrace()
+    sys.exit(1)
@@ -0,0 +1,149 @@
+/*
+ * DGEMM, DGESV and DSYEV throughput benchmark of the installed BLAS and
+ * LAPACK.
+ *
+ * Built against the installed TPLs and run by install_devtools.py after the
+ * TPLs are installed (see TplBenchmarks.py).  Prints one line per
+ * measurement:
+ *
+ *   <routine>_gflops:<n> <GFLOP/s>
+ *
+ * for n x n matrices.  The flop counts are the usual ones (2 n^3 for DGEMM,
+ * 2/3 n^3 + 2 n^2 for DGESV with one right-hand side and 4/3 n^3 for DSYEV
+ * with just the eigenvalues).  Each is the best of the calls made in at
+ * least minTime seconds.
+ */
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/time.h>
+
+extern void dgemm_(const char *transa, const char *transb, const int *m,
+  const int *n, const int *k, const double *alpha, const double *a,
+  const int *lda, const double *b, const int *ldb, const double *beta,
+  double *c, const int *ldc);
+
+extern void dgesv_(const int *n, const int *nrhs, double *a, const int *lda,
+  int *ipiv, double *b, const int *ldb, int *info);
+
+extern void dsyev_(const char *jobz, const char *uplo, const int *n,
+  double *a, const int *lda, double *w, double *work, const int *lwork,
+  int *info);
+
+static const int matSizes[] = { 64, 128, 256, 512 };
+static const int numMatSizes = sizeof(matSizes) / sizeof(matSizes[0]);
+static const double minTime = 0.2;
+
+static double getTime(void)
+{
+  struct timeval tv;
+  gettimeofday(&tv, NULL);
+  return tv.tv_sec + tv.tv_usec * 1.0e-6;
+}
+
+/* Diagonally dominant (and symmetric) so DGESV is well conditioned */
+static void fillMatrix(double *a, int n)
+{
+  int i, j;
+  for (j = 0; j < n; ++j) {
+    for (i = 0; i < n; ++i) {
+      a[i + j * n] = 1.0 / (1.0 + i + j);
+    }
+    a[j + j * n] += n;
+  }
+}
+
+static double benchDgemm(int n, double *a, double *b, double *c)
+{
+  const double one = 1.0, zero = 0.0;
+  double startTime, time, bestTime = 0.0, totalTime = 0.0;
+  fillMatrix(a, n);
+  fillMatrix(b, n);
+  while (totalTime < minTime || bestTime == 0.0) {
+    startTime = getTime();
+    dgemm_("N", "N", &n, &n, &n, &one, a, &n, b, &n, &zero, c, &n);
+    time = getTime() - startTime;
+    totalTime += time;
+    if (bestTime == 0.0 || time < bestTime) {
+      bestTime = time;
+    }
+  }
+  return 2.0 * n * n * n / bestTime / 1.0e9;
+}
+
+static double benchDgesv(int n, double *a, double *b, int *ipiv)
+{
+  const int nrhs = 1;
+  int info;
+  double startTime, time, bestTime = 0.0, totalTime = 0.0;
+  while (totalTime < minTime || bestTime == 0.0) {
+    fillMatrix(a, n);
+    memset(b, 0, n * sizeof(double));
+    b[0] = 1.0;
+    startTime = getTime();
+    dgesv_(&n, &nrhs, a, &n, ipiv, b, &n, &info);
+    time = getTime() - startTime;
+    if (info != 0) {
+      fprintf(stderr, "Error, dgesv failed with info = %d!\n", info);
+      exit(1);
+    }
+    totalTime += time;
+    if (bestTime == 0.0 || time < bestTime) {
+      bestTime = time;
+    }
+  }
+  return (2.0 / 3.0 * n * n * n + 2.0 * n * n) / bestTime / 1.0e9;
+}
+
+static double benchDsyev(int n, double *a, double *w)
+{
+  int info, lwork = -1;
+  double workSize, *work;
+  double startTime, time, bestTime = 0.0, totalTime = 0.0;
+  fillMatrix(a, n);
+  dsyev_("N", "U", &n, a, &n, w, &workSize, &lwork, &info);
+  lwork = (int) workSize;
+  work = (double *) malloc(lwork * sizeof(double));
+  while (totalTime < minTime || bestTime == 0.0) {
+    fillMatrix(a, n);
+    startTime = getTime();
+    dsyev_("N", "U", &n, a, &n, w, work, &lwork, &info);
+    time = getTime() - startTime;
+    if (info != 0) {
+      fprintf(stderr, "Error, dsyev failed with info = %d!\n", info);
+      exit(1);
+    }
+    totalTime += time;
+    if (bestTime == 0.0 || time < bestTime) {
+      bestTime = time;
+    }
+  }
+  free(work);
+  return 4.0 / 3.0 * n * n * n / bestTime / 1.0e9;
+}
+
+int main(void)
+{
+  int i, n, maxN = matSizes[numMatSizes - 1];
+  double *a = (double *) malloc(maxN * maxN * sizeof(double));
+  double *b = (double *) malloc(maxN * maxN * sizeof(double));
+  double *c = (double *) malloc(maxN * maxN * sizeof(double));
+  int *ipiv = (int *) malloc(maxN * sizeof(int));
+  if (!a || !b || !c || !ipiv) {
+    fprintf(stderr, "Error, could not allocate the matrices!\n");
+    return 1;
+  }
+  for (i = 0; i < numMatSizes; ++i) {
+    n = matSizes[i];
+    printf("dgemm_gflops:%d %.3f\n", n, benchDgemm(n, a, b, c));
+    printf("dgesv_gflops:%d %.3f\n", n, benchDgesv(n, a, b, ipiv));
+    printf("dsyev_gflops:%d %.3f\n", n, benchDsyev(n, a, c));
+    fflush(stdout);
+  }
+  free(a);
+  free(b);
+  free(c);
+  free(ipiv);
+  return 0;
+}
@@ -0,0 +1,297 @@
+/*
+ * Parallel write/read throughput benchmark of the installed HDF5.
+ *
+ * Built with mpicc against the installed HDF5 and run by install_devtools.py
+ * on several MPI ranks after the TPLs are installed (see TplBenchmarks.py).
+ * Each rank writes (and then reads back) its own block of rows of a chunked
+ * 2D dataset of doubles in a file in the current dir, with independent and
+ * with collective MPI-IO transfers.  Rank 0 prints one line per
+ * measurement:
+ *
+ *   <write|read>_mbps:<independent|collective> <MB/s>
+ *
+ * where the MB/s is the data of all of the ranks over the time of the
+ * slowest rank (including the open and close of the file, and for the
+ * write an fsync() of the file so that the data is on the disk).  Each is
+ * the best of a few repetitions.  The read will mostly come out of the page
+ * cache of the host.
+ *
+ * If HDF5 was built without parallel support, each rank writes and reads
+ * its own file instead and only the independent results are printed.
+ */
+
+#include <hdf5.h>
+#include <mpi.h>
+#include <fcntl.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <unistd.h>
+
+#define NUM_COLS 1024
+#define NUM_ROWS_PER_RANK 4096
+#define NUM_ROWS_PER_CHUNK 256
+
+static const int numReps = 3;
+
+static void checkStatus(herr_t status, const char *what)
+{
+  if (status < 0) {
+    fprintf(stderr, "Error, %s failed!\n", what);
+    MPI_Abort(MPI_COMM_WORLD, 1);
+  }
+}
+
+static void checkId(hid_t id, const char *what)
+{
+  checkStatus(id < 0 ? -1 : 0, what);
+}
+
+static void getFileName(char *fileName, int rank)
+{
+#ifdef H5_HAVE_PARALLEL
+  (void) rank;
+  sprintf(fileName, "hdf5_benchmark.h5");
+#else
+  sprintf(fileName, "hdf5_benchmark.%d.h5", rank);
+#endif
+}
+
+static hid_t getFileAccessPlist(void)
+{
+  hid_t fapl = H5Pcreate(H5P_FILE_ACCESS);
+  checkId(fapl, "H5Pcreate");
+#ifdef H5_HAVE_PARALLEL
+  checkStatus(H5Pset_fapl_mpio(fapl, MPI_COMM_WORLD, MPI_INFO_NULL),
+    "H5Pset_fapl_mpio");
+#endif
+  return fapl;
+}
+
+static hid_t getTransferPlist(int collective)
+{
+  hid_t dxpl = H5Pcreate(H5P_DATASET_XFER);
+  checkId(dxpl, "H5Pcreate");
+#ifdef H5_HAVE_PARALLEL
+  checkStatus(H5Pset_dxpl_mpio(dxpl,
+    collective ? H5FD_MPIO_COLLECTIVE : H5FD_MPIO_INDEPENDENT),
+    "H5Pset_dxpl_mpio");
+#else
+  (void) collective;
+#endif
+  return dxpl;
+}
+
+/* Select the block of rows of this rank in the file dataspace */
+static hid_t getFileSpace(hid_t dset, int rank)
+{
+  hsize_t start[2], count[2];
+  hid_t fileSpace = H5Dget_space(dset);
+  checkId(fileSpace, "H5Dget_space");
+#ifdef H5_HAVE_PARALLEL
+  start[0] = (hsize_t) rank * NUM_ROWS_PER_RANK;
+#else
+  (void) rank;
+  start[0] = 0;
+#endif
+  start[1] = 0;
+  count[0] = NUM_ROWS_PER_RANK;
+  count[1] = NUM_COLS;
+  checkStatus(H5Sselect_hyperslab(fileSpace, H5S_SELECT_SET, start, NULL,
+    count, NULL), "H5Sselect_hyperslab");
+  return fileSpace;
+}
+
+/* Flush the data written to the (closed) file to the disk */
+static void syncFile(const char *fileName)
+{
+  int fd = open(fileName, O_RDONLY);
+  if (fd < 0 || fsync(fd) != 0) {
+    fprintf(stderr, "Error, could not fsync '%s'!\n", fileName);
+    MPI_Abort(MPI_COMM_WORLD, 1);
+  }
+  close(fd);
+}
+
+/* Get the time of the slowest rank from the start time of each rank */
+static double getMaxTime(double startTime)
+{
+  double time = MPI_Wtime() - startTime, maxTime = time;
+  MPI_Allreduce(&time, &maxTime, 1, MPI_DOUBLE, MPI_MAX, MPI_COMM_WORLD);
+  return maxTime;
+}
+
+static double writeFile(const double *data, int rank, int numRanks,
+  int collective)
+{
+  char fileName[64];
+  hsize_t dims[2], chunkDims[2], memDims[2];
+  hid_t fapl, dcpl, dxpl, file, fileSpace, memSpace, dset;
+  double startTime;
+
+  getFileName(fileName, rank);
+#ifdef H5_HAVE_PARALLEL
+  dims[0] = (hsize_t) numRanks * NUM_ROWS_PER_RANK;
+#else
+  (void) numRanks;
+  dims[0] = NUM_ROWS_PER_RANK;
+#endif
+  dims[1] = NUM_COLS;
+  chunkDims[0] = NUM_ROWS_PER_CHUNK;
+  chunkDims[1] = NUM_COLS;
+  memDims[0] = NUM_ROWS_PER_RANK;
+  memDims[1] = NUM_COLS;
+
+  MPI_Barrier(MPI_COMM_WORLD);
+  startTime = MPI_Wtime();
+  fapl = getFileAccessPlist();
+  file = H5Fcreate(fileName, H5F_ACC_TRUNC, H5P_DEFAULT, fapl);
+  checkId(file, "H5Fcreate");
+  dcpl = H5Pcreate(H5P_DATASET_CREATE);
+  checkId(dcpl, "H5Pcreate");
+  checkStatus(H5Pset_chunk(dcpl, 2, chunkDims), "H5Pset_chunk");
+  fileSpace = H5Screate_simple(2, dims, NULL);
+  checkId(fileSpace, "H5Screate_simple");
+  dset = H5Dcreate2(file, "data", H5T_NATIVE_DOUBLE, fileSpace, H5P_DEFAULT,
+    dcpl, H5P_DEFAULT);
+  checkId(dset, "H5Dcreate2");
+  H5Sclose(fileSpace);
+  fileSpace = getFileSpace(dset, rank);
+  memSpace = H5Screate_simple(2, memDims, NULL);
+  checkId(memSpace, "H5Screate_simple");
+  dxpl = getTransferPlist(collective);
+  checkStatus(H5Dwrite(dset, H5T_NATIVE_DOUBLE, memSpace, fileSpace, dxpl,
+    data), "H5Dwrite");
+  H5Pclose(dxpl);
+  H5Sclose(memSpace);
+  H5Sclose(fileSpace);
+  H5Dclose(dset);
+  H5Pclose(dcpl);
+  checkStatus(H5Fclose(file), "H5Fclose");
+  H5Pclose(fapl);
+#ifdef H5_HAVE_PARALLEL
+  if (rank == 0) {
+    syncFile(fileName);
+  }
+#else
+  syncFile(fileName);
+#endif
+  return getMaxTime(startTime);
+}
+
+static double readFile(double *data, int rank, int collective)
+{
+  char fileName[64];
+  hsize_t memDims[2];
+  hid_t fapl, dxpl, file, fileSpace, memSpace, dset;
+  double startTime;
+
+  getFileName(fileName, rank);
+  memDims[0] = NUM_ROWS_PER_RANK;
+  memDims[1] = NUM_COLS;
+
+  MPI_Barrier(MPI_COMM_WORLD);
+  startTime = MPI_Wtime();
+  fapl = getFileAccessPlist();
+  file = H5Fopen(fileName, H5F_ACC_RDONLY, fapl);
+  checkId(file, "H5Fopen");
+  dset = H5Dopen2(file, "data", H5P_DEFAULT);
+  checkId(dset, "H5Dopen2");
+  fileSpace = getFileSpace(dset, rank);
+  memSpace = H5Screate_simple(2, memDims, NULL);
+  checkId(memSpace, "H5Screate_simple");
+  dxpl = getTransferPlist(collective);
+  checkStatus(H5Dread(dset, H5T_NATIVE_DOUBLE, memSpace, fileSpace, dxpl,
+    data), "H5Dread");
+  H5Pclose(dxpl);
+  H5Sclose(memSpace);
+  H5Sclose(fileSpace);
+  H5Dclose(dset);
+  checkStatus(H5Fclose(file), "H5Fclose");
+  H5Pclose(fapl);
+  return getMaxTime(startTime);
+}
+
+static double getValue(int rank, int i)
+{
+  return rank + 1.0e-6 * i;
+}
+
+static void checkData(const double *data, int rank)
+{
+  int i;
+  for (i = 0; i < NUM_ROWS_PER_RANK * NUM_COLS; ++i) {
+    if (data[i] != getValue(rank, i)) {
+      fprintf(stderr, "Error, rank %d read back the wrong data!\n", rank);
+      MPI_Abort(MPI_COMM_WORLD, 1);
+    }
+  }
+}
+
+int main(int argc, char **argv)
+{
+  static const char *modeNames[] = { "independent", "collective" };
+  int rank, numRanks, i, mode, numModes, rep;
+  char fileName[64];
+  double *data, totalMb, writeTime, readTime, time;
+
+  MPI_Init(&argc, &argv);
+  MPI_Comm_rank(MPI_COMM_WORLD, &rank);
+  MPI_Comm_size(MPI_COMM_WORLD, &numRanks);
+
+  data = (double *) malloc(
+    (size_t) NUM_ROWS_PER_RANK * NUM_COLS * sizeof(double));
+  if (!data) {
+    fprintf(stderr, "Error, could not allocate the HDF5 benchmark data!\n");
+    MPI_Abort(MPI_COMM_WORLD, 1);
+  }
+  totalMb = (double) numRanks * NUM_ROWS_PER_RANK * NUM_COLS *
+    sizeof(double) / 1.0e6;
+
+#ifdef H5_HAVE_PARALLEL
+  numModes = 2;
+#else
+  numModes = 1;
+  if (rank == 0) {
+    fprintf(stderr, "NOTE: HDF5 was built without parallel support, so"
+      " each rank writes its own file and there are no collective"
+      " results!\n");
+  }
+#endif
+
+  for (mode = 0; mode < numModes; ++mode) {
+    writeTime = readTime = 0.0;
+    for (rep = 0; rep < numReps; ++rep) {
+      for (i = 0; i < NUM_ROWS_PER_RANK * NUM_COLS; ++i) {
+        data[i] = getValue(rank, i);
+      }
+      time = writeFile(data, rank, numRanks, mode);
+      writeTime = (rep == 0 || time < writeTime) ? time : writeTime;
+      for (i = 0; i < NUM_ROWS_PER_RANK * NUM_COLS; ++i) {
+        data[i] = 0.0;
+      }
+      time = readFile(data, rank, mode);
+      readTime = (rep == 0 || time < readTime) ? time : readTime;
+      checkData(data, rank);
+    }
+    if (rank == 0) {
+      printf("write_mbps:%s %.3f\n", modeNames[mode], totalMb / writeTime);
+      printf("read_mbps:%s %.3f\n", modeNames[mode], totalMb / readTime);
+      fflush(stdout);
+    }
+  }
+
+  /* Don't leave the (large) data files behind in the scratch dir */
+#ifdef H5_HAVE_PARALLEL
+  if (rank == 0) {
+    getFileName(fileName, rank);
+    remove(fileName);
+  }
+#else
+  getFileName(fileName, rank);
+  remove(fileName);
+#endif
+
+  free(data);
+  MPI_Finalize();
+  return 0;
+}
@@ -132,6 +132,10 @@ command --download-cmnd=<download-cmnd> is:
     self.autoconfBuildBaseDir = self.autoconfBaseDir+"/autoconf-build"
     self.scriptBaseDir = getScriptBaseDir()
 
+  # The build dir (for --build-in-memory)
+  def getBuildDir(self):
+    return self.autoconfBuildBaseDir
+
   #
   # Called after setup()
   #
@@ -143,12 +147,12 @@ command --download-cmnd=<download-cmnd> is:
   def doUntar(self):
     # Find the full name of the source tarball
     echoChDir(self.autoconfBaseDir)
-    echoRunSysCmnd("tar -xzf "+self.autoconfTarball)
+    extractTarball(self.autoconfTarball)
 
   def doConfigure(self):
     createDir(self.autoconfBuildBaseDir, True, True)
     echoRunSysCmnd(
-      "../"+self.autoconfSrcDir+"/configure "+\
+      self.autoconfBaseDir+"/"+self.autoconfSrcDir+"/configure "+\
       " "+self.inOptions.extraConfigureOptions+\
       " --prefix="+self.inOptions.installDir,
       extraEnv={"CFLAGS":"-O3"},
@@ -157,12 +161,13 @@ command --download-cmnd=<download-cmnd> is:
   def doBuild(self):
     echoChDir(self.autoconfBuildBaseDir)
     echoRunSysCmnd("make " + getParallelOpt(self.inOptions, "-j") \
-      + self.inOptions.makeOptions)
+      + self.inOptions.makeOptions, extraEnv=self.inOptions.makeEnv)
 
   def doInstall(self):
     echoChDir(self.autoconfBuildBaseDir)
     echoRunSysCmnd("make " + getParallelOpt(self.inOptions, "-j") \
-      + self.inOptions.makeOptions + " install")
+      + self.inOptions.makeOptions + " install",
+      extraEnv=self.inOptions.makeEnv)
 
   def getFinalInstructions(self):
     return """
@@ -175,8 +180,11 @@ to your path and that should be it!
 
 
 #
-# Executable statements
+# Script driver
 #
 
-autoconfInstaller = InstallProgramDriver(AutoconfInstall())
-autoconfInstaller.runDriver()
+def getInstallObj():
+  return AutoconfInstall()
+
+if __name__ == '__main__':
+  sys.exit(InstallProgramDriver(getInstallObj()).runDriver())
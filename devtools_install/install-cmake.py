@@ -150,6 +150,10 @@ command --download-cmnd=<download-cmnd> is:
     self.cmakeBuildBaseDir = self.cmakeBaseDir+"/cmake-build"
     self.scriptBaseDir = getScriptBaseDir()
 
+  # The build dir (for --build-in-memory)
+  def getBuildDir(self):
+    return self.cmakeBuildBaseDir
+
   #
   # Called after setup()
   #
@@ -161,7 +165,7 @@ command --download-cmnd=<download-cmnd> is:
   def doUntar(self):
     # Find the full name of the source tarball
     echoChDir(self.cmakeBaseDir)
-    echoRunSysCmnd("tar -xzf "+self.cmakeTarball)
+    extractTarball(self.cmakeTarball)
     if self.inOptions.version == "2.8.11" or self.inOptions.version == "3.1.1":
       echoChDir(self.cmakeSrcDir+"/Source/CPack")
       echoRunSysCmnd("patch -i ../../../fix_cpack_symlink.patch")
@@ -172,7 +176,7 @@ command --download-cmnd=<download-cmnd> is:
   def doConfigure(self):
     createDir(self.cmakeBuildBaseDir, True, True)
     echoRunSysCmnd(
-      "../"+self.cmakeSrcDir+"/configure "+\
+      self.cmakeBaseDir+"/"+self.cmakeSrcDir+"/configure "+\
       " "+self.inOptions.extraConfigureOptions+\
       getParallelOpt(self.inOptions, "--parallel=")+\
       " --prefix="+self.inOptions.installDir,
@@ -181,11 +185,13 @@ command --download-cmnd=<download-cmnd> is:
 
   def doBuild(self):
     echoChDir(self.cmakeBuildBaseDir)
-    echoRunSysCmnd("make "+getParallelOpt(self.inOptions, "-j")+self.inOptions.makeOptions)
+    echoRunSysCmnd("make "+getParallelOpt(self.inOptions, "-j")+self.inOptions.makeOptions,
+      extraEnv=self.inOptions.makeEnv)
 
   def doInstall(self):
     echoChDir(self.cmakeBuildBaseDir)
-    echoRunSysCmnd("make "+self.inOptions.makeOptions+" install")
+    echoRunSysCmnd("make "+self.inOptions.makeOptions+" install",
+      extraEnv=self.inOptions.makeEnv)
 
   def getFinalInstructions(self):
     return """
@@ -198,8 +204,11 @@ to your path and that should be it!
 
 
 #
-# Executable statements
+# Script driver
 #
 
-cmakeInstaller = InstallProgramDriver(CMakeInstall())
-cmakeInstaller.runDriver()
+def getInstallObj():
+  return CMakeInstall()
+
+if __name__ == '__main__':
+  sys.exit(InstallProgramDriver(getInstallObj()).runDriver())
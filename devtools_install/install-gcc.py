@@ -49,13 +49,6 @@ gccDefaultVersion = "4.8.3"
 gccSupportedVersions = ["4.8.3"]
 
 
-#allows for any user-specified version of gcc to be installed --EHC
-for arg in sys.argv[1:]:
-  if "version" in arg and "gcc" in arg:
-    gccSupportedVersions.append(arg.split("=")[1])
-    break
-    
-
 #
 # Script code
 #
@@ -86,6 +79,10 @@ class GccInstall:
   def getProductSupportedVersions(self):
     return gccSupportedVersions
 
+  # Any version given with --gcc-version=<version> can be installed
+  def allowUnlistedVersions(self):
+    return True
+
   #
   # Called after knowing the product version but before parsing the
   # command-line.
@@ -136,6 +133,10 @@ command --download-cmnd=<download-cmnd> is:
     self.gccBuildBaseDir = self.gccBaseDir+"/gcc-build"
     self.scriptBaseDir = getScriptBaseDir()
 
+  # The build dir (for --build-in-memory)
+  def getBuildDir(self):
+    return self.gccBuildBaseDir
+
   #
   # Called after setup()
   #
@@ -145,12 +146,12 @@ command --download-cmnd=<download-cmnd> is:
     echoRunSysCmnd(self.inOptions.downloadCmnd)
 
   def doUntar(self):
-    print "Nothing to untar!"
+    print("Nothing to untar!")
 
   def doConfigure(self):
     createDir(self.gccBuildBaseDir)
     echoRunSysCmnd(
-      "../"+self.gccSrcDir+"/configure --disable-multilib --enable-languages='c,c++,fortran'"+\
+      self.gccBaseDir+"/"+self.gccSrcDir+"/configure --disable-multilib --enable-languages='c,c++,fortran'"+\
       " "+self.inOptions.extraConfigureOptions+\
       " --prefix="+self.inOptions.installDir,
       workingDir=self.gccBuildBaseDir,
@@ -160,12 +161,13 @@ command --download-cmnd=<download-cmnd> is:
   def doBuild(self):
     echoChDir(self.gccBuildBaseDir)
     echoRunSysCmnd("make " + getParallelOpt(self.inOptions, "-j") \
-      + self.inOptions.makeOptions)
+      + self.inOptions.makeOptions, extraEnv=self.inOptions.makeEnv)
 
   def doInstall(self):
     echoChDir(self.gccBuildBaseDir)
     echoRunSysCmnd("make " + getParallelOpt(self.inOptions, "-j") \
-      + self.inOptions.makeOptions + " install")
+      + self.inOptions.makeOptions + " install",
+      extraEnv=self.inOptions.makeEnv)
 
   def getFinalInstructions(self):
     return """
@@ -185,8 +187,11 @@ LD_LIBRARY_PATH.
 
 
 #
-# Executable statements
+# Script driver
 #
 
-gccInstaller = InstallProgramDriver(GccInstall())
-gccInstaller.runDriver()
+def getInstallObj():
+  return GccInstall()
+
+if __name__ == '__main__':
+  sys.exit(InstallProgramDriver(getInstallObj()).runDriver())
@@ -168,7 +168,7 @@ command --download-cmnd=<download-cmnd> is:
   def doUntar(self):
     # Find the full name of the source tarball
     echoChDir(self.gitBaseDir)
-    echoRunSysCmnd("tar -xzf "+self.gitTarball)
+    extractTarball(self.gitTarball)
 
   def doConfigure(self):
     echoChDir(self.gitSrcBuildDir)
@@ -183,30 +183,38 @@ command --download-cmnd=<download-cmnd> is:
   def doBuild(self):
     echoChDir(self.gitSrcBuildDir)
     echoRunSysCmnd("make "+getParallelOpt(self.inOptions, "-j")+\
-      self.inOptions.makeOptions+" all")
+      self.inOptions.makeOptions+" all", extraEnv=self.inOptions.makeEnv)
     if self.inOptions.withDoc:
       echoRunSysCmnd("make "+getParallelOpt(self.inOptions, "-j")+\
-        self.inOptions.makeOptions+" doc")
+        self.inOptions.makeOptions+" doc",
+        extraEnv=self.inOptions.makeEnv)
     if self.inOptions.withInfo:
       echoRunSysCmnd("make "+getParallelOpt(self.inOptions, "-j")+\
-        self.inOptions.makeOptions+" info")
+        self.inOptions.makeOptions+" info",
+        extraEnv=self.inOptions.makeEnv)
     # Build git-subtree to get ready to install
     echoChDir(self.gitSubtreeSrcBuildDir)
 
 
   def doInstall(self):
     echoChDir(self.gitSrcBuildDir)
-    echoRunSysCmnd("make "+self.inOptions.makeOptions+" install")
+    echoRunSysCmnd("make "+self.inOptions.makeOptions+" install",
+      extraEnv=self.inOptions.makeEnv)
     if self.inOptions.withDoc:
-      echoRunSysCmnd("make "+self.inOptions.makeOptions+" install-doc")
-      echoRunSysCmnd("make "+self.inOptions.makeOptions+" install-html")
+      echoRunSysCmnd("make "+self.inOptions.makeOptions+" install-doc",
+        extraEnv=self.inOptions.makeEnv)
+      echoRunSysCmnd("make "+self.inOptions.makeOptions+" install-html",
+        extraEnv=self.inOptions.makeEnv)
     if self.inOptions.withInfo:
-      echoRunSysCmnd("make "+self.inOptions.makeOptions+" install-info")
+      echoRunSysCmnd("make "+self.inOptions.makeOptions+" install-info",
+        extraEnv=self.inOptions.makeEnv)
     # Install git-subtree and documentation
     echoChDir(self.gitSubtreeSrcBuildDir)
-    echoRunSysCmnd("make "+self.inOptions.makeOptions+" install")
+    echoRunSysCmnd("make "+self.inOptions.makeOptions+" install",
+      extraEnv=self.inOptions.makeEnv)
     if self.inOptions.withDoc:
-      echoRunSysCmnd("make "+self.inOptions.makeOptions+" install-doc")
+      echoRunSysCmnd("make "+self.inOptions.makeOptions+" install-doc",
+        extraEnv=self.inOptions.makeEnv)
 
   def getFinalInstructions(self):
     return """
@@ -218,8 +226,11 @@ to your path and that should be it!
 """
 
 #
-# Executable statements
+# Script driver
 #
 
-gitInstaller = InstallProgramDriver(GitInstall())
-gitInstaller.runDriver()
+def getInstallObj():
+  return GitInstall()
+
+if __name__ == '__main__':
+  sys.exit(InstallProgramDriver(getInstallObj()).runDriver())
@@ -50,11 +50,6 @@ mpichTarballVersions = {
   "3.1.3" : "3.1.3",
   "3.2.1" : "3.2.1"
   }
-for arg in sys.argv[1:]:
-  if "version" in arg and "mpich" in arg:
-    mpichSupportedVersions.append(arg.split("=")[1])
-    mpichTarballVersions[arg.split("=")[1]] = arg.split("=")[1]
-    break
 
 #
 # Script code
@@ -86,6 +81,10 @@ class MpichInstall:
   def getProductSupportedVersions(self):
     return mpichSupportedVersions
 
+  # Any version given with --mpich-version=<version> can be installed
+  def allowUnlistedVersions(self):
+    return True
+
   #
   # Called after knowing the product version but before parsing the
   # command-line.
@@ -132,12 +131,17 @@ command --download-cmnd=<download-cmnd> is:
     self.inOptions = inOptions
     self.baseDir = os.getcwd()
     self.mpichBaseDir = self.baseDir+"/"+self.getBaseDirName(self.inOptions.version)
-    mpichVersionFull = mpichTarballVersions[self.inOptions.version]
+    mpichVersionFull = mpichTarballVersions.get(self.inOptions.version,
+      self.inOptions.version)
     self.mpichTarball = "mpich-"+mpichVersionFull+".tar.gz"
     self.mpichSrcDir = "mpich-"+mpichVersionFull
     self.mpichBuildBaseDir = self.mpichBaseDir+"/mpich-build"
     self.scriptBaseDir = getScriptBaseDir()
 
+  # The build dir (for --build-in-memory)
+  def getBuildDir(self):
+    return self.mpichBuildBaseDir
+
   #
   # Called after setup()
   #
@@ -149,7 +153,7 @@ command --download-cmnd=<download-cmnd> is:
   def doUntar(self):
     # Find the full name of the source tarball
     echoChDir(self.mpichBaseDir)
-    echoRunSysCmnd("tar -xzf "+self.mpichTarball)
+    extractTarball(self.mpichTarball)
     # NOTE: I found that you have to untar the tarball and can't store the
     # open source in the git repo.  Otherwise the timestaps are messed up and
     # it 'make' tries to recreate some generated files.
@@ -157,7 +161,7 @@ command --download-cmnd=<download-cmnd> is:
   def doConfigure(self):
     createDir(self.mpichBuildBaseDir, True, True)
     echoRunSysCmnd(
-      "../"+self.mpichSrcDir+"/configure "+\
+      self.mpichBaseDir+"/"+self.mpichSrcDir+"/configure "+\
       " "+self.inOptions.extraConfigureOptions+\
       " --prefix="+self.inOptions.installDir,
       extraEnv={"CFLAGS":"-O3", "CXXFLAGS":"-O3", "FFLAGS":"-O3"},
@@ -166,12 +170,13 @@ command --download-cmnd=<download-cmnd> is:
   def doBuild(self):
     echoChDir(self.mpichBuildBaseDir)
     echoRunSysCmnd("make " + getParallelOpt(self.inOptions, "-j") \
-      + self.inOptions.makeOptions)
+      + self.inOptions.makeOptions, extraEnv=self.inOptions.makeEnv)
 
   def doInstall(self):
     echoChDir(self.mpichBuildBaseDir)
     echoRunSysCmnd("make " + getParallelOpt(self.inOptions, "-j") \
-      + self.inOptions.makeOptions + " install")
+      + self.inOptions.makeOptions + " install",
+      extraEnv=self.inOptions.makeEnv)
 
   def getFinalInstructions(self):
     return """
@@ -191,8 +196,11 @@ LD_LIBRARY_PATH.
 
 
 #
-# Executable statements
+# Script driver
 #
 
-mpichInstaller = InstallProgramDriver(MpichInstall())
-mpichInstaller.runDriver()
+def getInstallObj():
+  return MpichInstall()
+
+if __name__ == '__main__':
+  sys.exit(InstallProgramDriver(getInstallObj()).runDriver())
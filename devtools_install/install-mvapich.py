@@ -49,11 +49,6 @@ mvapichSupportedVersions = ["2.3", "2.3"]
 mvapichTarballVersions = {
   "2.3" : "2.3"
   }
-for arg in sys.argv[1:]:
-  if "version" in arg and "mvapich" in arg:
-    mvapichSupportedVersions.append(arg.split("=")[1])
-    mvapichTarballVersions[arg.split("=")[1]] = arg.split("=")[1]
-    break
 
 #
 # Script code
@@ -85,6 +80,10 @@ class MvapichInstall:
   def getProductSupportedVersions(self):
     return mvapichSupportedVersions
 
+  # Any version given with --mvapich2-version=<version> can be installed
+  def allowUnlistedVersions(self):
+    return True
+
   #
   # Called after knowing the product version but before parsing the
   # command-line.
@@ -131,12 +130,17 @@ command --download-cmnd=<download-cmnd> is:
     self.inOptions = inOptions
     self.baseDir = os.getcwd()
     self.mvapichBaseDir = self.baseDir+"/"+self.getBaseDirName(self.inOptions.version)
-    mvapichVersionFull = mvapichTarballVersions[self.inOptions.version]
+    mvapichVersionFull = mvapichTarballVersions.get(self.inOptions.version,
+      self.inOptions.version)
     self.mvapichTarball = "mvapich-"+mvapichVersionFull+".tar.gz"
     self.mvapichSrcDir = "mvapich-"+mvapichVersionFull
     self.mvapichBuildBaseDir = self.mvapichBaseDir+"/mvapich-build"
     self.scriptBaseDir = getScriptBaseDir()
 
+  # The build dir (for --build-in-memory)
+  def getBuildDir(self):
+    return self.mvapichBuildBaseDir
+
   #
   # Called after setup()
   #
@@ -148,7 +152,7 @@ command --download-cmnd=<download-cmnd> is:
   def doUntar(self):
     # Find the full name of the source tarball
     echoChDir(self.mvapichBaseDir)
-    echoRunSysCmnd("tar -xzf "+self.mvapichTarball)
+    extractTarball(self.mvapichTarball)
     # NOTE: I found that you have to untar the tarball and can't store the
     # open source in the git repo.  Otherwise the timestaps are messed up and
     # it 'make' tries to recreate some generated files.
@@ -156,7 +160,7 @@ command --download-cmnd=<download-cmnd> is:
   def doConfigure(self):
     createDir(self.mvapichBuildBaseDir, True, True)
     echoRunSysCmnd(
-      "../"+self.mvapichSrcDir+"/configure "+\
+      self.mvapichBaseDir+"/"+self.mvapichSrcDir+"/configure "+\
       " "+self.inOptions.extraConfigureOptions+\
       " --prefix="+self.inOptions.installDir,
       extraEnv={"CFLAGS":"-O3", "CXXFLAGS":"-O3", "FFLAGS":"-O3"},
@@ -165,12 +169,13 @@ command --download-cmnd=<download-cmnd> is:
   def doBuild(self):
     echoChDir(self.mvapichBuildBaseDir)
     echoRunSysCmnd("make " + getParallelOpt(self.inOptions, "-j") \
-      + self.inOptions.makeOptions)
+      + self.inOptions.makeOptions, extraEnv=self.inOptions.makeEnv)
 
   def doInstall(self):
     echoChDir(self.mvapichBuildBaseDir)
     echoRunSysCmnd("make " + getParallelOpt(self.inOptions, "-j") \
-      + self.inOptions.makeOptions + " install")
+      + self.inOptions.makeOptions + " install",
+      extraEnv=self.inOptions.makeEnv)
 
   def getFinalInstructions(self):
     return """
@@ -190,8 +195,11 @@ LD_LIBRARY_PATH.
 
 
 #
-# Executable statements
+# Script driver
 #
 
-mvapichInstaller = InstallProgramDriver(MvapichInstall())
-mvapichInstaller.runDriver()
+def getInstallObj():
+  return MvapichInstall()
+
+if __name__ == '__main__':
+  sys.exit(InstallProgramDriver(getInstallObj()).runDriver())
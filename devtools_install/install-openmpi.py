@@ -40,12 +40,12 @@
 # @HEADER
 
 #
-# Version info that will change with new versions
+# Defaults
 #
 
-openmpiVersion = "1.4.3"
-openmpiTarball = "openmpi-"+openmpiVersion+".tar.gz"
-openmpiSrcDir = "openmpi-"+openmpiVersion
+openmpiBaseName = "openmpi"
+openmpiDefaultVersion = "1.4.3"
+openmpiSupportedVersions = ["1.4.3"]
 
 
 #
@@ -62,30 +62,54 @@ class OpenMpiInstall:
   def __init__(self):
     self.dummy = None
 
-  def getProductName(self):
-    return "openmpi-"+openmpiVersion
+  #
+  # Called before even knowing the product version
+  #
 
   def getScriptName(self):
     return "install-openmpi.py"
 
-  def getExtraHelpStr(self):
+  def getProductBaseName(self):
+    return openmpiBaseName
+
+  def getProductDefaultVersion(self):
+    return openmpiDefaultVersion
+
+  def getProductSupportedVersions(self):
+    return openmpiSupportedVersions
+
+  #
+  # Called after knowing the product version but before parsing the
+  # command-line.
+  #
+
+  def getProductName(self, version):
+    return openmpiBaseName+"-"+version
+
+  def getBaseDirName(self, version):
+    return "openmpi.BASE"
+
+  def getExtraHelpStr(self, version):
     return """
-This script builds openmpi-"""+openmpiVersion+""" from source compiled with
+This script builds """+self.getProductName(version)+""" from source compiled with
 the configured GCC compiler (see options --with-gcc --with-lib-dir).
-"""
 
-  def getBaseDirName(self):
-    return "openmpi.BASE"
+NOTE: The assumed directory structure of the download source provided by the
+command --download-cmnd=<download-cmnd> is:
+
+   openmpi.BASE/
+     openmpi-<version>.tar.gz
+"""
 
-  def injectExtraCmndLineOptions(self, clp):
+  def injectExtraCmndLineOptions(self, clp, version):
     clp.add_option(
-      "--checkout-cmnd", dest="checkoutCmnd", type="string",
+      "--download-cmnd", dest="downloadCmnd", type="string",
       default="git clone software.sandia.gov:/space/git/TrilinosToolset/openmpi.BASE "+\
-      self.getBaseDirName(),
-      help="Command used to check out "+self.getProductName()+" and dependent source tarball(s)." )
+      self.getBaseDirName(version),
+      help="Command used to download "+self.getProductName(version)+" and dependent source tarball(s)." )
     clp.add_option(
       "--extra-configure-options", dest="extraConfigureOptions", type="string", default="",
-      help="Extra options to add to the 'configure' cmmand for "+self.getProductName()+"." \
+      help="Extra options to add to the 'configure' cmmand for "+self.getProductName(version)+"." \
       +"  Note: This does not override the hard-coded configure options." )
     clp.add_option(
       "--with-path", dest="withPath", type="string", default="",
@@ -96,46 +120,62 @@ the configured GCC compiler (see options --with-gcc --with-lib-dir).
       
   def echoExtraCmndLineOptions(self, inOptions):
     cmndLine = ""
-    cmndLine += "  --checkout-cmnd='"+inOptions.checkoutCmnd+"' \\\n"
+    cmndLine += "  --download-cmnd='"+inOptions.downloadCmnd+"' \\\n"
     if inOptions.extraConfigureOptions:
       cmndLine += "  --extra-configure-options='"+inOptions.extraConfigureOptions+"' \\\n"
     cmndLine += "  --with-path='"+inOptions.withPath+"' \\\n"
     cmndLine += "  --with-lib-dir='"+inOptions.withLibDir+"' \\\n"
     return cmndLine
+
+  #
+  # Called after parsing the command-line
+  #
     
   def setup(self, inOptions):
     self.inOptions = inOptions
     self.baseDir = os.getcwd()
-    self.openmpiBaseDir = self.baseDir+"/"+self.getBaseDirName()
-    self.openmpiSrcBaseDir = self.openmpiBaseDir+"/"+openmpiSrcDir
+    self.openmpiBaseDir = self.baseDir+"/"+self.getBaseDirName(self.inOptions.version)
+    self.openmpiTarball = "openmpi-"+self.inOptions.version+".tar.gz"
+    self.openmpiSrcDir = "openmpi-"+self.inOptions.version
     self.openmpiBuildBaseDir = self.openmpiBaseDir+"/openmpi-build"
     self.scriptBaseDir = getScriptBaseDir()
 
-  def doCheckout(self):
-    echoRunSysCmnd(self.inOptions.checkoutCmnd)
+  # The build dir (for --build-in-memory)
+  def getBuildDir(self):
+    return self.openmpiBuildBaseDir
+
+  #
+  # Called after setup()
+  #
+
+  def doDownload(self):
+    removeDirIfExists(self.openmpiBaseDir, True)
+    echoRunSysCmnd(self.inOptions.downloadCmnd)
 
   def doUntar(self):
     echoChDir(self.openmpiBaseDir)
-    echoRunSysCmnd("tar -xzvf "+openmpiTarball)
+    extractTarball(self.openmpiTarball)
 
   def doConfigure(self):
     createDir(self.openmpiBuildBaseDir, True, True)
     echoRunSysCmnd(
-      self.getEnvCmnd()+"../"+openmpiSrcDir+"/configure "+\
+      self.getEnvCmnd()+self.openmpiBaseDir+"/"+self.openmpiSrcDir+"/configure "+\
       " "+self.inOptions.extraConfigureOptions+\
       " --prefix="+self.inOptions.installDir)
 
   def doBuild(self):
     echoChDir(self.openmpiBuildBaseDir)
-    echoRunSysCmnd(self.getEnvCmnd()+"make "+self.inOptions.makeOptions)
+    echoRunSysCmnd(self.getEnvCmnd()+"make "+self.inOptions.makeOptions,
+      extraEnv=self.inOptions.makeEnv)
 
   def doInstall(self):
     echoChDir(self.openmpiBuildBaseDir)
-    echoRunSysCmnd(self.getEnvCmnd()+"make "+self.inOptions.makeOptions+" install")
+    echoRunSysCmnd(self.getEnvCmnd()+"make "+self.inOptions.makeOptions+" install",
+      extraEnv=self.inOptions.makeEnv)
 
   def getFinalInstructions(self):
     return """
-To use the installed version of openmpi-"""+openmpiVersion+""" access the include
+To use the installed version of openmpi-"""+self.inOptions.version+""" access the include
 headers in the directory:
 
   """+self.inOptions.installDir+"""/include
@@ -162,9 +202,11 @@ Actually, using the MPI compiler wrappers mpicc, mpic++, etc. is prefered.
 
 
 #
-# Executable statements
+# Script driver
 #
 
-openmpiInstaller = InstallProgramDriver(OpenMpiInstall())
+def getInstallObj():
+  return OpenMpiInstall()
 
-openmpiInstaller.runDriver()
+if __name__ == '__main__':
+  sys.exit(InstallProgramDriver(getInstallObj()).runDriver())
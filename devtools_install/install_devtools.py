@@ -44,8 +44,27 @@
 #
 
 from FindGeneralScriptSupport import *
+from InstallScheduler import *
+from StageStamps import *
+from SourceDownloads import *
+from SourceCache import *
+from SourceMirror import *
+from GccPrerequisites import *
+from BinaryCache import *
+from BuildTimeline import *
+from CompilerCache import *
+from BuildParallelism import *
+from InMemoryBuildDirs import *
+from BuildPlan import *
+from EnvSnapshot import *
+from RuntimeImage import *
+from MpiBenchmark import *
+from TplBenchmarks import *
 import InstallProgramDriver
+import glob
 import os
+import shutil
+import threading
 
 #
 # Defaults and constants
@@ -53,6 +72,8 @@ import os
 
 devtools_install_dir = os.path.dirname(os.path.abspath(__file__))
 
+repo_base_dir = os.path.dirname(devtools_install_dir)
+
 scratch_dir = os.getcwd()
 
 sourceGitUrlBase_default = "https://github.com/tribitsdevtools/"
@@ -84,6 +105,10 @@ compilerToolsetChoices = (["all"] + compilerToolsetArray + [""])
 TPLToolsetArray = [ "hdf5", "blas", "lapack", "hypre", "petsc", "slepc", "sundials" ]
 TPLToolsetChoices = (["all"] + TPLToolsetArray + [""])
 
+# Env vars set by a loaded dev env that must not leak into the TPL build
+tplEnvVarNames = [ "HDF5_ROOT", "BLAS_ROOT", "LAPACK_DIR", "HYPRE_DIR",
+  "PETSC_DIR", "SLEPC_DIR", "SUNDIALS_DIR" ]
+
 #
 # Utility functions
 #
@@ -148,14 +173,172 @@ At a high level, this script performs the following actions.
    load_dev_env.sh (csh).  (if --initial-setup is passed in.)
 
 2) Download the sources for all of the requested common tools and compiler
-   toolset.  (if --download is passed in.)
+   toolset and update the vera_tpls git submodule.  The sources are downloaded at the same time using
+   --download-jobs=<num-jobs> workers.  A failed download does not stop the
+   other downloads, only the install of that tool (and the tools that depend
+   on it) is skipped.  The downloaded sources are kept in the cache
+   --source-cache-dir=<dir> so later runs (e.g. for another install dir)
+   get them from there instead of the network.  (if --download is passed
+   in.)
 
 3) Configure, build, and install the requested common tools under
    common_tools/. (if --install is passed in.)
 
 4) Configure, build, and install the downloaded GCC and MPICH tools.  First
    install GCC then MPICH using the installed GCC and install under
-   gcc-<gcc-version>/.  (if --install is passed in.)
+   gcc-<gcc-version>/.  Then build the VERA TPLs with that MPI.  (if
+   --install is passed in.)
+
+To install on a machine without internet access, first run on a machine that
+has it with:
+
+  --prefetch-bundle=<bundle-file>
+
+to download every source needed for the selected --common-tools and
+--compiler-toolset (including the GCC prerequisites and the vera_tpls
+submodule) into the one file <bundle-file>.  Then copy that file over and run
+with:
+
+  --mirror=<bundle-file>
+
+(or --mirror=<dir> for a directory the bundle was extracted into) to get all
+of the sources from there instead of the network.  The install-<tool>.py
+scripts accept the same --mirror option.
+
+Steps 3) and 4) are run as a dependency graph.  The common tools do not
+depend on anything, MPICH (or MVAPICH) depends on GCC and the VERA TPLs
+depend on the MPI.  Tools that do not depend on each other are built at the
+same time, sharing the --parallel=<num-procs> processes between them (with
+--parallel=auto, the cores and the memory of the machine).  Each
+tool is downloaded and built in its own scratch directory tools/<tool>-<ver>/
+and the output of its build commands is written to logs/<tool>-<ver>.log.
+The VERA TPLs are configured once (task vera_tpls) and then all of them are
+built by one 'make -j<n> <tpls>' in their shared build dir (task
+vera_tpls-build).  The TPLs that do not depend on each other are built at the
+same time (e.g. hdf5 next to lapack, then hypre next to sundials, then petsc
+and slepc).  The log and the build time of each TPL are split out of the
+files of its build steps into logs/vera_tpls-<tpl>.log and the timeline.
+Only the TPLs selected with --tpl-toolset (and the TPLs they need, e.g.
+lapack for blas) are built, so --tpl-toolset=hdf5,lapack gives a slim install
+without petsc, slepc and hypre.
+
+Each download and each install stage (untar, configure, build, install) of
+each tool writes a stamp file under stamps/ with a hash of its inputs (tool
+version, configure command, compiler, build env vars and the stamps of the
+tools it depends on).  Re-running skips the stages that are up to date and
+resumes from the first stage that failed or whose inputs changed.  For
+example, if the VERA TPLs fail to build, re-running does not rebuild GCC.
+Pass in --ignore-stamps to redo everything.
+
+Each tool that is built is also packed into the binary cache
+--binary-cache-dir=<dir>, keyed by the tool version, its configure flags, the
+hashes of the compilers used to build it and the host arch.  Installing the
+same tool again (e.g. into a new install dir or a container) restores it from
+the cache instead of building it.  GCC and CMake can be restored into any
+install dir, the MPI and TPL installs only into the same install dir since
+they have it hard-coded in them.
+
+Each download and each install stage of each tool (including the stages run
+by the install-<tool>.py scripts) is recorded as a JSON line in the timeline
+file --timeline-file=<file> (default logs/timeline.jsonl) with its start and
+end times, wall and CPU time, exit code and log file.  At the end of
+the install, a report of the wall and CPU time of each tool and stage and of
+the critical path through the install graph is printed.
+
+If --compiler-cache=<dir> is given, the C, C++ and Fortran compiles of the
+tool builds are run through ccache with its cache in <dir> so that building a
+similar toolset again gets most of the object files out of the cache.  The
+MPI compilers are only wrapped in the 'make' command so that the installed
+MPI compiler wrappers do not call ccache.  The hit rate is printed at the end
+of the install.
+
+Once all of the tools are installed, the benchmarks selected with
+--tpl-benchmarks=<benchmarks> (none by default) are built against the
+installed TPLs and run one at a time (as the tasks benchmark-<benchmark> with their own logs and
+stamps).  The blas_lapack benchmark reports the GFLOP/s of DGEMM, DGESV and
+DSYEV for a few matrix sizes.  The hdf5 benchmark writes and reads back a
+chunked dataset from 4 MPI ranks in its scratch dir (so on the disk of the
+dev env) and reports the MB/s of independent and collective I/O (the reads
+mostly come out of the page cache).  The petsc_slepc benchmark times a KSP
+solve and an eigenvalue solve of the 2D Laplacian on 4 MPI ranks along with
+their iteration counts, and warns if PETSc was configured with debugging or
+compiled without optimization.  The results are written to
+gcc-<ver>/tpls/benchmarks/<benchmark>.json (along with the TPL versions and
+the host) so that the dev env variants can be compared.  To validate an
+install, re-run it with the benchmarks (the installs are up to date so only
+the benchmarks are run):
+
+  install-devtools.py --install-dir=<dev_env_base> --install \
+   --tpl-benchmarks=all
+
+With --mpi-benchmark=warn or --mpi-benchmark=fail (it is off by default),
+after MPICH (or MVAPICH) is installed, the microbenchmark mpi_benchmark.c is
+built with its mpicc and run on the local host with
+--mpi-benchmark-ranks=<num-ranks> ranks.  It measures the ping-pong latency
+and bandwidth and the all-reduce latency for a few message sizes and
+compares them to the baseline for the same MPI, GCC, number of ranks and
+host in --mpi-benchmark-baseline=<file> (the first run records the
+baseline).  A result that is worse than the baseline by more than
+--mpi-benchmark-tolerance=<fraction> is a regression, e.g. for an MPI built
+with the wrong device or with debug flags.  With --mpi-benchmark=warn a
+regression is reported and with --mpi-benchmark=fail the MPI install fails
+(so the TPLs are not built with it).  The results are written to
+tools/<mpi>-<ver>/mpi-benchmark/results.json.  To validate an install,
+re-run it with the benchmark on (the installs are up to date so only the
+benchmark is run):
+
+  install-devtools.py --install-dir=<dev_env_base> --install \
+   --mpi-benchmark=warn
+
+If --build-in-memory is given, the build trees of GCC, CMake, MPICH and the
+TPLs (e.g. tools/gcc-<ver>/gcc-build/) are linked to directories in the tmpfs
+--build-in-memory-dir=<dir> (default /dev/shm) if it has room for them and
+there is enough free RAM for them next to the compile jobs.  Otherwise they
+are built on disk as before.  The stamps and the logs stay in the scratch
+dir.  A build tree in memory is removed after the tool is installed (so a
+re-run restores the tool from the binary cache instead of rebuilding it) and
+is kept if the build fails so that a re-run resumes in it.
+
+At the end of the install, the env of the dev env (what loading the gcc-<ver>
+module and sourcing load_dev_env.sh give) is also written flattened into
+env/load_dev_env_snapshot.[sh,csh].  These just set the final PATH,
+LD_LIBRARY_PATH, PKG_CONFIG_PATH and *_DIR vars (leaving out the dirs that
+were not installed) without any module loads so they are quick to source,
+e.g. in batch jobs.
+
+With --runtime-image, the Dockerfile <dev_env_base>/images/runtime/Dockerfile
+of a minimal runtime image is written.  The image copies the installed
+common_tools, gcc-<ver>/toolset, gcc-<ver>/tpls and env trees to the same
+paths and sets the same env as the snapshot with ENV, so the tools are not
+built again inside the image.  It is built with <dev_env_base> as the
+context (with --build-image or as shown at the top of the Dockerfile).
+
+With --matrix=<compiler-toolset> given more than once, a compiler toolset
+(e.g. GCC 4.8.3 with MPICH and GCC 5.4.0 with MPICH) is installed for each
+in one run.  The common tools and the sources the toolsets share (e.g. the
+MPICH tarball) are downloaded and installed once.  The GCC, MPI and TPL
+builds of all of the toolsets are then scheduled in the one dependency graph
+so that they are built at the same time, sharing the same --parallel budget.
+The MPI and TPL tasks of a toolset get the suffix @gcc-<ver> (e.g.
+mpich-3.1.3@gcc-5.4.0 with the log logs/mpich-3.1.3@gcc-5.4.0.log) and a
+toolset that fails does not stop the others: the toolsets that are installed
+are still benchmarked and get their env snapshot files before the script
+fails.  The env files of each toolset go in env/gcc-<ver>/ and its images in
+images/dev_env-gcc-<ver>/ and images/runtime-gcc-<ver>/.
+
+If --plan=<file> is given, the requested actions are not done (as for
+--no-op) but their plan is written as JSON to <file> (or to stdout for '-').
+The plan lists each download and where it would come from (up to date,
+mirror, source cache or network) and each tool and TPL benchmark with its
+dependencies and its stages that would run or are up to date.  (Its binary
+cache entry is 'unknown' since the key depends on compilers that may not be
+installed yet.)  Each of these has a duration estimated from the previous
+runs in the timeline file, along with the estimated download, install
+(critical path, including the benchmarks run after it) and total times.
+For example:
+
+  install-devtools.py --install-dir=<dev_env_base> --download --install \
+   --plan=plan.json
 
 The informational arguments to this function are:
 
@@ -237,17 +420,31 @@ The informational arguments to this function are:
 
       --tpl-toolset=''
 
+  --matrix=<compiler-toolset>
+
+    Install several compiler toolsets (and the TPLs built with each) in one
+    run, one for each --matrix argument (which takes the same values as
+    --compiler-toolset, which is then ignored).  For example:
+
+      --matrix=gcc:4.8.3,mpich:3.1.3 --matrix=gcc:5.4.0,mpich:3.1.3
+
+    Each must use a different GCC version.
+
 The action argumnets are:
 
   --initial-setup: Create <dev_env_base>/ directories and install
     load_dev_env.sh
 
-  --download: Download all of the requested tools
+  --download: Download all of the requested tools (that are not already
+    downloaded)
 
   --install: Configure, build, and install all of the requested tools
 
   --do-all: Do everything.  Implies --initial-setup --downlaod --install
 
+  --prefetch-bundle=<bundle-file>: Only download the sources for the requested
+    tools into <bundle-file> to use later with --mirror=<bundle-file>
+
 To change modify the permissions of the installed files, see the options
 --install-owner, --install-group, and --install-for-all.
 
@@ -260,7 +457,8 @@ If the user needs more customization, then they can just run with --do-all
 --no-op and see what commands are run to install things and then they can run
 the commands themselves manually and make whatever modifications they need.
 
-NOTE: The actual tool installs are performed using the scripts:
+NOTE: The actual tool installs are performed using the drivers of the scripts
+(run by a pool of worker processes of this script, not as commands):
 
 * install-autoconf.py
 * install-cmake.py
@@ -315,15 +513,139 @@ def getCmndLineOptions(cmndLineArgs, skipEchoCmndLine=False):
 
   clp.add_option(
     "--tpl-toolset", dest="TPLToolset", type="string", default="all",
-    help="Specifies and other tpl-specific tools to" \
-      " set in the load_dev_env scripts." \
+    help="Specifies the VERA TPLs to build under gcc-<gcc-version>/tpls/" \
+      " (along with the TPLs they need) and to set in the gcc-<gcc-version>" \
+      " module and the env snapshot." \
       "  Can be 'all', or empty '', or any combination of" \
       " '"+(",".join(TPLToolsetArray))+"' (separated by commas, no spaces).")
 
   clp.add_option(
-    "--parallel", dest="parallelLevel", type="string", default="1",
-    help="Number of parallel processes to use in the build.  The default is" \
-      " just '1'.  Use something like '8' to get faster parallel builds." )
+    "--tpl-benchmarks", dest="tplBenchmarks", type="string", default="",
+    help="Specifies the benchmarks to run against the installed TPLs once" \
+      " they are installed (the ones whose TPLs are not installed are" \
+      " skipped).  Can be 'all', or empty '', or any combination of" \
+      " '"+(",".join(tplBenchmarkNames))+"' (separated by commas, no spaces)." \
+      "  (Default = '')")
+
+  clp.add_option(
+    "--matrix", dest="matrix", type="string", action="append", default=[],
+    help="Install the compiler toolset <compiler-toolset> (same values as" \
+      " --compiler-toolset) along with the TPLs built with it.  Given more" \
+      " than once, all of these toolsets are built in one run at the same" \
+      " time and --compiler-toolset is ignored.  Each must use a different" \
+      " GCC version.")
+
+  clp.add_option(
+    "--parallel", dest="parallelLevel", type="string",
+    default=autoParallelLevel,
+    help="Number of parallel processes to use in the build.  This is the" \
+      " total budget shared by all of the tools being built at the same" \
+      " time.  If '"+autoParallelLevel+"', the budget is the number of cores" \
+      " and each tool gets as many jobs as fit in the available memory for" \
+      " that tool (e.g. GCC needs more memory per job than MPICH)." \
+      "  (Default = '"+autoParallelLevel+"')" )
+
+  clp.add_option(
+    "--download-jobs", dest="downloadJobs", type="string", default="4",
+    help="Number of sources to download at the same time.  (Default = '4')" )
+
+  clp.add_option(
+    "--source-cache-dir", dest="sourceCacheDir", type="string",
+    default=sourceCacheDir_default,
+    help="Directory of the persistent cache of the downloaded tool sources." \
+      "  Sources found in the cache are not downloaded again.  Set to empty" \
+      " '' to not use a cache.  (Default = '"+sourceCacheDir_default+"')" )
+
+  clp.add_option(
+    "--source-cache-max-size", dest="sourceCacheMaxSizeGb", type="string",
+    default=sourceCacheMaxSizeGb_default,
+    help="Max size in GB of the source cache.  The least recently used" \
+      " sources are removed when it gets bigger than this." \
+      "  (Default = '"+sourceCacheMaxSizeGb_default+"')" )
+
+  clp.add_option(
+    "--binary-cache-dir", dest="binaryCacheDir", type="string",
+    default=binaryCacheDir_default,
+    help="Directory of the persistent cache of the built tool installs." \
+      "  A tool that was built before with the same version, configure" \
+      " flags, compilers and host arch is restored from the cache instead of" \
+      " being built again.  Set to empty '' to not use a cache." \
+      "  (Default = '"+binaryCacheDir_default+"')" )
+
+  clp.add_option(
+    "--binary-cache-max-size", dest="binaryCacheMaxSizeGb", type="string",
+    default=binaryCacheMaxSizeGb_default,
+    help="Max size in GB of the binary cache.  The least recently used" \
+      " installs are removed when it gets bigger than this." \
+      "  (Default = '"+binaryCacheMaxSizeGb_default+"')" )
+
+  clp.add_option(
+    "--compiler-cache", dest="compilerCache", type="string", default="",
+    help="Directory of the ccache cache to run the compilers of the tool" \
+      " builds through.  If empty '', ccache is not used.  (Default = '')" )
+
+  clp.add_option(
+    "--build-in-memory", dest="buildInMemory", action="store_true",
+    default=False,
+    help="Put the build trees of the tools in --build-in-memory-dir if there" \
+      " is room for them (and on disk otherwise)." )
+
+  clp.add_option(
+    "--build-in-memory-dir", dest="buildInMemoryDir", type="string",
+    default=inMemoryBuildBaseDir_default,
+    help="The tmpfs dir to put the build trees in with --build-in-memory." \
+      "  (Default = '"+inMemoryBuildBaseDir_default+"')" )
+
+  clp.add_option(
+    "--mpi-benchmark", dest="mpiBenchmark", type="choice",
+    choices=mpiBenchmarkModes, default=mpiBenchmarkMode_default,
+    help="What to do when the latency or bandwidth of a newly installed MPI" \
+      " regresses from its baseline in --mpi-benchmark-baseline: 'warn'," \
+      " 'fail' its install (so the TPLs are not built with it) or 'off' to" \
+      " not run the benchmark.  (Default = '"+mpiBenchmarkMode_default+"')" )
+
+  clp.add_option(
+    "--mpi-benchmark-ranks", dest="mpiBenchmarkRanks", type="string",
+    default=mpiBenchmarkRanks_default,
+    help="Number of ranks to run the MPI benchmark with on the local host." \
+      "  (Default = '"+mpiBenchmarkRanks_default+"')" )
+
+  clp.add_option(
+    "--mpi-benchmark-tolerance", dest="mpiBenchmarkTolerance", type="string",
+    default=mpiBenchmarkTolerance_default,
+    help="Fraction a latency can be higher (or a bandwidth lower) than its" \
+      " baseline before it is a regression." \
+      "  (Default = '"+mpiBenchmarkTolerance_default+"')" )
+
+  clp.add_option(
+    "--mpi-benchmark-baseline", dest="mpiBenchmarkBaselineFile",
+    type="string", default=mpiBenchmarkBaselineFile_default,
+    help="JSON file of the MPI benchmark baselines.  The first benchmark run" \
+      " of an MPI (for the same GCC, number of ranks and host) is recorded" \
+      " as its baseline." \
+      "  (Default = '"+mpiBenchmarkBaselineFile_default+"')" )
+
+  clp.add_option(
+    "--timeline-file", dest="timelineFile", type="string", default="",
+    help="JSON lines file to record the download and install stages of each" \
+      " tool in.  (Default = '<scratch-dir>/logs/" \
+      +buildTimelineFileName_default+"')" )
+
+  clp.add_option(
+    "--plan", dest="planFile", type="string", default="",
+    help="Write the plan of the requested actions as JSON to the given file" \
+      " ('-' for stdout) instead of doing them.  Implies --no-op.")
+
+  clp.add_option(
+    "--mirror", dest="mirror", type="string", default="",
+    help="Prefetch bundle file (or a directory it was extracted into, or a" \
+      " file:// URL to either) to get all of the sources from instead of" \
+      " the network.  (Default = '')" )
+
+  clp.add_option(
+    "--ignore-stamps", dest="ignoreStamps", action="store_true", default=False,
+    help="Redo all of the download and install stages even if their stamp" \
+      " files in stamps/ show that they are up to date." )
 
   clp.add_option(
     "--do-op", dest="skipOp", action="store_false",
@@ -345,14 +667,31 @@ def getCmndLineOptions(cmndLineArgs, skipEchoCmndLine=False):
     "--download", dest="doDownload", action="store_true", default=False,
     help="[ACTION] Download all of the tools specified by --common-tools" \
       " and --compiler-toolset.  WARNING:  If the source for a tool has" \
-      " already been downloaded, it will be deleted (along with the build" \
-      " directory) and downloaded from scratch!")
+      " already been downloaded, it will be replaced by the copy from the" \
+      " source cache (or downloaded from scratch if it is not cached)" \
+      " unless its stamp shows that it is up to date!")
+
+  clp.add_option(
+    "--prefetch-bundle", dest="prefetchBundle", type="string", default="",
+    help="[ACTION] Download all of the sources for the tools specified by" \
+      " --common-tools and --compiler-toolset (and the GCC prerequisites and" \
+      " the vera_tpls submodule) into the given bundle file and exit.  The" \
+      " bundle can then be used with --mirror=<bundle-file> on a machine" \
+      " without internet access.")
 
   clp.add_option(
     "--install", dest="doInstall", action="store_true", default=False,
     help="[ACTION] Configure, build, and install all of the tools specified by" \
       " --common-tools and --compiler-toolset.")
 
+  clp.add_option(
+    "--runtime-image", dest="runtimeImage", action="store_true", default=False,
+    help="[ACTION] Write the Dockerfile images/runtime/Dockerfile of a minimal" \
+      " runtime image that copies the installed common_tools," \
+      " gcc-<gcc-version>/toolset, gcc-<gcc-version>/tpls and env trees" \
+      " instead of building the tools again.  With --build-image, that image" \
+      " is built.")
+
   clp.add_option(
     "--show-final-instructions", dest="showFinalInstructions", action="store_true",
     default=False,
@@ -369,6 +708,12 @@ def getCmndLineOptions(cmndLineArgs, skipEchoCmndLine=False):
 
   (options, args) = clp.parse_args(args=cmndLineArgs)
 
+  if options.planFile:
+    options.skipOp = True
+    if options.planFile == "-":
+      # Only the plan goes to stdout so that it can be piped
+      sys.stdout = sys.stderr
+
   # NOTE: Above, in the pairs of boolean options, the *last* add_option(...)
   # takes effect!  That is why the commands are ordered the way they are!
 
@@ -387,7 +732,32 @@ def getCmndLineOptions(cmndLineArgs, skipEchoCmndLine=False):
     cmndLine +=  "  --common-tools='"+options.commonTools+"' \\\n"
     cmndLine +=  "  --compiler-toolset='"+options.compilerToolset+"' \\\n"
     cmndLine +=  "  --tpl-toolset='"+options.TPLToolset+"' \\\n"
+    cmndLine +=  "  --tpl-benchmarks='"+options.tplBenchmarks+"' \\\n"
+    for compilerToolset in options.matrix:
+      cmndLine +=  "  --matrix='"+compilerToolset+"' \\\n"
     cmndLine +=  "  --parallel='"+options.parallelLevel+"' \\\n"
+    cmndLine +=  "  --download-jobs='"+options.downloadJobs+"' \\\n"
+    cmndLine +=  "  --source-cache-dir='"+options.sourceCacheDir+"' \\\n"
+    cmndLine +=  "  --source-cache-max-size='"+options.sourceCacheMaxSizeGb+"' \\\n"
+    cmndLine +=  "  --binary-cache-dir='"+options.binaryCacheDir+"' \\\n"
+    cmndLine +=  "  --binary-cache-max-size='"+options.binaryCacheMaxSizeGb+"' \\\n"
+    cmndLine +=  "  --mirror='"+options.mirror+"' \\\n"
+    if options.buildInMemory:
+      cmndLine +=  "  --build-in-memory \\\n"
+      cmndLine +=  "  --build-in-memory-dir='"+options.buildInMemoryDir+"' \\\n"
+    if options.compilerCache:
+      cmndLine +=  "  --compiler-cache='"+options.compilerCache+"' \\\n"
+    cmndLine +=  "  --mpi-benchmark='"+options.mpiBenchmark+"' \\\n"
+    if options.mpiBenchmark != "off":
+      cmndLine +=  "  --mpi-benchmark-ranks='"+options.mpiBenchmarkRanks+"' \\\n"
+      cmndLine +=  "  --mpi-benchmark-tolerance='"+options.mpiBenchmarkTolerance+"' \\\n"
+      cmndLine +=  "  --mpi-benchmark-baseline='"+options.mpiBenchmarkBaselineFile+"' \\\n"
+    if options.timelineFile:
+      cmndLine +=  "  --timeline-file='"+options.timelineFile+"' \\\n"
+    if options.planFile:
+      cmndLine +=  "  --plan='"+options.planFile+"' \\\n"
+    if options.ignoreStamps:
+      cmndLine +=  "  --ignore-stamps \\\n"
     if not options.skipOp:
       cmndLine +=  "  --do-op \\\n"
     else:
@@ -396,8 +766,12 @@ def getCmndLineOptions(cmndLineArgs, skipEchoCmndLine=False):
       cmndLine +=  "  --initial-setup \\\n"
     if options.doDownload:
       cmndLine +=  "  --download \\\n"
+    if options.prefetchBundle:
+      cmndLine +=  "  --prefetch-bundle='"+options.prefetchBundle+"' \\\n"
     if options.doInstall:
       cmndLine +=  "  --install \\\n"
+    if options.runtimeImage:
+      cmndLine +=  "  --runtime-image \\\n"
     if options.showFinalInstructions:
       cmndLine +=  "  --show-final-instructions \\\n"
     if options.doAll:
@@ -412,10 +786,15 @@ def getCmndLineOptions(cmndLineArgs, skipEchoCmndLine=False):
   # Check the input arguments
   #
 
-  if options.installDir == "":
+  if options.prefetchBundle:
+    # Only the sources are downloaded so there is nothing installed
+    options.prefetchBundle = \
+      os.path.abspath(os.path.expanduser(options.prefetchBundle))
+  elif options.installDir == "":
     print("\nError, you must set --install-dir=<dev_env_base>!")
     raise Exception("Bad input option --install-dir")
-  options.installDir = os.path.abspath(os.path.expanduser(options.installDir))
+  if options.installDir:
+    options.installDir = os.path.abspath(os.path.expanduser(options.installDir))
 
   if options.commonTools == "all":
     options.commonTools = ",".join(commonToolsArray)
@@ -429,6 +808,9 @@ def getCmndLineOptions(cmndLineArgs, skipEchoCmndLine=False):
     options.TPLToolset = ",".join(TPLToolsetArray)
   #print("options.TPLToolset = '"+options.TPLToolset+"'")
 
+  if options.tplBenchmarks == "all":
+    options.tplBenchmarks = ",".join(tplBenchmarkNames)
+
   if options.doAll:
     options.doInitialSetup = True
     options.doDownload = True
@@ -501,13 +883,13 @@ def writeLoadDevEnvFiles(devEnvBaseDir, devEnvDir, inOptions, versionList, mvapi
     ("@DEV_ENV_BASE@", devEnvBaseDir),
     ("@CMAKE_VERSION@", versionList["cmake"]),
     ("@AUTOCONF_VERSION@", versionList["autoconf"]),
-    ("@GCC_VERSION@", versionList["gcc"])
-    ("@HDF5_VERSION@", versionList["hdf5"])
-    ("@BLAS_VERSION@", versionList["blas"])
-    ("@LAPACK_VERSION@", versionList["lapack"])
-    ("@HYPRE_VERSION@", versionList["hypre"])
-    ("@PETSC_VERSION@", versionList["petsc"])
-    ("@SLEPC_VERSION@", versionList["slepc"])
+    ("@GCC_VERSION@", versionList["gcc"]),
+    ("@HDF5_VERSION@", versionList["hdf5"]),
+    ("@BLAS_VERSION@", versionList["blas"]),
+    ("@LAPACK_VERSION@", versionList["lapack"]),
+    ("@HYPRE_VERSION@", versionList["hypre"]),
+    ("@PETSC_VERSION@", versionList["petsc"]),
+    ("@SLEPC_VERSION@", versionList["slepc"]),
     ("@SUNDIALS_VERSION@", versionList["sundials"])]
   if mvapichInstalled:
     subPairArray.append(("@MVAPICH_VERSION@", versionList["mvapich"]))
@@ -537,40 +919,437 @@ def writeLoadDevEnvFiles(devEnvBaseDir, devEnvDir, inOptions, versionList, mvapi
 
 
 #
-# Download the source for tool
+# Write the Dockerfiles images/<devEnvImageName>/Dockerfile (the multi-stage
+# build of the dev env, see Dockerfile.in) and images/install/Dockerfile
 #
-def downloadToolSource(toolName, toolVer, gitUrlBase, inOptions):
+def writeDockerFiles(devEnvBaseDir, inOptions, versionList, mvapichInstalled,
+  devEnvImageName="dev_env" \
+  ):
 
-  toolDir = toolName+"-"+toolVer
+  if mvapichInstalled:
+    (mpiName, mpiVersion) = ("mvapich2", versionList["mvapich"])
+  else:
+    (mpiName, mpiVersion) = ("mpich", versionList["mpich"])
 
-  print("\nDownloading the source for " + toolDir + " ...")
+  if inOptions.mkl_true:
+    (mklTrue, tplUrl, tplSourceDir) = ("true",
+      "https://github.com/ehcole/MPACT_tpls.git", "/MPACT_tpls/TPL_build/")
+  else:
+    (mklTrue, tplUrl, tplSourceDir) = ("false",
+      "https://github.com/CASL/vera_tpls.git", "/vera_tpls/TPL_build/")
 
-  outFile = toolDir+"-download.log"
-  workingDir=scratch_dir
-  toolSrcBaseDir = toolDir+"-base"
-  targetToolSrcDir = workingDir+"/"+toolSrcBaseDir
+  subPairArray = [
+    ("@GCC_VERSION@", versionList["gcc"]),
+    ("@MPI_NAME@", mpiName),
+    ("@MPI_VERSION@", mpiVersion),
+    ("@MPI_PREFIX@", "/usr/lib64/"+mpiName+"-"+mpiVersion+"-x86_64"),
+    ("@CMAKE_VERSION@", versionList["cmake"]),
+    ("@CMAKE_VERSION_MAJOR_MINOR@",
+      ".".join(versionList["cmake"].split(".")[0:2])),
+    ("@TPL_URL@", tplUrl),
+    ("@TPL_SOURCE_DIR@", tplSourceDir),
+    ("@MKL_TRUE@", mklTrue),
+    ("@MVAPICH_INSTALLED@", str(mvapichInstalled)),
+    ("@HDF5_VERSION@", versionList["hdf5"]),
+    ("@LAPACK_VERSION@", versionList["lapack"]),
+    ("@HYPRE_VERSION@", versionList["hypre"]),
+    ("@PETSC_VERSION@", versionList["petsc"]),
+    ("@SLEPC_VERSION@", versionList["slepc"]),
+    ("@SUNDIALS_VERSION@", versionList["sundials"])]
 
-  if os.path.exists(targetToolSrcDir):
-    print("\nRemoving existing directory '" + targetToolSrcDir + "' ...")
-    cmnd = "rm -rf "+targetToolSrcDir
-    if not inOptions.skipOp:
-      echoRunSysCmnd(cmnd)
+  for imageName in [devEnvImageName, "install"]:
+    imageDir = os.path.join(devEnvBaseDir, "images", imageName)
+    if not os.path.exists(imageDir):
+      os.makedirs(imageDir)
+
+  configureFile(
+    os.path.join(devtools_install_dir, "Dockerfile.in"),
+    subPairArray,
+    os.path.join(devEnvBaseDir, "images", devEnvImageName, "Dockerfile")
+    )
+
+  shutil.copy(
+    os.path.join(devtools_install_dir, "Dockerfile_install"),
+    os.path.join(devEnvBaseDir, "images", "install", "Dockerfile")
+    )
+
+
+#
+# Get the scratch directory for a tool (downloads and builds for the tool
+# happen in here)
+#
+def getToolScratchDir(toolDir):
+  return os.path.join(scratch_dir, "tools", toolDir)
+
+
+def getDownloadStampDir():
+  return os.path.join(scratch_dir, "stamps", "downloads")
+
+
+#
+# Get the sources to download for each selected tool
+#
+def getSourceDownloads(versionList, commonToolsSelectedSet,
+  compilerToolsetSelectedSet, inOptions \
+  ):
+
+  sourceDownloads = []
+
+  def addGitRepo(toolName):
+    toolDir = toolName+"-"+versionList[toolName]
+    sourceDownloads.append(SourceDownload(toolDir,
+      inOptions.sourceGitUrlBase+toolDir+"-base", getToolScratchDir(toolDir),
+      isGitRepo=True, toolName=toolName, toolVersion=versionList[toolName]))
+
+  # NOTE: The tarballs are extracted while they download (see untarSource())
+  def addTarball(toolName, url):
+    toolDir = toolName+"-"+versionList[toolName]
+    sourceDownloads.append(SourceDownload(toolDir, url,
+      getToolScratchDir(toolDir), toolName=toolName,
+      toolVersion=versionList[toolName],
+      extractDir=getToolScratchDir(toolDir)))
+
+  if "cmake" in commonToolsSelectedSet:
+    cmake_version = versionList["cmake"]
+    cmakeShort = ".".join(cmake_version.split(".")[0:2])
+    addTarball("cmake", "https://cmake.org/files/v" + cmakeShort + "/cmake-" +
+      cmake_version + ".tar.gz")
+  if "autoconf" in commonToolsSelectedSet:
+    addGitRepo("autoconf")
+
+  if "gcc" in compilerToolsetSelectedSet:
+    gcc_version = versionList["gcc"]
+    addTarball("gcc", "https://ftp.gnu.org/gnu/gcc/gcc-" + gcc_version +
+      "/gcc-" + gcc_version + ".tar.gz")
+  if "mpich" in compilerToolsetSelectedSet:
+    mpich_version = versionList["mpich"]
+    if isMpichInstalledWithDriver(mpich_version):
+      addGitRepo("mpich")
     else:
-      print("\nRunning: " + cmnd)
+      addTarball("mpich", "http://www.mpich.org/static/downloads/" +
+        mpich_version + "/mpich-" + mpich_version + ".tar.gz")
+  if "mvapich" in compilerToolsetSelectedSet:
+    addTarball("mvapich",
+      "http://mvapich.cse.ohio-state.edu/download/mvapich/mv2/mvapich2-" +
+      versionList["mvapich"] + ".tar.gz")
+
+  # The VERA TPL sources come from the vera_tpls git submodule
+  sourceDownloads.append(SourceDownload("vera_tpls",
+    "https://github.com/CASL/vera_tpls", repo_base_dir, isGitRepo=True,
+    downloadCmnd="git submodule init && git submodule update"))
+
+  return sourceDownloads
+
+
+#
+# Get the sources to download for the common tools and each compiler toolset
+# variant (the sources that the variants share are only downloaded once)
+#
+def getVariantsSourceDownloads(variants, commonToolsSelectedSet, inOptions):
+  sourceDownloads = []
+  sourceDownloadNames = set()
+  for variant in variants:
+    for sourceDownload in getSourceDownloads(variant.versionList,
+      commonToolsSelectedSet, variant.compilerToolsetSelectedSet, inOptions \
+      ):
+      if not sourceDownload.name in sourceDownloadNames:
+        sourceDownloadNames.add(sourceDownload.name)
+        sourceDownloads.append(sourceDownload)
+  return sourceDownloads
+
+
+#
+# Get the GCC versions selected by the compiler toolset variants
+#
+def getSelectedGccVersions(variants):
+  gccVersions = []
+  for variant in variants:
+    if "gcc" in variant.compilerToolsetSelectedSet \
+      and not variant.versionList["gcc"] in gccVersions \
+      :
+      gccVersions.append(variant.versionList["gcc"])
+  return gccVersions
+
+
+#
+# Get the SourceMirror for --mirror=<mirror> (only extracted once)
+#
+sourceMirrorInst = None
+
+def getSourceMirror(inOptions):
+  global sourceMirrorInst
+  if not sourceMirrorInst:
+    sourceMirrorInst = SourceMirror(inOptions.mirror,
+      os.path.join(scratch_dir, "mirror"), inOptions.skipOp)
+  return sourceMirrorInst
+
+
+#
+# Get the BuildTimeline for --timeline-file=<file> (only created once)
+#
+buildTimelineInst = None
+
+def getBuildTimeline(inOptions):
+  global buildTimelineInst
+  if not buildTimelineInst:
+    buildTimelineInst = BuildTimeline(getBuildTimelineFile(inOptions),
+      "install_devtools.py")
+  return buildTimelineInst
+
+
+def getBuildTimelineFile(inOptions):
+  timelineFile = inOptions.timelineFile
+  if not timelineFile:
+    timelineFile = os.path.join(scratch_dir, "logs",
+      buildTimelineFileName_default)
+  return os.path.abspath(timelineFile)
 
-  cmnd = "git clone "+gitUrlBase+toolSrcBaseDir+" "+targetToolSrcDir
+
+#
+# Get the BuildPlan for --plan=<file> (or None).  The estimates come from the
+# previous runs in the timeline file.
+#
+buildPlanInst = None
+
+def getBuildPlan(inOptions):
+  global buildPlanInst
+  if not inOptions.planFile:
+    return None
+  if not buildPlanInst:
+    buildPlanInst = BuildPlan(
+      readStageDurationEstimates(getBuildTimelineFile(inOptions)))
+  return buildPlanInst
+
+
+#
+# Print the timeline report of this run
+#
+def printBuildTimelineReport(inOptions):
+  if inOptions.skipOp:
+    return
+  timeline = getBuildTimeline(inOptions)
+  print("\nBuild timeline (from '"+timeline.timelineFile+"'):")
+  print(getTimelineReportStr(
+    readTimelineEvents(timeline.timelineFile, timeline.runId)))
+
+
+#
+# Get the CompilerCache for --compiler-cache=<dir> (or None)
+#
+compilerCacheInst = None
+
+def getCompilerCache(inOptions):
+  global compilerCacheInst
+  if not inOptions.compilerCache:
+    return None
+  if not compilerCacheInst:
+    compilerCacheInst = CompilerCache(inOptions.compilerCache, scratch_dir,
+      inOptions.skipOp)
+  return compilerCacheInst
+
+
+#
+# Get the SourceCache for --source-cache-dir=<dir> (or None)
+#
+def getSourceCache(inOptions):
+  if not inOptions.sourceCacheDir:
+    return None
+  return SourceCache(inOptions.sourceCacheDir,
+    int(float(inOptions.sourceCacheMaxSizeGb)*1024*1024*1024))
+
+
+#
+# Get the BinaryCache for --binary-cache-dir=<dir> (or None)
+#
+def getBinaryCache(inOptions):
+  if not inOptions.binaryCacheDir:
+    return None
+  return BinaryCache(inOptions.binaryCacheDir,
+    int(float(inOptions.binaryCacheMaxSizeGb)*1024*1024*1024))
+
+
+#
+# Get the C, C++ and Fortran compilers used by default to build the tools
+# (found in the given PATH)
+#
+def getHostCompilers(path=None):
+  compilers = []
+  for (envVarName, defaultCompiler) in \
+    [("CC", "cc"), ("CXX", "c++"), ("FC", "gfortran")] \
+    :
+    compiler = os.environ.get(envVarName, defaultCompiler)
+    if path and not os.path.isabs(compiler):
+      for pathDir in path.split(os.pathsep):
+        if os.path.exists(os.path.join(pathDir, compiler)):
+          compiler = os.path.join(pathDir, compiler)
+          break
+    compilers.append(compiler)
+  return compilers
+
+
+#
+# Run buildFunc() to build and install a tool into installDir unless the
+# install can be restored from the binary cache.  A tool that is built is
+# added to the cache.
+#
+def runCachedInstall(task, inOptions, toolName, toolVersion, installDir,
+  configureFlags, compilers, buildFunc, relocatable=False \
+  ):
+  (restored, key) = restoreCachedInstall(task, inOptions, toolName,
+    toolVersion, installDir, configureFlags, compilers, relocatable)
+  if restored:
+    return
+  buildFunc()
+  storeCachedInstall(task, inOptions, toolName, toolVersion, key, installDir)
+
+
+#
+# Restore the install of a tool into installDir from the binary cache if it
+# is there.  Returns (restored, key) where key is the binary cache key to
+# store the install with after it is built (or '' if there is no binary
+# cache).
+#
+def restoreCachedInstall(task, inOptions, toolName, toolVersion, installDir,
+  configureFlags, compilers, relocatable=False \
+  ):
+  binaryCache = getBinaryCache(inOptions)
+  if not binaryCache:
+    return (False, "")
+  # NOTE: The compilers in the key may not be installed yet (or may be
+  # rebuilt by this run) so they are not probed with --no-op
+  if inOptions.skipOp:
+    print("\nNot looking up "+toolName+"-"+toolVersion+" in the binary" \
+      " cache '"+binaryCache.cacheDir+"' (its key is unknown with --no-op)")
+    if task.plan:
+      task.plan.setBinaryCacheStatus(task.name, None)
+    return (False, "")
+  key = getBinaryCacheKey(toolName, toolVersion, configureFlags, compilers,
+    installDir, relocatable)
+  cacheName = toolName+"-"+toolVersion+" (key "+key[0:12]+")"
+  if not binaryCache.contains(toolName, toolVersion, key, touch=False):
+    return (False, key)
+  print("\nRestoring "+cacheName+" from the binary cache '" \
+    +binaryCache.cacheDir+"' ...")
+  task.runStage("binary-cache", {"key" : key},
+    lambda: binaryCache.restore(task, toolName, toolVersion, key, installDir),
+    outputPath=installDir)
+  return (True, key)
+
+
+#
+# Add the built install of a tool to the binary cache with the key from
+# restoreCachedInstall() (if there is a binary cache)
+#
+def storeCachedInstall(task, inOptions, toolName, toolVersion, key,
+  installDir \
+  ):
+  if not key:
+    return
+  binaryCache = getBinaryCache(inOptions)
+  print("\nAdding "+toolName+"-"+toolVersion+" (key "+key[0:12]+") to the" \
+    " binary cache '"+binaryCache.cacheDir+"' ...")
   if not inOptions.skipOp:
-    echoRunSysCmnd(cmnd, workingDir=workingDir, outFile=outFile, timeCmnd=True)
-  else:
-    print("\nRunning: " + cmnd)
-    print("\n  Running in working directory: " + workingDir)
-    print("\n   Writing console output to file " + outFile)
+    binaryCache.storeInstall(task, toolName, toolVersion, key, installDir)
+
+
+def getGccPrerequisitesDir(gccVersion):
+  return os.path.join(getToolScratchDir("gcc-"+gccVersion), "prerequisites")
+
+
+#
+# Get the GCC prerequisite archives as (archives, checksums) from the mirror
+# or from the downloaded GCC sources (see readGccPrerequisites()).  Returns
+# ([], {}) if the GCC sources are not there (e.g. for --no-op).
+#
+def getGccPrerequisites(gccVersion, inOptions):
+  if inOptions.mirror:
+    return (getSourceMirror(inOptions).getGccPrerequisites(gccVersion), {})
+  gccDir = "gcc-"+gccVersion
+  gccSrcDir = os.path.join(getToolScratchDir(gccDir), gccDir)
+  gccTarball = os.path.join(getToolScratchDir(gccDir), gccDir+".tar.gz")
+  if not os.path.exists(gccSrcDir) and not os.path.exists(gccTarball):
+    return ([], {})
+  return readGccPrerequisites(gccSrcDir, gccTarball, gccVersion)
+
+
+#
+# Get the downloads of the GCC prerequisite archives and the ucontext patch.
+# These go in the prerequisites/ dir of the GCC scratch dir.  The archives
+# are cached under their own names and versions (e.g. gmp/4.3.2) so they are
+# shared by all of the GCC versions that use them.
+#
+def getGccPrerequisiteDownloads(gccVersion, archives, checksums={}):
+  gccDir = "gcc-"+gccVersion
+  prereqDir = getGccPrerequisitesDir(gccVersion)
+  sourceDownloads = []
+  for archive in archives:
+    archiveDirName = getGccPrerequisiteDirName(archive)
+    sourceDownloads.append(SourceDownload(gccDir+"-"+archiveDirName,
+      gccInfrastructureUrl_default+archive, prereqDir,
+      toolName=getGccPrerequisiteLinkName(archive),
+      toolVersion=archiveDirName.split("-", 1)[1],
+      checksum=checksums.get(archive, None)))
+  sourceDownloads.append(SourceDownload(gccDir+"-ucontext-patch",
+    gccUcontextPatchUrl, prereqDir, fileName=gccUcontextPatchFileName,
+    toolName="gcc", toolVersion=gccVersion))
+  return sourceDownloads
+
+
+#
+# Download all of the sources for the selected tools into a prefetch bundle
+#
+def writePrefetchBundle(variants, commonToolsSelectedSet, inOptions,
+  sourceCache, sourceMirror \
+  ):
+
+  sourceDownloads = getVariantsSourceDownloads(variants,
+    commonToolsSelectedSet, inOptions)
+  logDir = os.path.join(scratch_dir, "logs")
+  downloadResults = downloadSources(sourceDownloads,
+    int(inOptions.downloadJobs), logDir, inOptions.skipOp, sourceCache,
+    sourceMirror, getDownloadStampDir(), inOptions.ignoreStamps)
+
+  # The GCC prerequisites are listed in the GCC sources so they can only be
+  # downloaded after GCC
+  gccPrerequisites = {}
+  for gccVersion in getSelectedGccVersions(variants):
+    gccDir = "gcc-"+gccVersion
+    if not downloadResults[gccDir][0]:
+      continue
+    (archives, checksums) = getGccPrerequisites(gccVersion, inOptions)
+    print("\nGCC prerequisites for "+gccDir+": "+str(archives))
+    gccPrerequisites[gccVersion] = archives
+    prereqDownloads = getGccPrerequisiteDownloads(gccVersion, archives,
+      checksums)
+    downloadResults.update(downloadSources(prereqDownloads,
+      int(inOptions.downloadJobs), logDir, inOptions.skipOp, sourceCache,
+      sourceMirror, getDownloadStampDir(), inOptions.ignoreStamps))
+    sourceDownloads.extend(prereqDownloads)
+
+  if printDownloadSummary(downloadResults):
+    raise Exception("Error, not all of the sources could be downloaded" \
+      " for the prefetch bundle!")
+
+  print("\nWriting the prefetch bundle '"+inOptions.prefetchBundle+"' ...")
+  if not inOptions.skipOp:
+    manifest = writeSourceBundle(inOptions.prefetchBundle, sourceDownloads,
+      variants[0].versionList, gccPrerequisites,
+      os.path.join(scratch_dir, "prefetch-bundle"))
+    print("\nWrote "+str(len(manifest["sources"]))+" sources to '" \
+      +inOptions.prefetchBundle+"'")
 
 
 #
 # Install downloaded tool from source
 #
-def installToolFromSource(toolName, toolVer, installBaseDir,
+# The install-<tool>.py script is not run through its command-line.  Its
+# driver is run with InstallProgramDriver.run() in a worker of the driver pool
+# of the scheduler (see InstallTask.runInstallDriver()) so that it gets its
+# own working dir, env and log output while the other tasks run.  The task
+# must be created with usesInstallDriver=True.
+#
+
+def installToolFromSource(task, toolName, toolVer, installBaseDir,
   extraEnv, inOptions \
   ):
 
@@ -578,29 +1357,1248 @@ def installToolFromSource(toolName, toolVer, installBaseDir,
 
   print("\nInstalling " + toolDir + " ...")
 
-  outFile = toolDir+"-install.log"
-  workingDir=scratch_dir
   toolInstallDir = installBaseDir+"/"+toolDir
 
-  cmnd = devtools_install_dir+"/install-"+toolName+".py" \
-    +" --"+toolName+"-version="+toolVer \
-    +" --untar --configure --build --install --show-final-instructions" \
-    +" --install-dir="+toolInstallDir \
-    +" --parallel="+inOptions.parallelLevel \
-    +" --install-owner="+inOptions.installOwner \
-    +" --install-group="+inOptions.installGroup
-  if inOptions.installForAll:
-    cmnd += "  --install-for-all"
-  print("Executing command: " + cmnd)
+  driverOptions = {
+    "version" : toolVer,
+    "untar" : True,
+    "configure" : True,
+    "build" : True,
+    "install" : True,
+    "showFinalInstructions" : True,
+    "installDir" : toolInstallDir,
+    "parallel" : str(task.numProcs),
+    "installOwner" : inOptions.installOwner,
+    "installGroup" : inOptions.installGroup,
+    "installForAll" : inOptions.installForAll,
+    "ignoreStamps" : inOptions.ignoreStamps,
+    }
+  if inOptions.compilerCache:
+    driverOptions["compilerCache"] = getCompilerCache(inOptions).cacheDir
+  if inOptions.buildInMemory:
+    driverOptions["buildInMemory"] = True
+    driverOptions["buildInMemoryDir"] = inOptions.buildInMemoryDir
+  if task.timeline:
+    driverOptions["timelineFile"] = task.timeline.timelineFile
+    driverOptions["timelineRunId"] = task.timeline.runId
+  task.runInstallDriver(toolName, driverOptions, extraEnv)
+  print("Completed installing " + toolDir + " ...")
+
+
+#
+# Extract the source tarball of a tool in its scratch dir (unless it was
+# already extracted while it was downloading)
+#
+def untarSource(task, tarball):
+  tarballPath = os.path.join(task.scratchDir, tarball)
+  if not task.skipOp and wasExtractedWhileDownloading(tarballPath):
+    print("\n"+tarball+" was already extracted while it was downloading")
+    # The next untar (e.g. after a failed patch) extracts it again
+    os.remove(getExtractedStampFile(tarballPath))
+    return
+  task.extractTarball(tarball)
+
+
+#
+# Run the build of a tool with its build dir in memory for --build-in-memory
+# (if there is room)
+#
+def runToolBuild(task, inOptions, toolName, buildDir, buildFunc):
+  if not inOptions.buildInMemory:
+    buildFunc()
+    return
+  if inOptions.skipOp:
+    print("\nSetting up the build dir '"+buildDir+"' for "+toolName+" in" \
+      " '"+inOptions.buildInMemoryDir+"' if there is room ...")
+    buildFunc()
+    return
+  runInMemoryBuild(buildDir, toolName, inOptions.buildInMemoryDir,
+    task.numProcs*getToolMemPerJobMb(toolName), buildFunc)
+
+
+#
+# Get the directories of the dev env install (the env files of a --matrix
+# variant go in env/<variant>/)
+#
+def getDevEnvDirs(devEnvBaseDir, gccVersion, variantName=""):
+  devEnvDirs = dict()
+  devEnvDirs["base"] = devEnvBaseDir
+  devEnvDirs["variant"] = variantName
+  devEnvDirs["commonTools"] = os.path.join(devEnvBaseDir, "common_tools")
+  devEnvDirs["compilerToolsetBase"] = \
+    os.path.join(devEnvBaseDir, "gcc-"+gccVersion)
+  devEnvDirs["compilerToolset"] = \
+    os.path.join(devEnvDirs["compilerToolsetBase"], "toolset")
+  devEnvDirs["env"] = os.path.join(devEnvBaseDir, "env")
+  if variantName:
+    devEnvDirs["env"] = os.path.join(devEnvDirs["env"], variantName)
+  return devEnvDirs
+
+
+#
+# Get the name of a dir under <dev_env_base>/images/ for the variant
+#
+def getImageDirName(devEnvDirs, imageName):
+  if devEnvDirs["variant"]:
+    return imageName+"-"+devEnvDirs["variant"]
+  return imageName
+
+
+#
+# A compiler toolset (GCC and an MPI) to install along with the TPLs built
+# with it.  Without --matrix, there is just the one from --compiler-toolset.
+# With --matrix, there is one for each --matrix=<toolset>, named
+# gcc-<gcc-version>.  The install tasks of a variant for its MPI and TPLs
+# then get the suffix @<variant> (see addInstallTasks()) and its env files go
+# in env/<variant>/.
+#
+class CompilerToolsetVariant:
+
+  def __init__(self, compilerToolset, versionList, devEnvBaseDir, isMatrix):
+    self.compilerToolset = compilerToolset
+    if compilerToolset == "all":
+      compilerToolset = ",".join(compilerToolsetArray)
+    self.compilerToolsetSelected = \
+      getToolsSelectedArray(compilerToolset, compilerToolsetArray)
+    self.compilerToolsetSelectedSet = set(self.compilerToolsetSelected)
+    self.versionList = dict(versionList)
+    for toolName in compilerToolset.split(','):
+      if "gcc" in toolName and ':' in toolName:
+        self.versionList["gcc"] = toolName.split(':')[1]
+      elif "mpich" in toolName and ':' in toolName:
+        self.versionList["mpich"] = toolName.split(':')[1]
+      elif "mvapich" in toolName and ':' in toolName:
+        self.versionList["mvapich"] = toolName.split(':')[1]
+    # NOTE: MPICH is installed if both are selected (see addInstallTasks())
+    self.mvapichInstalled = "mvapich" in self.compilerToolsetSelectedSet \
+      and not "mpich" in self.compilerToolsetSelectedSet
+    self.name = "gcc-"+self.versionList["gcc"]
+    # Set to its VeraTplsBuild (if any) by addInstallTasks() in main()
+    self.tplsBuild = None
+    # Set to the names of the install tasks it needs (including the common
+    # tools) in main()
+    self.installTaskNames = []
+    if isMatrix:
+      self.taskNameSuffix = "@"+self.name
+      self.devEnvDirs = getDevEnvDirs(devEnvBaseDir, self.versionList["gcc"],
+        self.name)
+    else:
+      self.taskNameSuffix = ""
+      self.devEnvDirs = getDevEnvDirs(devEnvBaseDir, self.versionList["gcc"])
+
+
+#
+# Get the compiler toolset variants to install
+#
+def getCompilerToolsetVariants(inOptions, versionList):
+  if not inOptions.matrix:
+    return [CompilerToolsetVariant(inOptions.compilerToolset, versionList,
+      inOptions.installDir, False)]
+  variants = []
+  for compilerToolset in inOptions.matrix:
+    variant = CompilerToolsetVariant(compilerToolset, versionList,
+      inOptions.installDir, True)
+    for otherVariant in variants:
+      if otherVariant.name == variant.name:
+        raise Exception("Error, the --matrix toolsets" \
+          " '"+otherVariant.compilerToolset+"' and" \
+          " '"+variant.compilerToolset+"' both use "+variant.name+" and so" \
+          " would install their TPLs into the same "+variant.name+"/tpls/!" \
+          "  Install one of them with a different --install-dir.")
+    variants.append(variant)
+  return variants
+
+
+#
+# Write the module files
+#
+
+# The env of each TPL: (TPL, env var, install dir base name, subdirs added to
+# the path env vars).  BLAS is installed with LAPACK.
+tplEnvArray = [
+  ("hdf5", "HDF5_ROOT", "hdf5", ["bin", "lib", "include"]),
+  ("blas", "BLAS_ROOT", "lapack", ["lib"]),
+  ("lapack", "LAPACK_DIR", "lapack", ["lib"]),
+  ("hypre", "HYPRE_DIR", "hypre", ["lib"]),
+  ("petsc", "PETSC_DIR", "petsc", ["bin", "lib"]),
+  ("slepc", "SLEPC_DIR", "slepc", ["lib"]),
+  ("sundials", "SUNDIALS_DIR", "sundials", ["lib"]),
+  ]
+
+tplPathEnvVarNames = {"bin" : "PATH", "lib" : "LD_LIBRARY_PATH",
+  "include" : "INCLUDE"}
+
+
+#
+# Get the TPL install dirs of the installed TPLs (see getInstalledTpls()) as
+# a list of (dir name, env vars, subdirs)
+#
+def getTplEnvDirs(tplsSelectedSet, versionList):
+  installedTpls = getInstalledTpls(tplsSelectedSet)
+  tplEnvDirs = []
+  for (tplName, envVarName, tplDirBaseName, subDirs) in tplEnvArray:
+    if not tplName in installedTpls:
+      continue
+    tplDirName = tplDirBaseName + "-" + versionList[tplName]
+    if tplEnvDirs and tplEnvDirs[-1][0] == tplDirName:
+      tplEnvDirs[-1][1].append(envVarName)
+    else:
+      tplEnvDirs.append((tplDirName, [envVarName], subDirs))
+  return tplEnvDirs
+
+
+def writeCMakeModuleFile(devEnvDirs, cmake_version):
+  cmake_module = open(devEnvDirs["env"] + "/cmake-" + cmake_version, 'w+')
+  cmake_module.write("#%Module\n\n")
+  cmake_module.write("set version " + cmake_version + "\n")
+  cmake_module.write('set name "MPACT Development Environment - 2.1.0"\n')
+  cmake_module.write('set msg "Loads the development environment for MPACT."\n')
+  cmake_module.write('\n')
+  cmake_module.write("procs ModulesHelp { } {\n")
+  cmake_module.write(" puts stderr $msg }\n\n")
+  cmake_module.write("module-whatis $msg\n")
+  cmake_module.write(devEnvDirs["commonTools"] + "cmake-$version/bin\n")
+  cmake_module.close()
+
+
+def writeGccModuleFile(devEnvDirs, versionList, tplsSelectedSet,
+  mvapichInstalled \
+  ):
+  gcc_module = open(devEnvDirs["env"] + "/gcc-" + versionList["gcc"], 'w+')
+  gcc_module.write("#%Module\n\n")
+  gcc_module.write("set root " + devEnvDirs["base"] + "\n")
+  gcc_module.write("set version gcc-" + versionList["gcc"] + "\n")
+  gcc_module.write("set tpldir " + devEnvDirs["compilerToolsetBase"] + "/tpls\n")
+  gcc_module.write('set name "MPACT Development Environment - $version"\n')
+  gcc_module.write('set msg "Loads the development environment for MPACT."\n')
+  gcc_module.write('proc ModulesHelp { } {\n')
+  gcc_module.write(" puts stderr $msg }\n")
+  gcc_module.write("module-whatis $msg\n")
+  if not mvapichInstalled:
+    gcc_module.write("if ![ is-loaded 'mpi/mpich-" + versionList["mpich"] + "-x86_64' ] {\n")
+    gcc_module.write(" module load mpi/mpich-" + versionList["mpich"] + "-x86_64 }\n")
+  else:
+    gcc_module.write("if ![ is-loaded 'mpi/mvapich-" + versionList["mvapich"] + "-x86_64' ] {\n")
+    gcc_module.write(" module load mpi/mvapich-" + versionList["mvapich"] + "-x86_64 }\n")
+  gcc_module.write("setenv TRIBITS_DEV_ENV_BASE          $root\n")
+  gcc_module.write("setenv TRIBITS_DEV_ENV_GCC_VERSION   $version\n")
+  gcc_module.write("setenv TRIBITS_DEV_ENV_COMPILER_BASE $root/$version\n")
+  gcc_module.write("setenv TRIBITS_DEV_ENV_MPICH_DIR     $env(MPI_HOME)\n")
+  gcc_module.write("setenv LOADED_TRIBITS_DEV_ENV        $version\n")
+  gcc_module.write("setenv LOADED_VERA_DEV_ENV        $version\n")
+  gcc_module.write("prepend-path PATH $root/common_tools\n")
+  for (tplDirName, envVarNames, subDirs) in \
+    getTplEnvDirs(tplsSelectedSet, versionList) \
+    :
+    gcc_module.write("set tplpath $tpldir/" + tplDirName + "\n")
+    for envVarName in envVarNames:
+      gcc_module.write("setenv %-21s $tplpath\n" % envVarName)
+    for subDir in subDirs:
+      gcc_module.write("prepend-path %-15s $tplpath/%s\n" %
+        (tplPathEnvVarNames[subDir], subDir))
+  gcc_module.write("set-alias gitdist-status     {gitdist dist-repo-status}\n")
+  gcc_module.write("set-alias gitdist-mod        {gitdist --dist-mod-only}\n")
+  gcc_module.close()
+
+
+def writeMpichModuleFile(devEnvDirs, mpich_version):
+  mpich_dir = devEnvDirs["compilerToolset"] + "/mpich-" + mpich_version
+  mpich_module = open(devEnvDirs["env"] + "/mpich-" + mpich_version, 'w+')
+  mpich_module.write("#%Module\n\n")
+  mpich_module.write("conflict mvapich\n")
+  mpich_module.write("prepend-path            PATH            "+mpich_dir+"/bin\n")
+  mpich_module.write("prepend-path            LD_LIBRARY_PATH "+mpich_dir+"/lib\n")
+  #mpich_module.write("prepend-path            PYTHONPATH      /usr/lib64/python2.7/site-packages/mpich\n")
+  #mpich_module.write("prepend-path            MANPATH         /usr/share/man/mpich-x86_64\n")
+  mpich_module.write("prepend-path            PKG_CONFIG_PATH "+mpich_dir+"/lib/pkgconfig\n")
+  mpich_module.write("setenv                  MPI_BIN         "+mpich_dir+"/bin\n")
+  #mpich_module.write("setenv                  MPI_SYSCONFIG   /etc/mpich-x86_64\n")
+  #mpich_module.write("setenv                  MPI_FORTRAN_MOD_DIR     /usr/lib64/gfortran/modules/mpich-x86_64\n")
+  mpich_module.write("setenv                  MPI_INCLUDE     "+mpich_dir+"/include\n")
+  mpich_module.write("setenv                  MPI_LIB         "+mpich_dir+"/lib\n")
+  #mpich_module.write("setenv                  MPI_MAN         /usr/share/man/mpich-x86_64\n")
+  #mpich_module.write("setenv                  MPI_PYTHON_SITEARCH     /usr/lib64/python2.7/site-packages/mpich\n")
+  mpich_module.write("setenv                  MPI_COMPILER    mpiexec\n")
+  mpich_module.write("setenv                  MPI_SUFFIX      _mpich\n")
+  mpich_module.write("setenv                  MPI_HOME        "+mpich_dir+"\n")
+  mpich_module.close()
+
+
+def writeMvapichModuleFile(devEnvDirs, mvapich_version):
+  mvapich_module = open(devEnvDirs["env"] + "/mvapich-" + mvapich_version, 'w+')
+  mvapich_module.write("conflict mpich\n")
+  mvapich_module.write("prepend-path            PATH            /usr/lib64/mvapich2/bin\n")
+  mvapich_module.write("prepend-path            LD_LIBRARY_PATH /usr/lib64/mvapich2/lib\n")
+  mvapich_module.write("prepend-path            PYTHONPATH      /usr/lib64/python2.7/site-packages/mvapich2\n")
+  mvapich_module.write("prepend-path            MANPATH         /usr/share/man/mvapich2-x86_64\n")
+  mvapich_module.write("prepend-path            PKG_CONFIG_PATH /usr/lib64/mvapich2/lib/pkgconfig\n")
+  mvapich_module.write("setenv                  MPI_BIN         /usr/lib64/mvapich2/bin\n")
+  mvapich_module.write("setenv                  MPI_SYSCONFIG   /etc/mvapich2-x86_64\n")
+  mvapich_module.write("setenv                  MPI_FORTRAN_MOD_DIR     /usr/lib64/gfortran/modules/mvapich2-x86_64\n")
+  mvapich_module.write("setenv                  MPI_INCLUDE     /usr/include/mvapich2-x86_64\n")
+  mvapich_module.write("setenv                  MPI_LIB         /usr/lib64/mvapich2/lib\n")
+  mvapich_module.write("setenv                  MPI_MAN         /usr/share/man/mvapich2-x86_64\n")
+  mvapich_module.write("setenv                  MPI_PYTHON_SITEARCH     /usr/lib64/python2.7/site-packages/mvapich2")
+  mvapich_module.write("setenv                  MPI_COMPILER    mvapich2-x86_64\n")
+  mvapich_module.write("setenv                  MPI_SUFFIX      _mvapich2\n")
+  mvapich_module.write("setenv                  MPI_HOME        /usr/lib64/mvapich2")
+  mvapich_module.close()
+
+
+#
+# Get the values of MPI_COMPILER and MPI_SUFFIX that the MPI module file sets
+#
+def getMpiCompilerAndSuffix(mvapichInstalled):
+  if mvapichInstalled:
+    return ("mvapich2-x86_64", "_mvapich2")
+  return ("mpiexec", "_mpich")
+
+
+#
+# Get the env of the installed dev env as the env operations of the module
+# files (see EnvSnapshot.py).  This is what loading the gcc-<ver> module
+# (which loads the MPI module) and sourcing load_dev_env.sh give.
+#
+def getDevEnvSnapshotOps(devEnvDirs, versionList, tplsSelectedSet,
+  mvapichInstalled \
+  ):
+  gccDir = devEnvDirs["compilerToolset"] + "/gcc-" + versionList["gcc"]
+  tplsDir = devEnvDirs["compilerToolsetBase"] + "/tpls"
+  if mvapichInstalled:
+    mpiDir = devEnvDirs["compilerToolset"] + "/mvapich-" + \
+      versionList["mvapich"]
+  else:
+    mpiDir = devEnvDirs["compilerToolset"] + "/mpich-" + versionList["mpich"]
+  (mpiCompiler, mpiSuffix) = getMpiCompilerAndSuffix(mvapichInstalled)
+  envOps = [
+    ("setenv", "TRIBITS_DEV_ENV_BASE", devEnvDirs["base"]),
+    ("prepend-path", "PATH", devEnvDirs["commonTools"]),
+    ("prepend-path", "PATH", devEnvDirs["commonTools"] + "/cmake-" +
+      versionList["cmake"] + "/bin"),
+    ("prepend-path", "PATH", devEnvDirs["commonTools"] + "/autoconf-" +
+      versionList["autoconf"] + "/bin"),
+    ("setenv", "TRIBITS_DEV_ENV_GCC_VERSION", "gcc-" + versionList["gcc"]),
+    ("setenv", "TRIBITS_DEV_ENV_COMPILER_BASE",
+      devEnvDirs["compilerToolsetBase"]),
+    ("setenv", "TRIBITS_DEV_ENV_GCC_DIR", gccDir),
+    ("prepend-path", "PATH", gccDir + "/bin"),
+    ("prepend-path", "LD_LIBRARY_PATH", gccDir + "/lib64"),
+    ("setenv", "TRIBITS_DEV_ENV_MPICH_DIR", mpiDir),
+    ("prepend-path", "PATH", mpiDir + "/bin"),
+    ("prepend-path", "LD_LIBRARY_PATH", mpiDir + "/lib"),
+    ("prepend-path", "PKG_CONFIG_PATH", mpiDir + "/lib/pkgconfig"),
+    ("setenv", "MPI_BIN", mpiDir + "/bin"),
+    ("setenv", "MPI_INCLUDE", mpiDir + "/include"),
+    ("setenv", "MPI_LIB", mpiDir + "/lib"),
+    ("setenv", "MPI_COMPILER", mpiCompiler),
+    ("setenv", "MPI_SUFFIX", mpiSuffix),
+    ("setenv", "MPI_HOME", mpiDir),
+    ("setenv", "LOADED_TRIBITS_DEV_ENV", "gcc-" + versionList["gcc"]),
+    ("setenv", "LOADED_VERA_DEV_ENV", "gcc-" + versionList["gcc"]),
+    ]
+  for (tplDirName, envVarNames, subDirs) in \
+    getTplEnvDirs(tplsSelectedSet, versionList) \
+    :
+    tplDir = tplsDir + "/" + tplDirName
+    for envVarName in envVarNames:
+      envOps.append(("setenv", envVarName, tplDir))
+    for subDir in subDirs:
+      envOps.append(("prepend-path", tplPathEnvVarNames[subDir],
+        tplDir + "/" + subDir))
+  return envOps
+
+
+#
+# Write the flattened env snapshot files <base>_snapshot.[sh,csh] of the
+# installed dev env (see EnvSnapshot.py)
+#
+def writeDevEnvSnapshotFiles(devEnvDirs, inOptions, versionList,
+  tplsSelectedSet, mvapichInstalled \
+  ):
+  if not os.path.exists(devEnvDirs["env"]):
+    os.makedirs(devEnvDirs["env"])
+  writeEnvSnapshotFiles(
+    getDevEnvSnapshotOps(devEnvDirs, versionList, tplsSelectedSet,
+      mvapichInstalled),
+    os.path.join(devEnvDirs["env"],
+      inOptions.loadDevEnvFileBaseName+"_snapshot"),
+    "Flattened env snapshot of the MPACT dev env gcc-"+versionList["gcc"] \
+      +" (no module loads)")
+
+
+#
+# Write the runtime image files images/runtime/Dockerfile[.dockerignore] (or
+# images/runtime-<variant>/ for a --matrix toolset) for the trees installed
+# under the install dir (see RuntimeImage.py)
+#
+def writeRuntimeImage(devEnvDirs, inOptions, versionList, tplsSelectedSet,
+  mvapichInstalled \
+  ):
+  (setVars, prependPaths) = flattenEnvOps(
+    getDevEnvSnapshotOps(devEnvDirs, versionList, tplsSelectedSet,
+      mvapichInstalled))
+  trees = getRuntimeImageTrees(devEnvDirs["base"], versionList["gcc"],
+    os.path.relpath(devEnvDirs["env"], devEnvDirs["base"]))
+  writeRuntimeImageFiles(getRuntimeImageDir(devEnvDirs),
+    getRuntimeImageDockerfileStr(devEnvDirs["base"], trees, setVars,
+      prependPaths, os.path.join(devEnvDirs["env"],
+        inOptions.loadDevEnvFileBaseName+"_snapshot")),
+    getRuntimeImageDockerignoreStr(trees))
+
+
+def getRuntimeImageDir(devEnvDirs):
+  return os.path.join(devEnvDirs["base"], "images",
+    getImageDirName(devEnvDirs, "runtime"))
+
+
+#
+# Install tasks run by the InstallScheduler (see addInstallTasks())
+#
+# Each task is broken into stages with task.runStage() so that a re-run only
+# redoes the stages that failed or whose inputs changed.  The inputs of the
+# build stages leave out the number of processes since that does not change
+# what is built.
+#
+
+def installGitdistTask(task, versionList, devEnvDirs, inOptions):
+  print("\nInstalling gitdist ...")
+  gitdistFile = pythonUtilsDir+"/gitdist"
+  def install():
+    task.runCmnd("cp "+gitdistFile+" "+devEnvDirs["commonTools"]+"/")
+    if not inOptions.skipOp:
+      InstallProgramDriver.fixupInstallPermissions(inOptions,
+        devEnvDirs["commonTools"])
+  task.runStage("install",
+    {"sha256" : getFileSha256(gitdistFile), "dir" : devEnvDirs["commonTools"]},
+    install, outputPath=devEnvDirs["commonTools"]+"/gitdist")
+
+
+def installAutoconfTask(task, versionList, devEnvDirs, inOptions):
+  print("Installing from source (autoconf)")
+  autoconfInstallDir = devEnvDirs["commonTools"] + "/autoconf-" + \
+    versionList["autoconf"]
+  runCachedInstall(task, inOptions, "autoconf", versionList["autoconf"],
+    autoconfInstallDir, "", getHostCompilers(),
+    lambda: task.runStage("install", getStdStageEnvInputs(),
+      lambda: installToolFromSource(task, "autoconf", versionList["autoconf"],
+        devEnvDirs["commonTools"], None, inOptions ),
+      outputPath=autoconfInstallDir))
+  print("Installing autoconf complete")
+
+
+def installCMakeTask(task, versionList, devEnvDirs, inOptions):
+  cmake_version = versionList["cmake"]
+  cmakeSrcDir = task.scratchDir + "/cmake-" + cmake_version
+  cmakeBuildDir = task.scratchDir + "/cmake-build"
+  cmakeInstallDir = devEnvDirs["commonTools"] + "/cmake-" + cmake_version
+  # Force the code to compile with ssl to avoid errors in subsequent make
+  configureFlags = "-DCMAKE_USE_OPENSSL=ON" \
+    " -DCMAKE_INSTALL_PREFIX=" + cmakeInstallDir + "/"
+  configureCmnd = "cmake " + cmakeSrcDir + " " + configureFlags
+  cmakeEnv = None
+  compilerCache = getCompilerCache(inOptions)
+  if compilerCache:
+    configureCmnd += compilerCache.getCMakeLauncherOptions()
+    cmakeEnv = compilerCache.getCcacheEnv()
+  def build():
+    def untar():
+      untarSource(task, "cmake-" + cmake_version + ".tar.gz")
+      task.runCmnd("yum install openssl-devel", throwExcept=False)
+    task.runStage("untar", {}, untar, outputPath=cmakeSrcDir)
+    print("CUSTOM DEVIATION FROM DEVENV SETUP: OPENSSL")
+    def configure():
+      task.runCmnd("mkdir -p " + cmakeBuildDir)
+      task.runCmnd(configureCmnd, workingDir=cmakeBuildDir, extraEnv=cmakeEnv)
+    task.runStage("configure",
+      {"cmnd" : configureCmnd, "env" : getStdStageEnvInputs()}, configure,
+      outputPath=cmakeBuildDir + "/CMakeCache.txt")
+    task.runStage("install", {},
+      lambda: task.runCmnd("make" + task.getParallelOpt("-j") + " install",
+        workingDir=cmakeBuildDir, extraEnv=cmakeEnv),
+      outputPath=cmakeInstallDir)
+  # CMake finds its modules relative to the executable
+  runCachedInstall(task, inOptions, "cmake", cmake_version, cmakeInstallDir,
+    configureFlags, getHostCompilers(),
+    lambda: runToolBuild(task, inOptions, "cmake", cmakeBuildDir, build),
+    relocatable=True)
+  if not inOptions.skipOp:
+    writeCMakeModuleFile(devEnvDirs, cmake_version)
+
+
+def installGccTask(task, versionList, devEnvDirs, inOptions, tplsSelectedSet,
+  mvapichInstalled \
+  ):
+  gcc_version = versionList["gcc"]
+  gccSrcDir = task.scratchDir + "/gcc-" + gcc_version
+  gccBuildDir = task.scratchDir + "/gcc-build"
+  gccInstallDir = devEnvDirs["compilerToolset"] + "/gcc-" + gcc_version
+  prereqDir = task.scratchDir + "/prerequisites"
+  configureFlags = "--disable-libsanitizer --disable-multilib" \
+    " --prefix=" + gccInstallDir + " --enable-languages=c,c++,fortran"
+  # NOTE: GCC does not record the compilers it was built with so they can be
+  # run through ccache in the env (this only speeds up stage 1)
+  gccEnv = None
+  if getCompilerCache(inOptions):
+    gccEnv = getCompilerCache(inOptions).getEnv()
+  def build():
+    def untar():
+      print("unpacking gcc-" + gcc_version + ".tar.gz...")
+      untarSource(task, "gcc-" + gcc_version + ".tar.gz")
+      # The prerequisites were downloaded (or restored from the source cache
+      # or the mirror) in the download step
+      archives = getGccPrerequisites(gcc_version, inOptions)[0]
+      if task.skipOp or \
+        (archives and haveGccPrerequisites(prereqDir, archives)) \
+        :
+        print("unpacking gcc prerequisites from " + prereqDir + "...")
+        installGccPrerequisites(task, gccSrcDir, prereqDir, archives)
+      else:
+        print("downloading gcc prerequisites...")
+        task.runCmnd("./contrib/download_prerequisites", workingDir=gccSrcDir)
+      print("CUSTOM DEVIATION FROM STD DEVENV SETUP:")
+      print("Apply patch to gcc source (struct ucontext vs ucontext_t)")
+      if task.skipOp or \
+        os.path.exists(prereqDir + "/" + gccUcontextPatchFileName) \
+        :
+        task.runCmnd("cp " + prereqDir + "/" + gccUcontextPatchFileName + " .",
+          workingDir=gccSrcDir, throwExcept=False)
+      else:
+        task.runCmnd("wget -O " + gccUcontextPatchFileName + " '" +
+          gccUcontextPatchUrl + "'", workingDir=gccSrcDir, throwExcept=False)
+      task.runCmnd("patch -f -p1 < compiler.patch", workingDir=gccSrcDir,
+        throwExcept=False)
+    task.runStage("untar", {}, untar, outputPath=gccSrcDir)
+    print("configuring gcc...")
+    print("CUSTOM DEVIATION FROM STD DEVENV SETUP:")
+    print("Disabling libsanitizer")
+    configureCmnd = gccSrcDir + "/configure " + configureFlags
+    def configure():
+      task.runCmnd("mkdir -p " + gccBuildDir)
+      task.runCmnd(configureCmnd, workingDir=gccBuildDir, extraEnv=gccEnv)
+    task.runStage("configure",
+      {"cmnd" : configureCmnd, "env" : getStdStageEnvInputs()}, configure,
+      outputPath=gccBuildDir + "/Makefile")
+    print("building gcc...")
+    task.runStage("build", {},
+      lambda: task.runCmnd("make" + task.getParallelOpt("-j"),
+        workingDir=gccBuildDir, extraEnv=gccEnv))
+    task.runStage("install", {},
+      lambda: task.runCmnd("make install", workingDir=gccBuildDir),
+      outputPath=gccInstallDir)
+  # GCC finds its own files relative to the executables
+  runCachedInstall(task, inOptions, "gcc", gcc_version, gccInstallDir,
+    configureFlags, getHostCompilers(),
+    lambda: runToolBuild(task, inOptions, "gcc", gccBuildDir, build),
+    relocatable=True)
   if not inOptions.skipOp:
-    echoRunSysCmnd(cmnd, workingDir=workingDir, outFile=outFile, timeCmnd=True,
-      extraEnv=extraEnv)
+    writeGccModuleFile(devEnvDirs, versionList, tplsSelectedSet,
+      mvapichInstalled)
+
+
+#
+# Get the make vars and env to run the compilers of an autotools build through
+# the compiler cache at build time (or empty if there is no compiler cache)
+#
+def getCompilerCacheMakeVars(inOptions):
+  compilerCache = getCompilerCache(inOptions)
+  if not compilerCache:
+    return ("", None)
+  return (compilerCache.getMakeVarsStr(), compilerCache.getCcacheEnv())
+
+
+#
+# Copy the downloaded source of a tool into the scratch dir of the task if
+# that is not where it was downloaded to (e.g. the MPI of a --matrix toolset
+# which is built in tools/<tool>-<ver>@<variant>/ from the one download in
+# tools/<tool>-<ver>/)
+#
+def copySharedSource(task, toolDir, sourceFileName):
+  sharedDir = getToolScratchDir(toolDir)
+  if os.path.abspath(task.scratchDir) == os.path.abspath(sharedDir):
+    return
+  task.runStage("source", {"source" : sharedDir + "/" + sourceFileName},
+    lambda: task.runCmnd("rm -rf " + sourceFileName + " && cp -r " + \
+      sharedDir + "/" + sourceFileName + " ."),
+    outputPath=task.scratchDir + "/" + sourceFileName)
+
+
+def assertGccInstalled(devEnvDirs, versionList, inOptions):
+  gccInstallDir = devEnvDirs["compilerToolset"]+"/gcc-"+versionList["gcc"]
+  if not os.path.exists(gccInstallDir) and not inOptions.skipOp:
+    raise Exception("Error, gcc has not been installed yet." \
+      "  Missing directory '"+gccInstallDir+"'")
+  return gccInstallDir
+
+
+#
+# Run the benchmark of a newly installed MPI and compare it to its baseline
+# (see MpiBenchmark.py)
+#
+def runMpiBenchmark(task, inOptions, versionList, mpiName, mpiVersion, mpiDir,
+  mpiEnv \
+  ):
+  if inOptions.mpiBenchmark == "off":
+    return
+  benchmarkDir = task.scratchDir + "/mpi-benchmark"
+  resultsFile = benchmarkDir + "/results.json"
+  sourceFile = os.path.join(devtools_install_dir, mpiBenchmarkSourceFileName)
+  numRanks = int(inOptions.mpiBenchmarkRanks)
+  tolerance = float(inOptions.mpiBenchmarkTolerance)
+  def benchmark():
+    task.runCmnd("rm -rf " + benchmarkDir + " && mkdir -p " + benchmarkDir)
+    task.runCmnd("cp " + sourceFile + " . && " + mpiDir + "/bin/mpicc -O2" \
+      " -o mpi_benchmark " + mpiBenchmarkSourceFileName,
+      workingDir=benchmarkDir, extraEnv=mpiEnv)
+    # NOTE: The timeout is for an MPI that hangs instead of failing
+    task.runCmnd("timeout 600 " + mpiDir + "/bin/mpiexec -n " + \
+      str(numRanks) + " ./mpi_benchmark > mpi_benchmark.out",
+      workingDir=benchmarkDir, extraEnv=mpiEnv)
+    if task.skipOp:
+      return
+    results = parseMpiBenchmarkOutput(
+      readStrFromFile(benchmarkDir + "/mpi_benchmark.out"))
+    key = getMpiBenchmarkKey(mpiName, mpiVersion, versionList["gcc"],
+      numRanks)
+    (baseline, regressions) = checkMpiBenchmarkResults(
+      inOptions.mpiBenchmarkBaselineFile, key, results, tolerance)
+    print("\nMPI benchmark of " + mpiName + "-" + mpiVersion + " (" + key + \
+      "):\n\n" + getBenchmarkReportStr(results, baseline))
+    if not baseline:
+      print("Recorded as the baseline in '" + \
+        inOptions.mpiBenchmarkBaselineFile + "'")
+    writeMpiBenchmarkResultsFile(resultsFile, key, results, baseline,
+      regressions)
+    if regressions:
+      regressionsStr = "The MPI benchmark of " + mpiName + "-" + \
+        mpiVersion + " regressed from its baseline by more than" \
+        " --mpi-benchmark-tolerance=" + inOptions.mpiBenchmarkTolerance + \
+        ":\n\n  " + "\n  ".join(regressions)
+      if inOptions.mpiBenchmark == "fail":
+        raise Exception("Error, " + regressionsStr)
+      print("\nWARNING: " + regressionsStr)
+  # NOTE: The benchmark is not chained so that turning it on or off does not
+  # rebuild the TPLs
+  task.runStage("benchmark", {"mpiDir" : mpiDir, "numRanks" : numRanks,
+    "tolerance" : tolerance, "mode" : inOptions.mpiBenchmark,
+    "baselineFile" : inOptions.mpiBenchmarkBaselineFile,
+    "source" : getFileSha256(sourceFile)},
+    benchmark, outputPath=resultsFile, chained=False)
+
+
+#
+# Get the env to run the programs built with an installed MPI in
+#
+def getMpiRunEnv(mpiDir, gccInstallDir):
+  return {
+    "PATH" : mpiDir + "/bin" + os.pathsep + os.environ.get("PATH", ""),
+    "LD_LIBRARY_PATH" : prependPathVar(mpiDir + "/lib" + os.pathsep + \
+      gccInstallDir + "/lib64", "LD_LIBRARY_PATH"),
+    }
+
+
+#
+# Return True if the MPICH version is installed with the install-mpich.py
+# driver (and False if it is built directly from its tarball)
+#
+def isMpichInstalledWithDriver(mpich_version):
+  return mpich_version == "3.1.3"
+
+
+def installMpichTask(task, versionList, devEnvDirs, inOptions):
+  mpich_version = versionList["mpich"]
+  gccInstallDir = assertGccInstalled(devEnvDirs, versionList, inOptions)
+  mpich_dir = devEnvDirs["compilerToolset"] + "/mpich-" + mpich_version
+  LD_LIBRARY_PATH = os.environ.get("LD_LIBRARY_PATH", "")
+  if isMpichInstalledWithDriver(mpich_version):
+    mpichEnv = {
+      "CC" : gccInstallDir+"/bin/gcc",
+      "CXX" : gccInstallDir+"/bin/g++",
+      "FC" : gccInstallDir+"/bin/gfortran",
+      "LD_LIBRARY_PATH" : gccInstallDir+"/lib64:"+LD_LIBRARY_PATH
+      }
+    def install():
+      copySharedSource(task, "mpich-" + mpich_version,
+        "mpich-" + mpich_version + "-base")
+      task.runStage("install", getStdStageEnvInputs(mpichEnv),
+        lambda: installToolFromSource(
+          task,
+          "mpich",
+          mpich_version,
+          devEnvDirs["compilerToolset"],
+          mpichEnv,
+          inOptions
+          ),
+        outputPath=mpich_dir)
+    runCachedInstall(task, inOptions, "mpich", mpich_version, mpich_dir,
+      "--prefix=" + mpich_dir,
+      [mpichEnv["CC"], mpichEnv["CXX"], mpichEnv["FC"]], install)
   else:
-    print("\nRunning: " + cmnd)
-    print("\n  Running in working directory: " + workingDir)
-    print("\n  Appending environment: " + str(extraEnv))
-    print("\n  Writing console output to file " + outFile)
-  print("Completed installing " + toolDir + " ...")
+    mpichBuildDir = task.scratchDir + "/mpich-build"
+    configureFlags = "-prefix=" + mpich_dir
+    configureCmnd = task.scratchDir + "/mpich-" + mpich_version + \
+      "/configure " + configureFlags
+    (makeVars, makeEnv) = getCompilerCacheMakeVars(inOptions)
+    def build():
+      copySharedSource(task, "mpich-" + mpich_version,
+        "mpich-" + mpich_version + ".tar.gz")
+      task.runStage("untar", {},
+        lambda: untarSource(task, "mpich-" + mpich_version + ".tar.gz"),
+        outputPath=task.scratchDir + "/mpich-" + mpich_version)
+      def configure():
+        task.runCmnd("mkdir -p " + mpich_dir)
+        task.runCmnd("mkdir -p " + mpichBuildDir)
+        task.runCmnd(configureCmnd, workingDir=mpichBuildDir)
+      task.runStage("configure",
+        {"cmnd" : configureCmnd, "env" : getStdStageEnvInputs()}, configure,
+        outputPath=mpichBuildDir + "/Makefile")
+      task.runStage("build", {},
+        lambda: task.runCmnd("make" + task.getParallelOpt("-j") + makeVars,
+          workingDir=mpichBuildDir, extraEnv=makeEnv))
+      task.runStage("install", {},
+        lambda: task.runCmnd("make install", workingDir=mpichBuildDir),
+        outputPath=mpich_dir + "/bin")
+    # NOTE: The MPI compiler wrappers have the install dir hard-coded in them
+    runCachedInstall(task, inOptions, "mpich", mpich_version, mpich_dir,
+      configureFlags, getHostCompilers(),
+      lambda: runToolBuild(task, inOptions, "mpich", mpichBuildDir, build))
+  runMpiBenchmark(task, inOptions, versionList, "mpich", mpich_version,
+    mpich_dir, getMpiRunEnv(mpich_dir, gccInstallDir))
+  if not inOptions.skipOp:
+    writeMpichModuleFile(devEnvDirs, mpich_version)
+
+
+def installMvapichTask(task, versionList, devEnvDirs, inOptions):
+  mvapich_version = versionList["mvapich"]
+  gccInstallDir = assertGccInstalled(devEnvDirs, versionList, inOptions)
+  mvapichSrcDir = task.scratchDir + "/mvapich2-" + mvapich_version
+  mvapichDir = devEnvDirs["compilerToolset"] + "/mvapich-" + mvapich_version
+  configureFlags = "--prefix " + mvapichDir
+  configureCmnd = "./configure " + configureFlags
+  (makeVars, makeEnv) = getCompilerCacheMakeVars(inOptions)
+  def build():
+    copySharedSource(task, "mvapich-" + mvapich_version,
+      "mvapich2-" + mvapich_version + ".tar.gz")
+    def untar():
+      task.runCmnd("yum install libibverbs", throwExcept=False)
+      untarSource(task, "mvapich2-" + mvapich_version + ".tar.gz")
+    task.runStage("untar", {}, untar, outputPath=mvapichSrcDir)
+    task.runStage("configure",
+      {"cmnd" : configureCmnd, "env" : getStdStageEnvInputs()},
+      lambda: task.runCmnd(configureCmnd, workingDir=mvapichSrcDir),
+      outputPath=mvapichSrcDir + "/Makefile")
+    task.runStage("build", {},
+      lambda: task.runCmnd("make" + task.getParallelOpt("-j") + makeVars,
+        workingDir=mvapichSrcDir, extraEnv=makeEnv))
+    task.runStage("install", {},
+      lambda: task.runCmnd("make install", workingDir=mvapichSrcDir),
+      outputPath=mvapichDir)
+  runCachedInstall(task, inOptions, "mvapich", mvapich_version, mvapichDir,
+    configureFlags, getHostCompilers(), build)
+  runMpiBenchmark(task, inOptions, versionList, "mvapich", mvapich_version,
+    mvapichDir, getMpiRunEnv(mvapichDir, gccInstallDir))
+  if not inOptions.skipOp:
+    writeMvapichModuleFile(devEnvDirs, mvapich_version)
+
+
+#
+# The VERA TPLs are built by the CMake project vera_tpls/TPL_build as one
+# make target per TPL (an ExternalProject).  The project is configured by the
+# 'vera_tpls' task and then the 'vera_tpls-build' task builds all of the
+# selected TPLs with one 'make -j<n> <tpls>' so that make builds the TPLs that
+# do not depend on each other at the same time.  (Concurrent makes of the
+# targets in the shared build dir would race each other.)  The log and the
+# times of each TPL are then split out of the files of its ExternalProject
+# steps into logs/vera_tpls-<tpl>.log and the timeline as the node
+# vera_tpls-<tpl> that depends on the TPLs in tplBuildDepsArray (see
+# splitTplBuildLogs()).  The 'vera_tpls-finish' task adds the TPLs to the
+# binary cache.  The tasks share their state through a VeraTplsBuild object.
+#
+
+# The TPLs (make targets of TPL_build) and the TPLs each one needs.  BLAS is
+# built along with LAPACK.
+tplBuildDepsArray = [
+  ("hdf5", []),
+  ("lapack", []),
+  ("hypre", ["lapack"]),
+  ("sundials", ["lapack"]),
+  ("petsc", ["lapack", "hypre"]),
+  ("slepc", ["petsc"]),
+  ]
+
+
+def getTplTaskName(tplName, taskNameSuffix=""):
+  return "vera_tpls-" + tplName + taskNameSuffix
+
+
+def getTplBuildTarget(tplName):
+  if tplName == "blas":
+    return "lapack"
+  return tplName
+
+
+#
+# Get the TPL_build targets for the selected TPLs and the TPLs they need (in
+# build order)
+#
+def getTplBuildTargets(tplsSelectedSet):
+  tplBuildDeps = dict(tplBuildDepsArray)
+  buildTargets = set()
+  def addBuildTarget(buildTarget):
+    if not buildTarget in buildTargets:
+      buildTargets.add(buildTarget)
+      for dep in tplBuildDeps[buildTarget]:
+        addBuildTarget(dep)
+  for tplName in tplsSelectedSet:
+    addBuildTarget(getTplBuildTarget(tplName))
+  return [tplName for (tplName, tplDeps) in tplBuildDepsArray
+    if tplName in buildTargets]
+
+
+#
+# Get the TPLs (in TPLToolsetArray) that are installed for the selected TPLs
+#
+def getInstalledTpls(tplsSelectedSet):
+  buildTargets = getTplBuildTargets(tplsSelectedSet)
+  return [tplName for tplName in TPLToolsetArray
+    if getTplBuildTarget(tplName) in buildTargets]
+
+
+class VeraTplsBuild:
+
+  def __init__(self, devEnvDirs, inOptions, mpiDir, mvapichInstalled,
+    buildTargets, taskNameSuffix="" \
+    ):
+    self.inOptions = inOptions
+    self.mpiDir = mpiDir
+    self.mvapichInstalled = mvapichInstalled
+    self.buildTargets = buildTargets
+    self.taskNameSuffix = taskNameSuffix
+    self.installDir = devEnvDirs["compilerToolsetBase"] + "/tpls"
+    # Set by the 'vera_tpls' task
+    self.buildDir = None
+    self.submoduleCommit = "unknown"
+    self.restored = False
+    self.cacheKey = ""
+    self.tplEnv = self.getTplEnv()
+    self.unsetTplEnvCmnd = "env" + \
+      "".join([" -u " + envVar for envVar in tplEnvVarNames]) + " "
+    self.cmakeOptions = ' -D CMAKE_INSTALL_PREFIX=' + \
+      self.installDir + ' -D CMAKE_BUILD_TYPE=Release' \
+      '  -D CMAKE_CXX_COMPILER=mpicxx -D CMAKE_C_COMPILER=mpicc' \
+      ' -D CMAKE_Fortran_COMPILER=mpif90 -D FFLAGS="-fPIC -O3"' \
+      '  -D CFLAGS="-fPIC -O3"  -D CXXFLAGS="-fPIC -O3"  -D LDFLAGS=""' \
+      '  -D ENABLE_SHARED=ON'
+
+  # Do the Python equivalent of loading the mpi module and make sure that
+  # the TPL env vars from an already loaded dev env are not picked up.
+  def getTplEnv(self):
+    mpiDir = self.mpiDir
+    (mpiCompiler, mpiSuffix) = getMpiCompilerAndSuffix(self.mvapichInstalled)
+    tplEnv = {
+      "PATH" : mpiDir + "/bin" + os.pathsep + os.environ.get("PATH", ""),
+      "LD_LIBRARY_PATH" : prependPathVar(mpiDir + "/lib", "LD_LIBRARY_PATH"),
+      "PKG_CONFIG_PATH" : prependPathVar(mpiDir + "/lib/pkgconfig",
+        "PKG_CONFIG_PATH"),
+      "MPI_BIN" : mpiDir + "/bin",
+      "MPI_INCLUDE" : mpiDir + "/include",
+      "MPI_LIB" : mpiDir + "/lib",
+      "MPI_COMPILER" : mpiCompiler,
+      "MPI_SUFFIX" : mpiSuffix,
+      "MPI_HOME" : mpiDir,
+      }
+    compilerCache = getCompilerCache(self.inOptions)
+    if compilerCache:
+      tplEnv.update(compilerCache.getCcacheEnv())
+    return tplEnv
+
+  # NOTE: The TPLs are built with the MPI compiler wrappers which wrap the
+  # GCC compilers so both are part of the binary cache key
+  def getCompilers(self):
+    return [self.mpiDir + "/bin/mpicc", self.mpiDir + "/bin/mpicxx",
+      self.mpiDir + "/bin/mpif90"] + getHostCompilers(self.tplEnv["PATH"])
+
+
+# NOTE: The vera_tpls submodule is shared by the TPL builds of all of the
+# --matrix toolsets so only one of them updates it at a time
+veraTplsSubmoduleLock = threading.Lock()
+
+
+def installTplsTask(task, tplsBuild, inOptions):
+  tplsBuild.buildDir = task.scratchDir + "/tpls-build"
+  print("installing CMake target for vera_tpls")
+  def updateSubmodule():
+    task.runCmnd("mkdir -p " + tplsBuild.installDir)
+    # With a mirror, the vera_tpls sources were restored in the download step
+    if not inOptions.mirror:
+      veraTplsSubmoduleLock.acquire()
+      try:
+        task.runCmnd("git submodule init && git submodule update",
+          workingDir=repo_base_dir)
+      finally:
+        veraTplsSubmoduleLock.release()
+  # NOTE: The submodule commit is an input so that updating it rebuilds the
+  # TPLs
+  submoduleEntry = s(getCmndOutput("git ls-tree HEAD vera_tpls",
+    throwOnError=False, workingDir=repo_base_dir)).split()
+  if len(submoduleEntry) > 2:
+    tplsBuild.submoduleCommit = submoduleEntry[2]
+  task.runStage("update", {"submodule" : tplsBuild.submoduleCommit},
+    updateSubmodule, outputPath=repo_base_dir + "/vera_tpls/TPL_build")
+  # NOTE: The TPLs that are built are part of the binary cache key so that a
+  # slim install is not restored for a full one
+  (tplsBuild.restored, tplsBuild.cacheKey) = restoreCachedInstall(task,
+    inOptions, "vera_tpls", tplsBuild.submoduleCommit, tplsBuild.installDir,
+    tplsBuild.cmakeOptions + "  targets=" + ",".join(tplsBuild.buildTargets),
+    tplsBuild.getCompilers())
+  if tplsBuild.restored:
+    return
+  # NOTE: The compiler launchers do not change what is installed so they are
+  # left out of the cmakeOptions (which are part of the stamp and cache keys)
+  cmakeLauncherOptions = ""
+  compilerCache = getCompilerCache(inOptions)
+  if compilerCache:
+    cmakeLauncherOptions = compilerCache.getCMakeLauncherOptions()
+  # NOTE: The build dir is shared by the TPL tasks so the one in memory is
+  # only removed by the 'vera_tpls-finish' task
+  if inOptions.buildInMemory:
+    print("\nSetting up the build dir '" + tplsBuild.buildDir + "' for" \
+      " vera_tpls in '" + inOptions.buildInMemoryDir + "' if there is room" \
+      " ...")
+    if not inOptions.skipOp:
+      setUpBuildDir(tplsBuild.buildDir, "vera_tpls", inOptions.buildInMemoryDir,
+        task.numProcs*getToolMemPerJobMb("vera_tpls"))
+  def configure():
+    task.runCmnd("mkdir -p " + tplsBuild.buildDir)
+    task.runCmnd(tplsBuild.unsetTplEnvCmnd + 'cmake ' + \
+      tplsBuild.cmakeOptions + cmakeLauncherOptions + '  -D PROCS_INSTALL=' + \
+      str(task.numProcs) + ' ' + repo_base_dir + '/vera_tpls/TPL_build',
+      workingDir=tplsBuild.buildDir, extraEnv=tplsBuild.tplEnv)
+  task.runStage("configure",
+    {"cmakeOptions" : tplsBuild.cmakeOptions, "mpiDir" : tplsBuild.mpiDir},
+    configure, outputPath=tplsBuild.buildDir + "/CMakeCache.txt")
+
+
+def buildTplsTask(task, tplsBuild):
+  if tplsBuild.restored:
+    print("\nThe TPLs were restored from the binary cache with the other" \
+      " vera_tpls")
+    return
+  makeCmnd = tplsBuild.unsetTplEnvCmnd + "make" + task.getParallelOpt("-j") + \
+    " " + " ".join(tplsBuild.buildTargets)
+  def build():
+    makeStartTime = time.time()
+    try:
+      task.runCmnd(makeCmnd, workingDir=tplsBuild.buildDir,
+        extraEnv=tplsBuild.tplEnv)
+    finally:
+      if not task.skipOp:
+        splitTplBuildLogs(task, tplsBuild, makeStartTime)
+  task.runStage("build", {"targets" : tplsBuild.buildTargets}, build,
+    outputPath=tplsBuild.installDir)
+
+
+#
+# Get the ExternalProject stamp dir of a TPL_build target (e.g.
+# <build-dir>/hdf5-prefix/src/hdf5-stamp/) or "" if there is none yet
+#
+def getTplStampDir(buildDir, tplName):
+  for stampDirPattern in ["/*/src/", "/*/", "/"]:
+    stampDirs = glob.glob(buildDir + stampDirPattern + tplName + "-stamp")
+    if stampDirs:
+      return stampDirs[0]
+  return ""
+
+
+#
+# Get the (startTime, endTime, status) of the build of a TPL_build target by
+# the make that started at makeStartTime out of its ExternalProject step
+# stamps (e.g. hdf5-configure), which are touched when each step finishes
+#
+# The TPL was 'skipped' if none of its steps were run, 'done' if its last step
+# (<tpl>-done) was run and 'failed' otherwise.  It was started when its first
+# step was run (the first step, mkdir, takes no time).
+#
+def getTplBuildTimes(stampDir, tplName, makeStartTime):
+  stepTimes = []
+  doneTime = None
+  if stampDir:
+    for fileName in os.listdir(stampDir):
+      stepName = fileName[len(tplName)+1:]
+      if not fileName.startswith(tplName + "-") or "." in stepName:
+        continue
+      stepTime = os.path.getmtime(os.path.join(stampDir, fileName))
+      if stepTime < makeStartTime:
+        continue
+      stepTimes.append(stepTime)
+      if stepName == "done":
+        doneTime = stepTime
+  if not stepTimes:
+    return (makeStartTime, makeStartTime, "skipped")
+  if doneTime is None:
+    return (min(stepTimes), time.time(), "failed")
+  return (min(stepTimes), doneTime, "done")
+
+
+#
+# Write the log of each TPL_build target out of the log files of its
+# ExternalProject steps (e.g. hdf5-build-out.log) and add its build to the
+# timeline as a node that depends on the TPLs it needs (see
+# tplBuildDepsArray)
+#
+# NOTE: The CPU time of the make can't be split between the TPLs so it is
+# only recorded for the vera_tpls-build task.
+#
+def splitTplBuildLogs(task, tplsBuild, makeStartTime):
+  tplBuildDeps = dict(tplBuildDepsArray)
+  print("\nBuild of each TPL (out of its ExternalProject step files):\n")
+  for tplName in tplsBuild.buildTargets:
+    tplTaskName = getTplTaskName(tplName, tplsBuild.taskNameSuffix)
+    tplLogFile = os.path.join(os.path.dirname(task.logFile),
+      tplTaskName + ".log")
+    stampDir = getTplStampDir(tplsBuild.buildDir, tplName)
+    (startTime, endTime, status) = getTplBuildTimes(stampDir, tplName,
+      makeStartTime)
+    writeTplBuildLog(tplLogFile, stampDir, tplName, makeStartTime,
+      task.logFile)
+    print("  %-20s %10.1f s  %s" % (tplName, endTime-startTime, status))
+    if not task.timeline:
+      continue
+    exitCode = 0
+    if status == "failed":
+      exitCode = 1
+    task.timeline.addStageEvent(tplTaskName, "build", startTime, endTime, 0.0,
+      exitCode, status, tplLogFile)
+    if status != "skipped":
+      task.timeline.addTaskEvent(tplTaskName,
+        [getTplTaskName(dep, tplsBuild.taskNameSuffix)
+          for dep in tplBuildDeps[tplName]],
+        startTime, endTime, status)
+
+
+def writeTplBuildLog(tplLogFile, stampDir, tplName, makeStartTime,
+  makeLogFile \
+  ):
+  stepLogFiles = []
+  if stampDir:
+    stepLogFiles = [logFile
+      for logFile in glob.glob(stampDir + "/" + tplName + "-*-???.log")
+      if os.path.getmtime(logFile) >= makeStartTime]
+  stepLogFiles.sort(key=os.path.getmtime)
+  logStr = ""
+  for stepLogFile in stepLogFiles:
+    logStr += "==> " + stepLogFile + " <==\n" + \
+      readStrFromFile(stepLogFile) + "\n"
+  if not stepLogFiles:
+    logStr = "No step log files of " + tplName + " were written by this" \
+      " build.  See the make output in '" + makeLogFile + "'.\n"
+  writeStrToFile(tplLogFile, logStr)
+
+
+def finishTplsTask(task, tplsBuild, inOptions):
+  if tplsBuild.restored:
+    return
+  storeCachedInstall(task, inOptions, "vera_tpls", tplsBuild.submoduleCommit,
+    tplsBuild.cacheKey, tplsBuild.installDir)
+  if inOptions.buildInMemory and not inOptions.skipOp:
+    removeInMemoryBuildDir(tplsBuild.buildDir)
+
+
+#
+# Prepend a path to a path env var from the current env
+#
+def prependPathVar(path, envVarName):
+  currentValue = os.environ.get(envVarName, "")
+  if currentValue:
+    return path + os.pathsep + currentValue
+  return path
+
+
+#
+# Get the (CPU budget, memory budget in MB) for --parallel=<num>|auto.  An
+# explicit number of processes has no memory budget.
+#
+def getParallelBudget(inOptions):
+  if inOptions.parallelLevel == autoParallelLevel:
+    return (getNumCores(), getAvailableMemoryMb())
+  return (int(inOptions.parallelLevel), 0)
+
+
+def getTaskMemPerProcMb(inOptions, toolName):
+  if inOptions.parallelLevel == autoParallelLevel:
+    return getToolMemPerJobMb(toolName)
+  return 0
+
+
+#
+# Add the install tasks for the selected tools to the scheduler
+#
+# The MPI and TPL task names get the suffix taskNameSuffix (e.g. @gcc-5.4.0)
+# so that the tasks of the --matrix toolsets do not clash.  The GCC task
+# names already differ.
+#
+def addInstallTasks(scheduler, versionList, devEnvDirs, inOptions,
+  commonToolsSelectedSet, compilerToolsetSelectedSet, tplsSelectedSet,
+  mvapichInstalled, taskNameSuffix="" \
+  ):
+
+  def newTask(taskName, toolName, func, deps=None, usesInstallDriver=False):
+    return InstallTask(taskName, func, deps,
+      maxProcs=getParallelJobs(inOptions.parallelLevel, toolName),
+      memPerProcMb=getTaskMemPerProcMb(inOptions, toolName),
+      usesInstallDriver=usesInstallDriver)
+
+  if "gitdist" in commonToolsSelectedSet:
+    scheduler.addTask(InstallTask("gitdist",
+      lambda task: installGitdistTask(task, versionList, devEnvDirs, inOptions)))
+
+  if "autoconf" in commonToolsSelectedSet:
+    scheduler.addTask(newTask("autoconf-"+versionList["autoconf"], "autoconf",
+      lambda task: installAutoconfTask(task, versionList, devEnvDirs, inOptions),
+      usesInstallDriver=True))
+
+  if "cmake" in commonToolsSelectedSet:
+    scheduler.addTask(newTask("cmake-"+versionList["cmake"], "cmake",
+      lambda task: installCMakeTask(task, versionList, devEnvDirs, inOptions)))
+
+  gccDeps = []
+  if "gcc" in compilerToolsetSelectedSet:
+    gccTaskName = "gcc-"+versionList["gcc"]
+    scheduler.addTask(newTask(gccTaskName, "gcc",
+      lambda task: installGccTask(task, versionList, devEnvDirs, inOptions,
+        tplsSelectedSet, mvapichInstalled)))
+    gccDeps = [gccTaskName]
+
+  mpiDeps = []
+  mpiDir = devEnvDirs["compilerToolset"] + "/mpich-" + versionList["mpich"]
+  if "mpich" in compilerToolsetSelectedSet:
+    mpichTaskName = "mpich-"+versionList["mpich"]+taskNameSuffix
+    scheduler.addTask(newTask(mpichTaskName, "mpich",
+      lambda task: installMpichTask(task, versionList, devEnvDirs, inOptions),
+      deps=gccDeps,
+      usesInstallDriver=isMpichInstalledWithDriver(versionList["mpich"])))
+    mpiDeps = [mpichTaskName]
+  elif "mvapich" in compilerToolsetSelectedSet:
+    mvapichTaskName = "mvapich-"+versionList["mvapich"]+taskNameSuffix
+    scheduler.addTask(newTask(mvapichTaskName, "mvapich",
+      lambda task: installMvapichTask(task, versionList, devEnvDirs, inOptions),
+      deps=gccDeps))
+    mpiDeps = [mvapichTaskName]
+    mpiDir = devEnvDirs["compilerToolset"] + "/mvapich-" + versionList["mvapich"]
+
+  tplBuildTargets = getTplBuildTargets(tplsSelectedSet)
+  if not tplBuildTargets:
+    return None
+  tplsBuild = VeraTplsBuild(devEnvDirs, inOptions, mpiDir, mvapichInstalled,
+    tplBuildTargets, taskNameSuffix)
+  tplsTaskName = "vera_tpls"+taskNameSuffix
+  scheduler.addTask(newTask(tplsTaskName, "vera_tpls",
+    lambda task: installTplsTask(task, tplsBuild, inOptions),
+    deps=mpiDeps))
+  tplsBuildTaskName = "vera_tpls-build"+taskNameSuffix
+  scheduler.addTask(newTask(tplsBuildTaskName, "vera_tpls",
+    lambda task: buildTplsTask(task, tplsBuild),
+    deps=[tplsTaskName]))
+  scheduler.addTask(InstallTask("vera_tpls-finish"+taskNameSuffix,
+    lambda task: finishTplsTask(task, tplsBuild, inOptions),
+    deps=[tplsBuildTaskName]))
+  return tplsBuild
+
+
+#
+# Return True if all of the install tasks of a compiler toolset variant are
+# done
+#
+def isVariantInstalled(scheduler, variant):
+  for taskName in variant.installTaskNames:
+    if scheduler.getTask(taskName).status != "done":
+      return False
+  return True
+
+
+#
+# Add the tasks for the TPL benchmarks (see TplBenchmarks.py) of a compiler
+# toolset variant to the scheduler of the benchmarks (which is run after all
+# of the install tasks are done)
+#
+def addTplBenchmarkTasks(benchmarkScheduler, installScheduler, tplsBuild,
+  versionList, devEnvDirs, inOptions, tplsSelectedSet, taskNameSuffix="" \
+  ):
+  if not tplsBuild:
+    return
+  tplBenchmarksSelectedSet = set(
+    getToolsSelectedArray(inOptions.tplBenchmarks, tplBenchmarkNames))
+  # NOTE: The benchmarks are re-run when the TPLs are rebuilt
+  finishTask = installScheduler.getTask("vera_tpls-finish"+taskNameSuffix)
+  tplsHash = ""
+  if finishTask.stamps:
+    tplsHash = finishTask.stamps.getLastHash()
+  for benchmark in getTplBenchmarks(tplBenchmarksSelectedSet,
+    getInstalledTpls(tplsSelectedSet) \
+    ):
+    benchmarkScheduler.addTask(InstallTask(
+      "benchmark-"+benchmark[0]+taskNameSuffix,
+      lambda task, benchmark=benchmark: installTplBenchmarkTask(task,
+        tplsBuild, versionList, devEnvDirs, tplsSelectedSet, benchmark,
+        tplsHash)))
+
+
+#
+# Get the install dir of each installed TPL
+#
+def getTplInstallDirs(tplsDir, tplsSelectedSet, versionList):
+  installedTpls = getInstalledTpls(tplsSelectedSet)
+  return dict([(tplName,
+    tplsDir + "/" + tplDirBaseName + "-" + versionList[tplName])
+    for (tplName, envVarName, tplDirBaseName, subDirs) in tplEnvArray
+    if tplName in installedTpls])
+
+
+def installTplBenchmarkTask(task, tplsBuild, versionList, devEnvDirs,
+  tplsSelectedSet, benchmark, tplsHash \
+  ):
+  (benchmarkName, benchmarkTpls, sourceFileName, numRanks) = benchmark
+  sourceFile = os.path.join(devtools_install_dir, sourceFileName)
+  exeName = os.path.splitext(sourceFileName)[0]
+  tplDirs = getTplInstallDirs(tplsBuild.installDir, tplsSelectedSet,
+    versionList)
+  buildFlags = getTplBenchmarkBuildFlags(benchmarkName, tplDirs)
+  resultsFile = tplsBuild.installDir + "/benchmarks/" + benchmarkName + \
+    ".json"
+  # The benchmarks are linked against libgfortran of the installed GCC (and
+  # the TPL lib dirs are for the libs that PETSc links without an rpath)
+  gccInstallDir = devEnvDirs["compilerToolset"] + "/gcc-" + versionList["gcc"]
+  runEnv = dict(tplsBuild.tplEnv)
+  runEnv["LD_LIBRARY_PATH"] = os.pathsep.join(
+    [tplDirs[tplName] + "/lib" for tplName in benchmarkTpls] +
+    [tplsBuild.mpiDir + "/lib", gccInstallDir + "/lib64",
+     os.environ.get("LD_LIBRARY_PATH", "")])
+  if numRanks:
+    runCmnd = "mpiexec -n " + str(numRanks) + " ./" + exeName
+  else:
+    runCmnd = "./" + exeName
+  def benchmark():
+    task.runCmnd("cp " + sourceFile + " . && mpicc -O2 -o " + exeName + \
+      " " + sourceFileName + " " + buildFlags, extraEnv=runEnv)
+    # NOTE: The timeout is for a benchmark that hangs instead of failing
+    task.runCmnd("timeout 1800 " + runCmnd + " > " + exeName + ".out",
+      extraEnv=runEnv)
+    if task.skipOp:
+      return
+    results = parseTplBenchmarkOutput(
+      readStrFromFile(task.scratchDir + "/" + exeName + ".out"))
+    print("\nTPL benchmark " + benchmarkName + " of " + \
+      tplsBuild.installDir + ":\n\n" + getTplBenchmarkReportStr(results))
+    warnings = getTplBenchmarkWarnings(benchmarkName, tplDirs, results)
+    for warning in warnings:
+      print("WARNING: " + warning)
+    writeTplBenchmarkResultsFile(resultsFile, benchmarkName,
+      "gcc-" + versionList["gcc"] + " " + os.path.basename(tplsBuild.mpiDir),
+      dict([(tplName, versionList[tplName]) for tplName in benchmarkTpls]),
+      results, warnings)
+  task.runStage("benchmark", {"tpls" : tplsHash, "buildFlags" : buildFlags,
+    "runCmnd" : runCmnd, "source" : getFileSha256(sourceFile)},
+    benchmark, outputPath=resultsFile)
+
 
 #
 # Main
@@ -615,7 +2613,6 @@ def main(cmndLineArgs):
   gcc_version = gcc_version_default
   mpich_version = mpich_version_default
   mvapich_version = mvapich_version_default
-  mvapichInstalled = False
   hdf5_version = hdf5_version_default
   blas_version = blas_version_default
   lapack_version = lapack_version_default
@@ -633,14 +2630,6 @@ def main(cmndLineArgs):
       cmake_version = toolName.split(':')[1]
     elif "autoconf" in toolName and ':' in toolName:
       autoconf_version = toolName.split(':')[1]
-  for toolName in inOptions.compilerToolset.split(','):
-    if "gcc" in toolName and ':' in toolName:
-      gcc_version = toolName.split(':')[1]
-    elif "mpich" in toolName and ':' in toolName:
-      mpich_version = toolName.split(':')[1]
-    elif "mvapich" in toolName and ':' in toolName:
-      mvapich_version = toolName.split(':')[1]
-      mvapichInstalled = True
   for toolName in inOptions.TPLToolset.split(','):
     if "hdf5" in toolName and ':' in toolName:
       hdf5_version = toolName.split(':')[1]
@@ -679,15 +2668,33 @@ def main(cmndLineArgs):
   print("\nSelected common tools = " + str(commonToolsSelected))
   commonToolsSelectedSet = set(commonToolsSelected)
 
-  compilerToolsetSelected = \
-    getToolsSelectedArray(inOptions.compilerToolset, compilerToolsetArray)
-  print("\nSelected compiler toolset = " + str(compilerToolsetSelected))
-  compilerToolsetSelectedSet = set(compilerToolsetSelected)
+  variants = getCompilerToolsetVariants(inOptions, versionList)
+  for variant in variants:
+    if variant.taskNameSuffix:
+      print("\nSelected compiler toolset " + variant.name + " = " +
+        str(variant.compilerToolsetSelected))
+    else:
+      print("\nSelected compiler toolset = " +
+        str(variant.compilerToolsetSelected))
 
   TPLToolsetSelected = \
     getToolsSelectedArray(inOptions.TPLToolset, TPLToolsetArray)
-  print("\nSelected compiler toolset = " + str(TPLToolsetSelected))
+  print("\nSelected TPL toolset = " + str(TPLToolsetSelected))
   TPLToolsetSelectedSet = set(TPLToolsetSelected)
+  print("\nTPL_build targets = " +
+    str(getTplBuildTargets(TPLToolsetSelectedSet)))
+
+  sourceMirror = None
+  if inOptions.mirror:
+    sourceMirror = getSourceMirror(inOptions)
+
+  if inOptions.prefetchBundle:
+    print("\n\nDownload all sources for each selected tool into the prefetch" \
+      " bundle:\n")
+    writePrefetchBundle(variants, commonToolsSelectedSet, inOptions,
+      getSourceCache(inOptions), sourceMirror)
+    print("\n[End]")
+    return 0
 
   dev_env_base_dir = inOptions.installDir
 
@@ -701,129 +2708,102 @@ def main(cmndLineArgs):
   common_tools_dir = os.path.join(dev_env_base_dir, "common_tools")
   common_tools_exists = os.path.exists(common_tools_dir)
 
-  compiler_toolset_base_dir = os.path.join(dev_env_base_dir, "gcc-"+gcc_version)
-  compiler_toolset_base_exists = os.path.exists(compiler_toolset_base_dir)
-
-  compiler_toolset_dir = os.path.join(compiler_toolset_base_dir, "toolset")
-  compiler_toolset_exists = os.path.exists(compiler_toolset_dir)
-
-  dev_env_dir = os.path.join(dev_env_base_dir, "env")
-  dev_env_exists = os.path.exists(dev_env_dir)
   if inOptions.doInitialSetup:
     if not dev_env_base_exists:
       print("Creating directory '" + dev_env_base_dir + "' ...")
       if not inOptions.skipOp:
         os.makedirs(dev_env_base_dir)
-    if not dev_env_exists and not inOptions.skipOp:
-      os.makedirs(dev_env_dir)
     if not common_tools_exists:
       print("Creating directory '" + common_tools_dir + "' ...")
       if not inOptions.skipOp:
         os.makedirs(common_tools_dir)
+  else:
+    print("Skipping setup of the install directory by request!")
+    assertInstallDirExists(dev_env_base_dir, inOptions)
+    assertInstallDirExists(common_tools_dir, inOptions)
 
-    # Always create this directory so we can write the load_dev_env.sh script!
-    if not compiler_toolset_base_exists:
-      print("Creating directory '" + compiler_toolset_base_dir + "' ...")
-      if not inOptions.skipOp:
-        os.makedirs(compiler_toolset_base_dir)
+  for variant in variants:
 
-    if not compiler_toolset_exists:
-      print("Creating directory '" + compiler_toolset_dir + "' ...")
-      if not inOptions.skipOp:
-        os.makedirs(compiler_toolset_dir)
+    devEnvDirs = variant.devEnvDirs
 
-    print("Writing new files " + inOptions.loadDevEnvFileBaseName +
-          ".[sh,csh] ...")
-    if not inOptions.skipOp:
-      writeLoadDevEnvFiles(dev_env_base_dir, dev_env_dir, inOptions, versionList, mvapichInstalled)
-  else:
+    compiler_toolset_base_dir = devEnvDirs["compilerToolsetBase"]
+    compiler_toolset_base_exists = os.path.exists(compiler_toolset_base_dir)
 
-    print("Skipping setup of the install directory by request!")
+    compiler_toolset_dir = devEnvDirs["compilerToolset"]
+    compiler_toolset_exists = os.path.exists(compiler_toolset_dir)
 
-    assertInstallDirExists(dev_env_base_dir, inOptions)
-    assertInstallDirExists(common_tools_dir, inOptions)
-    assertInstallDirExists(compiler_toolset_base_dir, inOptions)
-    assertInstallDirExists(compiler_toolset_dir, inOptions)
-  if not inOptions.skipOp:
-    os.system("mkdir " + dev_env_base_dir + "/images")
-    os.system("mkdir " + dev_env_base_dir + "/images/dev_env")
-    os.system("mkdir " + dev_env_base_dir + "/images/install")
-    if inOptions.mkl_true:
-      mkl_true = "true"
-      tpl_url = 'https://github.com/ehcole/MPACT_tpls.git'
-      tpl_source_dir = "/MPACT_tpls/TPL_build/"
+    dev_env_dir = devEnvDirs["env"]
+    dev_env_exists = os.path.exists(dev_env_dir)
+
+    if inOptions.doInitialSetup:
+      if not dev_env_exists and not inOptions.skipOp:
+        os.makedirs(dev_env_dir)
+
+      # Always create this directory so we can write the load_dev_env.sh script!
+      if not compiler_toolset_base_exists:
+        print("Creating directory '" + compiler_toolset_base_dir + "' ...")
+        if not inOptions.skipOp:
+          os.makedirs(compiler_toolset_base_dir)
+
+      if not compiler_toolset_exists:
+        print("Creating directory '" + compiler_toolset_dir + "' ...")
+        if not inOptions.skipOp:
+          os.makedirs(compiler_toolset_dir)
+
+      print("Writing new files " + dev_env_dir + "/" +
+            inOptions.loadDevEnvFileBaseName + ".[sh,csh] ...")
+      if not inOptions.skipOp:
+        writeLoadDevEnvFiles(dev_env_base_dir, dev_env_dir, inOptions,
+          variant.versionList, variant.mvapichInstalled)
     else:
-      mkl_true = "false"
-      tpl_url = "https://github.com/CASL/vera_tpls.git"
-      tpl_source_dir = "/vera_tpls/TPL_build/"
-    os.system("autoconf")
-    os.system("./configure GCC_VERSION=gcc_version MPI_VERSION=MPI_VERSION CMAKE_VERSION=cmake_version TPL_URL=tpl_url TPL_SOURCE_DIR=tpl_source_dir MKL_TRUE=mkl_true MVAPICH_INSTALLED=mvapichInstalled")
-    os.system("mv Dockerfile " + dev_env_base_dir + "/images/dev_env")
-    os.system("mv Dockerfile_install " + dev_env_base_dir + "/images/install")
+      assertInstallDirExists(compiler_toolset_base_dir, inOptions)
+      assertInstallDirExists(compiler_toolset_dir, inOptions)
+    devEnvImageName = getImageDirName(devEnvDirs, "dev_env")
+    print("Writing the Dockerfiles under " + dev_env_base_dir + "/images/" +
+      devEnvImageName + " ...")
+    if not inOptions.skipOp:
+      writeDockerFiles(dev_env_base_dir, inOptions, variant.versionList,
+        variant.mvapichInstalled, devEnvImageName)
+  timeline = None
+  if not inOptions.skipOp and (inOptions.doDownload or inOptions.doInstall):
+    timeline = getBuildTimeline(inOptions)
+
   ###
   print("\n\nB) Download all sources for each selected tool:\n")
   ###
+  failedDownloads = []
   if inOptions.doDownload:
-    for tool in commonToolsSelectedSet:
-      if "cmake" in tool:
-        print("")
-        print("Downloading the source for cmake-" + cmake_version + " ...")
-        print("")
-        cmakeShort = cmake_version[:-2]
-        if not inOptions.skipOp:
-          try:
-            os.system("wget https://cmake.org/files/v" + cmakeShort + "/cmake-" + cmake_version + ".tar.gz")
-          except:
-            print("Invalid CMake version passed. No Download link found.")
-            exit(1)
-          os.system("mv cmake-" + cmake_version + ".tar.gz " + common_tools_dir)
-        else:
-          print("wget " + dev_env_base_dir + "/common_tools https://cmake.org/files/v" + cmakeShort + "/cmake-" + cmake_version + ".tar.gz")
-      elif "autoconf" in tool:
-        downloadToolSource("autoconf", autoconf_version,
-          inOptions.sourceGitUrlBase, inOptions)
-    for tool in compilerToolsetSelectedSet:
-      if "gcc" in tool:
-        print("")
-        print("Downloading the source for gcc-" + gcc_version + " ...")
-        print("")
-        if not inOptions.skipOp:
-          try:
-            os.system("wget https://ftp.gnu.org/gnu/gcc/gcc-" + gcc_version + "/gcc-" + gcc_version + ".tar.gz")
-          except:
-            print("Invalid gcc version passed. No Download link found.")
-            exit(1)
-        else:
-          print("wget https://ftp.gnu.org/gnu/gcc/gcc-" + gcc_version + "/gcc-" + gcc_version + ".tar.gz")
-
-      elif "mpich" in tool:
-        if mpich_version == '3.1.3':
-          downloadToolSource("mpich", mpich_version,
-                             inOptions.sourceGitUrlBase, inOptions)
-        else:
-          print("")
-          print("Downloading the source for mpich-" + mpich_version + " ..")
-          print("")
-          if not inOptions.skipOp:
-            try:
-              os.system("wget / http://www.mpich.org/static/downloads/" + mpich_version + "/mpich-" + mpich_version + ".tar.gz")
-            except:
-              print("Invalid mpich version passed. No Download link found.")
-              exit(1)
-          else:
-            print("wget http://www.mpich.org/static/downloads/" + mpich_version + "/mpich-" + mpich_version + ".tar.gz")
-      elif "mvapich" in tool:
-        print("")
-        print("Downloading the source for mvapich-" + mvapich_version + " ..")
-        print("")
-        if not inOptions.skipOp:
-          try:
-            os.system("wget http://mvapich.cse.ohio-state.edu/download/mvapich/mv2/mvapich2-" + mvapich_version + ".tar.gz")
-          except:
-            print("Invalid mvapich version passed. No Download link found.")
-            exit(1)
-        else:
-          print("wget/ http://mvapich.cse.ohio-state.edu/download/mvapich/mv2/mvapich2-" + mvapich_version + ".tar.gz")
+    sourceDownloads = getVariantsSourceDownloads(variants,
+      commonToolsSelectedSet, inOptions)
+    gccVersions = getSelectedGccVersions(variants)
+    if sourceMirror:
+      # Without network access, the GCC prerequisites must come from the
+      # mirror too
+      for gccVersion in gccVersions:
+        sourceDownloads.extend(getGccPrerequisiteDownloads(gccVersion,
+          sourceMirror.getGccPrerequisites(gccVersion)))
+    downloadResults = downloadSources(sourceDownloads,
+      int(inOptions.downloadJobs), os.path.join(scratch_dir, "logs"),
+      inOptions.skipOp, getSourceCache(inOptions), sourceMirror,
+      getDownloadStampDir(), inOptions.ignoreStamps, timeline,
+      getBuildPlan(inOptions))
+    # The GCC prerequisites are listed in the GCC sources so they can only
+    # be downloaded (or restored from the source cache) after GCC
+    prereqDownloads = []
+    for gccVersion in gccVersions:
+      if sourceMirror or not downloadResults["gcc-"+gccVersion][0]:
+        continue
+      (archives, checksums) = getGccPrerequisites(gccVersion, inOptions)
+      print("\nGCC prerequisites for gcc-"+gccVersion+": "+str(archives))
+      prereqDownloads.extend(
+        getGccPrerequisiteDownloads(gccVersion, archives, checksums))
+    if prereqDownloads:
+      downloadResults.update(downloadSources(prereqDownloads,
+        int(inOptions.downloadJobs), os.path.join(scratch_dir, "logs"),
+        inOptions.skipOp, getSourceCache(inOptions), sourceMirror,
+        getDownloadStampDir(), inOptions.ignoreStamps, timeline,
+        getBuildPlan(inOptions)))
+    failedDownloads = printDownloadSummary(downloadResults)
   else:
 
     print("Skipping download of the source for the tools on request!")
@@ -834,202 +2814,103 @@ def main(cmndLineArgs):
   print("\n\nC) Untar, configure, build and install each selected tool:\n")
   ###
   if inOptions.doInstall:
-    if "gitdist" in commonToolsSelectedSet:
-      print("\nInstalling gitdist ...")
-      echoRunSysCmnd("cp "+pythonUtilsDir+"/gitdist "+common_tools_dir+"/")
-      InstallProgramDriver.fixupInstallPermissions(inOptions, common_tools_dir)
-
-    if "cmake" in commonToolsSelectedSet:
-      os.system("tar -xf " + common_tools_dir + "/cmake-" + cmake_version + ".tar.gz")
-      os.system("mv -f cmake-" + cmake_version + " " + common_tools_dir)
-      os.system("yum install openssl-devel")
+    compilerCache = getCompilerCache(inOptions)
+    if compilerCache:
+      compilerCacheStartStats = compilerCache.getStats()
+    (cpuBudget, memBudgetMb) = getParallelBudget(inOptions)
+    scheduler = InstallScheduler(cpuBudget,
+      os.path.join(scratch_dir, "tools"), os.path.join(scratch_dir, "logs"),
+      inOptions.skipOp, os.path.join(scratch_dir, "stamps"),
+      inOptions.ignoreStamps, timeline, memBudgetMb, getBuildPlan(inOptions))
+    # NOTE: The common tools are only installed once (for all of the
+    # variants) and the tasks of all of the variants share the budget
+    addInstallTasks(scheduler, variants[0].versionList,
+      variants[0].devEnvDirs, inOptions, commonToolsSelectedSet, set(), set(),
+      False)
+    commonTaskNames = scheduler.getTaskNames()
+    for variant in variants:
+      prevTaskNames = set(scheduler.getTaskNames())
+      variant.tplsBuild = addInstallTasks(scheduler, variant.versionList,
+        variant.devEnvDirs, inOptions, set(),
+        variant.compilerToolsetSelectedSet, TPLToolsetSelectedSet,
+        variant.mvapichInstalled, variant.taskNameSuffix)
+      variant.installTaskNames = commonTaskNames + \
+        [taskName for taskName in scheduler.getTaskNames()
+          if not taskName in prevTaskNames]
+    # NOTE: The extra downloads for a tool (e.g. gcc-<ver>-gmp-<ver>) are
+    # named with the tool's task name as a prefix and the tasks of a --matrix
+    # variant (e.g. mpich-<ver>@gcc-<ver>) with the download name
+    for downloadName in failedDownloads:
+      for taskName in scheduler.getTaskNames():
+        if downloadName == taskName or downloadName.startswith(taskName+"-") \
+          or taskName.startswith(downloadName+"@") \
+          :
+          scheduler.failTask(taskName, "Error, the download of the source" \
+            " for '"+downloadName+"' failed!")
+    # NOTE: A failed --matrix toolset does not stop the others from being
+    # benchmarked and getting their env snapshot files.  The errors are
+    # raised once that is done.
+    installErrors = []
+    try:
+      try:
+        scheduler.run()
+      except Exception as e:
+        installErrors.append(str(e))
+      installedVariants = [variant for variant in variants
+        if isVariantInstalled(scheduler, variant)]
+      # NOTE: The benchmarks are run one at a time after everything is
+      # installed so the builds do not disturb the timings
+      benchmarkScheduler = InstallScheduler(1,
+        os.path.join(scratch_dir, "tools"), os.path.join(scratch_dir, "logs"),
+        inOptions.skipOp, os.path.join(scratch_dir, "stamps"),
+        inOptions.ignoreStamps, timeline, 0, getBuildPlan(inOptions))
+      for variant in installedVariants:
+        addTplBenchmarkTasks(benchmarkScheduler, scheduler, variant.tplsBuild,
+          variant.versionList, variant.devEnvDirs, inOptions,
+          TPLToolsetSelectedSet, variant.taskNameSuffix)
+      if benchmarkScheduler.getTaskNames():
+        print("\nRun the benchmarks of the installed TPLs:")
+        try:
+          benchmarkScheduler.run()
+        except Exception as e:
+          installErrors.append(str(e))
+        if getBuildPlan(inOptions):
+          getBuildPlan(inOptions).setToolsRunAfter(
+            benchmarkScheduler.getTaskNames(), scheduler.getTaskNames())
+    finally:
+      printBuildTimelineReport(inOptions)
+      if compilerCache and not inOptions.skipOp:
+        print("\nCompiler cache '"+compilerCache.cacheDir+"': " \
+          +compilerCache.getHitRateStr(compilerCacheStartStats))
+    for variant in variants:
+      if not variant in installedVariants:
+        print("\nNot writing the env snapshot files of "+variant.name+" since" \
+          " its install failed!")
+        continue
+      print("\nWriting the env snapshot files "+variant.devEnvDirs["env"]+"/" \
+        +inOptions.loadDevEnvFileBaseName+"_snapshot.[sh,csh] ...")
       if not inOptions.skipOp:
-
-        print("CUSTOM DEVIATION FROM DEVENV SETUP: OPENSSL")
-        # Force the code to compile with ssl to avoid errors in subsequent make
-        os.system("cmake " + common_tools_dir + "/cmake-" + cmake_version + " -DCMAKE_USE_OPENSSL=ON -DCMAKE_INSTALL_PREFIX=" + dev_env_base_dir + "/common_tools/cmake-" + cmake_version + "/")
-
-        #os.system("cmake " + common_tools_dir + "/cmake-" + cmake_version + " -DCMAKE_INSTALL_PREFIX=" + dev_env_base_dir + "/common_tools/cmake-" + cmake_version + "/")
-        # To return code to original state, uncomment above and indent previous line
-
-        os.system("make -j4 install")
-        os.system("cd ..")
-        cmake_module = open(dev_env_dir + "/cmake-" + cmake_version, 'w+')
-        cmake_module.write("#%Module\n\n")
-        cmake_module.write("set version " + cmake_version + "\n")
-        cmake_module.write('set name "MPACT Development Environment - 2.1.0"\n')
-        cmake_module.write('set msg "Loads the development environment for MPACT."\n')
-        cmake_module.write('\n')
-        cmake_module.write("procs ModulesHelp { } {\n")
-        cmake_module.write(" puts stderr $msg }\n\n")
-        cmake_module.write("module-whatis $msg\n")
-        cmake_module.write(common_tools_dir + "cmake-$version/bin\n")
-        cmake_module.close()
-    print("Checking for Autoconf in toolset")
-    if "autoconf" in commonToolsSelectedSet:
-      print("Installing from source (autoconf)")
-      installToolFromSource("autoconf", autoconf_version_default,
-        common_tools_dir, None, inOptions )
-      print("Installing autoconf complete")
-
-    print("Checking for GCC in compilerToolset")
-    if "gcc" in compilerToolsetSelectedSet:
-      print("unpacking gcc-" + gcc_version + ".tar.gz...")
-      os.system("tar xzf gcc-" + gcc_version + ".tar.gz")
-
-      os.chdir("gcc-" + gcc_version)
-      print("downloading gcc prerequisites...")
-      os.system("./contrib/download_prerequisites")
-      print("CUSTOM DEVIATION FROM STD DEVENV SETUP:")
-      print("Apply patch to gcc source (struct ucontext vs ucontext_t)")
-      os.system("wget -O compiler.patch https://gcc.gnu.org/git/?p=gcc.git\;a=patch\;h=14c2f22a1877f6b60a2f7c2f83ffb032759456a6")
-      os.system("patch -f -p1 < compiler.patch")
-      os.chdir(compiler_toolset_dir)
-      os.system("mkdir gcc-" + gcc_version)
-      os.chdir("gcc-" + gcc_version)
-      print("configuring gcc...")
-      print("CUSTOM DEVIATION FROM STD DEVENV SETUP:")
-      print("Disabling libsanitizer")
-      os.system(scratch_dir + "/gcc-" + gcc_version + "/configure --disable-libsanitizer --disable-multilib --prefix=" + compiler_toolset_dir + "/gcc-" + gcc_version + " --enable-languages=c,c++,fortran")
-      print("building gcc...")
-      os.system("make -j8")
-      os.system("make install")
-      os.chdir(scratch_dir)
-      if not inOptions.skipOp:
-        gcc_module = open(dev_env_dir + "/gcc-" + gcc_version, 'w+')
-        gcc_module.write("#%Module\n\n")
-        gcc_module.write("set root " + dev_env_base_dir + "\n")
-        gcc_module.write("set version gcc-" + gcc_version + "\n")
-        gcc_module.write("set tpldir " + compiler_toolset_base_dir + "/tpls\n")
-        gcc_module.write('set name "MPACT Development Environment - $version"\n')
-        gcc_module.write('set msg "Loads the development environment for MPACT."\n')
-        gcc_module.write('proc ModulesHelp { } {\n')
-        gcc_module.write(" puts stderr $msg }\n")
-        gcc_module.write("module-whatis $msg\n")
-        if not mvapichInstalled:
-          gcc_module.write("if ![ is-loaded 'mpi/mpich-" + mpich_version + "-x86_64' ] {\n")
-          gcc_module.write(" module load mpi/mpich-" + mpich_version + "-x86_64 }\n")
-        else:
-          gcc_module.write("if ![ is-loaded 'mpi/mvapich-" + mvapich_version + "-x86_64' ] {\n")
-          gcc_module.write(" module load mpi/mvapich-" + mvapich_version + "-x86_64 }\n")
-        gcc_module.write("setenv TRIBITS_DEV_ENV_BASE          $root\n")
-        gcc_module.write("setenv TRIBITS_DEV_ENV_GCC_VERSION   $version\n")
-        gcc_module.write("setenv TRIBITS_DEV_ENV_COMPILER_BASE $root/$version\n")
-        gcc_module.write("setenv TRIBITS_DEV_ENV_MPICH_DIR     $env(MPI_HOME)\n")
-        gcc_module.write("setenv LOADED_TRIBITS_DEV_ENV        $version\n")
-        gcc_module.write("setenv LOADED_VERA_DEV_ENV        $version\n")
-        gcc_module.write("prepend-path PATH $root/common_tools\n")
-        gcc_module.write("set tplpath $tpldir/hdf5-1.8.10\n")
-        gcc_module.write("setenv HDF5_ROOT             $tplpath\n")
-        gcc_module.write("prepend-path PATH            $tplpath/bin\n")
-        gcc_module.write("prepend-path LD_LIBRARY_PATH $tplpath/lib\n")
-        gcc_module.write("prepend-path INCLUDE         $tplpath/include\n")
-        gcc_module.write("set tplpath $tpldir/lapack-3.3.1\n")
-        gcc_module.write("setenv BLAS_ROOT             $tplpath\n")
-        gcc_module.write("setenv LAPACK_DIR            $tplpath\n")
-        gcc_module.write("prepend-path LD_LIBRARY_PATH $tplpath/lib\n")
-        gcc_module.write("set tplpath $tpldir/hypre-2.9.1a\n")
-        gcc_module.write("setenv HYPRE_DIR             $tplpath\n")
-        gcc_module.write("prepend-path LD_LIBRARY_PATH $tplpath/lib\n")
-        gcc_module.write("set tplpath $tpldir/petsc-3.5.4\n")
-        gcc_module.write("setenv PETSC_DIR             $tplpath\n")
-        gcc_module.write("prepend-path PATH            $tplpath/bin\n")
-        gcc_module.write("prepend-path LD_LIBRARY_PATH $tplpath/lib\n")
-        gcc_module.write("set tplpath $tpldir/slepc-3.5.4\n")
-        gcc_module.write("setenv SLEPC_DIR             $tplpath\n")
-        gcc_module.write("prepend-path LD_LIBRARY_PATH $tplpath/lib\n")
-        gcc_module.write("set tplpath $tpldir/sundials-2.9.0\n")
-        gcc_module.write("setenv SUNDIALS_DIR          $tplpath\n")
-        gcc_module.write("prepend-path LD_LIBRARY_PATH $tplpath/lib\n")
-        gcc_module.write("set-alias gitdist-status     {gitdist dist-repo-status}\n")
-        gcc_module.write("set-alias gitdist-mod        {gitdist --dist-mod-only}\n")
-        gcc_module.close()
-
-    if "mpich" in compilerToolsetSelectedSet:
-      gccInstallDir = compiler_toolset_dir+"/gcc-"+gcc_version
-      mpich_dir = compiler_toolset_dir + "/mpich-" + mpich_version
-
-      if not os.path.exists(gccInstallDir) and not inOptions.skipOp:
-        raise Exception("Error, gcc has not been installed yet." \
-          "  Missing directory '"+gccInstallDir+"'")
-      LD_LIBRARY_PATH = os.environ.get("LD_LIBRARY_PATH", "")
-      if mpich_version == "3.1.3":
-        installToolFromSource(
-          "mpich",
-          mpich_version,
-          compiler_toolset_dir,
-          {
-            "CC" : gccInstallDir+"/bin/gcc",
-            "CXX" : gccInstallDir+"/bin/g++",
-            "FC" : gccInstallDir+"/bin/gfortran",
-            "LD_LIBRARY_PATH" : gccInstallDir+"/lib64:"+LD_LIBRARY_PATH
-          },
-          inOptions
-        )
-      else:
-        os.system("tar xfz mpich-" + mpich_version + ".tar.gz")
-        os.system("mkdir -p " + compiler_toolset_dir + "/mpich-" + mpich_version)
-        os.system("mkdir tmp")
-        os.chdir("tmp")
-        os.system("../mpich-" + mpich_version +  "/configure -prefix=" + compiler_toolset_dir + "/mpich-" + mpich_version)
-        os.system("make")
-        os.system("make install")
-      if not inOptions.skipOp:
-        mpich_module = open(dev_env_dir + "/mpich-" + mpich_version, 'w+')
-        mpich_module.write("#%Module\n\n")
-        mpich_module.write("conflict mvapich\n")
-        mpich_module.write("prepend-path            PATH            "+mpich_dir+"/bin\n")
-        mpich_module.write("prepend-path            LD_LIBRARY_PATH "+mpich_dir+"/lib\n")
-        #mpich_module.write("prepend-path            PYTHONPATH      /usr/lib64/python2.7/site-packages/mpich\n")
-        #mpich_module.write("prepend-path            MANPATH         /usr/share/man/mpich-x86_64\n")
-        mpich_module.write("prepend-path            PKG_CONFIG_PATH "+mpich_dir+"/lib/pkgconfig\n")
-        mpich_module.write("setenv                  MPI_BIN         "+mpich_dir+"/bin\n")
-        #mpich_module.write("setenv                  MPI_SYSCONFIG   /etc/mpich-x86_64\n")
-        #mpich_module.write("setenv                  MPI_FORTRAN_MOD_DIR     /usr/lib64/gfortran/modules/mpich-x86_64\n")
-        mpich_module.write("setenv                  MPI_INCLUDE     "+mpich_dir+"/include\n")
-        mpich_module.write("setenv                  MPI_LIB         "+mpich_dir+"/lib\n")
-        #mpich_module.write("setenv                  MPI_MAN         /usr/share/man/mpich-x86_64\n")
-        #mpich_module.write("setenv                  MPI_PYTHON_SITEARCH     /usr/lib64/python2.7/site-packages/mpich\n")
-        mpich_module.write("setenv                  MPI_COMPILER    mpiexec\n")
-        mpich_module.write("setenv                  MPI_SUFFIX      _mpich\n")
-        mpich_module.write("setenv                  MPI_HOME        "+mpich_dir+"\n")
-        mpich_module.close()
-
-    elif "mvapich" in compilerToolsetSelectedSet:
-      gccInstallDir = compiler_toolset_dir+"/gcc-"+gcc_version
-      if not os.path.exists(gccInstallDir) and not inOptions.skipOp:
-        raise Exception("Error, gcc has not been installed yet." \
-          "  Missing directory '"+gccInstallDir+"'")
-      LD_LIBRARY_PATH = os.environ.get("LD_LIBRARY_PATH", "")
-      mvapichDir = gccInstallDir + "/toolset/mvapich-" + mvapich_version
-      if not inOptions.skipOp:
-        os.system("yum install libibverbs")
-        os.system("gzip -dc mvapich2-" + mvapich_version + ".tar.gz | tar -x")
-        os.chdir("mvapich2-" + mvapich_version)
-        os.system("./configure --prefix " + mvapichDir)
-        os.system("make -j8")
-        os.system("make install")
-        mvapich_module = open(dev_env_dir + "/mvapich-" + mvapich_version, 'w+')
-        mvapich_module.write("conflict mpich\n")
-        mvapich_module.write("prepend-path            PATH            /usr/lib64/mvapich2/bin\n")
-        mvapich_module.write("prepend-path            LD_LIBRARY_PATH /usr/lib64/mvapich2/lib\n")
-        mvapich_module.write("prepend-path            PYTHONPATH      /usr/lib64/python2.7/site-packages/mvapich2\n")
-        mvapich_module.write("prepend-path            MANPATH         /usr/share/man/mvapich2-x86_64\n")
-        mvapich_module.write("prepend-path            PKG_CONFIG_PATH /usr/lib64/mvapich2/lib/pkgconfig\n")
-        mvapich_module.write("setenv                  MPI_BIN         /usr/lib64/mvapich2/bin\n")
-        mvapich_module.write("setenv                  MPI_SYSCONFIG   /etc/mvapich2-x86_64\n")
-        mvapich_module.write("setenv                  MPI_FORTRAN_MOD_DIR     /usr/lib64/gfortran/modules/mvapich2-x86_64\n")
-        mvapich_module.write("setenv                  MPI_INCLUDE     /usr/include/mvapich2-x86_64\n")
-        mvapich_module.write("setenv                  MPI_LIB         /usr/lib64/mvapich2/lib\n")
-        mvapich_module.write("setenv                  MPI_MAN         /usr/share/man/mvapich2-x86_64\n")
-        mvapich_module.write("setenv                  MPI_PYTHON_SITEARCH     /usr/lib64/python2.7/site-packages/mvapich2")
-        mvapich_module.write("setenv                  MPI_COMPILER    mvapich2-x86_64\n")
-        mvapich_module.write("setenv                  MPI_SUFFIX      _mvapich2\n")
-        mvapich_module.write("setenv                  MPI_HOME        /usr/lib64/mvapich2")
-        mvapich_module.close()
+        writeDevEnvSnapshotFiles(variant.devEnvDirs, inOptions,
+          variant.versionList, TPLToolsetSelectedSet, variant.mvapichInstalled)
+    if installErrors:
+      raise Exception("\n".join(installErrors))
   else:
     print("Skipping install of the tools on request!")
 
+  if inOptions.runtimeImage:
+    for variant in variants:
+      print("\nWriting the runtime image Dockerfile under " \
+        +getRuntimeImageDir(variant.devEnvDirs)+" ...")
+      if not inOptions.skipOp:
+        writeRuntimeImage(variant.devEnvDirs, inOptions, variant.versionList,
+          TPLToolsetSelectedSet, variant.mvapichInstalled)
+
+  if inOptions.planFile:
+    print("\nWriting the plan to '"+inOptions.planFile+"' ...")
+    writeBuildPlan(
+      getBuildPlan(inOptions).getPlan(int(inOptions.downloadJobs)),
+      inOptions.planFile)
+
   ###
   print("\n\nD) Final instructions for using installed dev env:")
   ###
@@ -1039,74 +2920,39 @@ def main(cmndLineArgs):
     print("*** NOTE: --no-op provided, only traced actions that would have been taken!")
     print("***")
   else:
-    os.system("mv /home/mkbz/git/mpact-dev-env/devtools_install/load_dev_env.sh " + dev_env_dir)
-    os.system("mv /home/mkbz/git/mpact-dev-env/devtools_install/load_dev_env.csh " + dev_env_dir)
-
-  print("installing CMake target for vera_tpls")
-  if not inOptions.skipOp and inOptions.doInstall:
-    os.system("mkdir " + compiler_toolset_base_dir + "/tpls")
-    os.chdir(scratch_dir + "/..")
-    os.system("git submodule init && git submodule update")
-    if not os.path.exists(scratch_dir + "/tmp"):
-      os.mkdir(scratch_dir + "/tmp")
-    os.chdir(scratch_dir + "/tmp")
-    os.system("rm -rf *")
-    #os.system("module load mpi")
-    if 'HDF5_ROOT' in os.environ:
-      del os.environ['HDF5_ROOT']
-    if 'BLAS_ROOT' in os.environ:
-      del os.environ['BLAS_ROOT']
-    if 'LAPACK_DIR' in os.environ:
-      del os.environ['LAPACK_DIR']
-    if 'HYPRE_DIR' in os.environ:
-      del os.environ['HYPRE_DIR']
-    if 'PETSC_DIR' in os.environ:
-      del os.environ['PETSC_DIR']
-    if 'SLEPC_DIR' in os.environ:
-      del os.environ['SLEPC_DIR']
-    if 'SUNDIALS_DIR' in os.environ:
-      del os.environ['SUNDIALS_DIR']
-
-    #mpicc_path = compiler_toolset_dir + "/mpich-"+ mpich_version + "/bin/mpicc"
-    #mpicxx_path = compiler_toolset_dir + "/mpich-"+ mpich_version + "/bin/mpicxx"
-    #mpif90_path = compiler_toolset_dir + "/mpich-"+ mpich_version + "/bin/mpif90"
-
-    # Now do the Python equivalent of loading the mpi module
-    os.environ['PATH'] = compiler_toolset_dir + "/mpich-" + mpich_version + "/bin" + os.pathsep + os.environ['PATH']
-
-    if 'LD_LIBRARY_PATH' in os.environ:
-      os.environ['LD_LIBRARY_PATH'] = compiler_toolset_dir + "/mpich-" + mpich_version + "/lib" + os.pathsep + os.environ['LD_LIBRARY_PATH']
-    else:
-      os.environ['LD_LIBRARY_PATH'] = compiler_toolset_dir + "/mpich-" + mpich_version + "/lib"
+    os.system("mv /home/mkbz/git/mpact-dev-env/devtools_install/load_dev_env.sh " + variants[0].devEnvDirs["env"])
+    os.system("mv /home/mkbz/git/mpact-dev-env/devtools_install/load_dev_env.csh " + variants[0].devEnvDirs["env"])
 
-    if 'PKG_CONFIG_PATH' in os.environ:
-      os.environ['PKG_CONFIG_PATH'] = compiler_toolset_dir + "/mpich-" + mpich_version + "/lib/pkgconfig" + os.pathsep + os.environ['PKG_CONFIG_PATH']
-    else:
-      os.environ['PKG_CONFIG_PATH'] = compiler_toolset_dir + "/mpich-" + mpich_version + "/lib/pkgconfig"
-
-    os.environ['MPI_BIN'] = compiler_toolset_dir + "/mpich-" + mpich_version + "/bin"
-    os.environ['MPI_INCLUDE'] = compiler_toolset_dir + "/mpich-" + mpich_version + "/include"
-    os.environ['MPI_LIB'] = compiler_toolset_dir + "/mpich-" + mpich_version + "/lib"
-    os.environ['MPI_COMPILER'] = "mpiexec"
-    os.environ['MPI_SUFFIX'] = "_mpich"
-    os.environ['MPI_HOME'] = compiler_toolset_dir + "/mpich-" + mpich_version
-
-
-    os.system('cmake  -D CMAKE_INSTALL_PREFIX=' + compiler_toolset_base_dir + '/tpls -D CMAKE_BUILD_TYPE=Release  -D CMAKE_CXX_COMPILER=mpicxx -D CMAKE_C_COMPILER=mpicc -D CMAKE_Fortran_COMPILER=mpif90 -D FFLAGS="-fPIC -O3"  -D CFLAGS="-fPIC -O3"  -D CXXFLAGS="-fPIC -O3"  -D LDFLAGS=""  -D ENABLE_SHARED=ON  -D PROCS_INSTALL=8 ../../vera_tpls/TPL_build')
-    os.system("make -j8 || make -j8")
-  else:
-    print("git submodule init && git submodule update")
-    print('cmake  -D CMAKE_INSTALL_PREFIX=' + compiler_toolset_base_dir + '/tpls -D CMAKE_BUILD_TYPE=Release  -D CMAKE_CXX_COMPILER=mpicxx  -D CMAKE_C_COMPILER=mpicc  -D CMAKE_Fortran_COMPILER=mpif90  -D FFLAGS="-fPIC -O3"  -D CFLAGS="-fPIC -O3"  -D CXXFLAGS="-fPIC -O3"  -D LDFLAGS=""  -D ENABLE_SHARED=ON  -D PROCS_INSTALL=8 ../vera_tpls/TPL_build')
-    print("make -j8")
   if not inOptions.skipOp:
-    if inOptions.build_image:
-      print("building docker image")
-      os.system("docker build -t test-mpact-dev-env " + dev_env_base_dir + "/images")
+    for variant in variants:
+      imageTag = "test-mpact-dev-env"
+      if variant.taskNameSuffix:
+        imageTag += "-" + variant.name
+      if inOptions.build_image and inOptions.runtimeImage:
+        print("building runtime docker image")
+        # NOTE: The install dir is the build context (see RuntimeImage.py)
+        os.system("DOCKER_BUILDKIT=1 docker build -f " +
+          getRuntimeImageDir(variant.devEnvDirs) + "/Dockerfile" +
+          " -t " + imageTag + "-runtime " + dev_env_base_dir)
+      elif inOptions.build_image:
+        print("building docker image")
+        # NOTE: The cache mounts in the Dockerfile need BuildKit
+        os.system("DOCKER_BUILDKIT=1 docker build -t " + imageTag + " " +
+          dev_env_base_dir + "/images/" +
+          getImageDirName(variant.devEnvDirs, "dev_env"))
   if inOptions.showFinalInstructions:
-    print("\nTo use the new dev env, just source the file:\n")
-    print("  source " + dev_env_base_dir + "/env/load_dev_env.sh\n")
+    for variant in variants:
+      if variant.taskNameSuffix:
+        print("\nTo use the new dev env " + variant.name + ", just source" +
+          " the file:\n")
+      else:
+        print("\nTo use the new dev env, just source the file:\n")
+      print("  source " + variant.devEnvDirs["env"] + "/load_dev_env.sh\n")
     print("for sh or bash shells (or load_dev_env.csh for csh shell).\n")
-    print("TIP: Add this source to your ~/.bash_profile!")
+    print("TIP: Add this source to your ~/.bash_profile!\n")
+    print("For batch jobs, source the " +
+      inOptions.loadDevEnvFileBaseName + "_snapshot.[sh,csh] next to it" +
+      " instead which sets the same env without any module loads.")
   else:
     print("Skipping on request ...")
   print("\n[End]")
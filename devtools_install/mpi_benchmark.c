@@ -0,0 +1,130 @@
+/*
+ * Ping-pong and all-reduce microbenchmark of an installed MPI.
+ *
+ * Built with the mpicc of the new MPI and run by install_devtools.py after
+ * the MPI is installed (see MpiBenchmark.py).  Rank 0 prints one line per
+ * measurement:
+ *
+ *   pingpong <bytes> <one-way latency in us> <bandwidth in MB/s>
+ *   allreduce <bytes> <latency in us>
+ *
+ * The ping-pong is between ranks 0 and 1, the all-reduce (sum of doubles)
+ * is over all of the ranks.  Each is the best of a few repetitions so that
+ * a busy host gives less noisy results.
+ */
+
+#include <mpi.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+static const int msgSizes[] = { 8, 1024, 65536, 1048576 };
+static const int numMsgSizes = sizeof(msgSizes) / sizeof(msgSizes[0]);
+static const int numWarmupIters = 10;
+static const int numReps = 3;
+
+static int getNumIters(int msgSize)
+{
+  return msgSize >= 65536 ? 100 : 1000;
+}
+
+static double pingPong(char *buf, int msgSize, int numIters, int rank)
+{
+  int i;
+  double startTime = 0.0;
+  for (i = -numWarmupIters; i < numIters; ++i) {
+    if (i == 0) {
+      MPI_Barrier(MPI_COMM_WORLD);
+      startTime = MPI_Wtime();
+    }
+    if (rank == 0) {
+      MPI_Send(buf, msgSize, MPI_CHAR, 1, 0, MPI_COMM_WORLD);
+      MPI_Recv(buf, msgSize, MPI_CHAR, 1, 0, MPI_COMM_WORLD,
+        MPI_STATUS_IGNORE);
+    }
+    else if (rank == 1) {
+      MPI_Recv(buf, msgSize, MPI_CHAR, 0, 0, MPI_COMM_WORLD,
+        MPI_STATUS_IGNORE);
+      MPI_Send(buf, msgSize, MPI_CHAR, 0, 0, MPI_COMM_WORLD);
+    }
+  }
+  return (MPI_Wtime() - startTime) / numIters / 2.0;
+}
+
+static double allReduce(double *sendBuf, double *recvBuf, int count,
+  int numIters)
+{
+  int i;
+  double startTime = 0.0, time, maxTime;
+  for (i = -numWarmupIters; i < numIters; ++i) {
+    if (i == 0) {
+      MPI_Barrier(MPI_COMM_WORLD);
+      startTime = MPI_Wtime();
+    }
+    MPI_Allreduce(sendBuf, recvBuf, count, MPI_DOUBLE, MPI_SUM,
+      MPI_COMM_WORLD);
+  }
+  time = (MPI_Wtime() - startTime) / numIters;
+  maxTime = time;
+  MPI_Reduce(&time, &maxTime, 1, MPI_DOUBLE, MPI_MAX, 0, MPI_COMM_WORLD);
+  return maxTime;
+}
+
+int main(int argc, char **argv)
+{
+  int rank, numRanks, i, rep, maxMsgSize;
+  char *buf;
+  double *sendBuf, *recvBuf, time, repTime;
+
+  MPI_Init(&argc, &argv);
+  MPI_Comm_rank(MPI_COMM_WORLD, &rank);
+  MPI_Comm_size(MPI_COMM_WORLD, &numRanks);
+  if (numRanks < 2) {
+    fprintf(stderr, "Error, the MPI benchmark needs at least 2 ranks!\n");
+    MPI_Abort(MPI_COMM_WORLD, 1);
+  }
+
+  maxMsgSize = msgSizes[numMsgSizes - 1];
+  buf = (char *) malloc(maxMsgSize);
+  sendBuf = (double *) malloc(maxMsgSize);
+  recvBuf = (double *) malloc(maxMsgSize);
+  if (!buf || !sendBuf || !recvBuf) {
+    fprintf(stderr, "Error, could not allocate the MPI benchmark buffers!\n");
+    MPI_Abort(MPI_COMM_WORLD, 1);
+  }
+  memset(buf, 0, maxMsgSize);
+  for (i = 0; i < maxMsgSize / (int) sizeof(double); ++i) {
+    sendBuf[i] = 1.0;
+  }
+
+  for (i = 0; i < numMsgSizes; ++i) {
+    time = pingPong(buf, msgSizes[i], getNumIters(msgSizes[i]), rank);
+    for (rep = 1; rep < numReps; ++rep) {
+      repTime = pingPong(buf, msgSizes[i], getNumIters(msgSizes[i]), rank);
+      time = repTime < time ? repTime : time;
+    }
+    if (rank == 0) {
+      printf("pingpong %d %.3f %.3f\n", msgSizes[i], time * 1.0e6,
+        msgSizes[i] / time / 1.0e6);
+    }
+  }
+
+  for (i = 0; i < numMsgSizes; ++i) {
+    time = allReduce(sendBuf, recvBuf, msgSizes[i] / (int) sizeof(double),
+      getNumIters(msgSizes[i]));
+    for (rep = 1; rep < numReps; ++rep) {
+      repTime = allReduce(sendBuf, recvBuf,
+        msgSizes[i] / (int) sizeof(double), getNumIters(msgSizes[i]));
+      time = repTime < time ? repTime : time;
+    }
+    if (rank == 0) {
+      printf("allreduce %d %.3f\n", msgSizes[i], time * 1.0e6);
+    }
+  }
+
+  free(buf);
+  free(sendBuf);
+  free(recvBuf);
+  MPI_Finalize();
+  return 0;
+}
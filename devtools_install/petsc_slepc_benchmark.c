@@ -0,0 +1,176 @@
+/*
+ * Linear and eigenvalue solver smoke benchmark of the installed PETSc and
+ * SLEPc.
+ *
+ * Built with mpicc against the installed PETSc and SLEPc and run by
+ * install_devtools.py on several MPI ranks after the TPLs are installed (see
+ * TplBenchmarks.py).  It solves the 5-point 2D Laplacian on an m x m grid
+ * with a KSP (CG with Jacobi) and finds a few of its largest eigenvalues
+ * with an EPS (Krylov-Schur).  Rank 0 prints one line per measurement:
+ *
+ *   ksp_solve_s:<m> <seconds>         (best of a few solves)
+ *   ksp_iterations:<m> <iterations>
+ *   eps_solve_s:<m> <seconds>
+ *   eps_iterations:<m> <iterations>
+ *   petsc_debug <1 if PETSc was configured with debugging, else 0>
+ *
+ * It fails if a solve does not converge.
+ */
+
+#include <slepceps.h>
+
+static const PetscInt kspGridSize = 256;
+static const PetscInt epsGridSize = 64;
+static const PetscInt numEigenvalues = 4;
+static const int numReps = 3;
+
+/* The 5-point 2D Laplacian on an m x m grid with Dirichlet boundaries */
+static PetscErrorCode createLaplacian(PetscInt m, Mat *A)
+{
+  PetscErrorCode ierr;
+  PetscInt n = m * m, row, rowStart, rowEnd, i, j, numCols, cols[5];
+  PetscScalar vals[5];
+
+  ierr = MatCreateAIJ(PETSC_COMM_WORLD, PETSC_DECIDE, PETSC_DECIDE, n, n, 5,
+    NULL, 4, NULL, A); CHKERRQ(ierr);
+  ierr = MatGetOwnershipRange(*A, &rowStart, &rowEnd); CHKERRQ(ierr);
+  for (row = rowStart; row < rowEnd; ++row) {
+    i = row / m;
+    j = row % m;
+    numCols = 0;
+    if (i > 0) {
+      cols[numCols] = row - m; vals[numCols++] = -1.0;
+    }
+    if (j > 0) {
+      cols[numCols] = row - 1; vals[numCols++] = -1.0;
+    }
+    cols[numCols] = row; vals[numCols++] = 4.0;
+    if (j < m - 1) {
+      cols[numCols] = row + 1; vals[numCols++] = -1.0;
+    }
+    if (i < m - 1) {
+      cols[numCols] = row + m; vals[numCols++] = -1.0;
+    }
+    ierr = MatSetValues(*A, 1, &row, numCols, cols, vals, INSERT_VALUES);
+    CHKERRQ(ierr);
+  }
+  ierr = MatAssemblyBegin(*A, MAT_FINAL_ASSEMBLY); CHKERRQ(ierr);
+  ierr = MatAssemblyEnd(*A, MAT_FINAL_ASSEMBLY); CHKERRQ(ierr);
+  return 0;
+}
+
+static PetscErrorCode benchKsp(PetscInt m)
+{
+  PetscErrorCode ierr;
+  Mat A;
+  Vec x, b;
+  KSP ksp;
+  PC pc;
+  KSPConvergedReason reason;
+  PetscInt rowStart, rowEnd, numIters;
+  PetscLogDouble startTime, endTime, bestTime = 0.0;
+  int rep;
+
+  ierr = createLaplacian(m, &A); CHKERRQ(ierr);
+  ierr = MatGetOwnershipRange(A, &rowStart, &rowEnd); CHKERRQ(ierr);
+  ierr = VecCreateMPI(PETSC_COMM_WORLD, rowEnd - rowStart, m * m, &x);
+  CHKERRQ(ierr);
+  ierr = VecDuplicate(x, &b); CHKERRQ(ierr);
+  /* The exact solution is all ones */
+  ierr = VecSet(x, 1.0); CHKERRQ(ierr);
+  ierr = MatMult(A, x, b); CHKERRQ(ierr);
+
+  ierr = KSPCreate(PETSC_COMM_WORLD, &ksp); CHKERRQ(ierr);
+  ierr = KSPSetOperators(ksp, A, A); CHKERRQ(ierr);
+  ierr = KSPSetType(ksp, KSPCG); CHKERRQ(ierr);
+  ierr = KSPGetPC(ksp, &pc); CHKERRQ(ierr);
+  ierr = PCSetType(pc, PCJACOBI); CHKERRQ(ierr);
+  ierr = KSPSetTolerances(ksp, 1.0e-8, PETSC_DEFAULT, PETSC_DEFAULT, 10000);
+  CHKERRQ(ierr);
+  ierr = KSPSetUp(ksp); CHKERRQ(ierr);
+
+  for (rep = 0; rep < numReps; ++rep) {
+    ierr = VecSet(x, 0.0); CHKERRQ(ierr);
+    ierr = PetscTime(&startTime); CHKERRQ(ierr);
+    ierr = KSPSolve(ksp, b, x); CHKERRQ(ierr);
+    ierr = PetscTime(&endTime); CHKERRQ(ierr);
+    ierr = KSPGetConvergedReason(ksp, &reason); CHKERRQ(ierr);
+    if (reason <= 0) {
+      SETERRQ(PETSC_COMM_WORLD, PETSC_ERR_NOT_CONVERGED,
+        "The KSP solve of the 2D Laplacian did not converge");
+    }
+    if (rep == 0 || endTime - startTime < bestTime) {
+      bestTime = endTime - startTime;
+    }
+  }
+  ierr = KSPGetIterationNumber(ksp, &numIters); CHKERRQ(ierr);
+
+  ierr = PetscPrintf(PETSC_COMM_WORLD, "ksp_solve_s:%d %.6f\n", (int) m,
+    (double) bestTime); CHKERRQ(ierr);
+  ierr = PetscPrintf(PETSC_COMM_WORLD, "ksp_iterations:%d %d\n", (int) m,
+    (int) numIters); CHKERRQ(ierr);
+
+  ierr = KSPDestroy(&ksp); CHKERRQ(ierr);
+  ierr = VecDestroy(&x); CHKERRQ(ierr);
+  ierr = VecDestroy(&b); CHKERRQ(ierr);
+  ierr = MatDestroy(&A); CHKERRQ(ierr);
+  return 0;
+}
+
+static PetscErrorCode benchEps(PetscInt m)
+{
+  PetscErrorCode ierr;
+  Mat A;
+  EPS eps;
+  PetscInt numConverged, numIters;
+  PetscLogDouble startTime, endTime;
+
+  ierr = createLaplacian(m, &A); CHKERRQ(ierr);
+  ierr = EPSCreate(PETSC_COMM_WORLD, &eps); CHKERRQ(ierr);
+  ierr = EPSSetOperators(eps, A, NULL); CHKERRQ(ierr);
+  ierr = EPSSetProblemType(eps, EPS_HEP); CHKERRQ(ierr);
+  ierr = EPSSetType(eps, EPSKRYLOVSCHUR); CHKERRQ(ierr);
+  ierr = EPSSetWhichEigenpairs(eps, EPS_LARGEST_MAGNITUDE); CHKERRQ(ierr);
+  ierr = EPSSetDimensions(eps, numEigenvalues, PETSC_DEFAULT, PETSC_DEFAULT);
+  CHKERRQ(ierr);
+  ierr = EPSSetTolerances(eps, 1.0e-8, 10000); CHKERRQ(ierr);
+  ierr = EPSSetUp(eps); CHKERRQ(ierr);
+
+  ierr = PetscTime(&startTime); CHKERRQ(ierr);
+  ierr = EPSSolve(eps); CHKERRQ(ierr);
+  ierr = PetscTime(&endTime); CHKERRQ(ierr);
+  ierr = EPSGetConverged(eps, &numConverged); CHKERRQ(ierr);
+  if (numConverged < numEigenvalues) {
+    SETERRQ(PETSC_COMM_WORLD, PETSC_ERR_NOT_CONVERGED,
+      "The EPS solve of the 2D Laplacian did not converge");
+  }
+  ierr = EPSGetIterationNumber(eps, &numIters); CHKERRQ(ierr);
+
+  ierr = PetscPrintf(PETSC_COMM_WORLD, "eps_solve_s:%d %.6f\n", (int) m,
+    (double) (endTime - startTime)); CHKERRQ(ierr);
+  ierr = PetscPrintf(PETSC_COMM_WORLD, "eps_iterations:%d %d\n", (int) m,
+    (int) numIters); CHKERRQ(ierr);
+
+  ierr = EPSDestroy(&eps); CHKERRQ(ierr);
+  ierr = MatDestroy(&A); CHKERRQ(ierr);
+  return 0;
+}
+
+int main(int argc, char **argv)
+{
+  PetscErrorCode ierr;
+
+  ierr = SlepcInitialize(&argc, &argv, NULL, NULL);
+  if (ierr) {
+    return ierr;
+  }
+  ierr = benchKsp(kspGridSize); CHKERRQ(ierr);
+  ierr = benchEps(epsGridSize); CHKERRQ(ierr);
+#if defined(PETSC_USE_DEBUG)
+  ierr = PetscPrintf(PETSC_COMM_WORLD, "petsc_debug 1\n"); CHKERRQ(ierr);
+#else
+  ierr = PetscPrintf(PETSC_COMM_WORLD, "petsc_debug 0\n"); CHKERRQ(ierr);
+#endif
+  ierr = SlepcFinalize();
+  return ierr;
+}
@@ -0,0 +1,111 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+
+#
+# Unit tests for BenchmarkBaselines.py
+#
+
+from FindGeneralScriptSupport import *
+from BenchmarkBaselines import *
+from MpiBenchmark import getMpiBenchmarkMetricRule
+
+import shutil
+import tempfile
+import unittest
+
+
+def getCountOrTimeRule(metric):
+  if metric == "commands":
+    return isBenchmarkCountRegressed
+  return isBenchmarkIncreaseRegressed
+
+
+class test_getBenchmarkRegressions(unittest.TestCase):
+
+  def test_metric_rules(self):
+    self.assertTrue(isBenchmarkIncreaseRegressed(2.1, 1.0, 1.0))
+    self.assertFalse(isBenchmarkIncreaseRegressed(2.0, 1.0, 1.0))
+    self.assertTrue(isBenchmarkDecreaseRegressed(0.4, 1.0, 1.0))
+    self.assertFalse(isBenchmarkDecreaseRegressed(0.5, 1.0, 1.0))
+    self.assertTrue(isBenchmarkCountRegressed(11, 10, 1.0))
+    self.assertFalse(isBenchmarkCountRegressed(10, 10, 1.0))
+
+  def test_regressions(self):
+    baseline = {"commands" : 10, "wall_s" : 1.0, "cpu_s" : 1.0}
+    results = {"commands" : 11, "wall_s" : 1.4, "cpu_s" : 1.6,
+      "processes" : 3}
+    self.assertEqual(getBenchmarkRegressions(results, baseline, 0.5,
+      getCountOrTimeRule),
+      ["commands: 11.000 (baseline 10.000)",
+       "cpu_s: 1.600 (baseline 1.000)"])
+
+  def test_mpi_benchmark_rules(self):
+    baseline = {"pingpong_latency_us:8" : 1.0,
+      "pingpong_bandwidth_mbps:1048576" : 1000.0}
+    self.assertEqual(getBenchmarkRegressions(
+      {"pingpong_latency_us:8" : 0.5,
+       "pingpong_bandwidth_mbps:1048576" : 400.0}, baseline, 1.0,
+      getMpiBenchmarkMetricRule),
+      ["pingpong_bandwidth_mbps:1048576: 400.000 (baseline 1000.000)"])
+
+  def test_report(self):
+    reportStr = getBenchmarkReportStr({"a" : 1.0, "b" : 2.0}, {"a" : 0.5})
+    self.assertEqual(reportStr.splitlines()[1].split(), ["a", "1.000", "0.500"])
+    self.assertEqual(reportStr.splitlines()[2].split(), ["b", "2.000", "-"])
+
+
+class test_benchmarkBaselinesFile(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpDir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpDir)
+
+  def test_write_and_read(self):
+    baselineFile = os.path.join(self.tmpDir, "a", "b", "baseline.json")
+    self.assertEqual(readBenchmarkBaselines(baselineFile), {})
+    writeBenchmarkBaselines(baselineFile, {"key" : {"wall_s" : 1.0}})
+    self.assertEqual(readBenchmarkBaselines(baselineFile),
+      {"key" : {"wall_s" : 1.0}})
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,85 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Unit tests for BuildParallelism.py
+#
+
+from FindGeneralScriptSupport import *
+from BuildParallelism import *
+
+import unittest
+
+
+class test_BuildParallelism(unittest.TestCase):
+
+  def test_auto_jobs_limited_by_cores(self):
+    self.assertEqual(getAutoNumJobs("mpich", 4, 64*1024), 4)
+
+  def test_auto_jobs_limited_by_memory(self):
+    self.assertEqual(getAutoNumJobs("gcc", 16, 8192), 4)
+    self.assertEqual(getAutoNumJobs("mpich", 16, 8192), 16)
+
+  def test_auto_jobs_at_least_one(self):
+    self.assertEqual(getAutoNumJobs("gcc", 16, 100), 1)
+    self.assertEqual(getAutoNumJobs("gcc", 0, 0), 1)
+
+  def test_unknown_memory_uses_the_cores(self):
+    self.assertEqual(getAutoNumJobs("gcc", 8, 0), 8)
+
+  def test_tool_without_memory_needs(self):
+    self.assertEqual(getAutoNumJobs("gitdist", 8, 100), 8)
+
+  def test_mem_per_job_default(self):
+    self.assertEqual(getToolMemPerJobMb("not-a-tool"), toolMemPerJobMb_default)
+
+  def test_explicit_parallel_level(self):
+    self.assertEqual(getParallelJobs("3", "gcc"), 3)
+    self.assertEqual(getParallelJobs(5, "gcc"), 5)
+
+  def test_auto_parallel_level(self):
+    numJobs = getParallelJobs(autoParallelLevel, "gcc")
+    self.assertTrue(1 <= numJobs <= getNumCores())
+
+  def test_read_first_line_of_missing_file(self):
+    self.assertEqual(readFirstLine("/does/not/exist"), "")
+
+
+if __name__ == '__main__':
+  unittest.main()
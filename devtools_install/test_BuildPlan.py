@@ -0,0 +1,166 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Unit tests for BuildPlan.py
+#
+
+from FindGeneralScriptSupport import *
+from BuildPlan import *
+
+import unittest
+
+
+def getStageEvent(toolName, stageName, wall, start, status="done"):
+  return {"event" : "stage", "tool" : toolName, "stage" : stageName,
+    "wall" : wall, "start" : start, "status" : status}
+
+
+class test_getToolBaseName(unittest.TestCase):
+
+  def test_tool_base_names(self):
+    self.assertEqual(getToolBaseName("gcc-4.8.3"), "gcc")
+    self.assertEqual(getToolBaseName("mpich-3.1.3@gcc-5.4.0"), "mpich")
+    self.assertEqual(getToolBaseName("vera_tpls-hdf5"), "vera_tpls-hdf5")
+    self.assertEqual(getToolBaseName("gitdist"), "gitdist")
+
+
+class test_getStageDurationEstimates(unittest.TestCase):
+
+  def test_average_of_the_last_runs(self):
+    events = [getStageEvent("gcc-4.8.3", "build", wall, start)
+      for (wall, start) in [(100.0, 1.0), (10.0, 2.0), (20.0, 3.0),
+        (30.0, 4.0)]]
+    estimates = getStageDurationEstimates(events)
+    self.assertEqual(estimates[("gcc-4.8.3", "build")], 20.0)
+    self.assertEqual(estimates[("gcc", "build")], 20.0)
+
+  def test_only_done_stages(self):
+    events = [getStageEvent("gcc-4.8.3", "build", 10.0, 1.0),
+      getStageEvent("gcc-4.8.3", "build", 1.0, 2.0, "failed"),
+      getStageEvent("gcc-4.8.3", "build", 0.0, 3.0, "skipped")]
+    estimates = getStageDurationEstimates(events)
+    self.assertEqual(estimates[("gcc-4.8.3", "build")], 10.0)
+
+
+class test_BuildPlan(unittest.TestCase):
+
+  def getPlan(self):
+    plan = BuildPlan({("gcc", "build") : 100.0, ("gcc-4.8.3", "build") : 90.0,
+      ("mpich", "build") : 30.0, ("cmake", "build") : 20.0,
+      ("gcc-4.8.3", "download") : 8.0, ("mpich-3.1.3", "download") : 4.0})
+    plan.addDownload("gcc-4.8.3", "url", "network")
+    plan.addDownload("mpich-3.1.3", "url", "network")
+    plan.addDownload("cmake-3.3.2", "url", "up-to-date")
+    plan.addTool("gcc-4.8.3", [], 4)
+    plan.addStage("gcc-4.8.3", "untar", True)
+    plan.addStage("gcc-4.8.3", "build", True)
+    plan.addTool("mpich-3.1.3", ["gcc-4.8.3"], 4)
+    plan.addStage("mpich-3.1.3", "build", True)
+    plan.addTool("cmake-3.3.2", [], 4)
+    plan.addStage("cmake-3.3.2", "build", False)
+    return plan
+
+  def test_estimate_falls_back_to_other_versions(self):
+    plan = self.getPlan()
+    self.assertEqual(plan.getEstimate("gcc-4.8.3", "build"), 90.0)
+    self.assertEqual(plan.getEstimate("gcc-5.4.0", "build"), 100.0)
+    self.assertEqual(plan.getEstimate("git-2.6.4", "build"), None)
+
+  def test_estimates(self):
+    planData = self.getPlan().getPlan(numDownloadJobs=1)
+    estimates = planData["estimates"]
+    self.assertEqual(estimates["download"], 12.0)
+    self.assertEqual(estimates["install"], 120.0)
+    self.assertEqual(estimates["total"], 132.0)
+    self.assertEqual(estimates["criticalPath"], ["gcc-4.8.3", "mpich-3.1.3"])
+    self.assertEqual(estimates["unestimated"], ["gcc-4.8.3/untar"])
+
+  def test_benchmarks_run_after_the_installs(self):
+    plan = self.getPlan()
+    plan.estimates[("benchmark-hdf5", "benchmark")] = 5.0
+    plan.estimates[("benchmark-blas_lapack", "benchmark")] = 10.0
+    plan.addTool("benchmark-hdf5", [], 1)
+    plan.addStage("benchmark-hdf5", "benchmark", True)
+    plan.addTool("benchmark-blas_lapack", [], 1)
+    plan.addStage("benchmark-blas_lapack", "benchmark", True)
+    plan.setToolsRunAfter(["benchmark-hdf5", "benchmark-blas_lapack"],
+      ["gcc-4.8.3", "mpich-3.1.3", "cmake-3.3.2"])
+    estimates = plan.getPlan()["estimates"]
+    self.assertEqual(estimates["criticalPath"], ["gcc-4.8.3", "mpich-3.1.3",
+      "benchmark-hdf5", "benchmark-blas_lapack"])
+    self.assertEqual(estimates["install"], 135.0)
+
+  def test_concurrent_downloads(self):
+    estimates = self.getPlan().getPlan(numDownloadJobs=4)["estimates"]
+    self.assertEqual(estimates["download"], 8.0)
+
+  def test_up_to_date_stages(self):
+    planData = self.getPlan().getPlan()
+    cmake = [tool for tool in planData["tools"]
+      if tool["name"] == "cmake-3.3.2"][0]
+    self.assertEqual(cmake["stages"], [{"name" : "build",
+      "action" : "up-to-date", "estimate" : 0.0}])
+    self.assertEqual(cmake["estimate"], 0.0)
+
+  def test_tool_status_and_binary_cache(self):
+    plan = self.getPlan()
+    plan.setBinaryCacheStatus("gcc-4.8.3", True)
+    plan.setBinaryCacheStatus("mpich-3.1.3", False)
+    plan.setBinaryCacheStatus("cmake-3.3.2", None)
+    plan.setToolStatus("gcc-4.8.3", "pending")
+    tools = dict([(tool["name"], tool) for tool in plan.getPlan()["tools"]])
+    self.assertEqual(tools["gcc-4.8.3"]["binaryCache"], "hit")
+    self.assertEqual(tools["mpich-3.1.3"]["binaryCache"], "miss")
+    self.assertEqual(tools["cmake-3.3.2"]["binaryCache"], "unknown")
+    self.assertEqual(tools["gcc-4.8.3"]["status"], "pending")
+
+  def test_traced_tasks_are_not_done(self):
+    plan = self.getPlan()
+    for toolName in ["gcc-4.8.3", "cmake-3.3.2"]:
+      plan.setToolStatus(toolName, "done")
+    plan.setToolStatus("mpich-3.1.3", "skipped")
+    tools = dict([(tool["name"], tool) for tool in plan.getPlan()["tools"]])
+    self.assertEqual(tools["gcc-4.8.3"]["status"], "pending")
+    self.assertEqual(tools["cmake-3.3.2"]["status"], "up-to-date")
+    self.assertEqual(tools["mpich-3.1.3"]["status"], "skipped")
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,156 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Unit tests for BuildTimeline.py
+#
+
+from FindGeneralScriptSupport import *
+from BuildTimeline import *
+
+import shutil
+import tempfile
+import unittest
+
+
+def getTaskEvent(toolName, deps, wall, start=0.0):
+  return {"event" : "task", "tool" : toolName, "deps" : deps,
+    "start" : start, "end" : start+wall, "wall" : wall, "status" : "done"}
+
+
+class test_getCriticalPath(unittest.TestCase):
+
+  def test_no_tasks(self):
+    self.assertEqual(getCriticalPath([]), ([], 0.0))
+
+  def test_diamond(self):
+    # gcc -> (mpich, cmake) -> tpls
+    events = [
+      getTaskEvent("gcc", [], 100.0),
+      getTaskEvent("mpich", ["gcc"], 30.0),
+      getTaskEvent("cmake", ["gcc"], 50.0),
+      getTaskEvent("tpls", ["mpich", "cmake"], 20.0),
+      getTaskEvent("autoconf", [], 10.0),
+      ]
+    (path, length) = getCriticalPath(events)
+    self.assertEqual([e["tool"] for e in path], ["gcc", "cmake", "tpls"])
+    self.assertEqual(length, 170.0)
+
+  def test_deps_that_are_not_tasks_are_ignored(self):
+    events = [getTaskEvent("mpich", ["gcc"], 30.0)]
+    (path, length) = getCriticalPath(events)
+    self.assertEqual([e["tool"] for e in path], ["mpich"])
+    self.assertEqual(length, 30.0)
+
+  def test_independent_tasks(self):
+    events = [getTaskEvent("a", [], 5.0), getTaskEvent("b", [], 7.0)]
+    (path, length) = getCriticalPath(events)
+    self.assertEqual([e["tool"] for e in path], ["b"])
+    self.assertEqual(length, 7.0)
+
+
+class test_BuildTimeline(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpDir = tempfile.mkdtemp()
+    self.timelineFile = os.path.join(self.tmpDir, "logs", "timeline.jsonl")
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpDir)
+
+  def test_events_of_a_run(self):
+    timeline = BuildTimeline(self.timelineFile, "install_devtools.py")
+    timeline.addStageEvent("gcc", "build", 10.0, 25.0, 40.0, 0, "done",
+      "gcc.log")
+    timeline.addTaskEvent("gcc", [], 5.0, 30.0, "done")
+    events = readTimelineEvents(self.timelineFile)
+    self.assertEqual([e["event"] for e in events],
+      ["run-start", "stage", "task"])
+    for event in events:
+      self.assertEqual(event["runId"], timeline.runId)
+    self.assertEqual(events[1]["wall"], 15.0)
+    self.assertEqual(events[1]["cpu"], 40.0)
+    self.assertEqual(events[2]["wall"], 25.0)
+
+  def test_child_script_adds_to_the_run(self):
+    timeline = BuildTimeline(self.timelineFile, "install_devtools.py")
+    childTimeline = BuildTimeline(self.timelineFile, "install-gcc.py",
+      timeline.runId)
+    childTimeline.addStageEvent("gcc-4.8.3", "configure", 1.0, 2.0, 0.5, 0,
+      "done")
+    events = readTimelineEvents(self.timelineFile)
+    self.assertEqual([e["event"] for e in events], ["run-start", "stage"])
+    self.assertEqual(events[1]["script"], "install-gcc.py")
+
+  def test_last_run_is_read(self):
+    timeline1 = BuildTimeline(self.timelineFile, "install_devtools.py",
+      "run1")
+    timeline1.addEvent({"event" : "run-start", "time" : 1.0})
+    timeline1.addTaskEvent("gcc", [], 1.0, 2.0, "done")
+    timeline2 = BuildTimeline(self.timelineFile, "install_devtools.py",
+      "run2")
+    timeline2.addEvent({"event" : "run-start", "time" : 3.0})
+    events = readTimelineEvents(self.timelineFile)
+    self.assertEqual([e["runId"] for e in events], ["run2"])
+    self.assertEqual(len(readTimelineEvents(self.timelineFile, "run1")), 2)
+    self.assertEqual(len(readAllTimelineEvents(self.timelineFile)), 3)
+
+  def test_cut_off_line_is_ignored(self):
+    timeline = BuildTimeline(self.timelineFile, "install_devtools.py")
+    timelineFileHandle = open(self.timelineFile, "a")
+    timelineFileHandle.write('{"event" : "sta')
+    timelineFileHandle.close()
+    self.assertEqual(len(readTimelineEvents(self.timelineFile)), 1)
+
+  def test_report(self):
+    events = [
+      {"event" : "run-start", "runId" : "r", "time" : 0.0},
+      {"event" : "stage", "tool" : "gcc", "stage" : "build", "start" : 1.0,
+       "end" : 101.0, "wall" : 100.0, "cpu" : 350.0, "status" : "done",
+       "script" : "install_devtools.py"},
+      getTaskEvent("gcc", [], 100.0, 1.0),
+      ]
+    reportStr = getTimelineReportStr(events)
+    self.assertTrue("Critical path of the install graph (100.0 s of 100.0 s"
+      in reportStr)
+    self.assertTrue("Total wall time: 101.0 s" in reportStr)
+
+
+if __name__ == '__main__':
+  unittest.main()
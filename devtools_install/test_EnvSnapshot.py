@@ -0,0 +1,121 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Unit tests for EnvSnapshot.py
+#
+
+from FindGeneralScriptSupport import *
+from EnvSnapshot import *
+
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+
+def allPathsExist(path):
+  return True
+
+
+class test_flattenEnvOps(unittest.TestCase):
+
+  def test_merges_the_prepended_paths(self):
+    envOps = [
+      ("setenv", "CC", "gcc"),
+      ("prepend-path", "PATH", "/a/bin"),
+      ("prepend-path", "LD_LIBRARY_PATH", "/a/lib"),
+      ("prepend-path", "PATH", "/b/bin"),
+      ("setenv", "CC", "mpicc"),
+      ]
+    (setVars, prependPaths) = flattenEnvOps(envOps, allPathsExist)
+    self.assertEqual(setVars, [("CC", "mpicc")])
+    self.assertEqual(prependPaths, [("PATH", ["/b/bin", "/a/bin"]),
+      ("LD_LIBRARY_PATH", ["/a/lib"])])
+
+  def test_prepending_a_path_again_moves_it_first(self):
+    envOps = [("prepend-path", "PATH", "/a"), ("prepend-path", "PATH", "/b"),
+      ("prepend-path", "PATH", "/a")]
+    (setVars, prependPaths) = flattenEnvOps(envOps, allPathsExist)
+    self.assertEqual(prependPaths, [("PATH", ["/a", "/b"])])
+
+  def test_missing_paths_are_left_out(self):
+    envOps = [("prepend-path", "PATH", "/a"), ("prepend-path", "PATH", "/b"),
+      ("prepend-path", "MANPATH", "/b/man")]
+    (setVars, prependPaths) = flattenEnvOps(envOps,
+      lambda path: path == "/a")
+    self.assertEqual(prependPaths, [("PATH", ["/a"])])
+
+  def test_invalid_op(self):
+    self.assertRaises(Exception, flattenEnvOps, [("append-path", "PATH", "/a")])
+
+
+class test_writeEnvSnapshotFiles(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpDir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpDir)
+
+  def test_sourcing_the_sh_snapshot_twice(self):
+    binDir = os.path.join(self.tmpDir, "bin")
+    os.makedirs(binDir)
+    fileBasePath = os.path.join(self.tmpDir, "load_dev_env_snapshot")
+    writeEnvSnapshotFiles([("setenv", "MY_CC", "gcc"),
+      ("prepend-path", "PATH", binDir),
+      ("prepend-path", "PATH", os.path.join(self.tmpDir, "missing"))],
+      fileBasePath, "Test snapshot")
+    self.assertTrue(os.path.exists(fileBasePath+".csh"))
+    output = s(subprocess.Popen(["sh", "-c", ". "+fileBasePath+".sh; . " \
+      +fileBasePath+".sh; echo \"$MY_CC $PATH\""],
+      stdout=subprocess.PIPE, env={"PATH" : "/usr/bin:/bin"}
+      ).communicate()[0]).strip()
+    self.assertEqual(output, "gcc "+binDir+":/usr/bin:/bin")
+
+  def test_csh_snapshot(self):
+    cshStr = getEnvSnapshotCshStr([("CC", "gcc")], [("PATH", ["/a", "/b"])],
+      "id", "Test snapshot")
+    self.assertTrue('setenv CC "gcc"' in cshStr)
+    self.assertTrue('  setenv PATH "/a:/b:${PATH}"' in cshStr)
+    self.assertTrue('setenv '+envSnapshotGuardVarName+' "id"' in cshStr)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,193 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+
+#
+# Unit tests for GccPrerequisites.py
+#
+
+from FindGeneralScriptSupport import *
+from GccPrerequisites import *
+
+import shutil
+import tempfile
+import unittest
+
+
+# The contrib/download_prerequisites of GCC 4.8
+gccOldPrerequisitesScript = """#! /bin/sh
+
+# Download some prerequisites needed by gcc.
+# Run this from the top level of the gcc source tree and the gcc
+# build will do the right thing.
+
+# Necessary to build GCC.
+MPFR=mpfr-2.4.2
+GMP=gmp-4.3.2
+MPC=mpc-0.8.1
+
+wget ftp://gcc.gnu.org/pub/gcc/infrastructure/$MPFR.tar.bz2 || exit 1
+tar xjf $MPFR.tar.bz2 || exit 1
+ln -sf $MPFR mpfr || exit 1
+
+wget ftp://gcc.gnu.org/pub/gcc/infrastructure/$GMP.tar.bz2 || exit 1
+tar xjf $GMP.tar.bz2  || exit 1
+ln -sf $GMP gmp || exit 1
+
+wget ftp://gcc.gnu.org/pub/gcc/infrastructure/$MPC.tar.gz || exit 1
+tar xzf $MPC.tar.gz || exit 1
+ln -sf $MPC mpc || exit 1
+
+# Necessary to build GCC with the Graphite loop optimizations.
+if [ "$GRAPHITE_LOOP_OPT" = "yes" ] ; then
+  ISL=isl-0.15
+
+  wget ftp://gcc.gnu.org/pub/gcc/infrastructure/$ISL.tar.bz2 || exit 1
+  tar xjf $ISL.tar.bz2  || exit 1
+  ln -sf $ISL isl || exit 1
+fi
+"""
+
+# The start of the contrib/download_prerequisites of GCC 7 and later
+gccNewPrerequisitesScript = """#! /bin/sh
+program='download_prerequisites'
+
+# Versions of the dependencies
+gmp='gmp-6.1.0.tar.bz2'
+mpfr='mpfr-3.1.4.tar.bz2'
+mpc='mpc-1.0.3.tar.gz'
+isl='isl-0.16.1.tar.bz2'
+
+base_url='ftp://gcc.gnu.org/pub/gcc/infrastructure/'
+
+echo_archives() {
+    echo "${gmp}"
+    echo "${mpfr}"
+    echo "${mpc}"
+    if [ ${graphite} -gt 0 ]; then echo "${isl}"; fi
+}
+
+graphite=1
+verify=1
+force=0
+chksum_extension='sha512'
+"""
+
+# A contrib/prerequisites.sha512 file (the checksums are not the real ones)
+gccPrerequisitesSha512 = """\
+3c82aeab9c1596d4da8afac2eec38e429e84f3211e1a572cf8fd2b546493c44c039b922a1133eaaa48bd7f3e11dbe795a384e21ed95cbe3ecc58d7ac02246117  gmp-6.1.0.tar.bz2
+cf4f4b2d80abb79e820e78c8077b6725bbbb4e8f41896783c899087be0e94068e1a3e31a6a6ce5fdff32a4fd23a1571ea5a7dc2bfc6a1b5b4b61c37c1c2f8e2  mpfr-3.1.4.tar.bz2
+4ce3cf4e5fb8e1e2cd7bb0ed4cc2f4e9b67a4e5e1fb19f0ac39ef1ac0a8d6c5cb3bd76fc5d9b78c8b6c35a1ed8c44c2ecb5e7e6ee8d4d34df3a9d54ac8b1f6d6a  mpc-1.0.3.tar.gz
+"""
+
+
+class test_getGccPrerequisitesFromScript(unittest.TestCase):
+
+  def test_old_script(self):
+    self.assertEqual(getGccPrerequisitesFromScript(gccOldPrerequisitesScript),
+      ["gmp-4.3.2.tar.bz2", "isl-0.15.tar.bz2", "mpc-0.8.1.tar.gz",
+       "mpfr-2.4.2.tar.bz2"])
+
+  def test_new_script(self):
+    self.assertEqual(getGccPrerequisitesFromScript(gccNewPrerequisitesScript),
+      ["gmp-6.1.0.tar.bz2", "isl-0.16.1.tar.bz2", "mpc-1.0.3.tar.gz",
+       "mpfr-3.1.4.tar.bz2"])
+
+  def test_commented_out_wget(self):
+    scriptStr = "GMP=gmp-4.3.2\n# wget ftp://host/$GMP.tar.bz2\n"
+    self.assertEqual(getGccPrerequisitesFromScript(scriptStr), [])
+
+
+class test_getGccPrerequisiteChecksumsFromStr(unittest.TestCase):
+
+  def test_sha512_file(self):
+    checksums = getGccPrerequisiteChecksumsFromStr(gccPrerequisitesSha512)
+    self.assertEqual(sorted(checksums.keys()),
+      ["gmp-6.1.0.tar.bz2", "mpc-1.0.3.tar.gz", "mpfr-3.1.4.tar.bz2"])
+    self.assertTrue(checksums["gmp-6.1.0.tar.bz2"].startswith("3c82aeab"))
+
+  def test_other_lines_are_ignored(self):
+    self.assertEqual(getGccPrerequisiteChecksumsFromStr(
+      "\n# comment\nabc  not-an-archive\nabc def ghi\n"), {})
+
+
+class test_readGccPrerequisites(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpDir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpDir)
+
+  def test_from_src_dir(self):
+    gccSrcDir = os.path.join(self.tmpDir, "gcc-7.3.0")
+    os.makedirs(os.path.join(gccSrcDir, "contrib"))
+    writeStrToFile(os.path.join(gccSrcDir, "contrib",
+      "download_prerequisites"), gccNewPrerequisitesScript)
+    writeStrToFile(os.path.join(gccSrcDir, "contrib", "prerequisites.sha512"),
+      gccPrerequisitesSha512)
+    (archives, checksums) = readGccPrerequisites(gccSrcDir,
+      os.path.join(self.tmpDir, "gcc-7.3.0.tar.gz"), "7.3.0")
+    self.assertEqual(len(archives), 4)
+    self.assertEqual(checksums["mpc-1.0.3.tar.gz"][0], "sha512")
+    self.assertFalse("isl-0.16.1.tar.bz2" in checksums)
+
+  def test_from_tarball(self):
+    gccSrcDir = os.path.join(self.tmpDir, "gcc-4.8.3")
+    os.makedirs(os.path.join(gccSrcDir, "contrib"))
+    writeStrToFile(os.path.join(gccSrcDir, "contrib",
+      "download_prerequisites"), gccOldPrerequisitesScript)
+    gccTarball = os.path.join(self.tmpDir, "gcc-4.8.3.tar.gz")
+    tarballFile = tarfile.open(gccTarball, "w:gz")
+    tarballFile.add(gccSrcDir, "gcc-4.8.3")
+    tarballFile.close()
+    shutil.rmtree(gccSrcDir)
+    (archives, checksums) = readGccPrerequisites(gccSrcDir, gccTarball,
+      "4.8.3")
+    self.assertEqual(archives[0], "gmp-4.3.2.tar.bz2")
+    self.assertEqual(checksums, {})
+
+  def test_missing_script(self):
+    self.assertRaises(Exception, readGccPrerequisites,
+      os.path.join(self.tmpDir, "gcc-4.8.3"),
+      os.path.join(self.tmpDir, "gcc-4.8.3.tar.gz"), "4.8.3")
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,191 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Unit tests for the tarball extraction and the intercepted commands in
+# GeneralScriptSupport.py
+#
+
+from FindGeneralScriptSupport import *
+
+import io
+import shutil
+import tarfile
+import tempfile
+import unittest
+
+
+def getTarballBytes(members):
+  """Return a .tar.gz with the given (name, type, linkname) members"""
+  tarballBytes = io.BytesIO()
+  tarStream = tarfile.open(fileobj=tarballBytes, mode="w:gz")
+  for (name, memberType, linkname) in members:
+    member = tarfile.TarInfo(name)
+    member.type = memberType
+    member.linkname = linkname
+    data = b""
+    if memberType == tarfile.REGTYPE:
+      data = b"data"
+      member.size = len(data)
+    tarStream.addfile(member, io.BytesIO(data))
+  tarStream.close()
+  return tarballBytes.getvalue()
+
+
+class test_checkTarMember(unittest.TestCase):
+
+  def getMember(self, name, memberType=tarfile.REGTYPE, linkname=""):
+    member = tarfile.TarInfo(name)
+    member.type = memberType
+    member.linkname = linkname
+    return member
+
+  def test_safe_members(self):
+    checkTarMember(self.getMember("a/b.txt"), "/dest")
+    checkTarMember(self.getMember("a", tarfile.DIRTYPE), "/dest")
+    checkTarMember(self.getMember("a/c", tarfile.SYMTYPE, "b.txt"), "/dest")
+    checkTarMember(self.getMember("a/d", tarfile.LNKTYPE, "a/b.txt"), "/dest")
+
+  def test_unsafe_members(self):
+    for member in [self.getMember("/etc/passwd"),
+      self.getMember("a/../../evil"),
+      self.getMember("a/c", tarfile.SYMTYPE, "../../evil"),
+      self.getMember("a/c", tarfile.SYMTYPE, "/etc/passwd"),
+      self.getMember("a/d", tarfile.LNKTYPE, "../evil"),
+      self.getMember("a/e", tarfile.CHRTYPE)] \
+      :
+      self.assertRaises(Exception, checkTarMember, member, "/dest")
+
+  def test_removes_setuid_bit(self):
+    member = self.getMember("a/b")
+    member.mode = 0o4755
+    checkTarMember(member, "/dest")
+    self.assertEqual(member.mode, 0o755)
+
+
+class test_extractTarballStream(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpDir = tempfile.mkdtemp()
+    self.destDir = os.path.join(self.tmpDir, "dest")
+    os.makedirs(self.destDir)
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpDir)
+
+  def extract(self, members):
+    extractTarballStream(io.BytesIO(getTarballBytes(members)), "r|gz",
+      self.destDir)
+
+  def test_extracts_files(self):
+    self.extract([("a", tarfile.DIRTYPE, ""), ("a/b.txt", tarfile.REGTYPE, "")])
+    self.assertEqual(readStrFromFile(os.path.join(self.destDir, "a/b.txt")),
+      "data")
+
+  def test_rejects_member_outside_of_dest_dir(self):
+    self.assertRaises(Exception, self.extract,
+      [("../evil.txt", tarfile.REGTYPE, "")])
+    self.assertFalse(os.path.exists(os.path.join(self.tmpDir, "evil.txt")))
+
+
+class test_getTarballDecompressor(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpDir = tempfile.mkdtemp()
+    self.origPath = os.environ.get("PATH", "")
+    os.environ["PATH"] = self.tmpDir
+
+  def tearDown(self):
+    os.environ["PATH"] = self.origPath
+    shutil.rmtree(self.tmpDir)
+
+  # Put a (dummy) program into the PATH
+  def addProgram(self, programName):
+    programPath = os.path.join(self.tmpDir, programName)
+    writeStrToFile(programPath, "#!/bin/sh\n")
+    os.chmod(programPath, 0o755)
+
+  def test_parallel_decompressor_first(self):
+    self.addProgram("gzip")
+    self.assertEqual(getTarballDecompressor("a.tar.gz"), ("gzip -dc", "r|gz"))
+    self.addProgram("pigz")
+    self.assertEqual(getTarballDecompressor("a.tgz"), ("pigz -dc", "r|gz"))
+
+  def test_tarfile_fallback(self):
+    self.assertEqual(getTarballDecompressor("a.tar.bz2"), ("", "r|bz2"))
+    self.assertEqual(getExtractTarballCmnd("a.tar.bz2"), "")
+
+  def test_zstd_has_no_tarfile_fallback(self):
+    self.assertRaises(Exception, getTarballDecompressor, "a.tar.zst")
+    self.assertRaises(Exception, extractTarball, "a.tar.zst")
+    self.addProgram("zstd")
+    self.assertEqual(getTarballDecompressor("a.tar.zst")[0], "zstd -T0 -dc")
+
+  def test_extract_cmnd_quotes_paths(self):
+    self.addProgram("gzip")
+    self.addProgram("tar")
+    self.assertEqual(getExtractTarballCmnd("it's here.tar.gz", "dest dir"),
+      "gzip -dc 'it'\\''s here.tar.gz' | tar -xf - -C 'dest dir'")
+
+
+class test_interceptedCmndOutFile(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpDir = tempfile.mkdtemp()
+    self.outFile = os.path.join(self.tmpDir, "out.txt")
+
+  def tearDown(self):
+    g_sysCmndInterceptor.clear()
+    shutil.rmtree(self.tmpDir)
+
+  def test_writes_output(self):
+    g_sysCmndInterceptor.setInterceptedCmnd("echo a", 0, "a\n")
+    self.assertEqual(runSysCmndInterface("echo a", outFile=self.outFile), 0)
+    self.assertEqual(readStrFromFile(self.outFile), "a\n")
+
+  def test_none_output(self):
+    writeStrToFile(self.outFile, "before\n")
+    g_sysCmndInterceptor.setInterceptedCmnd("echo a", 1)
+    self.assertEqual(runSysCmndInterface("echo a", outFile=self.outFile,
+      appendOutFile=True), 1)
+    self.assertEqual(readStrFromFile(self.outFile), "before\n")
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,267 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Unit tests for InstallScheduler.py
+#
+
+from FindGeneralScriptSupport import *
+from InstallScheduler import *
+
+import shutil
+import tempfile
+import threading
+import unittest
+
+
+#
+# Records the tasks that were run, their order and how many processes were
+# in use at the same time
+#
+class TaskRecorder:
+
+  def __init__(self, taskTime=0.05):
+    self.taskTime = taskTime
+    self.lock = threading.Lock()
+    self.tasksRun = []
+    self.numProcs = {}
+    self.procsInUse = 0
+    self.maxProcsInUse = 0
+    self.memInUse = 0
+    self.maxMemInUse = 0
+
+  def getTaskFunc(self, fail=False):
+    def taskFunc(task):
+      self.lock.acquire()
+      self.tasksRun.append(task.name)
+      self.numProcs[task.name] = task.numProcs
+      self.procsInUse += task.numProcs
+      self.maxProcsInUse = max(self.maxProcsInUse, self.procsInUse)
+      self.memInUse += task.numProcs * task.memPerProcMb
+      self.maxMemInUse = max(self.maxMemInUse, self.memInUse)
+      self.lock.release()
+      time.sleep(self.taskTime)
+      self.lock.acquire()
+      self.procsInUse -= task.numProcs
+      self.memInUse -= task.numProcs * task.memPerProcMb
+      self.lock.release()
+      if fail:
+        raise Exception("Error, "+task.name+" failed!")
+    return taskFunc
+
+
+class test_InstallScheduler(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpDir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpDir)
+
+  def getScheduler(self, cpuBudget, **kwargs):
+    return InstallScheduler(cpuBudget, os.path.join(self.tmpDir, "scratch"),
+      os.path.join(self.tmpDir, "logs"), **kwargs)
+
+  def test_topological_order(self):
+    scheduler = self.getScheduler(1)
+    for (name, deps) in [("tpls", ["mpich", "cmake"]), ("mpich", ["gcc"]),
+      ("gcc", []), ("cmake", [])] \
+      :
+      scheduler.addTask(InstallTask(name, None, deps))
+    order = [task.name for task in scheduler.getTopologicalOrder()]
+    self.assertEqual(order, ["gcc", "cmake", "mpich", "tpls"])
+
+  def test_cycle_is_an_error(self):
+    scheduler = self.getScheduler(1)
+    scheduler.addTask(InstallTask("a", None, ["c"]))
+    scheduler.addTask(InstallTask("b", None, ["a"]))
+    scheduler.addTask(InstallTask("c", None, ["b"]))
+    scheduler.addTask(InstallTask("d", None, []))
+    try:
+      scheduler.getTopologicalOrder()
+      self.fail("Expected an exception")
+    except Exception as e:
+      self.assertTrue("cyclic" in str(e))
+      self.assertFalse("'d'" in str(e))
+
+  def test_unknown_dep_is_an_error(self):
+    scheduler = self.getScheduler(1)
+    scheduler.addTask(InstallTask("mpich", None, ["gcc"]))
+    self.assertRaises(Exception, scheduler.getTopologicalOrder)
+
+  def test_duplicate_task_is_an_error(self):
+    scheduler = self.getScheduler(1)
+    scheduler.addTask(InstallTask("gcc", None))
+    self.assertRaises(Exception, scheduler.addTask, InstallTask("gcc", None))
+
+  def test_downstream_depths(self):
+    scheduler = self.getScheduler(1)
+    scheduler.addTask(InstallTask("gcc", None))
+    scheduler.addTask(InstallTask("mpich", None, ["gcc"]))
+    scheduler.addTask(InstallTask("tpls", None, ["mpich"]))
+    scheduler.addTask(InstallTask("cmake", None))
+    self.assertEqual(scheduler.getDownstreamDepths(),
+      {"gcc" : 3, "mpich" : 2, "tpls" : 1, "cmake" : 1})
+
+  def test_runs_deps_first_within_the_cpu_budget(self):
+    recorder = TaskRecorder()
+    scheduler = self.getScheduler(4)
+    scheduler.addTask(InstallTask("gcc", recorder.getTaskFunc(), [], 4))
+    scheduler.addTask(InstallTask("cmake", recorder.getTaskFunc(), [], 4))
+    scheduler.addTask(InstallTask("autoconf", recorder.getTaskFunc(), [], 1))
+    scheduler.addTask(InstallTask("mpich", recorder.getTaskFunc(), ["gcc"],
+      4))
+    scheduler.run()
+    self.assertEqual(sorted(recorder.tasksRun),
+      ["autoconf", "cmake", "gcc", "mpich"])
+    self.assertTrue(recorder.tasksRun.index("gcc") <
+      recorder.tasksRun.index("mpich"))
+    self.assertTrue(recorder.maxProcsInUse <= 4)
+    for task in scheduler.tasks:
+      self.assertEqual(task.status, "done")
+      self.assertTrue(1 <= task.numProcs <= task.maxProcs)
+
+  def test_starts_the_longest_chain_first(self):
+    recorder = TaskRecorder()
+    scheduler = self.getScheduler(1)
+    scheduler.addTask(InstallTask("cmake", recorder.getTaskFunc()))
+    scheduler.addTask(InstallTask("gcc", recorder.getTaskFunc()))
+    scheduler.addTask(InstallTask("mpich", recorder.getTaskFunc(), ["gcc"]))
+    scheduler.run()
+    self.assertEqual(recorder.tasksRun[0], "gcc")
+
+  def test_leaves_a_process_for_each_ready_task(self):
+    recorder = TaskRecorder()
+    scheduler = self.getScheduler(4)
+    scheduler.addTask(InstallTask("gcc", recorder.getTaskFunc(), [], 8))
+    scheduler.addTask(InstallTask("cmake", recorder.getTaskFunc(), [], 8))
+    scheduler.run()
+    self.assertEqual(sum(recorder.numProcs.values()), 4)
+    self.assertEqual(recorder.maxProcsInUse, 4)
+
+  def test_memory_budget(self):
+    recorder = TaskRecorder()
+    scheduler = self.getScheduler(8, memBudgetMb=4096)
+    scheduler.addTask(InstallTask("gcc", recorder.getTaskFunc(), [], 8,
+      memPerProcMb=2048))
+    scheduler.addTask(InstallTask("mpich", recorder.getTaskFunc(), [], 8,
+      memPerProcMb=512))
+    scheduler.run()
+    self.assertEqual(recorder.numProcs["gcc"], 2)
+    self.assertTrue(recorder.maxMemInUse <= 4096)
+
+  def test_failed_task_skips_its_dependents(self):
+    recorder = TaskRecorder()
+    scheduler = self.getScheduler(2)
+    scheduler.addTask(InstallTask("gcc", recorder.getTaskFunc(fail=True)))
+    scheduler.addTask(InstallTask("mpich", recorder.getTaskFunc(), ["gcc"]))
+    scheduler.addTask(InstallTask("tpls", recorder.getTaskFunc(), ["mpich"]))
+    scheduler.addTask(InstallTask("cmake", recorder.getTaskFunc()))
+    self.assertRaises(Exception, scheduler.run)
+    statuses = dict([(task.name, task.status) for task in scheduler.tasks])
+    self.assertEqual(statuses, {"gcc" : "failed", "mpich" : "skipped",
+      "tpls" : "skipped", "cmake" : "done"})
+    self.assertEqual(sorted(recorder.tasksRun), ["cmake", "gcc"])
+
+  def test_failed_before_run(self):
+    recorder = TaskRecorder()
+    scheduler = self.getScheduler(1)
+    scheduler.addTask(InstallTask("gcc", recorder.getTaskFunc()))
+    scheduler.addTask(InstallTask("mpich", recorder.getTaskFunc(), ["gcc"]))
+    scheduler.failTask("gcc", "download failed")
+    self.assertRaises(Exception, scheduler.run)
+    self.assertEqual(recorder.tasksRun, [])
+
+  def test_stage_stamps_of_deps(self):
+    stampBaseDir = os.path.join(self.tmpDir, "stamps")
+    stagesRun = []
+    def getTaskFunc(stageInputs):
+      def taskFunc(task):
+        task.runStage("install", stageInputs,
+          lambda: stagesRun.append(task.name))
+      return taskFunc
+    def runGraph(gccInputs):
+      scheduler = self.getScheduler(1, stampBaseDir=stampBaseDir)
+      scheduler.addTask(InstallTask("gcc", getTaskFunc(gccInputs)))
+      scheduler.addTask(InstallTask("mpich", getTaskFunc({}), ["gcc"]))
+      scheduler.run()
+    runGraph({"version" : "1"})
+    self.assertEqual(stagesRun, ["gcc", "mpich"])
+    runGraph({"version" : "1"})
+    self.assertEqual(stagesRun, ["gcc", "mpich"])
+    # A rebuilt dependency rebuilds its dependents
+    runGraph({"version" : "2"})
+    self.assertEqual(stagesRun, ["gcc", "mpich", "gcc", "mpich"])
+
+  def test_install_driver_runs_in_a_worker(self):
+    installDir = os.path.join(self.tmpDir, "install")
+    rtnCodes = []
+    def taskFunc(task):
+      rtnCodes.append(task.runInstallDriver("cmake",
+        {"installDir" : installDir, "showDefaults" : True},
+        {"INSTALL_SCHEDULER_TEST_VAR" : "1"}))
+    cwd = os.getcwd()
+    scheduler = self.getScheduler(2)
+    task = scheduler.addTask(InstallTask("cmake", taskFunc,
+      usesInstallDriver=True))
+    scheduler.run()
+    self.assertEqual(rtnCodes, [0])
+    self.assertTrue("--install-dir='"+installDir+"'" in
+      readStrFromFile(task.logFile))
+    # The working dir and env of the worker are not those of the scheduler
+    self.assertEqual(os.getcwd(), cwd)
+    self.assertFalse("INSTALL_SCHEDULER_TEST_VAR" in os.environ)
+
+  def test_failed_install_driver(self):
+    def taskFunc(task):
+      task.runInstallDriver("cmake", {"version" : "0.0.1"})
+    scheduler = self.getScheduler(1)
+    scheduler.addTask(InstallTask("cmake", taskFunc, usesInstallDriver=True))
+    self.assertRaises(Exception, scheduler.run)
+    self.assertTrue("0.0.1" in scheduler.getTask("cmake").errorMsg)
+
+  def test_install_driver_needs_uses_install_driver(self):
+    scheduler = self.getScheduler(1)
+    scheduler.addTask(InstallTask("cmake",
+      lambda task: task.runInstallDriver("cmake", {"showDefaults" : True})))
+    self.assertRaises(Exception, scheduler.run)
+
+
+if __name__ == '__main__':
+  unittest.main()
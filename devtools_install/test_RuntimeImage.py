@@ -0,0 +1,139 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Unit tests for RuntimeImage.py
+#
+
+from FindGeneralScriptSupport import *
+from RuntimeImage import *
+
+import shutil
+import tempfile
+import unittest
+
+
+# The system packages of the compilers and build tools that the runtime image
+# must not install (the installed GCC is copied in instead)
+buildOnlyPackages = ["gcc", "gcc-c++", "gcc-gfortran", "cmake", "autoconf",
+  "automake", "libtool", "bzip2", "wget"]
+
+
+class test_RuntimeImage(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpDir = tempfile.mkdtemp()
+    self.installDir = os.path.join(self.tmpDir, "dev_env")
+    self.imageDir = os.path.join(self.installDir, "images", "runtime")
+    # The trees of an install plus what is left over from building it
+    for subDir in ["common_tools/cmake-3.3.2/bin", "gcc-5.4.0/toolset/bin",
+      "gcc-5.4.0/tpls/hdf5-1.8.10", "env", "images/dev_env", "scratch/tools",
+      "gcc-5.4.0/tpls-build"] \
+      :
+      os.makedirs(os.path.join(self.installDir, subDir))
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpDir)
+
+  def writeImage(self, trees):
+    writeRuntimeImageFiles(self.imageDir,
+      getRuntimeImageDockerfileStr(self.installDir, trees,
+        [("CC", "gcc")], [("PATH", ["/a/bin", "/b/bin"])], "snapshot-id"),
+      getRuntimeImageDockerignoreStr(trees))
+    dockerfileLines = readStrFromFile(
+      os.path.join(self.imageDir, "Dockerfile")).splitlines()
+    dockerignoreLines = readStrFromFile(
+      os.path.join(self.imageDir, "Dockerfile.dockerignore")).splitlines()
+    return (dockerfileLines, dockerignoreLines)
+
+  def test_trees(self):
+    self.assertEqual(getRuntimeImageTrees(self.installDir, "5.4.0"),
+      ["common_tools", "gcc-5.4.0/toolset", "gcc-5.4.0/tpls", "env"])
+
+  def test_trees_without_tpls(self):
+    shutil.rmtree(os.path.join(self.installDir, "gcc-5.4.0/tpls"))
+    os.makedirs(os.path.join(self.installDir, "env/gcc-5.4.0"))
+    self.assertEqual(getRuntimeImageTrees(self.installDir, "5.4.0",
+      "env/gcc-5.4.0"),
+      ["common_tools", "gcc-5.4.0/toolset", "env/gcc-5.4.0"])
+
+  def test_from_and_copy_stages(self):
+    trees = getRuntimeImageTrees(self.installDir, "5.4.0")
+    (dockerfileLines, dockerignoreLines) = self.writeImage(trees)
+    self.assertEqual([line for line in dockerfileLines
+      if line.startswith("FROM ")], ["FROM "+runtimeImageBaseImage_default])
+    # The installs are copied to the same absolute paths
+    self.assertEqual([line for line in dockerfileLines
+      if line.startswith("COPY ")],
+      ["COPY "+tree+" "+self.installDir+"/"+tree for tree in trees])
+    firstCopyLine = "COPY "+trees[0]+" "+self.installDir+"/"+trees[0]
+    self.assertTrue(dockerfileLines.index("FROM "+runtimeImageBaseImage_default)
+      < dockerfileLines.index(firstCopyLine))
+    self.assertTrue('  PATH="/a/bin:/b/bin${PATH:+:${PATH}}" \\'
+      in dockerfileLines)
+    self.assertTrue('  '+envSnapshotGuardVarName+'="snapshot-id"'
+      in dockerfileLines)
+
+  def test_only_the_install_trees_are_in_the_context(self):
+    trees = getRuntimeImageTrees(self.installDir, "5.4.0")
+    (dockerfileLines, dockerignoreLines) = self.writeImage(trees)
+    self.assertEqual(dockerignoreLines,
+      ["*"]+["!"+tree for tree in trees])
+    for leftOver in ["images", "scratch", "gcc-5.4.0/tpls-build"]:
+      self.assertFalse(leftOver in trees)
+      self.assertFalse("!"+leftOver in dockerignoreLines)
+
+  def test_no_build_only_toolchains(self):
+    (dockerfileLines, dockerignoreLines) = self.writeImage(
+      getRuntimeImageTrees(self.installDir, "5.4.0"))
+    installLines = [line for line in dockerfileLines
+      if line.startswith("yum install ")]
+    self.assertEqual(len(installLines), 1)
+    installedPackages = installLines[0].split()[3:]
+    self.assertEqual(installedPackages, runtimeImagePackages)
+    for package in buildOnlyPackages:
+      self.assertFalse(package in installedPackages)
+    # Nothing is built in the image
+    for line in dockerfileLines:
+      for buildCmnd in ["configure", "make install", "cmake ", "install-"]:
+        self.assertFalse(buildCmnd in line, line)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,158 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Unit tests for SourceCache.py
+#
+
+from FindGeneralScriptSupport import *
+from SourceCache import *
+
+import json
+import shutil
+import tempfile
+import unittest
+
+
+class test_SourceCache(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpDir = tempfile.mkdtemp()
+    self.cacheDir = os.path.join(self.tmpDir, "cache")
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpDir)
+
+  def writeSrcFile(self, fileName, contents):
+    srcPath = os.path.join(self.tmpDir, fileName)
+    writeStrToFile(srcPath, contents)
+    return srcPath
+
+  # Set the last-used time of the entries in the index so that the LRU
+  # order does not depend on the clock
+  def setLastUsed(self, cache, lastUsedTimes):
+    index = json.loads(readStrFromFile(cache.indexFile))
+    for (key, lastUsed) in lastUsedTimes.items():
+      index[key]["lastUsed"] = lastUsed
+    writeStrToFile(cache.indexFile, json.dumps(index))
+
+  def test_store_lookup_fetch(self):
+    cache = SourceCache(self.cacheDir, 1000)
+    srcPath = self.writeSrcFile("a.tar.gz", "aaaa")
+    sha256 = cache.store("a", "1.0", "a.tar.gz", srcPath)
+    self.assertEqual(sha256, getFileSha256(srcPath))
+    self.assertEqual(cache.lookup("a", "1.0", "a.tar.gz"),
+      cache.getBlobPath(sha256))
+    self.assertEqual(cache.lookup("a", "2.0", "a.tar.gz"), None)
+    destPath = os.path.join(self.tmpDir, "fetched.tar.gz")
+    self.assertTrue(cache.fetch("a", "1.0", "a.tar.gz", destPath))
+    self.assertEqual(readStrFromFile(destPath), "aaaa")
+    self.assertFalse(os.path.exists(destPath+".part"))
+
+  def test_lookup_checks_expected_sha256(self):
+    cache = SourceCache(self.cacheDir, 1000)
+    sha256 = cache.store("a", "1.0", "a.tar.gz",
+      self.writeSrcFile("a.tar.gz", "aaaa"))
+    self.assertEqual(cache.lookup("a", "1.0", "a.tar.gz", sha256),
+      cache.getBlobPath(sha256))
+    self.assertEqual(cache.lookup("a", "1.0", "a.tar.gz", "0"*64), None)
+
+  def test_missing_blob_is_a_miss(self):
+    cache = SourceCache(self.cacheDir, 1000)
+    sha256 = cache.store("a", "1.0", "a.tar.gz",
+      self.writeSrcFile("a.tar.gz", "aaaa"))
+    os.remove(cache.getBlobPath(sha256))
+    self.assertEqual(cache.lookup("a", "1.0", "a.tar.gz"), None)
+
+  def test_same_contents_stored_once(self):
+    cache = SourceCache(self.cacheDir, 1000)
+    srcPath = self.writeSrcFile("a.tar.gz", "aaaa")
+    cache.store("a", "1.0", "a.tar.gz", srcPath)
+    cache.store("b", "1.0", "b.tar.gz", srcPath)
+    self.assertEqual(cache.getTotalSize(), 4)
+
+  def test_evicts_least_recently_used(self):
+    cache = SourceCache(self.cacheDir, 10)
+    shaA = cache.store("a", "1", "a", self.writeSrcFile("a", "aaaaaa"))
+    shaB = cache.store("b", "1", "b", self.writeSrcFile("b", "bbbb"))
+    self.setLastUsed(cache, {"a/1/a" : 1.0, "b/1/b" : 2.0})
+    cache.store("c", "1", "c", self.writeSrcFile("c", "cccc"))
+    self.assertEqual(cache.lookup("a", "1", "a"), None)
+    self.assertFalse(os.path.exists(cache.getBlobPath(shaA)))
+    self.assertEqual(cache.lookup("b", "1", "b"), cache.getBlobPath(shaB))
+    self.assertTrue(cache.lookup("c", "1", "c"))
+    self.assertEqual(cache.getTotalSize(), 8)
+
+  def test_lookup_marks_entry_as_used(self):
+    cache = SourceCache(self.cacheDir, 10)
+    cache.store("a", "1", "a", self.writeSrcFile("a", "aaaa"))
+    cache.store("b", "1", "b", self.writeSrcFile("b", "bbbb"))
+    self.setLastUsed(cache, {"a/1/a" : 1.0, "b/1/b" : 2.0})
+    cache.lookup("a", "1", "a")
+    cache.store("c", "1", "c", self.writeSrcFile("c", "cccc"))
+    self.assertTrue(cache.lookup("a", "1", "a"))
+    self.assertEqual(cache.lookup("b", "1", "b"), None)
+
+  def test_shared_blob_kept_while_still_used(self):
+    cache = SourceCache(self.cacheDir, 8)
+    srcPath = self.writeSrcFile("a", "aaaa")
+    sha256 = cache.store("a", "1", "a", srcPath)
+    cache.store("a", "2", "a", srcPath)
+    self.setLastUsed(cache, {"a/1/a" : 1.0, "a/2/a" : 2.0})
+    cache.store("c", "1", "c", self.writeSrcFile("c", "cccccc"))
+    # Evicting a/1/a alone does not free any space so a/2/a goes too
+    self.assertEqual(cache.lookup("a", "2", "a"), None)
+    self.assertFalse(os.path.exists(cache.getBlobPath(sha256)))
+
+  def test_entry_bigger_than_cap_is_kept(self):
+    cache = SourceCache(self.cacheDir, 2)
+    cache.store("a", "1", "a", self.writeSrcFile("a", "aaaa"))
+    self.assertTrue(cache.lookup("a", "1", "a"))
+
+  def test_corrupted_index_is_ignored(self):
+    cache = SourceCache(self.cacheDir, 1000)
+    os.makedirs(self.cacheDir)
+    writeStrToFile(cache.indexFile, "{")
+    self.assertEqual(cache.lookup("a", "1", "a"), None)
+    cache.store("a", "1", "a", self.writeSrcFile("a", "aaaa"))
+    self.assertTrue(cache.lookup("a", "1", "a"))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,150 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+
+#
+# Unit tests for SourceMirror.py
+#
+
+from FindGeneralScriptSupport import *
+from SourceMirror import *
+from SourceDownloads import SourceDownload
+
+import shutil
+import tempfile
+import unittest
+
+
+class test_SourceMirror(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpDir = tempfile.mkdtemp()
+    self.downloadDir = os.path.join(self.tmpDir, "downloads")
+    os.makedirs(self.downloadDir)
+    writeStrToFile(os.path.join(self.downloadDir, "cmake-3.3.2.tar.gz"),
+      "cmake sources")
+    self.cmakeDownload = SourceDownload("cmake",
+      "https://cmake.org/files/v3.3/cmake-3.3.2.tar.gz", self.downloadDir,
+      toolName="cmake", toolVersion="3.3.2")
+    self.bundleFile = os.path.join(self.tmpDir, "bundle.tar")
+    writeSourceBundle(self.bundleFile, [self.cmakeDownload],
+      ["cmake-3.3.2"], {"4.8.3" : ["gmp-4.3.2.tar.bz2"]},
+      os.path.join(self.tmpDir, "staging"))
+    self.cmakeRelPath = "sources/cmake/cmake-3.3.2.tar.gz"
+    self.destPath = os.path.join(self.tmpDir, "cmake-3.3.2.tar.gz")
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpDir)
+
+  def extractBundle(self):
+    mirrorDir = os.path.join(self.tmpDir, "mirror")
+    os.makedirs(mirrorDir)
+    bundle = tarfile.open(self.bundleFile, "r")
+    bundle.extractall(mirrorDir)
+    bundle.close()
+    return mirrorDir
+
+  def test_bundle_rel_path(self):
+    self.assertEqual(getBundleSourceRelPath("cmake", "cmake-3.3.2.tar.gz"),
+      self.cmakeRelPath)
+    self.assertEqual(self.cmakeDownload.getBundleRelPath(), self.cmakeRelPath)
+
+  def test_manifest(self):
+    mirror = SourceMirror(self.bundleFile, os.path.join(self.tmpDir, "ext"))
+    manifest = mirror.getManifest()
+    self.assertEqual(manifest["versions"], ["cmake-3.3.2"])
+    self.assertEqual(manifest["sources"][0]["path"], self.cmakeRelPath)
+    self.assertEqual(manifest["files"][self.cmakeRelPath]["size"], 13)
+    self.assertEqual(mirror.getGccPrerequisites("4.8.3"),
+      ["gmp-4.3.2.tar.bz2"])
+    self.assertEqual(mirror.getGccPrerequisites("5.4.0"), [])
+
+  def test_bundle_mirror(self):
+    extractDir = os.path.join(self.tmpDir, "ext")
+    mirror = SourceMirror(self.bundleFile, extractDir)
+    self.assertEqual(mirror.mirrorDir, extractDir)
+    self.assertTrue(mirror.fetch(self.cmakeRelPath, self.destPath))
+    self.assertEqual(readStrFromFile(self.destPath), "cmake sources")
+
+  def test_dir_mirror(self):
+    mirrorDir = self.extractBundle()
+    mirror = SourceMirror(mirrorDir, os.path.join(self.tmpDir, "ext"))
+    self.assertEqual(mirror.mirrorDir, mirrorDir)
+    self.assertFalse(os.path.exists(os.path.join(self.tmpDir, "ext")))
+    self.assertTrue(mirror.fetch(self.cmakeRelPath, self.destPath))
+    self.assertEqual(readStrFromFile(self.destPath), "cmake sources")
+    self.assertFalse(os.path.exists(self.destPath+".part"))
+
+  def test_file_url_mirror(self):
+    mirrorDir = self.extractBundle()
+    self.assertEqual(getMirrorPath("file://"+mirrorDir), mirrorDir)
+    mirror = SourceMirror("file://"+mirrorDir,
+      os.path.join(self.tmpDir, "ext"))
+    self.assertTrue(mirror.fetch(self.cmakeRelPath, self.destPath))
+    self.assertEqual(getMirrorCatCmnd("file://"+mirrorDir, self.cmakeRelPath),
+      "cat "+os.path.join(mirrorDir, self.cmakeRelPath))
+    self.assertEqual(getMirrorCatCmnd(self.bundleFile, self.cmakeRelPath),
+      "tar -xOf "+self.bundleFile+" "+self.cmakeRelPath)
+
+  def test_missing_entry(self):
+    mirror = SourceMirror(self.extractBundle(),
+      os.path.join(self.tmpDir, "ext"))
+    self.assertFalse(mirror.fetch("sources/mpich/mpich-3.1.3.tar.gz",
+      self.destPath))
+    self.assertFalse(os.path.exists(self.destPath))
+
+  def test_changed_file(self):
+    mirrorDir = self.extractBundle()
+    writeStrToFile(os.path.join(mirrorDir, self.cmakeRelPath), "changed")
+    mirror = SourceMirror(mirrorDir, os.path.join(self.tmpDir, "ext"))
+    self.assertRaises(Exception, mirror.fetch, self.cmakeRelPath,
+      self.destPath)
+
+  def test_dir_without_manifest(self):
+    mirror = SourceMirror(self.tmpDir, os.path.join(self.tmpDir, "ext"))
+    self.assertEqual(mirror.getManifest(), {})
+
+  def test_missing_mirror(self):
+    self.assertRaises(Exception, SourceMirror,
+      os.path.join(self.tmpDir, "no-such-mirror"),
+      os.path.join(self.tmpDir, "ext"))
+
+
+if __name__ == '__main__':
+  unittest.main()
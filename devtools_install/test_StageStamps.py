@@ -0,0 +1,176 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+# Unit tests for StageStamps.py
+#
+
+from FindGeneralScriptSupport import *
+from StageStamps import *
+
+import shutil
+import tempfile
+import unittest
+
+
+class StageRecorder:
+
+  def __init__(self):
+    self.stagesRun = []
+
+  def getStageFunc(self, stageName):
+    return lambda: self.stagesRun.append(stageName)
+
+
+class test_getStageInputsHash(unittest.TestCase):
+
+  def test_key_order_does_not_matter(self):
+    self.assertEqual(getStageInputsHash({"a" : 1, "b" : [2, 3]}),
+      getStageInputsHash({"b" : [2, 3], "a" : 1}))
+
+  def test_different_inputs(self):
+    self.assertNotEqual(getStageInputsHash({"a" : 1}),
+      getStageInputsHash({"a" : 2}))
+
+
+class test_StageStamps(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpDir = tempfile.mkdtemp()
+    self.stampDir = os.path.join(self.tmpDir, "stamps")
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpDir)
+
+  def runStages(self, stageInputs, baseInputs=None, **kwargs):
+    recorder = StageRecorder()
+    stamps = StageStamps(self.stampDir, baseInputs, verbose=False, **kwargs)
+    for (stageName, inputs) in stageInputs:
+      stamps.runStage(stageName, inputs, recorder.getStageFunc(stageName))
+    return (recorder.stagesRun, stamps)
+
+  def test_first_run_runs_all_and_writes_stamps(self):
+    (stagesRun, stamps) = self.runStages([("configure", {"x" : 1}),
+      ("build", {})])
+    self.assertEqual(stagesRun, ["configure", "build"])
+    self.assertTrue(os.path.exists(stamps.getStampFile("configure")))
+    self.assertTrue(os.path.exists(stamps.getStampFile("build")))
+
+  def test_rerun_skips_up_to_date_stages(self):
+    stageInputs = [("configure", {"x" : 1}), ("build", {})]
+    (stagesRun1, stamps1) = self.runStages(stageInputs)
+    (stagesRun2, stamps2) = self.runStages(stageInputs)
+    self.assertEqual(stagesRun2, [])
+    self.assertEqual(stamps1.getLastHash(), stamps2.getLastHash())
+
+  def test_changed_inputs_rerun_that_stage_and_the_later_ones(self):
+    self.runStages([("untar", {}), ("configure", {"x" : 1}), ("build", {})])
+    (stagesRun, stamps) = self.runStages([("untar", {}),
+      ("configure", {"x" : 2}), ("build", {})])
+    self.assertEqual(stagesRun, ["configure", "build"])
+
+  def test_changed_base_inputs_rerun_all(self):
+    self.runStages([("configure", {}), ("build", {})], {"version" : "1"})
+    (stagesRun, stamps) = self.runStages([("configure", {}), ("build", {})],
+      {"version" : "2"})
+    self.assertEqual(stagesRun, ["configure", "build"])
+
+  def test_failed_stage_is_rerun(self):
+    stamps = StageStamps(self.stampDir, verbose=False)
+    stamps.runStage("configure", {}, lambda: None)
+    def failBuild():
+      raise Exception("build failed")
+    self.assertRaises(Exception, stamps.runStage, "build", {}, failBuild)
+    self.assertFalse(os.path.exists(stamps.getStampFile("build")))
+    (stagesRun, stamps) = self.runStages([("configure", {}), ("build", {})])
+    self.assertEqual(stagesRun, ["build"])
+
+  def test_missing_output_path_reruns_stage(self):
+    outputPath = os.path.join(self.tmpDir, "install")
+    os.makedirs(outputPath)
+    stamps = StageStamps(self.stampDir, verbose=False)
+    stamps.runStage("install", {}, lambda: None, outputPath)
+    shutil.rmtree(outputPath)
+    recorder = StageRecorder()
+    stamps = StageStamps(self.stampDir, verbose=False)
+    self.assertTrue(stamps.runStage("install", {},
+      recorder.getStageFunc("install"), outputPath))
+    self.assertEqual(recorder.stagesRun, ["install"])
+
+  def test_ignore_stamps_runs_all(self):
+    stageInputs = [("configure", {}), ("build", {})]
+    self.runStages(stageInputs)
+    (stagesRun, stamps) = self.runStages(stageInputs, ignoreStamps=True)
+    self.assertEqual(stagesRun, ["configure", "build"])
+
+  def test_skip_op_writes_no_stamps(self):
+    (stagesRun, stamps) = self.runStages([("configure", {})], skipOp=True)
+    self.assertEqual(stagesRun, ["configure"])
+    self.assertFalse(os.path.exists(self.stampDir))
+
+  def test_pass_stage_keeps_the_later_hashes(self):
+    self.runStages([("download", {}), ("build", {})])
+    recorder = StageRecorder()
+    stamps = StageStamps(self.stampDir, verbose=False)
+    stamps.passStage("download", {})
+    self.assertFalse(stamps.runStage("build", {},
+      recorder.getStageFunc("build")))
+    self.assertEqual(recorder.stagesRun, [])
+
+  def test_unchained_stage_does_not_change_the_later_stages(self):
+    (stagesRun, stamps1) = self.runStages([("install", {}), ("module", {})])
+    recorder = StageRecorder()
+    stamps2 = StageStamps(self.stampDir, verbose=False)
+    stamps2.runStage("install", {}, recorder.getStageFunc("install"))
+    self.assertTrue(stamps2.runStage("benchmark", {},
+      recorder.getStageFunc("benchmark"), chained=False))
+    self.assertFalse(stamps2.runStage("module", {},
+      recorder.getStageFunc("module")))
+    self.assertEqual(recorder.stagesRun, ["benchmark"])
+    self.assertEqual(stamps2.getLastHash(), stamps1.getLastHash())
+
+  def test_corrupted_stamp_reruns_stage(self):
+    self.runStages([("configure", {})])
+    writeStrToFile(os.path.join(self.stampDir, "configure.stamp"), "{")
+    (stagesRun, stamps) = self.runStages([("configure", {})])
+    self.assertEqual(stagesRun, ["configure"])
+
+
+if __name__ == '__main__':
+  unittest.main()
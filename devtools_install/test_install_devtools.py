@@ -0,0 +1,227 @@
+# @HEADER
+# ************************************************************************
+#
+#            TriBITS: Tribal Build, Integrate, and Test System
+#                    Copyright 2013 Sandia Corporation
+#
+# Under the terms of Contract DE-AC04-94AL85000 with Sandia Corporation,
+# the U.S. Government retains certain rights in this software.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright
+# notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the Corporation nor the names of the
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY SANDIA CORPORATION "AS IS" AND ANY
+# EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL SANDIA CORPORATION OR THE
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# ************************************************************************
+# @HEADER
+
+#
+#
+# Unit tests for install_devtools.py
+#
+
+from FindGeneralScriptSupport import *
+from install_devtools import *
+
+import shutil
+import tempfile
+import unittest
+
+
+#
+# Write the ExternalProject step stamps of a TPL_build target with their
+# times (relative to baseTime)
+#
+def writeTplStepStamps(stampDir, tplName, stepTimes, baseTime):
+  if not os.path.exists(stampDir):
+    os.makedirs(stampDir)
+  for (stepName, stepTime) in stepTimes:
+    stampFile = os.path.join(stampDir, tplName+"-"+stepName)
+    writeStrToFile(stampFile, "")
+    os.utime(stampFile, (baseTime+stepTime, baseTime+stepTime))
+
+
+class TimelineRecorder:
+
+  def __init__(self):
+    self.stageEvents = {}
+    self.taskEvents = {}
+
+  def addStageEvent(self, toolName, stageName, startTime, endTime, cpuTime,
+    exitCode, status, logFile="" \
+    ):
+    self.stageEvents[toolName] = (endTime-startTime, status, logFile)
+
+  def addTaskEvent(self, toolName, deps, startTime, endTime, status):
+    self.taskEvents[toolName] = (deps, status)
+
+
+class TplBuildTask:
+
+  def __init__(self, logDir):
+    self.logFile = os.path.join(logDir, "vera_tpls-build.log")
+    self.timeline = TimelineRecorder()
+
+
+class test_getTplBuildTargets(unittest.TestCase):
+
+  def test_independent_tpls(self):
+    self.assertEqual(getTplBuildTargets(set(["lapack", "hdf5"])),
+      ["hdf5", "lapack"])
+
+  def test_pulls_in_deps(self):
+    self.assertEqual(getTplBuildTargets(set(["slepc"])),
+      ["lapack", "hypre", "petsc", "slepc"])
+
+  def test_blas_is_built_by_lapack(self):
+    self.assertEqual(getTplBuildTargets(set(["blas"])), ["lapack"])
+    self.assertEqual(getTplBuildTargets(set(["blas", "lapack"])), ["lapack"])
+
+  def test_all(self):
+    self.assertEqual(getTplBuildTargets(set(TPLToolsetArray)),
+      [tplName for (tplName, tplDeps) in tplBuildDepsArray])
+
+  def test_none(self):
+    self.assertEqual(getTplBuildTargets(set()), [])
+
+
+tplVersionList = {"hdf5" : "1.10.1", "blas" : "3.8.0", "lapack" : "3.8.0",
+  "hypre" : "2.11.2", "petsc" : "3.8.4", "slepc" : "3.8.2",
+  "sundials" : "3.1.0"}
+
+
+class test_getInstalledTpls(unittest.TestCase):
+
+  def test_selected_tpls_and_deps(self):
+    self.assertEqual(getInstalledTpls(set(["petsc"])),
+      ["blas", "lapack", "hypre", "petsc"])
+    self.assertEqual(getInstalledTpls(set(["hdf5"])), ["hdf5"])
+
+  def test_blas_and_lapack_are_installed_together(self):
+    self.assertEqual(getInstalledTpls(set(["blas"])), ["blas", "lapack"])
+    self.assertEqual(getInstalledTpls(set(["lapack"])), ["blas", "lapack"])
+
+  def test_all(self):
+    self.assertEqual(getInstalledTpls(set(TPLToolsetArray)), TPLToolsetArray)
+
+  def test_none(self):
+    self.assertEqual(getInstalledTpls(set()), [])
+
+
+class test_getTplEnvDirs(unittest.TestCase):
+
+  def test_selected_tpls(self):
+    self.assertEqual(getTplEnvDirs(set(["hdf5", "sundials"]), tplVersionList),
+      [
+        ("hdf5-1.10.1", ["HDF5_ROOT"], ["bin", "lib", "include"]),
+        ("lapack-3.8.0", ["BLAS_ROOT", "LAPACK_DIR"], ["lib"]),
+        ("sundials-3.1.0", ["SUNDIALS_DIR"], ["lib"]),
+      ])
+
+  def test_none(self):
+    self.assertEqual(getTplEnvDirs(set(), tplVersionList), [])
+
+
+class test_splitTplBuildLogs(unittest.TestCase):
+
+  def setUp(self):
+    self.tmpDir = tempfile.mkdtemp()
+    self.buildDir = os.path.join(self.tmpDir, "tpls-build")
+    self.logDir = os.path.join(self.tmpDir, "logs")
+    os.makedirs(self.logDir)
+    # Whole seconds so that the stamp mtimes compare exactly with it
+    self.startTime = float(int(time.time()) - 100)
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpDir)
+
+  def getStampDir(self, tplName):
+    return os.path.join(self.buildDir, tplName+"-prefix", "src",
+      tplName+"-stamp")
+
+  def test_stamp_dir(self):
+    writeTplStepStamps(self.getStampDir("hdf5"), "hdf5", [("mkdir", 0)],
+      self.startTime)
+    self.assertEqual(getTplStampDir(self.buildDir, "hdf5"),
+      self.getStampDir("hdf5"))
+    self.assertEqual(getTplStampDir(self.buildDir, "lapack"), "")
+
+  def test_build_times(self):
+    stampDir = self.getStampDir("hdf5")
+    writeTplStepStamps(stampDir, "hdf5", [("mkdir", 5), ("configure", 10),
+      ("build", 40), ("install", 45), ("done", 45)], self.startTime)
+    writeStrToFile(os.path.join(stampDir, "hdf5-cfgcmd.txt"), "")
+    (startTime, endTime, status) = getTplBuildTimes(stampDir, "hdf5",
+      self.startTime)
+    self.assertEqual(status, "done")
+    self.assertAlmostEqual(startTime, self.startTime+5, 3)
+    self.assertAlmostEqual(endTime, self.startTime+45, 3)
+
+  def test_failed_and_up_to_date_builds(self):
+    stampDir = self.getStampDir("petsc")
+    writeTplStepStamps(stampDir, "petsc", [("mkdir", 0), ("configure", 10)],
+      self.startTime)
+    self.assertEqual(getTplBuildTimes(stampDir, "petsc", self.startTime)[2],
+      "failed")
+    # The stamps of an earlier make
+    self.assertEqual(getTplBuildTimes(stampDir, "petsc",
+      self.startTime+20)[2], "skipped")
+    self.assertEqual(getTplBuildTimes("", "petsc", self.startTime)[2],
+      "skipped")
+
+  def test_split_logs_and_timeline(self):
+    tplsBuild = VeraTplsBuild({"compilerToolsetBase" : self.tmpDir},
+      getCmndLineOptions(["--install-dir="+self.tmpDir], True),
+      self.tmpDir, False,
+      getTplBuildTargets(set(["hypre", "hdf5"])), "@gcc-5.4.0")
+    tplsBuild.buildDir = self.buildDir
+    writeTplStepStamps(self.getStampDir("lapack"), "lapack", [("mkdir", 0),
+      ("done", 30)], self.startTime)
+    writeStrToFile(os.path.join(self.getStampDir("lapack"),
+      "lapack-build-out.log"), "building lapack\n")
+    writeTplStepStamps(self.getStampDir("hypre"), "hypre", [("mkdir", 30),
+      ("build", 50)], self.startTime)
+    task = TplBuildTask(self.logDir)
+    splitTplBuildLogs(task, tplsBuild, self.startTime)
+    timeline = task.timeline
+    self.assertEqual(timeline.taskEvents, {
+      "vera_tpls-lapack@gcc-5.4.0" : ([], "done"),
+      "vera_tpls-hypre@gcc-5.4.0" : (["vera_tpls-lapack@gcc-5.4.0"],
+        "failed"),
+      })
+    self.assertEqual(timeline.stageEvents["vera_tpls-hdf5@gcc-5.4.0"][1],
+      "skipped")
+    self.assertAlmostEqual(
+      timeline.stageEvents["vera_tpls-lapack@gcc-5.4.0"][0], 30.0, 3)
+    lapackLog = readStrFromFile(os.path.join(self.logDir,
+      "vera_tpls-lapack@gcc-5.4.0.log"))
+    self.assertTrue("building lapack" in lapackLog)
+    hypreLog = readStrFromFile(os.path.join(self.logDir,
+      "vera_tpls-hypre@gcc-5.4.0.log"))
+    self.assertTrue(task.logFile in hypreLog)
+
+
+if __name__ == '__main__':
+  unittest.main()
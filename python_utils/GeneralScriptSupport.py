@@ -61,6 +61,7 @@ import time
 import datetime
 import optparse
 import traceback
+import tarfile
 
 #
 # Byte array / string / unicode support across Python 2 & 3
@@ -258,12 +259,18 @@ class InterceptedCmndStruct:
 # Class that is used to record a set of commands that will be used to
 # intercept commands
 #
+# The intercepted commands (IT) must be run in order.  A default intercepted
+# command (DT) is not used up and intercepts any command that matches it
+# (that is not the next intercepted command) in any order, e.g. to stub out
+# all of the commands of scripts that run commands concurrently.
+#
 
 class SysCmndInterceptor:
 
   def __init__(self):
     self.__fallThroughCmndRegexList = []
     self.__interceptedCmndStructList = []
+    self.__defaultInterceptedCmndStructList = []
     self.__allowExtraCmnds = True
 
   def setFallThroughCmndRegex(self, cmndRegex):
@@ -273,6 +280,10 @@ class SysCmndInterceptor:
     self.__interceptedCmndStructList.append(
        InterceptedCmndStruct(cmndRegex, cmndReturn, cmndOutput) )
 
+  def setDefaultInterceptedCmnd(self, cmndRegex, cmndReturn, cmndOutput=None):
+    self.__defaultInterceptedCmndStructList.append(
+       InterceptedCmndStruct(cmndRegex, cmndReturn, cmndOutput) )
+
   def setAllowExtraCmnds(self, allowExtraCmnds):
     self.__allowExtraCmnds = allowExtraCmnds
 
@@ -291,6 +302,8 @@ class SysCmndInterceptor:
       return False
     if len(self.__interceptedCmndStructList) > 0:
       return True
+    if self.getDefaultInterceptedCmndStruct(cmnd):
+      return True
     if not self.__allowExtraCmnds:
       return True
     return False
@@ -304,8 +317,19 @@ class SysCmndInterceptor:
          return True
      return False
 
+  def getDefaultInterceptedCmndStruct(self, cmnd):
+    for ics in self.__defaultInterceptedCmndStructList:
+      if re.match(ics.cmndRegex, cmnd):
+        return ics
+    return None
+
   def nextInterceptedCmndStruct(self, cmnd):
     assert(not self.isFallThroughCmnd(cmnd))
+    if len(self.__interceptedCmndStructList) == 0 or \
+      not re.match(self.__interceptedCmndStructList[0].cmndRegex, cmnd):
+      ics = self.getDefaultInterceptedCmndStruct(cmnd)
+      if ics:
+        return (ics.cmndReturn, ics.cmndOutput)
     if len(self.__interceptedCmndStructList) == 0:
       raise Exception("Error, cmnd='"+cmnd+"' is past the last expected command!")
     ics = self.__interceptedCmndStructList[0]
@@ -318,6 +342,7 @@ class SysCmndInterceptor:
   def clear(self):
     self.__fallThroughCmndRegexList = []
     self.__interceptedCmndStructList = []
+    self.__defaultInterceptedCmndStructList = []
     self.__allowExtraCmnds = True
 
   def readCommandsFromStr(self, cmndsStr):
@@ -332,7 +357,7 @@ class SysCmndInterceptor:
       #print("(tag, entry) = " + str((tag, entry)))
       if tag == "FT":
         self.__fallThroughCmndRegexList.append(entry.strip())
-      elif tag == "IT":
+      elif tag == "IT" or tag == "DT":
         entryArray = entry.split(';')
         if len(entryArray) < 3:
           raise Exception("Error, invalid line {"+line+"}")
@@ -344,9 +369,12 @@ class SysCmndInterceptor:
           cmndOutput += cmndOutputEntry.strip()[1:-1]+"\n"
         #print("(cmndRegex, cmndReturn, cmndOutput) = " +
         #      str((cmndRegex, cmndReturn, cmndOutput)))
-        self.__interceptedCmndStructList.append(
-          InterceptedCmndStruct(cmndRegex.strip(), int(cmndReturn), cmndOutput)
-          )
+        ics = InterceptedCmndStruct(cmndRegex.strip(), int(cmndReturn),
+          cmndOutput)
+        if tag == "IT":
+          self.__interceptedCmndStructList.append(ics)
+        else:
+          self.__defaultInterceptedCmndStructList.append(ics)
       else:
         raise Exception("Error, invalid tag = '"+tag+"'!")
 
@@ -380,21 +408,34 @@ g_dumpAllSysCmnds = "GENERAL_SCRIPT_SUPPORT_DUMD_COMMANDS" in os.environ
 
 
 def runSysCmndInterface(cmnd, outFile=None, rtnOutput=False, extraEnv=None, \
-  workingDir="", getStdErr=False \
+  workingDir="", getStdErr=False, appendOutFile=False, cmndStats=None \
   ):
   if g_dumpAllSysCmnds:
     print("\nDUMP SYS CMND: " + cmnd + "\n")
   if outFile!=None and rtnOutput==True:
     raise Exception("Error, both outFile and rtnOutput can not be true!") 
+  # NOTE: A relative outFile is relative to workingDir.  The working
+  # directory is passed to the child process as cwd instead of changing the
+  # current directory of this process so that commands can be run
+  # concurrently from multiple threads.
+  if outFile and workingDir:
+    outFile = os.path.join(workingDir, outFile)
+  if appendOutFile:
+    outFileMode = 'a'
+  else:
+    outFileMode = 'w'
   if g_sysCmndInterceptor.doProcessInterceptedCmnd(cmnd):
     (cmndReturn, cmndOutput) = g_sysCmndInterceptor.nextInterceptedCmndStruct(cmnd)
+    if cmndStats is not None:
+      cmndStats.update({"userTime" : 0.0, "sysTime" : 0.0, "maxRssKb" : 0})
     if rtnOutput:
       if cmndOutput==None:
         raise Exception("Error, the command '"+cmnd+"' gave None output when" \
                         " non-null output was expected!")
       return (cmndOutput, cmndReturn)
     if outFile:
-      writeStrToFile(outFile, cmndOutput)  
+      with open(outFile, outFileMode) as outFileHandle:
+        outFileHandle.write(cmndOutput or "")
     return cmndReturn
   # Else, fall through
   if extraEnv:
@@ -402,44 +443,77 @@ def runSysCmndInterface(cmnd, outFile=None, rtnOutput=False, extraEnv=None, \
     fullEnv.update(extraEnv)
   else:
     fullEnv = None
-  pwd = None
+  cwd = None
   if workingDir:
-    pwd = os.getcwd()
-    os.chdir(workingDir)
+    cwd = workingDir
   rtnObject = None
-  try:
-    if rtnOutput:
-      if getStdErr:
-        child = subprocess.Popen(cmnd, shell=True, stdout=subprocess.PIPE,
-          stderr = subprocess.STDOUT, env=fullEnv)
-      else:
-        child = subprocess.Popen(cmnd, shell=True, stdout=subprocess.PIPE,
-          env=fullEnv)
-      data = child.stdout.read()
-      #print("data = '" + str(data) + "'")
-      child.wait()
-      rtnCode = child.returncode
-      #print("rtnCode = '" + str(rtnCode) + "'")
-      rtnObject = (data, rtnCode)
+  if rtnOutput:
+    if getStdErr:
+      child = subprocess.Popen(cmnd, shell=True, stdout=subprocess.PIPE,
+        stderr = subprocess.STDOUT, env=fullEnv, cwd=cwd)
     else:
-      outFileHandle = None
-      if outFile:
-        outFileHandle = open(outFile, 'w')
-      rtnCode = subprocess.call(cmnd, shell=True, stderr=subprocess.STDOUT,
-        stdout=outFileHandle, env=fullEnv)
-      rtnObject = rtnCode
-  finally:
-    if pwd: os.chdir(pwd)
+      child = subprocess.Popen(cmnd, shell=True, stdout=subprocess.PIPE,
+        env=fullEnv, cwd=cwd)
+    data = child.stdout.read()
+    #print("data = '" + str(data) + "'")
+    child.wait()
+    rtnCode = child.returncode
+    #print("rtnCode = '" + str(rtnCode) + "'")
+    rtnObject = (data, rtnCode)
+  else:
+    outFileHandle = None
+    if outFile:
+      outFileHandle = open(outFile, outFileMode)
+    try:
+      if cmndStats is None:
+        rtnCode = subprocess.call(cmnd, shell=True, stderr=subprocess.STDOUT,
+          stdout=outFileHandle, env=fullEnv, cwd=cwd)
+      else:
+        child = subprocess.Popen(cmnd, shell=True, stderr=subprocess.STDOUT,
+          stdout=outFileHandle, env=fullEnv, cwd=cwd)
+        rtnCode = waitForChildWithStats(child, cmndStats)
+    finally:
+      if outFileHandle: outFileHandle.close()
+    rtnObject = rtnCode
   return rtnObject
 
 
+def waitForChildWithStats(child, cmndStats):
+  """Wait for a child process and put its CPU times and max RSS in cmndStats
+
+  NOTE: Unlike getrusage(RUSAGE_CHILDREN), os.wait4() gives the resources
+  used by just this child (and its descendants) so this works when several
+  commands are run at the same time from different threads.
+  """
+  rtnCode = waitForPidWithStats(child.pid, cmndStats)
+  child.returncode = rtnCode
+  return rtnCode
+
+
+def waitForPidWithStats(pid, cmndStats=None):
+  """Wait for the child process pid and return its return code
+
+  Its CPU times and max RSS are put in cmndStats (if not None).
+  """
+  (pid, status, rusage) = os.wait4(pid, 0)
+  if os.WIFSIGNALED(status):
+    rtnCode = -os.WTERMSIG(status)
+  else:
+    rtnCode = os.WEXITSTATUS(status)
+  if cmndStats is not None:
+    cmndStats["userTime"] = rusage.ru_utime
+    cmndStats["sysTime"] = rusage.ru_stime
+    cmndStats["maxRssKb"] = rusage.ru_maxrss
+  return rtnCode
+
+
 ######################################
 # System interaction utilties
 ######################################
 
 
 def runSysCmnd(cmnd, throwExcept=True, outFile=None, workingDir="",
-  extraEnv=None \
+  extraEnv=None, appendOutFile=False, cmndStats=None \
   ):
   """Run system command and optionally throw on failure"""
   sys.stdout.flush()
@@ -447,9 +521,11 @@ def runSysCmnd(cmnd, throwExcept=True, outFile=None, workingDir="",
   try:
     outFileHandle = None
     rtnCode = runSysCmndInterface(cmnd, outFile=outFile, extraEnv=extraEnv,
-      workingDir=workingDir)
+      workingDir=workingDir, appendOutFile=appendOutFile, cmndStats=cmndStats)
   except OSError as e:
     rtnCode = 1 # Just some error code != 0 please!
+  if cmndStats is not None:
+    cmndStats["rtnCode"] = rtnCode
   if rtnCode != 0 and throwExcept:
     raise RuntimeError("Error, the command '%s' failed with error code %d"
                        % (cmnd, rtnCode))
@@ -458,7 +534,7 @@ def runSysCmnd(cmnd, throwExcept=True, outFile=None, workingDir="",
 
 def echoRunSysCmnd(cmnd, throwExcept=True, outFile=None, msg=None,
   timeCmnd=False, verbose=True, workingDir="", returnTimeCmnd=False,
-  extraEnv=None
+  extraEnv=None, appendOutFile=False, cmndStats=None
   ):
   """Echo command to be run and run command with runSysCmnd()"""
   if verbose:
@@ -474,7 +550,8 @@ def echoRunSysCmnd(cmnd, throwExcept=True, outFile=None, msg=None,
   t1 = time.time()
   totalTimeMin = -1.0
   try:
-    rtn = runSysCmnd(cmnd, throwExcept, outFile, workingDir, extraEnv)
+    rtn = runSysCmnd(cmnd, throwExcept, outFile, workingDir, extraEnv,
+      appendOutFile, cmndStats)
   finally:
     if timeCmnd:
       t2 = time.time()
@@ -771,6 +848,173 @@ class TeeOutput(object):
     self._safe_outputfile_method('flush')
 
 
+######################################
+# Tarball extraction
+######################################
+
+
+# The decompressors for each type of tarball, the parallel ones first, and the
+# tarfile mode to fall back to if none of them are in the PATH (None if Python
+# tarfile can't read it)
+tarballDecompressors = [
+  ([".tar.gz", ".tgz"], ["pigz -dc", "gzip -dc"], "gz"),
+  ([".tar.bz2", ".tbz2", ".tbz"], ["pbzip2 -dc", "lbzip2 -dc", "bzip2 -dc"],
+    "bz2"),
+  ([".tar.xz", ".txz"], ["xz -T0 -dc", "xz -dc"], "xz"),
+  ([".tar.zst", ".tzst"], ["zstd -T0 -dc", "zstd -dc"], None),
+  ([".tar"], ["cat"], ""),
+  ]
+
+
+def findProgramInPath(programName):
+  """Return the full path of a program in the PATH (or '' if not found)"""
+  for pathDir in os.environ.get("PATH", "").split(os.pathsep):
+    programPath = os.path.join(pathDir, programName)
+    if os.path.isfile(programPath) and os.access(programPath, os.X_OK):
+      return programPath
+  return ""
+
+
+def getTarballDecompressor(tarball):
+  """Return (decompressCmnd, tarfileMode) for a tarball
+
+  decompressCmnd is the command that writes the uncompressed tar stream of a
+  file to stdout (using a parallel one like pigz if it is in the PATH), or ''
+  if none is in the PATH.  tarfileMode is the tarfile streaming mode to
+  extract it in Python with instead (e.g. 'r|gz').  Raises an exception if
+  none is in the PATH and Python tarfile can't read it (e.g. .tar.zst).
+  """
+  for (extensions, decompressCmnds, compression) in tarballDecompressors:
+    if [ext for ext in extensions if tarball.endswith(ext)]:
+      for decompressCmnd in decompressCmnds:
+        if findProgramInPath(decompressCmnd.split()[0]):
+          return (decompressCmnd, "r|"+(compression or ""))
+      if compression is None:
+        raise Exception("Error, "+decompressCmnds[-1].split()[0]+" is needed" \
+          " to extract '"+tarball+"' but it is not in the PATH!")
+      return ("", "r|"+compression)
+  return ("", "r|*")
+
+
+def getExtractTarballCmnd(tarball, destDir=""):
+  """Return the shell command to stream extract a tarball into destDir (or
+  '' if there is no decompressor for it in the PATH)"""
+  (decompressCmnd, tarfileMode) = getTarballDecompressor(tarball)
+  if not decompressCmnd or not findProgramInPath("tar"):
+    return ""
+  cmnd = decompressCmnd+" "+getShellQuotedArg(tarball)+" | tar -xf -"
+  if destDir:
+    cmnd += " -C "+getShellQuotedArg(destDir)
+  return cmnd
+
+
+def isPathInDir(path, dirPath):
+  """Return True if path (after resolving any symlinks) is inside dirPath"""
+  path = os.path.realpath(path)
+  dirPath = os.path.realpath(dirPath)
+  return path == dirPath or path.startswith(os.path.join(dirPath, ""))
+
+
+def checkTarMember(member, destDir):
+  """Raise an exception if a tar member would be extracted outside of destDir
+
+  Absolute paths, '..' components and links that point outside of destDir are
+  rejected, as are device files and FIFOs.  The setuid, setgid and sticky bits
+  are removed from the member's mode.
+  """
+  if os.path.isabs(member.name) or \
+    not isPathInDir(os.path.join(destDir, member.name), destDir) \
+    :
+    raise Exception("Error, the tarball member '"+member.name+"' would be" \
+      " extracted outside of '"+destDir+"'!")
+  if member.issym():
+    linkTarget = os.path.join(destDir, os.path.dirname(member.name),
+      member.linkname)
+  elif member.islnk():
+    linkTarget = os.path.join(destDir, member.linkname)
+  elif member.isfile() or member.isdir():
+    linkTarget = ""
+  else:
+    raise Exception("Error, the tarball member '"+member.name+"' is not a" \
+      " file, directory or link!")
+  if linkTarget and (os.path.isabs(member.linkname) or \
+    not isPathInDir(linkTarget, destDir)) \
+    :
+    raise Exception("Error, the tarball member '"+member.name+"' links to '" \
+      +member.linkname+"' outside of '"+destDir+"'!")
+  member.mode &= ~0o7000
+
+
+def extractTarballStream(fileObj, tarfileMode, destDir=""):
+  """Extract a tar stream read from fileObj with Python tarfile
+
+  Uses the tarfile 'data' extraction filter where it is available, otherwise
+  each member is checked with checkTarMember() before it is extracted.
+  """
+  destDir = destDir or "."
+  tarStream = tarfile.open(fileobj=fileObj, mode=tarfileMode)
+  try:
+    if hasattr(tarfile, "data_filter"):
+      tarStream.extractall(destDir, filter="data")
+    else:
+      # NOTE: A streaming tarfile can only be read once so each member is
+      # checked and extracted as it is read.
+      for member in tarStream:
+        checkTarMember(member, destDir)
+        tarStream.extract(member, destDir)
+  finally:
+    tarStream.close()
+
+
+def extractTarball(tarball, destDir="", outFile=None, verbose=True,
+  workingDir="", extraEnv=None, appendOutFile=False, cmndStats=None
+  ):
+  """Extract a tarball into destDir
+
+  The tarball is decompressed in a pipe to tar with a parallel decompressor
+  (e.g. pigz for .tar.gz) if there is one in the PATH, then the standard one
+  (e.g. gzip).  If neither is there, it is extracted in streaming mode with
+  Python tarfile.
+  """
+  cmnd = getExtractTarballCmnd(tarball, destDir)
+  if cmnd:
+    return echoRunSysCmnd(cmnd, outFile=outFile, verbose=verbose,
+      workingDir=workingDir, extraEnv=extraEnv, appendOutFile=appendOutFile,
+      cmndStats=cmndStats)
+  if workingDir:
+    tarball = os.path.join(workingDir, tarball)
+    destDir = os.path.join(workingDir, destDir)
+  tarfileMode = getTarballDecompressor(tarball)[1]
+  if verbose:
+    print("\nExtracting " + tarball + " with Python tarfile (" + tarfileMode \
+      + ") ...\n")
+  tarballFile = open(tarball, "rb")
+  try:
+    extractTarballStream(tarballFile, tarfileMode, destDir)
+  finally:
+    tarballFile.close()
+  return 0
+
+
+def getDownloadExtractTarballCmnd(url, tarball, destDir=""):
+  """Return the shell command to download a tarball and extract it into
+  destDir while it is downloading
+
+  The download is also written to the file tarball (once it is complete).
+  Returns '' if there is no decompressor for it in the PATH.
+  """
+  (decompressCmnd, tarfileMode) = getTarballDecompressor(tarball)
+  if not decompressCmnd or not findProgramInPath("bash"):
+    return ""
+  # NOTE: pipefail makes the command fail if the download fails part way
+  cmnd = 'wget -nv -O- "' + url + '" | tee "' + tarball + '.part" | ' + \
+    decompressCmnd + ' | tar -xf -'
+  if destDir:
+    cmnd += ' -C "' + destDir + '"'
+  cmnd += ' && mv "' + tarball + '.part" "' + tarball + '"'
+  return "bash -c 'set -o pipefail && " + cmnd + "'"
+
+
 ######################################
 # Shell argument helpers
 ######################################
@@ -779,6 +1023,11 @@ class TeeOutput(object):
 reCmndLineArg = re.compile(r"(--.+=)(.+)")
 
 
+def getShellQuotedArg(arg):
+  """Quote an argument for a POSIX shell command line"""
+  return "'" + arg.replace("'", "'\\''") + "'"
+
+
 def requoteCmndLineArgs(inArgs):
   argsStr = ""
   for arg in inArgs: